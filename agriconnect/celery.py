@@ -0,0 +1,20 @@
+"""
+Celery application for AgriConnect background tasks
+
+Workers run with ``celery -A agriconnect worker`` and the scheduler with
+``celery -A agriconnect beat``. Both default to the same settings module as
+manage.py, wsgi.py and asgi.py, so they share the web process's cache,
+broker and beat schedule. Setting
+CELERY_TASK_ALWAYS_EAGER=True runs tasks in-process instead, for tests and
+single-process development.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myapiproject.settings_appplatform')
+
+app = Celery('agriconnect')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -7,6 +7,7 @@ Frontend App: app.agritrade.cloud
 import os
 from decouple import config
 import dj_database_url
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -211,6 +212,24 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Africa/Accra'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-market-price-forecasts': {
+        'task': 'ai.tasks.refresh_market_price_forecasts',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'rebuild-semantic-index': {
+        'task': 'ai.tasks.rebuild_semantic_index',
+        'schedule': crontab(minute=15),
+    },
+    'resume-stalled-sms-broadcasts': {
+        'task': 'communications.tasks.resume_stalled_broadcasts',
+        'schedule': crontab(minute='*/5'),
+    },
+    'resume-stalled-recall-notifications': {
+        'task': 'traceability.tasks.resume_stalled_recall_notifications',
+        'schedule': crontab(minute='*/5'),
+    },
+}
 
 # Cache settings using Redis
 CACHES = {
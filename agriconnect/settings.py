@@ -9,6 +9,7 @@ escrow payments, warehouse management, and SMS integration.
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -402,6 +403,57 @@ BLOCKCHAIN_CONFIG = {
     'POLYGON_RPC_URL': config('POLYGON_RPC_URL', default=''),
     'ETHEREUM_RPC_URL': config('ETHEREUM_RPC_URL', default=''),
     'IPFS_GATEWAY': 'https://ipfs.io/ipfs/',
+    # Local simulated chain used by networks whose rpc_url starts with sim://
+    'SIMULATOR': {
+        'block_time': config('BLOCKCHAIN_SIM_BLOCK_TIME', default=2.0, cast=float),
+        'failure_rate': config('BLOCKCHAIN_SIM_FAILURE_RATE', default=0.0, cast=float),
+        'reorg_rate': config('BLOCKCHAIN_SIM_REORG_RATE', default=0.0, cast=float),
+        'max_reorg_depth': 3,
+    },
+}
+
+# Traceability QR label assets (content-addressed PNG/SVG in default storage)
+TRACEABILITY_QR_CONFIG = {
+    'STORAGE_PREFIX': 'traceability/qr',
+    'BATCH_WORKERS': config('TRACEABILITY_QR_WORKERS', default=4, cast=int),
+    'BATCH_CHUNK_SIZE': 50,
+    'CACHE_MAX_AGE': 60 * 60 * 24 * 365,  # Assets are immutable per content hash
+}
+
+# Buffered consumer QR scan ingestion
+TRACEABILITY_SCAN_INGEST = {
+    'FLUSH_INTERVAL_MS': 250,
+    'MAX_BATCH_SIZE': 500,
+    'MAX_BUFFER_SIZE': 20000,
+    'PROJECTION_CACHE_TTL': 300,
+    'SYNCHRONOUS': False,
+}
+
+# Time-decayed trending scores (reviews, peer recommendations, recipes);
+# run refresh_trending_scores every few minutes to renormalize
+TRENDING_CONFIG = {
+    'HALF_LIFE_HOURS': config('TRENDING_HALF_LIFE_HOURS', default=48, cast=float),
+    'SCORE_FLOOR': 0.001,
+    'BACKFILL_DAYS': 30,
+}
+
+# Offline farmer follow recommendations (refresh_farmer_recommendations)
+FARMER_RECOMMENDATION_CONFIG = {
+    'TOP_K': 20,
+    'BLOCK_SIZE': 256,  # Rows scored per dense block; bounds job memory
+}
+
+# Content-based similar recipes (refresh_recipe_similarity)
+RECIPE_SIMILARITY_CONFIG = {
+    'TOP_K': 10,
+    'BLOCK_SIZE': 256,
+}
+
+# Batch review sentiment / topic pipeline (process_review_insights)
+REVIEW_INSIGHTS_CONFIG = {
+    'BATCH_SIZE': 500,
+    'TREND_MONTHS': 12,
+    'MIN_REVIEWS_FOR_RANKING': 3,
 }
 
 # Email Configuration - Mailtrap for Development and Production Testing
@@ -441,6 +493,28 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks in-process (tests / single-process development)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+# Periodic tasks, run by `celery -A agriconnect beat`
+CELERY_BEAT_SCHEDULE = {
+    'refresh-market-price-forecasts': {
+        'task': 'ai.tasks.refresh_market_price_forecasts',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'rebuild-semantic-index': {
+        'task': 'ai.tasks.rebuild_semantic_index',
+        'schedule': crontab(minute=15),
+    },
+    'resume-stalled-sms-broadcasts': {
+        'task': 'communications.tasks.resume_stalled_broadcasts',
+        'schedule': crontab(minute='*/5'),
+    },
+    'resume-stalled-recall-notifications': {
+        'task': 'traceability.tasks.resume_stalled_recall_notifications',
+        'schedule': crontab(minute='*/5'),
+    },
+}
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -556,3 +630,80 @@ AI_USAGE_LIMITS = {
     'MAX_CONVERSATION_LENGTH': 20,
     'RATE_LIMIT_WINDOW': 60,  # seconds
 }
+
+# Exact-match reuse of advisory responses (ai/response_cache.py)
+AI_RESPONSE_CACHE_CONFIG = {
+    'ENABLED': config('AI_RESPONSE_CACHE_ENABLED', default=True, cast=bool),
+    'MEMORY_MAX_ENTRIES': 512,
+    'TTL_SECONDS': {
+        'crop_advisory': 6 * 60 * 60,
+        'disease_detection': 24 * 60 * 60,
+        'market_intelligence': 60 * 60,
+    },
+}
+
+# Single-flight coalescing and shared upstream limits for AI calls (ai/concurrency.py)
+AI_CONCURRENCY_CONFIG = {
+    'GLOBAL_LIMIT': config('AI_GLOBAL_CONCURRENCY', default=32, cast=int),
+    'QUEUE_DEADLINE_SECONDS': 5,
+}
+
+# Buffered AI usage accounting (ai/usage.py)
+AI_USAGE_ACCOUNTING_CONFIG = {
+    'FLUSH_INTERVAL_SECONDS': 10,
+}
+
+# Disease photo preprocessing and near-duplicate reuse (ai/image_pipeline.py)
+DISEASE_IMAGE_CONFIG = {
+    'MAX_DIMENSION': 1024,
+    'JPEG_QUALITY': 80,
+    'REUSE_WINDOW_HOURS': 24,
+}
+
+# Latency-aware provider routing with hedged requests (ai/routing.py)
+AI_ROUTING_CONFIG = {
+    'PROVIDERS': {
+        'primary': {'KIND': 'openai', 'BASE_URL': OPENAI_BASE_URL, 'API_KEY': OPENAI_API_KEY},
+        # Left out of routing while OPENROUTER_API_KEY is unset
+        'openrouter': {
+            'KIND': 'openai',
+            'BASE_URL': 'https://openrouter.ai/api/v1',
+            'API_KEY': config('OPENROUTER_API_KEY', default=''),
+        },
+    },
+    'ROUTES': [
+        {'PROVIDER': 'primary', 'MODEL': OPENAI_MODEL},
+        {'PROVIDER': 'openrouter', 'MODEL': config('AI_FALLBACK_MODEL', default='openai/gpt-4o-mini')},
+    ],
+    'REQUEST_TIMEOUT_SECONDS': OPENAI_TIMEOUT,
+}
+
+# Token-budgeted chat history with rolling summaries (ai/context.py)
+AI_CONTEXT_CONFIG = {
+    'MAX_CONTEXT_TOKENS': 3000,
+    'HISTORY_TOKEN_BUDGET': 1500,
+    'SUMMARY_MAX_TOKENS': 300,
+}
+
+# Reuse of vetted answers to equivalent questions (ai/semantic_reuse.py)
+SEMANTIC_REUSE_CONFIG = {
+    'ENABLED': config('SEMANTIC_REUSE_ENABLED', default=True, cast=bool),
+    'SIMILARITY_THRESHOLD': 0.9,
+}
+
+# Weekly market price forecasts fitted from order history (ai/price_forecast.py)
+MARKET_FORECAST_CONFIG = {
+    'HISTORY_WEEKS': 156,
+    'HORIZON_WEEKS': 26,
+    'MIN_OBSERVATIONS': 8,
+}
+
+# Bulk SMS broadcast jobs (communications/broadcast.py)
+SMS_BROADCAST_CONFIG = {
+    'MAX_WORKERS': config('SMS_BROADCAST_WORKERS', default=16, cast=int),
+    'CHUNK_SIZE': 500,
+    # Messages per second per provider, per worker process
+    'PROVIDER_RATE_LIMITS': {
+        'avrsms': config('AVRSMS_RATE_LIMIT', default=20, cast=int),
+    },
+}
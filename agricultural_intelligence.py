@@ -345,6 +345,10 @@ class GhanaAgriculturalIntelligence:
     def generate_market_price_prediction(self, crop, region, forecast_days=30):
         """Generate market price predictions"""
         
+        stored = self.get_stored_price_prediction(crop, region, forecast_days)
+        if stored:
+            return stored
+        
         crop_model = self.crop_models.get(crop)
         if not crop_model:
             return None
@@ -402,6 +406,48 @@ class GhanaAgriculturalIntelligence:
             }
         }
     
+    def get_stored_price_prediction(self, crop, region, forecast_days):
+        """Daily view of the nightly forecast fitted from AgriConnect sales, if one exists"""
+        from ai.price_forecast import get_price_forecast
+        
+        forecast = get_price_forecast(crop, region, unit='kg', weeks=forecast_days // 7 + 2)
+        if not forecast:
+            return None
+        
+        weekly = {datetime.strptime(week['week_start'], '%Y-%m-%d').date(): week for week in forecast['weekly']}
+        price_predictions = []
+        for i in range(forecast_days):
+            date = datetime.now() + timedelta(days=i)
+            week = weekly.get((date - timedelta(days=date.weekday())).date())
+            if week is None:
+                break
+            spread = (week['upper_price'] - week['lower_price']) / (2 * week['predicted_price'])
+            price_predictions.append({
+                'date': date.strftime('%Y-%m-%d'),
+                'predicted_price_ghs_per_kg': week['predicted_price'],
+                'confidence': round(max(0.5, min(0.95, 1 - spread)), 2),
+                'market_factors': self.get_market_factors(date, crop)
+            })
+        
+        if not price_predictions:
+            return None
+        
+        prices = [p['predicted_price_ghs_per_kg'] for p in price_predictions]
+        return {
+            'crop': crop,
+            'region': region,
+            'base_price_ghs_per_kg': forecast['last_observed_price'],
+            'forecast_period_days': len(price_predictions),
+            'price_predictions': price_predictions,
+            'source': 'platform_sales',
+            'summary': {
+                'avg_predicted_price': round(sum(prices) / len(prices), 2),
+                'min_predicted_price': round(min(prices), 2),
+                'max_predicted_price': round(max(prices), 2),
+                'volatility': round(forecast['model']['residual_std'] * 100, 1)
+            }
+        }
+    
     def get_market_factors(self, date, crop):
         """Get market factors affecting price"""
         
@@ -7,17 +7,17 @@ from django.utils.html import format_html
 from django.urls import reverse
 from .models import (
     AIConversation, CropAdvisory, DiseaseDetection, 
-    MarketIntelligence, AIUsageAnalytics, AIFeedback
+    MarketIntelligence, MarketPriceForecast, AIUsageAnalytics, AIFeedback
 )
 
 
 @admin.register(AIConversation)
 class AIConversationAdmin(admin.ModelAdmin):
     """Admin interface for AI conversations"""
-    list_display = ['id', 'user_link', 'conversation_type', 'language', 'created_at']
-    list_filter = ['conversation_type', 'language', 'created_at']
+    list_display = ['id', 'user_link', 'conversation_type', 'language', 'answer_reused', 'created_at']
+    list_filter = ['conversation_type', 'language', 'answer_reused', 'created_at']
     search_fields = ['user__username', 'user__email', 'farmer_question']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'reused_from', 'reuse_similarity', 'created_at', 'updated_at']
     date_hierarchy = 'created_at'
     
     def user_link(self, obj):
@@ -87,10 +87,20 @@ class MarketIntelligenceAdmin(admin.ModelAdmin):
     user_link.admin_order_field = 'conversation__user__username'
 
 
+@admin.register(MarketPriceForecast)
+class MarketPriceForecastAdmin(admin.ModelAdmin):
+    """Admin interface for stored market price forecasts"""
+    list_display = ['crop', 'region', 'unit', 'week_start', 'predicted_price', 'lower_price', 'upper_price', 'observations', 'fitted_at']
+    list_filter = ['region', 'unit', 'week_start']
+    search_fields = ['crop', 'region']
+    readonly_fields = ['fitted_at', 'model_parameters']
+    date_hierarchy = 'week_start'
+
+
 @admin.register(AIUsageAnalytics)
 class AIUsageAnalyticsAdmin(admin.ModelAdmin):
     """Admin interface for AI usage analytics"""
-    list_display = ['id', 'user_link', 'daily_queries', 'total_tokens_used', 'date']
+    list_display = ['id', 'user_link', 'daily_queries', 'total_tokens_used', 'cache_hits', 'tokens_saved', 'date']
     list_filter = ['date']
     search_fields = ['user__username']
     readonly_fields = ['id', 'date']
@@ -0,0 +1,230 @@
+"""
+AI Call Concurrency Control for AgriConnect
+Single-flight coalescing and shared concurrency limits for upstream AI calls
+
+When a weather or pest event hits a region, many identical advisory
+requests arrive together. Requests sharing a response-cache key are
+coalesced: one caller (the leader) makes the upstream call while the rest
+wait for its result, first on an in-process event and then, across
+workers, by polling the shared response cache behind an in-flight marker.
+
+Upstream calls also take a slot from a global and a per-service limit.
+Slots are leased keys in the shared Django cache (``cache.add`` is atomic on
+Redis), and a crashed worker's slot frees itself when its lease expires.
+Each slot and in-flight marker holds its owner's token and is released by
+compare-and-delete, so an owner whose lease ran out cannot free a slot
+another caller has since taken. Callers that cannot get a slot before their
+deadline get AIBusyError, which the views turn into a fast 503.
+
+The limits and cross-worker coalescing hold across workers only when
+SHARED_CACHE_ALIAS is a shared cache such as Redis (REDIS_URL in the
+deployed settings). With a local-memory cache they apply per process.
+"""
+
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_AI_CONCURRENCY_CONFIG = {
+    'ENABLED': True,
+    'SHARED_CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'ai:flight',
+    # Upstream calls allowed at once across all workers
+    'GLOBAL_LIMIT': 32,
+    'SERVICE_LIMITS': {
+        'general': 16,
+        'crop_advisory': 12,
+        'disease_detection': 8,
+        'market_intelligence': 8,
+    },
+    # Longest a request queues for an upstream slot
+    'QUEUE_DEADLINE_SECONDS': 5,
+    # Longest a coalesced request waits on the leader's upstream call
+    'FOLLOWER_WAIT_SECONDS': 30,
+    'POLL_INTERVAL_SECONDS': 0.1,
+    # Lease on slots and in-flight markers, beyond the OpenAI timeout
+    'LEASE_MARGIN_SECONDS': 10,
+}
+
+
+class AIBusyError(Exception):
+    """No upstream capacity became available before the request's deadline"""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def get_concurrency_config() -> Dict:
+    config = dict(DEFAULT_AI_CONCURRENCY_CONFIG)
+    config.update(getattr(settings, 'AI_CONCURRENCY_CONFIG', {}))
+    return config
+
+
+# Delete KEYS[1] only while it still holds this owner's token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _new_token() -> int:
+    # Django's Redis cache stores ints unpickled, so the script can compare them
+    return uuid.uuid4().int >> 65
+
+
+class _Flight:
+    """An upstream call in progress in this process"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class AICallGate:
+    """Coalesces identical calls and bounds concurrent upstream calls"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or get_concurrency_config()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.config['SHARED_CACHE_ALIAS']]
+
+    @property
+    def lease_seconds(self) -> int:
+        return int(settings.OPENAI_TIMEOUT) + self.config['LEASE_MARGIN_SECONDS']
+
+    def _key(self, *parts) -> str:
+        return ':'.join([self.config['KEY_PREFIX'], *map(str, parts)])
+
+    def _deadline(self, setting: str = 'QUEUE_DEADLINE_SECONDS') -> float:
+        return time.monotonic() + self.config[setting]
+
+    # Concurrency slots
+
+    def _acquire_slot(self, scope: str, limit: int, deadline: float):
+        """(key, token) of a free slot, waiting until the deadline"""
+        token = _new_token()
+        while True:
+            for slot in range(limit):
+                key = self._key('slot', scope, slot)
+                if self.shared.add(key, token, timeout=self.lease_seconds):
+                    return key, token
+            if time.monotonic() >= deadline:
+                raise AIBusyError(
+                    f"AI service busy ({scope}), please retry shortly",
+                    retry_after=self.config['QUEUE_DEADLINE_SECONDS']
+                )
+            time.sleep(self.config['POLL_INTERVAL_SECONDS'])
+
+    def _release(self, key: str, token: int):
+        """Delete ``key`` if it still holds ``token``"""
+        shared = self.shared
+        get_client = getattr(getattr(shared, '_cache', None), 'get_client', None)
+        if get_client is not None:
+            # Django's RedisCache: compare and delete atomically
+            get_client(write=True).eval(_RELEASE_SCRIPT, 1, shared.make_and_validate_key(key), token)
+        elif shared.get(key) == token:
+            shared.delete(key)
+
+    @contextmanager
+    def slot(self, service_type: str, deadline: Optional[float] = None):
+        """Hold a global and a per-service upstream slot for the block"""
+        if not self.config['ENABLED']:
+            yield
+            return
+        deadline = deadline or self._deadline()
+        acquired = [self._acquire_slot('global', self.config['GLOBAL_LIMIT'], deadline)]
+        try:
+            limit = self.config['SERVICE_LIMITS'].get(service_type)
+            if limit:
+                acquired.append(self._acquire_slot(service_type, limit, deadline))
+            yield
+        finally:
+            for key, token in acquired:
+                self._release(key, token)
+
+    @asynccontextmanager
+    async def aslot(self, service_type: str, deadline: Optional[float] = None):
+        """``slot`` for code on the event loop; waiting for a slot happens off the loop"""
+        held = self.slot(service_type, deadline)
+        await sync_to_async(held.__enter__, thread_sensitive=False)()
+        try:
+            yield
+        finally:
+            await sync_to_async(held.__exit__, thread_sensitive=False)(None, None, None)
+
+    # Single flight
+
+    def coalesce(self, key: str, service_type: str, call: Callable, lookup: Callable):
+        """
+        Run ``call`` once per key across concurrent callers.
+
+        ``lookup`` reads a finished result from the shared response cache;
+        followers in other workers poll it while the leader's in-flight marker
+        exists. Returns (result, leader) where ``leader`` is False for callers
+        that received someone else's result.
+        """
+        if not self.config['ENABLED']:
+            return call(), True
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(self.config['FOLLOWER_WAIT_SECONDS']):
+                raise AIBusyError("AI service busy, please retry shortly")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+
+        try:
+            flight.result, leader = self._coalesce_across_workers(key, service_type, call, lookup)
+            return flight.result, leader
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _coalesce_across_workers(self, key: str, service_type: str, call: Callable, lookup: Callable):
+        marker = self._key('inflight', key)
+        token = _new_token()
+        deadline = self._deadline('FOLLOWER_WAIT_SECONDS')
+        while not self.shared.add(marker, token, timeout=self.lease_seconds):
+            # Another worker is fetching this answer; wait for it to land
+            time.sleep(self.config['POLL_INTERVAL_SECONDS'])
+            result = lookup()
+            if result is not None:
+                return result, False
+            if time.monotonic() >= deadline:
+                raise AIBusyError("AI service busy, please retry shortly")
+        try:
+            # The previous leader may have finished between our lookups
+            result = lookup()
+            if result is not None:
+                return result, False
+            with self.slot(service_type):
+                return call(), True
+        finally:
+            self._release(marker, token)
+
+
+ai_call_gate = AICallGate()
@@ -0,0 +1,279 @@
+"""
+Conversation Context Windowing for AgriConnect AI Chat
+Fits conversation history into a fixed prompt token budget
+
+A chat thread is a chain of AIConversation turns sharing a ``thread_id``.
+Each turn stores its own token length (``context_tokens``) when it is
+saved, so assembling a prompt never re-tokenizes history: the newest
+MAX_HISTORY_TURNS unsummarized turns are read with their cached lengths and
+included newest-first while they fit the budget left after the system
+prompt, the rolling summary and the new message.
+
+Turns that no longer fit are folded into a per-thread rolling summary
+(ConversationSummary) by a background task, so older context is kept in
+condensed form and the work per request stays constant however long the
+thread grows.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import tiktoken
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_CONTEXT_CONFIG = {
+    # Prompt tokens for system prompt, summary, history and the new message
+    'MAX_CONTEXT_TOKENS': 3000,
+    # History kept verbatim; older turns are folded into the summary
+    'HISTORY_TOKEN_BUDGET': 1500,
+    'SUMMARY_MAX_TOKENS': 300,
+    # Unsummarized turns folded per summary refresh
+    'SUMMARY_BATCH_TURNS': 50,
+    'SUMMARY_LOCK_SECONDS': 120,
+    'ENCODING': 'cl100k_base',
+}
+
+# Chat format overhead per message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a farmer and AgriBot. "
+    "Merge the new exchanges into the existing summary. Keep facts the assistant will need "
+    "later: the farmer's crops, location, farm size, problems, advice already given and "
+    "decisions made. Write at most {words} words in plain sentences."
+)
+
+
+def get_context_config() -> Dict:
+    config = dict(DEFAULT_AI_CONTEXT_CONFIG)
+    # Turns read per request; defaults to the existing AI feature setting
+    config['MAX_HISTORY_TURNS'] = settings.AI_FEATURES.get('MAX_CONVERSATION_HISTORY', 10)
+    config.update(getattr(settings, 'AI_CONTEXT_CONFIG', {}))
+    return config
+
+
+@lru_cache(maxsize=4)
+def _encoding(name: str):
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=256)
+def count_tokens(text: str, encoding: str = DEFAULT_AI_CONTEXT_CONFIG['ENCODING']) -> int:
+    """Token length of a message body, including per-message overhead"""
+    return len(_encoding(encoding).encode(text or '', disallowed_special=())) + MESSAGE_OVERHEAD_TOKENS
+
+
+def turn_tokens(question: str, response: str, encoding: str = DEFAULT_AI_CONTEXT_CONFIG['ENCODING']) -> int:
+    """Cached on each AIConversation as ``context_tokens`` when the turn is saved"""
+    return count_tokens(question, encoding) + count_tokens(response, encoding)
+
+
+@dataclass
+class ContextWindow:
+    messages: List[Dict]
+    thread_id: Optional[str] = None
+    history_turns: int = 0
+    summary_used: bool = False
+    prompt_tokens: int = 0
+    # Unsummarized turns were left out; the rolling summary should be refreshed
+    overflow: bool = False
+
+    def stats(self) -> Dict:
+        return {
+            'history_turns': self.history_turns,
+            'summary_used': self.summary_used,
+            'prompt_tokens': self.prompt_tokens,
+        }
+
+
+def resolve_thread(user, conversation_id: Optional[str]):
+    """Thread id of a user's earlier turn; raises AIConversation.DoesNotExist"""
+    from .models import AIConversation
+
+    try:
+        turn = AIConversation.objects.only('id', 'thread_id').get(pk=conversation_id, user=user)
+    except ValidationError:
+        # Malformed UUID
+        raise AIConversation.DoesNotExist(f"No conversation {conversation_id}")
+    return turn.thread_id or turn.id
+
+
+def _unsummarized_turns(thread_id, summary, limit: int):
+    """Newest-first (id, question, response, context_tokens, created_at) after the summary"""
+    from .models import AIConversation
+
+    turns = AIConversation.objects.filter(thread_id=thread_id, job_status='completed')
+    if summary is not None and summary.summarized_through:
+        turns = turns.filter(created_at__gt=summary.summarized_through)
+    return list(turns.order_by('-created_at').values_list(
+        'id', 'farmer_question', 'ai_response', 'context_tokens', 'created_at'
+    )[:limit])
+
+
+def _cached_lengths(turns, encoding: str) -> List[int]:
+    """Stored token lengths, backfilling turns saved before lengths were recorded"""
+    from .models import AIConversation
+
+    lengths = []
+    for turn_id, question, response, tokens, _ in turns:
+        if not tokens:
+            tokens = turn_tokens(question, response, encoding)
+            AIConversation.objects.filter(pk=turn_id).update(context_tokens=tokens)
+        lengths.append(tokens)
+    return lengths
+
+
+def build_context(system_prompt: str, message: str, thread_id=None,
+                  config: Optional[Dict] = None) -> ContextWindow:
+    """System prompt, rolling summary, recent turns under budget, then the new message"""
+    from .models import ConversationSummary
+
+    config = config or get_context_config()
+    encoding = config['ENCODING']
+    system = {"role": "system", "content": system_prompt}
+    user_message = {"role": "user", "content": message}
+    used = count_tokens(system_prompt, encoding) + count_tokens(message, encoding)
+    if thread_id is None:
+        return ContextWindow(messages=[system, user_message], prompt_tokens=used)
+
+    summary = ConversationSummary.objects.filter(pk=thread_id).first()
+    summary_message = None
+    if summary is not None and summary.summary:
+        summary_message = {
+            "role": "system",
+            "content": f"Summary of the earlier conversation with this farmer: {summary.summary}",
+        }
+        used += summary.summary_tokens
+
+    # One extra row tells whether older unsummarized turns exist
+    turns = _unsummarized_turns(thread_id, summary, config['MAX_HISTORY_TURNS'] + 1)
+    overflow = len(turns) > config['MAX_HISTORY_TURNS']
+    turns = turns[:config['MAX_HISTORY_TURNS']]
+    lengths = _cached_lengths(turns, encoding)
+
+    budget = min(config['MAX_CONTEXT_TOKENS'] - used, config['HISTORY_TOKEN_BUDGET'])
+    kept = 0
+    for tokens in lengths:
+        if tokens > budget:
+            break
+        budget -= tokens
+        used += tokens
+        kept += 1
+    overflow = overflow or kept < len(turns)
+
+    history = []
+    for _, question, response, _, _ in reversed(turns[:kept]):
+        history.append({"role": "user", "content": question})
+        history.append({"role": "assistant", "content": response})
+
+    messages = [system] + ([summary_message] if summary_message else []) + history + [user_message]
+    return ContextWindow(
+        messages=messages,
+        thread_id=str(thread_id),
+        history_turns=kept,
+        summary_used=summary_message is not None,
+        prompt_tokens=used,
+        overflow=overflow,
+    )
+
+
+def _summary_lock_key(thread_id) -> str:
+    return f'ai:context-summary:{thread_id}'
+
+
+def schedule_summary(thread_id):
+    """Queue a summary refresh once per thread while one is pending"""
+    from .tasks import summarize_conversation_thread
+
+    config = get_context_config()
+    if cache.add(_summary_lock_key(thread_id), 1, config['SUMMARY_LOCK_SECONDS']):
+        summarize_conversation_thread.delay(str(thread_id))
+
+
+def release_summary_lock(thread_id):
+    cache.delete(_summary_lock_key(thread_id))
+
+
+def _turns_to_fold(thread_id, summary, before, limit: int):
+    """Oldest-first unsummarized turns created before ``before`` (all when None)"""
+    from .models import AIConversation
+
+    turns = AIConversation.objects.filter(thread_id=thread_id, job_status='completed')
+    if summary is not None and summary.summarized_through:
+        turns = turns.filter(created_at__gt=summary.summarized_through)
+    if before is not None:
+        turns = turns.filter(created_at__lt=before)
+    return list(turns.order_by('created_at').values_list(
+        'id', 'farmer_question', 'ai_response', 'context_tokens', 'created_at'
+    )[:limit])
+
+
+def _fold_batch(router, thread_id, summary, folded, config: Dict):
+    """Merge oldest-first turns into the summary; returns the saved summary"""
+    from .concurrency import ai_call_gate
+    from .models import AIConversation, ConversationSummary
+
+    encoding = config['ENCODING']
+    transcript = "\n".join(f"Farmer: {question}\nAgriBot: {response}" for _, question, response, _, _ in folded)
+    previous = summary.summary if summary is not None and summary.summary else "(none yet)"
+    with ai_call_gate.slot('general'):
+        completion = router.complete(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT.format(words=int(config['SUMMARY_MAX_TOKENS'] * 0.75))},
+                {"role": "user", "content": f"Existing summary:\n{previous}\n\nNew exchanges:\n{transcript}"},
+            ],
+            config['SUMMARY_MAX_TOKENS'],
+            0.2
+        )
+    text = completion.content.strip()
+
+    user_id = AIConversation.objects.filter(pk=folded[-1][0]).values_list('user_id', flat=True).first()
+    summary, _ = ConversationSummary.objects.update_or_create(
+        thread_id=thread_id,
+        defaults={
+            'user_id': user_id,
+            'summary': text,
+            'summary_tokens': count_tokens(text, encoding),
+            'summarized_through': folded[-1][4],
+            'turns_summarized': (summary.turns_summarized if summary is not None else 0) + len(folded),
+        }
+    )
+    logger.info(f"Folded {len(folded)} turns into the summary of thread {thread_id} ({completion.total_tokens} tokens)")
+    return summary
+
+
+def fold_into_summary(router, thread_id, config: Optional[Dict] = None) -> int:
+    """
+    Fold the turns outside the verbatim history window into the thread's
+    rolling summary, oldest first and SUMMARY_BATCH_TURNS per model call,
+    until only the window is left; returns the number of turns folded.
+    """
+    from .models import ConversationSummary
+
+    config = config or get_context_config()
+    summary = ConversationSummary.objects.filter(pk=thread_id).first()
+    recent = _unsummarized_turns(thread_id, summary, config['MAX_HISTORY_TURNS'])
+    lengths = _cached_lengths(recent, config['ENCODING'])
+
+    # Keep what the next request could still include verbatim
+    budget, kept = config['HISTORY_TOKEN_BUDGET'], 0
+    for tokens in lengths:
+        if tokens > budget:
+            break
+        budget -= tokens
+        kept += 1
+    before = recent[kept - 1][4] if kept else None
+
+    total = 0
+    while True:
+        folded = _turns_to_fold(thread_id, summary, before, config['SUMMARY_BATCH_TURNS'])
+        if not folded:
+            return total
+        summary = _fold_batch(router, thread_id, summary, folded, config)
+        total += len(folded)
@@ -0,0 +1,139 @@
+"""
+Disease Detection Image Pipeline for AgriConnect
+Normalizes farmer photos before inference and fingerprints them for reuse
+
+Phone photos arrive as multi-megabyte JPEGs, often sideways (EXIF
+orientation) and often re-sent after a timeout. Every upload is decoded,
+rotated upright, downsized and recompressed before it is sent to the model,
+and a 64-bit difference hash (dHash) is computed so that a near-identical
+photo of the same crop can reuse a recent DiseaseDetection instead of
+another vision call.
+"""
+
+import base64
+import binascii
+import io
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+DEFAULT_DISEASE_IMAGE_CONFIG = {
+    # Longest side after downsizing; vision models tile larger images anyway
+    'MAX_DIMENSION': 1024,
+    'JPEG_QUALITY': 80,
+    # Hamming distance (of 64 bits) at which two photos count as the same
+    'MATCH_MAX_DISTANCE': 6,
+    'REUSE_WINDOW_HOURS': 24,
+    'REUSE_CANDIDATES': 500,
+    # Reuse detections from other farmers' near-identical photos
+    'REUSE_ACROSS_USERS': False,
+}
+
+_HASH_SIZE = 8
+
+
+class InvalidImageError(ValueError):
+    """Upload is not a decodable image or is too large"""
+
+
+@dataclass
+class PreparedImage:
+    data_url: str
+    image_hash: str
+    width: int
+    height: int
+    original_bytes: int
+    prepared_bytes: int
+
+
+def get_image_config() -> Dict:
+    config = dict(DEFAULT_DISEASE_IMAGE_CONFIG)
+    config.update(getattr(settings, 'DISEASE_IMAGE_CONFIG', {}))
+    return config
+
+
+def difference_hash(image: Image.Image) -> str:
+    """64-bit dHash as 16 hex digits; robust to rescaling and recompression"""
+    small = image.convert('L').resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for column in range(_HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return f'{bits:016x}'
+
+
+def hash_distance(first: str, second: str) -> int:
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
+
+
+def decode_data_url(data_url: str) -> bytes:
+    """Raw bytes of a base64 ``data:`` URL"""
+    try:
+        _, encoded = data_url.split(',', 1)
+        return base64.b64decode(encoded, validate=True)
+    except (ValueError, binascii.Error) as e:
+        raise InvalidImageError('Malformed base64 image data') from e
+
+
+def prepare_image(data: bytes, config: Optional[Dict] = None) -> PreparedImage:
+    """Decode, orient, downsize and recompress an upload; raises InvalidImageError"""
+    config = config or get_image_config()
+    max_bytes = settings.AI_USAGE_LIMITS['MAX_IMAGE_SIZE_MB'] * 1024 * 1024
+    if not data:
+        raise InvalidImageError('Uploaded image file is empty')
+    if len(data) > max_bytes:
+        raise InvalidImageError(f"Image exceeds {settings.AI_USAGE_LIMITS['MAX_IMAGE_SIZE_MB']} MB")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Guards against decompression bombs before the full decode
+        image.draft('RGB', (config['MAX_DIMENSION'], config['MAX_DIMENSION']))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError('Failed to decode uploaded image') from e
+
+    image.thumbnail((config['MAX_DIMENSION'], config['MAX_DIMENSION']), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=config['JPEG_QUALITY'], optimize=True)
+    prepared = output.getvalue()
+
+    return PreparedImage(
+        data_url=f"data:image/jpeg;base64,{base64.b64encode(prepared).decode('ascii')}",
+        image_hash=difference_hash(image),
+        width=image.width,
+        height=image.height,
+        original_bytes=len(data),
+        prepared_bytes=len(prepared),
+    )
+
+
+def find_recent_match(user, crop_type: str, image_hash: str, config: Optional[Dict] = None):
+    """Most recent DiseaseDetection of a near-identical photo of the same crop"""
+    from .models import DiseaseDetection
+
+    config = config or get_image_config()
+    candidates = DiseaseDetection.objects.filter(
+        crop_type=crop_type,
+        created_at__gte=timezone.now() - timedelta(hours=config['REUSE_WINDOW_HOURS']),
+    ).exclude(image_hash='')
+    if not config['REUSE_ACROSS_USERS']:
+        candidates = candidates.filter(conversation__user=user)
+
+    best = None
+    for detection_id, candidate_hash in candidates.order_by('-created_at').values_list(
+        'id', 'image_hash'
+    )[:config['REUSE_CANDIDATES']]:
+        distance = hash_distance(image_hash, candidate_hash)
+        if distance <= config['MATCH_MAX_DISTANCE'] and (best is None or distance < best[1]):
+            best = (detection_id, distance)
+            if distance == 0:
+                break
+    if best is None:
+        return None
+    return DiseaseDetection.objects.select_related('conversation').get(pk=best[0])
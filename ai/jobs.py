@@ -0,0 +1,155 @@
+"""
+AI Background Jobs for AgriConnect
+Runs slow AI analyses on Celery workers instead of in the request
+
+Submitting a job creates the AIConversation up front in the 'queued' state
+with the service arguments in ``job_params`` and returns its id
+immediately. A worker claims the job, runs the usual service method, which
+fills in that same conversation, and records the service response in
+``job_result``. Clients poll the job endpoint or follow its SSE stream.
+
+Tasks are acknowledged late, so a job whose worker died is redelivered.
+A job left 'running' for longer than STALE_AFTER_SECONDS can then be
+claimed again. Each claim stamps ``job_started_at``, and only the run
+holding the latest claim may finish the job. If the task cannot be
+queued, the job fails straight away instead of staying 'queued'.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .concurrency import AIBusyError
+from .models import AIConversation
+
+logger = logging.getLogger(__name__)
+
+# conversation_type -> (AIServiceManager service, method)
+JOB_SERVICES = {
+    'crop_advisory': ('crop', 'get_crop_advice'),
+    'disease_detection': ('disease', 'detect_disease'),
+    'market_inquiry': ('market', 'get_market_intelligence'),
+}
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+DEFAULT_AI_JOB_CONFIG = {
+    # A running job not finished after this long is presumed lost and reclaimable
+    'STALE_AFTER_SECONDS': 600,
+}
+
+
+def get_job_config() -> Dict:
+    config = dict(DEFAULT_AI_JOB_CONFIG)
+    config.update(getattr(settings, 'AI_JOB_CONFIG', {}))
+    return config
+
+
+def enqueue_job(conversation_id: str):
+    """Send the job to the workers; fail it if the broker is unreachable"""
+    from .tasks import run_ai_job
+
+    try:
+        run_ai_job.delay(conversation_id)
+    except Exception as e:
+        logger.error(f"Could not queue AI job {conversation_id}: {str(e)}")
+        fail_job(conversation_id, 'AI job queue unavailable, please retry shortly')
+
+
+def submit_job(user, conversation_type: str, params: Dict[str, Any], farmer_question: str) -> AIConversation:
+    """
+    Queue an AI analysis; the task is sent once the surrounding transaction
+    commits. Outside a transaction that is immediately, and a job that could
+    not be queued comes back already failed.
+    """
+    conversation = AIConversation.objects.create(
+        user=user,
+        conversation_type=conversation_type,
+        language=params.get('language') or 'en',
+        farmer_question=farmer_question,
+        ai_response='',
+        farmer_location=params.get('location') or '',
+        crop_context=params.get('crop_type') or '',
+        openai_model_used=settings.OPENAI_MODEL,
+        job_status='queued',
+        job_params=params,
+    )
+    transaction.on_commit(lambda: enqueue_job(str(conversation.id)))
+    if not transaction.get_connection().in_atomic_block:
+        conversation.refresh_from_db(fields=['job_status', 'job_result', 'job_error', 'job_finished_at'])
+    return conversation
+
+
+def run_job(conversation_id: str) -> bool:
+    """
+    Execute a queued or stale running job; returns False if another worker
+    holds it or it has finished.
+
+    Raises AIBusyError, with the job put back in the queue, when the
+    concurrency limiter turns the call away so the task can retry later.
+    """
+    started = timezone.now()
+    stale = started - timedelta(seconds=get_job_config()['STALE_AFTER_SECONDS'])
+    # Conditional update so a redelivered task never runs a live job twice
+    claimed = AIConversation.objects.filter(
+        Q(job_status='queued') | Q(job_status='running', job_started_at__lt=stale),
+        pk=conversation_id,
+    ).update(job_status='running', job_started_at=started)
+    if not claimed:
+        return False
+    # Later updates only apply while this run still holds the claim
+    owned = AIConversation.objects.filter(pk=conversation_id, job_status='running', job_started_at=started)
+
+    from .services import ai_service_manager
+
+    conversation = AIConversation.objects.select_related('user').get(pk=conversation_id)
+    service_name, method_name = JOB_SERVICES[conversation.conversation_type]
+    service = ai_service_manager.get_service(service_name)
+    try:
+        result = getattr(service, method_name)(
+            user=conversation.user, conversation=conversation, **conversation.job_params
+        )
+    except Exception as e:
+        logger.error(f"AI job {conversation_id} error: {str(e)}")
+        result = {'success': False, 'error': str(e)}
+
+    if result.get('busy'):
+        owned.update(job_status='queued', job_started_at=None)
+        raise AIBusyError(result['error'], retry_after=result['retry_after'])
+
+    owned.update(
+        job_status='completed' if result.get('success') else 'failed',
+        job_result=result,
+        job_error='' if result.get('success') else result.get('error', ''),
+        job_finished_at=timezone.now(),
+    )
+    return True
+
+
+def fail_job(conversation_id: str, error: str):
+    AIConversation.objects.filter(pk=conversation_id).exclude(job_status__in=FINISHED_STATUSES).update(
+        job_status='failed',
+        job_result={'success': False, 'error': error},
+        job_error=error,
+        job_finished_at=timezone.now(),
+    )
+
+
+def job_payload(conversation: AIConversation) -> Dict[str, Any]:
+    """Job state as returned by the polling and streaming endpoints"""
+    payload = {
+        'job_id': str(conversation.id),
+        'job_type': conversation.conversation_type,
+        'status': conversation.job_status,
+        'created_at': conversation.created_at.isoformat(),
+        'started_at': conversation.job_started_at.isoformat() if conversation.job_started_at else None,
+        'finished_at': conversation.job_finished_at.isoformat() if conversation.job_finished_at else None,
+    }
+    if conversation.job_status in FINISHED_STATUSES:
+        payload['result'] = conversation.job_result
+    return payload
@@ -0,0 +1,24 @@
+"""
+Rebuild Semantic Index Management Command
+Re-embeds vetted farmer questions into the answer reuse index
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai.semantic_reuse import build_index, get_reuse_config
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the semantic answer reuse index from vetted AI conversations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rating', type=int, help='Lowest farmer rating that counts as vetted')
+
+    def handle(self, *args, **options):
+        config = get_reuse_config()
+        if options['min_rating']:
+            config['MIN_RATING'] = options['min_rating']
+
+        stats = build_index(config)
+        self.stdout.write(f"Indexed {stats['answers']} answers in {stats['lists']} lists under {config['STORAGE_PREFIX']}")
+        self.stdout.write(self.style.SUCCESS('Semantic index rebuilt'))
@@ -0,0 +1,30 @@
+"""
+Refresh Price Forecasts Management Command
+Refits the weekly market price forecasts from order history (run nightly)
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai.price_forecast import get_forecast_config, refresh_price_forecasts
+
+
+class Command(BaseCommand):
+    help = 'Refit market price forecasts for every crop and region from platform sales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-weeks', type=int, help='Weeks of order history to fit on')
+        parser.add_argument('--horizon-weeks', type=int, help='Weeks ahead to forecast')
+
+    def handle(self, *args, **options):
+        config = get_forecast_config()
+        if options['history_weeks']:
+            config['HISTORY_WEEKS'] = options['history_weeks']
+        if options['horizon_weeks']:
+            config['HORIZON_WEEKS'] = options['horizon_weeks']
+
+        stats = refresh_price_forecasts(config)
+        self.stdout.write(
+            f"Fitted {stats['forecast_series']} of {stats['series']} crop/region series "
+            f"({stats['rows']} forecast rows)"
+        )
+        self.stdout.write(self.style.SUCCESS('Market price forecasts refreshed'))
@@ -0,0 +1,68 @@
+"""
+Simulate AI Routing Management Command
+Exercises the provider router against local fake providers, with and without hedging
+"""
+
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from ai.routing import DEFAULT_AI_ROUTING_CONFIG, ProviderError, ProviderRouter, build_provider
+
+
+class Command(BaseCommand):
+    help = 'Compare tail latency of the AI provider router with and without hedging using fake providers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.2, help='Typical provider latency in seconds')
+        parser.add_argument('--slow-rate', type=float, default=0.05, help='Share of calls hitting a slow tail')
+        parser.add_argument('--slow-seconds', type=float, default=2.0)
+        parser.add_argument('--error-rate', type=float, default=0.02)
+
+    def handle(self, *args, **options):
+        provider_options = {
+            'KIND': 'fake',
+            'LATENCY_SECONDS': options['latency'],
+            'JITTER_SECONDS': options['latency'] / 2,
+            'SLOW_RATE': options['slow_rate'],
+            'SLOW_SECONDS': options['slow_seconds'],
+            'ERROR_RATE': options['error_rate'],
+        }
+        for max_hedges in (0, 1):
+            config = dict(
+                DEFAULT_AI_ROUTING_CONFIG,
+                MAX_HEDGES=max_hedges,
+                DEFAULT_HEDGE_DELAY_SECONDS=options['latency'] * 3,
+                MIN_HEDGE_DELAY_SECONDS=options['latency'],
+            )
+            providers = {
+                name: build_provider(name, provider_options, config['REQUEST_TIMEOUT_SECONDS'])
+                for name in ('fake-a', 'fake-b')
+            }
+            router = ProviderRouter(
+                providers, [{'PROVIDER': name, 'MODEL': 'simulated'} for name in providers], config
+            )
+
+            latencies, winners, hedged, failures = [], Counter(), 0, 0
+            for _ in range(options['requests']):
+                try:
+                    completion = router.complete([{"role": "user", "content": "ping"}], 16, 0.0)
+                except ProviderError:
+                    failures += 1
+                    continue
+                latencies.append(completion.latency_ms)
+                winners[completion.provider] += 1
+                hedged += completion.hedged
+
+            latencies.sort()
+
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0
+
+            self.stdout.write(
+                f"{'hedged' if max_hedges else 'unhedged'}: p50 {percentile(50)} ms, "
+                f"p95 {percentile(95)} ms, p99 {percentile(99)} ms, "
+                f"{hedged} hedged, {failures} failed, wins {dict(winners)}"
+            )
+        self.stdout.write(self.style.SUCCESS('Routing simulation complete'))
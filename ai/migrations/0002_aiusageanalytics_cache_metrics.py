@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiusageanalytics',
+            name='cache_hits',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aiusageanalytics',
+            name='cache_misses',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aiusageanalytics',
+            name='tokens_saved',
+            field=models.IntegerField(default=0, help_text='Tokens not spent thanks to cached responses'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_aiusageanalytics_cache_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diseasedetection',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', help_text='Perceptual hash (dHash) of the analyzed photo', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='diseasedetection',
+            index=models.Index(fields=['crop_type', '-created_at'], name='ai_diseased_crop_ty_5d531e_idx'),
+        ),
+    ]
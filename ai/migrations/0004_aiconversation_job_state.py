@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_diseasedetection_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_params',
+            field=models.JSONField(blank=True, default=dict, help_text='Service arguments of a queued job'),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_result',
+            field=models.JSONField(blank=True, default=dict, help_text='Service response of a finished job'),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='job_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
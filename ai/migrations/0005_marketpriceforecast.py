@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_aiconversation_job_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketPriceForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('crop', models.CharField(help_text='Normalized product name', max_length=200)),
+                ('region', models.CharField(blank=True, help_text='Normalized delivery region; blank for all regions', max_length=100)),
+                ('unit', models.CharField(max_length=20)),
+                ('week_start', models.DateField()),
+                ('predicted_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('lower_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('upper_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_observed_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('observations', models.IntegerField(help_text='Weeks with sales in the fitted history')),
+                ('weekly_volume', models.DecimalField(decimal_places=2, help_text='Average quantity sold per week with sales', max_digits=12)),
+                ('model_parameters', models.JSONField(default=dict)),
+                ('fitted_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Market Price Forecast',
+                'verbose_name_plural': 'Market Price Forecasts',
+                'ordering': ['crop', 'region', 'week_start'],
+                'unique_together': {('crop', 'region', 'unit', 'week_start')},
+            },
+        ),
+    ]
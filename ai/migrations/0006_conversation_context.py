@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_marketpriceforecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconversation',
+            name='thread_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='context_tokens',
+            field=models.IntegerField(default=0, help_text='Token length of question and response as chat history'),
+        ),
+        migrations.AddIndex(
+            model_name='aiconversation',
+            index=models.Index(fields=['thread_id', 'created_at'], name='ai_aiconver_thread__8290d7_idx'),
+        ),
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('thread_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('summary', models.TextField(blank=True)),
+                ('summary_tokens', models.IntegerField(default=0)),
+                ('summarized_through', models.DateTimeField(blank=True, help_text='Creation time of the newest summarized turn', null=True)),
+                ('turns_summarized', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_conversation_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversation Summary',
+                'verbose_name_plural': 'Conversation Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0006_conversation_context'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconversation',
+            name='answer_reused',
+            field=models.BooleanField(default=False, help_text='Answer served from an equivalent past question'),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='reused_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reuses', to='ai.aiconversation'),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='reuse_similarity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -39,6 +39,13 @@ class AIConversation(models.Model):
         ('fr', 'French'),
     ]
     
+    JOB_STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_conversations')
     
@@ -65,6 +72,23 @@ class AIConversation(models.Model):
     follow_up_needed = models.BooleanField(default=False)
     escalated_to_human = models.BooleanField(default=False)
     
+    # Chat Thread (turns of one chat share the id of its first turn)
+    thread_id = models.UUIDField(null=True, blank=True)
+    context_tokens = models.IntegerField(default=0, help_text="Token length of question and response as chat history")
+    
+    # Semantic Answer Reuse (ai/semantic_reuse.py)
+    answer_reused = models.BooleanField(default=False, help_text="Answer served from an equivalent past question")
+    reused_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='reuses')
+    reuse_similarity = models.FloatField(null=True, blank=True)
+    
+    # Background Job (requests submitted in job mode; synchronous ones are created completed)
+    job_status = models.CharField(max_length=10, choices=JOB_STATUSES, default='completed')
+    job_params = models.JSONField(default=dict, blank=True, help_text="Service arguments of a queued job")
+    job_result = models.JSONField(default=dict, blank=True, help_text="Service response of a finished job")
+    job_error = models.TextField(blank=True)
+    job_started_at = models.DateTimeField(null=True, blank=True)
+    job_finished_at = models.DateTimeField(null=True, blank=True)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -75,6 +99,8 @@ class AIConversation(models.Model):
             models.Index(fields=['user', 'conversation_type']),
             models.Index(fields=['language', 'created_at']),
             models.Index(fields=['farmer_satisfied']),
+            # Recent turns of a chat thread for context assembly
+            models.Index(fields=['thread_id', 'created_at']),
         ]
         verbose_name = "AI Conversation"
         verbose_name_plural = "AI Conversations"
@@ -82,6 +108,24 @@ class AIConversation(models.Model):
     def __str__(self):
         return f"AI Chat: {self.user.username} - {self.conversation_type}"
 
+class ConversationSummary(models.Model):
+    """Rolling summary of chat turns that no longer fit the prompt budget (ai/context.py)"""
+    
+    thread_id = models.UUIDField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_conversation_summaries')
+    summary = models.TextField(blank=True)
+    summary_tokens = models.IntegerField(default=0)
+    summarized_through = models.DateTimeField(null=True, blank=True, help_text="Creation time of the newest summarized turn")
+    turns_summarized = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Conversation Summary"
+        verbose_name_plural = "Conversation Summaries"
+    
+    def __str__(self):
+        return f"Summary: {self.thread_id} ({self.turns_summarized} turns)"
+
 class CropAdvisory(models.Model):
     """AI-generated crop recommendations and farming advice"""
     
@@ -220,12 +264,17 @@ class DiseaseDetection(models.Model):
     # Image Analysis (if provided)
     image_analyzed = models.BooleanField(default=False)
     image_analysis_results = models.JSONField(default=dict, blank=True)
+    image_hash = models.CharField(max_length=16, blank=True, default='', help_text="Perceptual hash (dHash) of the analyzed photo")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Near-duplicate photo lookup: recent detections per crop
+            models.Index(fields=['crop_type', '-created_at']),
+        ]
         verbose_name = "Disease Detection"
         verbose_name_plural = "Disease Detections"
     
@@ -304,6 +353,35 @@ class MarketIntelligence(models.Model):
     def __str__(self):
         return f"Market Intel: {self.crop_name} - {self.target_region}"
 
+class MarketPriceForecast(models.Model):
+    """Weekly crop price forecast fitted from platform sales (ai/price_forecast.py)"""
+    
+    crop = models.CharField(max_length=200, help_text="Normalized product name")
+    region = models.CharField(max_length=100, blank=True, help_text="Normalized delivery region; blank for all regions")
+    unit = models.CharField(max_length=20)
+    week_start = models.DateField()
+    
+    # Forecast
+    predicted_price = models.DecimalField(max_digits=10, decimal_places=2)
+    lower_price = models.DecimalField(max_digits=10, decimal_places=2)
+    upper_price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    # Fit Metadata
+    last_observed_price = models.DecimalField(max_digits=10, decimal_places=2)
+    observations = models.IntegerField(help_text="Weeks with sales in the fitted history")
+    weekly_volume = models.DecimalField(max_digits=12, decimal_places=2, help_text="Average quantity sold per week with sales")
+    model_parameters = models.JSONField(default=dict)
+    fitted_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['crop', 'region', 'unit', 'week_start']
+        ordering = ['crop', 'region', 'week_start']
+        verbose_name = "Market Price Forecast"
+        verbose_name_plural = "Market Price Forecasts"
+    
+    def __str__(self):
+        return f"Price Forecast: {self.crop} ({self.region or 'all'}) - {self.week_start}"
+
 class AIUsageAnalytics(models.Model):
     """Track AI usage patterns and performance metrics"""
     
@@ -321,6 +399,11 @@ class AIUsageAnalytics(models.Model):
     market_intelligence_queries = models.IntegerField(default=0)
     general_queries = models.IntegerField(default=0)
     
+    # Response Cache
+    cache_hits = models.IntegerField(default=0)
+    cache_misses = models.IntegerField(default=0)
+    tokens_saved = models.IntegerField(default=0, help_text="Tokens not spent thanks to cached responses")
+    
     # Performance Metrics
     average_response_time_ms = models.FloatField(default=0.0)
     satisfaction_score = models.FloatField(default=0.0, help_text="Average user satisfaction (1-5)")
@@ -0,0 +1,319 @@
+"""
+Market Price Forecasting for AgriConnect
+Forecasts weekly crop prices per region from the platform's own sales
+
+Every night the order history is bucketed into weekly volume-weighted
+average unit prices per (crop, region, unit) series, plus an all-regions
+series per (crop, unit). All series are fitted together with damped-trend
+exponential smoothing on log prices, with an additive seasonal term for
+series that have at least two years of history. The smoothing parameters
+are picked per series from a small grid by one-step-ahead error, and the
+recursion runs once per week for the whole batch as NumPy array operations.
+
+Forecasts are written to MarketPriceForecast, so serving a price forecast
+is a table lookup.
+"""
+
+import itertools
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MARKET_FORECAST_CONFIG = {
+    'HISTORY_WEEKS': 156,
+    'HORIZON_WEEKS': 26,
+    # Weeks with sales a series needs before it is forecast
+    'MIN_OBSERVATIONS': 8,
+    # Series without a sale in this many weeks are dropped
+    'MAX_STALE_WEEKS': 12,
+    'SEASON_LENGTH': 52,
+    'DAMPING': 0.95,
+    'ALPHAS': (0.1, 0.2, 0.3, 0.5, 0.7),
+    'BETAS': (0.0, 0.02, 0.05, 0.1),
+    'GAMMAS': (0.0, 0.05, 0.15),
+    # z-score of the stored prediction interval (80%)
+    'INTERVAL_Z': 1.2816,
+    # Series fitted per array batch; bounds the (grid, series, season) state
+    'BATCH_SIZE': 256,
+}
+
+SALE_STATUSES = ('confirmed', 'paid', 'processing', 'shipped', 'delivered', 'completed')
+
+ALL_REGIONS = ''
+
+
+def get_forecast_config() -> Dict:
+    config = dict(DEFAULT_MARKET_FORECAST_CONFIG)
+    config.update(getattr(settings, 'MARKET_FORECAST_CONFIG', {}))
+    return config
+
+
+def normalize_key(value: str) -> str:
+    return ' '.join((value or '').lower().split())
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def load_weekly_prices(history_start: date, weeks: int):
+    """
+    Weekly volume-weighted unit prices for every series.
+
+    Returns (keys, prices, volumes): keys[i] is (crop, region, unit) and
+    row i of the (series, weeks) arrays holds that series, NaN where it had
+    no sales that week.
+    """
+    from orders.models import OrderItem
+
+    rows = OrderItem.objects.filter(
+        order__status__in=SALE_STATUSES,
+        order__created_at__date__gte=history_start,
+        order__created_at__date__lt=history_start + timedelta(weeks=weeks),
+        quantity__gt=0,
+        unit_price__gt=0,
+    ).values_list('product_name', 'order__delivery_region', 'unit', 'order__created_at', 'unit_price', 'quantity')
+
+    codes = {}
+    series, week_index, amounts, quantities = [], [], [], []
+    for product_name, region, unit, created_at, unit_price, quantity in rows.iterator(chunk_size=5000):
+        crop, unit = normalize_key(product_name), normalize_key(unit)
+        week = (timezone.localdate(created_at) - history_start).days // 7
+        quantity = float(quantity)
+        for key in ((crop, normalize_key(region), unit), (crop, ALL_REGIONS, unit)):
+            series.append(codes.setdefault(key, len(codes)))
+            week_index.append(week)
+            amounts.append(float(unit_price) * quantity)
+            quantities.append(quantity)
+
+    keys = list(codes)
+    shape = (len(keys), weeks)
+    if not keys:
+        return keys, np.empty(shape), np.empty(shape)
+
+    cells = np.asarray(series) * weeks + np.asarray(week_index)
+    size = shape[0] * shape[1]
+    volumes = np.bincount(cells, weights=quantities, minlength=size).reshape(shape)
+    revenue = np.bincount(cells, weights=amounts, minlength=size).reshape(shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = np.where(volumes > 0, revenue / volumes, np.nan)
+    return keys, prices, volumes
+
+
+def _parameter_grid(config: Dict) -> np.ndarray:
+    """(alpha, beta, gamma) combinations satisfying the usual ETS bounds"""
+    grid = [
+        (alpha, beta, gamma)
+        for alpha, beta, gamma in itertools.product(config['ALPHAS'], config['BETAS'], config['GAMMAS'])
+        if beta <= alpha and gamma <= 1 - alpha
+    ]
+    return np.array(grid)
+
+
+def _seasonal_profile(log_prices: np.ndarray, observed: np.ndarray, season_length: int) -> np.ndarray:
+    """Classical decomposition: mean deviation from the series mean per week of season"""
+    series, weeks = log_prices.shape
+    deviations = np.where(observed, log_prices - np.nanmean(log_prices, axis=1, keepdims=True), 0.0)
+    positions = np.arange(weeks) % season_length
+    sums = np.zeros((series, season_length))
+    counts = np.zeros((series, season_length))
+    np.add.at(sums.T, positions, deviations.T)
+    np.add.at(counts.T, positions, observed.T)
+    profile = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return profile - profile.mean(axis=1, keepdims=True)
+
+
+def fit_forecasts(prices: np.ndarray, config: Dict) -> Dict[str, np.ndarray]:
+    """
+    Fit damped-trend (seasonal where possible) exponential smoothing to a
+    batch of weekly price series and forecast HORIZON_WEEKS ahead.
+
+    ``prices`` is (series, weeks) with NaN for weeks without sales; every
+    series needs at least one observation. Returns (series, horizon) arrays
+    ``predicted``, ``lower`` and ``upper`` plus the chosen parameters.
+    """
+    season_length, phi = config['SEASON_LENGTH'], config['DAMPING']
+    horizon = config['HORIZON_WEEKS']
+    series, weeks = prices.shape
+    observed = ~np.isnan(prices)
+    log_prices = np.log(np.where(observed, prices, 1.0))
+
+    first = observed.argmax(axis=1)
+    span = weeks - first
+    seasonal = (span >= 2 * season_length) & (observed.sum(axis=1) >= season_length)
+    profile = _seasonal_profile(np.where(observed, log_prices, np.nan), observed, season_length)
+    profile[~seasonal] = 0.0
+
+    grid = _parameter_grid(config)
+    alpha, beta, gamma = (grid[:, i, None] for i in range(3))
+    rows = np.arange(series)
+
+    # State per (parameter combination, series)
+    level = np.broadcast_to(log_prices[rows, first] - profile[rows, first % season_length], (len(grid), series)).copy()
+    trend = np.zeros((len(grid), series))
+    season = np.broadcast_to(profile, (len(grid), series, season_length)).copy()
+    sse = np.zeros((len(grid), series))
+
+    for week in range(weeks):
+        position = week % season_length
+        error = log_prices[:, week] - (level + phi * trend + season[:, :, position])
+        # Weeks without sales leave the state to its own dynamics
+        error = np.where(observed[:, week], error, 0.0)
+        sse += np.where(first < week, error ** 2, 0.0)
+        level = level + phi * trend + alpha * error
+        trend = phi * trend + beta * error
+        season[:, :, position] += gamma * error
+
+    # Non-seasonal series may not pick a grid point that learns a season
+    sse[(grid[:, 2] > 0)[:, None] & ~seasonal[None, :]] = np.inf
+    best = sse.argmin(axis=0)
+    level, trend = level[best, rows], trend[best, rows]
+    season = season[best, rows]
+    residuals = np.maximum(observed.sum(axis=1) - 1, 1)
+    sigma = np.sqrt(sse[best, rows] / residuals)
+
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi ** steps)
+    positions = (weeks + steps - 1) % season_length
+    log_forecast = level[:, None] + damping[None, :] * trend[:, None] + season[:, positions]
+    spread = config['INTERVAL_Z'] * sigma[:, None] * np.sqrt(steps)[None, :]
+
+    return {
+        'predicted': np.exp(log_forecast),
+        'lower': np.exp(log_forecast - spread),
+        'upper': np.exp(log_forecast + spread),
+        'alpha': grid[best, 0],
+        'beta': grid[best, 1],
+        'gamma': grid[best, 2],
+        'seasonal': seasonal,
+        'residual_std': sigma,
+    }
+
+
+def _money(value: float) -> Decimal:
+    return Decimal(str(round(float(value), 2)))
+
+
+def refresh_price_forecasts(config: Optional[Dict] = None, today: Optional[date] = None) -> Dict[str, int]:
+    """Refit every crop/region series and replace the stored forecasts"""
+    from .models import MarketPriceForecast
+
+    config = config or get_forecast_config()
+    current_week = week_start(today or timezone.localdate())
+    history_start = current_week - timedelta(weeks=config['HISTORY_WEEKS'])
+    keys, prices, volumes = load_weekly_prices(history_start, config['HISTORY_WEEKS'])
+
+    observed = ~np.isnan(prices)
+    counts = observed.sum(axis=1)
+    last_sale = config['HISTORY_WEEKS'] - 1 - observed[:, ::-1].argmax(axis=1)
+    eligible = np.flatnonzero(
+        (counts >= config['MIN_OBSERVATIONS'])
+        & (last_sale >= config['HISTORY_WEEKS'] - config['MAX_STALE_WEEKS'])
+    )
+
+    fitted_at = timezone.now()
+    forecast_weeks = [current_week + timedelta(weeks=step) for step in range(config['HORIZON_WEEKS'])]
+    records = []
+    for offset in range(0, len(eligible), config['BATCH_SIZE']):
+        batch = eligible[offset:offset + config['BATCH_SIZE']]
+        fit = fit_forecasts(prices[batch], config)
+        for i, index in enumerate(batch):
+            crop, region, unit = keys[index]
+            last_price = _money(prices[index, last_sale[index]])
+            parameters = {
+                'alpha': float(fit['alpha'][i]),
+                'beta': float(fit['beta'][i]),
+                'gamma': float(fit['gamma'][i]),
+                'damping': config['DAMPING'],
+                'seasonal': bool(fit['seasonal'][i]),
+                'residual_std': round(float(fit['residual_std'][i]), 6),
+            }
+            for step, forecast_week in enumerate(forecast_weeks):
+                records.append(MarketPriceForecast(
+                    crop=crop,
+                    region=region,
+                    unit=unit,
+                    week_start=forecast_week,
+                    predicted_price=_money(fit['predicted'][i, step]),
+                    lower_price=_money(fit['lower'][i, step]),
+                    upper_price=_money(fit['upper'][i, step]),
+                    last_observed_price=last_price,
+                    observations=int(counts[index]),
+                    weekly_volume=_money(volumes[index][observed[index]].mean()),
+                    model_parameters=parameters,
+                    fitted_at=fitted_at,
+                ))
+
+    with transaction.atomic():
+        MarketPriceForecast.objects.all().delete()
+        MarketPriceForecast.objects.bulk_create(records, batch_size=1000)
+
+    logger.info(f"Market price forecasts refreshed: {len(eligible)} of {len(keys)} series")
+    return {'series': len(keys), 'forecast_series': len(eligible), 'rows': len(records)}
+
+
+def get_price_forecast(crop: str, region: str = ALL_REGIONS, unit: Optional[str] = None,
+                       weeks: Optional[int] = None) -> Optional[Dict]:
+    """
+    Stored weekly forecast for a crop, falling back to the all-regions series
+    when the region has too little history. Without a unit, the unit with
+    the most sales is used. Returns None when nothing is forecast.
+    """
+    from .models import MarketPriceForecast
+
+    forecasts = MarketPriceForecast.objects.filter(
+        crop=normalize_key(crop),
+        week_start__gte=week_start(timezone.localdate()),
+    )
+    if unit:
+        forecasts = forecasts.filter(unit=normalize_key(unit))
+
+    for candidate in dict.fromkeys((normalize_key(region), ALL_REGIONS)):
+        rows = list(forecasts.filter(region=candidate).order_by('-observations', 'unit', 'week_start'))
+        if rows:
+            break
+    else:
+        return None
+
+    rows = [row for row in rows if row.unit == rows[0].unit][:weeks]
+    head = rows[0]
+    return {
+        'crop': head.crop,
+        'region': head.region or 'all',
+        'unit': head.unit,
+        'currency': 'GHS',
+        'last_observed_price': float(head.last_observed_price),
+        'observations': head.observations,
+        'fitted_at': head.fitted_at.isoformat(),
+        'model': head.model_parameters,
+        'weekly': [
+            {
+                'week_start': row.week_start.isoformat(),
+                'predicted_price': float(row.predicted_price),
+                'lower_price': float(row.lower_price),
+                'upper_price': float(row.upper_price),
+            }
+            for row in rows
+        ],
+    }
+
+
+def summarize_forecast(forecast: Dict) -> List[str]:
+    """Short text lines describing a stored forecast, for prompts"""
+    weekly = forecast['weekly']
+    low = min(week['lower_price'] for week in weekly)
+    high = max(week['upper_price'] for week in weekly)
+    return [
+        f"Last platform price: GHS {forecast['last_observed_price']:.2f} per {forecast['unit']}",
+        f"Forecast next week: GHS {weekly[0]['predicted_price']:.2f}",
+        f"Forecast in {len(weekly)} weeks: GHS {weekly[-1]['predicted_price']:.2f}",
+        f"80% range over the period: GHS {low:.2f} - {high:.2f}",
+    ]
@@ -0,0 +1,160 @@
+"""
+AI Response Cache for AgriConnect
+Exact-match reuse of advisory completions across farmers
+
+Farmers in the same area ask the same crop / stage / location questions
+within hours of each other. Responses are cached under a fingerprint of the
+normalized request (service, model, language and the service's own fields,
+with locations bucketed) so a repeat is answered without a completion call.
+
+Two tiers: a per-process LRU for the hottest keys and the shared Django
+cache so all workers benefit. TTLs are set per service, since market
+conditions go stale long before agronomic advice does.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_AI_RESPONSE_CACHE_CONFIG = {
+    'ENABLED': True,
+    'MEMORY_MAX_ENTRIES': 512,
+    'SHARED_CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'ai:response',
+    # Seconds a cached answer stays valid, per service
+    'TTL_SECONDS': {
+        'crop_advisory': 6 * 60 * 60,
+        'disease_detection': 24 * 60 * 60,
+        'market_intelligence': 60 * 60,
+    },
+    # Decimal places kept when a location is given as "lat,lng" (1 ~ 11 km)
+    'COORDINATE_PRECISION': 1,
+}
+
+_COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+
+def get_cache_config() -> Dict:
+    config = dict(DEFAULT_AI_RESPONSE_CACHE_CONFIG)
+    config.update(getattr(settings, 'AI_RESPONSE_CACHE_CONFIG', {}))
+    return config
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(_NON_WORD_RE.sub(' ', (value or '').lower()).split())
+
+
+def location_bucket(location: Optional[str]) -> str:
+    """Coarse location key: rounded coordinates, or the normalized place name"""
+    match = _COORDINATES_RE.match(location or '')
+    if match:
+        precision = get_cache_config()['COORDINATE_PRECISION']
+        latitude, longitude = (round(float(value), precision) for value in match.groups())
+        return f'geo:{latitude:.{precision}f},{longitude:.{precision}f}'
+    return normalize_text(location)
+
+
+def fingerprint(service: str, model: str, language: str, **fields) -> str:
+    """Stable key for a request; text fields are normalized before hashing"""
+    payload = {
+        'service': service,
+        'model': model,
+        'language': (language or 'en').lower(),
+        **{name: normalize_text(value) if isinstance(value, str) else value for name, value in fields.items()},
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'{service}:{digest}'
+
+
+class LRUTier:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Memory LRU in front of the shared Django cache"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or get_cache_config()
+        self.memory = LRUTier(self.config['MEMORY_MAX_ENTRIES'])
+
+    @property
+    def enabled(self) -> bool:
+        return self.config['ENABLED']
+
+    @property
+    def shared(self):
+        return caches[self.config['SHARED_CACHE_ALIAS']]
+
+    def ttl(self, service: str) -> int:
+        return self.config['TTL_SECONDS'].get(service, 0)
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.config['KEY_PREFIX']}:{key}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        stored = self.shared.get(self._shared_key(key))
+        if stored is None:
+            return None
+        # Promote with the remaining shared lifetime
+        remaining = stored['expires_at'] - time.time()
+        if remaining > 0:
+            self.memory.set(key, stored['value'], remaining)
+            return stored['value']
+        return None
+
+    def set(self, service: str, key: str, value: Dict[str, Any]):
+        ttl = self.ttl(service)
+        if not self.enabled or ttl <= 0:
+            return
+        self.memory.set(key, value, ttl)
+        self.shared.set(
+            self._shared_key(key), {'value': value, 'expires_at': time.time() + ttl}, timeout=ttl
+        )
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,481 @@
+"""
+AI Provider Routing for AgriConnect
+Latency-aware routing across chat completion providers with hedged requests
+
+Every configured route (provider + model) keeps a rolling window of call
+latencies and failures in this process. A completion goes to the fastest
+healthy route first; if it has not finished by that route's p95 latency, a
+hedged request is sent to the next route and whichever finishes first
+wins. The loser is cancelled: completions are streamed, and a cancelled
+attempt closes its stream at the next chunk so the provider stops
+generating. Routes whose recent error rate crosses ERROR_RATE_THRESHOLD are
+skipped for COOLDOWN_SECONDS; failures fail over to the next route
+immediately. Attempt latency is measured from when a pool thread starts
+the call, so time spent queued behind MAX_WORKERS neither pollutes the
+route's percentiles nor triggers hedges.
+
+Streamed completions (``ProviderRouter.stream``) are not hedged, since the
+farmer would see two answers interleave, but a route that fails before its
+first token fails over to the next one in the same ranking.
+
+Providers are OpenAI-compatible endpoints (OpenAI, OpenRouter, ...) or
+``fake`` providers with configurable latency and error rate, for exercising
+the router locally without network access (see the simulate_ai_routing
+management command).
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_ROUTING_CONFIG = {
+    # Per-route samples kept for latency percentiles and error rates
+    'WINDOW': 100,
+    'MIN_SAMPLES': 10,
+    'HEDGE_PERCENTILE': 95,
+    # Hedge delay until a route has MIN_SAMPLES; also its assumed latency
+    'DEFAULT_HEDGE_DELAY_SECONDS': 8.0,
+    'MIN_HEDGE_DELAY_SECONDS': 0.5,
+    'MAX_HEDGES': 1,
+    'ERROR_RATE_THRESHOLD': 0.5,
+    'COOLDOWN_SECONDS': 30,
+    'REQUEST_TIMEOUT_SECONDS': 60,
+    'MAX_WORKERS': 32,
+}
+
+
+class ProviderError(Exception):
+    """A provider failed to produce a completion"""
+
+
+class AttemptCancelled(Exception):
+    """An attempt was abandoned because another route answered first"""
+
+
+@dataclass
+class Completion:
+    content: str
+    total_tokens: int
+    provider: str
+    model: str
+    latency_ms: int = 0
+    hedged: bool = False
+
+
+def get_routing_config() -> Dict:
+    config = dict(DEFAULT_AI_ROUTING_CONFIG)
+    config['PROVIDERS'] = {
+        'primary': {
+            'KIND': 'openai',
+            'BASE_URL': settings.OPENAI_BASE_URL,
+            'API_KEY': settings.OPENAI_API_KEY,
+        },
+    }
+    config['ROUTES'] = [{'PROVIDER': 'primary', 'MODEL': settings.OPENAI_MODEL}]
+    config.update(getattr(settings, 'AI_ROUTING_CONFIG', {}))
+    return config
+
+
+class OpenAICompatibleProvider:
+    """Chat completions over any OpenAI-compatible API"""
+
+    def __init__(self, name: str, api_key: str, base_url: Optional[str] = None, timeout: float = 60):
+        self.name = name
+        # Retries would hide slow or failing attempts from the router
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        # Streamed completions run on the ASGI event loop
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+    def complete(self, model: str, messages: List[Dict], max_tokens: int, temperature: float,
+                 cancel: threading.Event) -> Completion:
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts, usage = [], None
+        try:
+            for chunk in stream:
+                if cancel.is_set():
+                    raise AttemptCancelled()
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+        # Providers that ignore include_usage: one delta is roughly one token
+        total_tokens = usage.total_tokens if usage is not None else len(parts)
+        return Completion(''.join(parts), total_tokens, self.name, model)
+
+    async def stream(self, model: str, messages: List[Dict], max_tokens: int,
+                     temperature: float) -> AsyncIterator[Tuple[str, object]]:
+        """('delta', text) per content delta, then ('usage', total_tokens) if reported"""
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    yield 'usage', chunk.usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield 'delta', chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+
+class FakeProvider:
+    """Local stand-in with a configurable latency distribution and error rate"""
+
+    def __init__(self, name: str, latency_seconds: float = 0.2, jitter_seconds: float = 0.0,
+                 slow_rate: float = 0.0, slow_seconds: float = 0.0, error_rate: float = 0.0,
+                 content: str = 'This is a simulated response.'):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.error_rate = error_rate
+        self.content = content
+
+    def complete(self, model: str, messages: List[Dict], max_tokens: int, temperature: float,
+                 cancel: threading.Event) -> Completion:
+        delay = self.latency_seconds + random.uniform(0, self.jitter_seconds)
+        if random.random() < self.slow_rate:
+            delay += self.slow_seconds
+        # Like a stream, notice cancellation between chunks
+        if cancel.wait(delay):
+            raise AttemptCancelled()
+        if random.random() < self.error_rate:
+            raise ProviderError(f"{self.name}: simulated failure")
+        return Completion(self.content, len(self.content.split()), self.name, model)
+
+    async def stream(self, model: str, messages: List[Dict], max_tokens: int,
+                     temperature: float) -> AsyncIterator[Tuple[str, object]]:
+        delay = self.latency_seconds + random.uniform(0, self.jitter_seconds)
+        if random.random() < self.slow_rate:
+            delay += self.slow_seconds
+        await asyncio.sleep(delay)
+        if random.random() < self.error_rate:
+            raise ProviderError(f"{self.name}: simulated failure")
+        words = self.content.split(' ')
+        for index, word in enumerate(words):
+            yield 'delta', word if index == len(words) - 1 else word + ' '
+        yield 'usage', len(words)
+
+
+def build_provider(name: str, options: Dict, timeout: float):
+    kind = options.get('KIND', 'openai')
+    if kind == 'fake':
+        return FakeProvider(
+            name,
+            latency_seconds=options.get('LATENCY_SECONDS', 0.2),
+            jitter_seconds=options.get('JITTER_SECONDS', 0.0),
+            slow_rate=options.get('SLOW_RATE', 0.0),
+            slow_seconds=options.get('SLOW_SECONDS', 0.0),
+            error_rate=options.get('ERROR_RATE', 0.0),
+        )
+    if kind == 'openai':
+        return OpenAICompatibleProvider(name, options['API_KEY'], options.get('BASE_URL'), timeout)
+    raise ValueError(f"Unknown AI provider kind: {kind}")
+
+
+class RouteStats:
+    """Rolling latency and outcome window for one provider/model route"""
+
+    def __init__(self, window: int):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.last_failure = 0.0
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._samples.append((latency, ok))
+            if not ok:
+                self.last_failure = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._samples)
+
+    def latency_percentile(self, percentile: float, min_samples: int) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.snapshot() if ok)
+        if len(latencies) < min_samples:
+            return None
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        samples = self.snapshot()
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+
+class _Attempt:
+    """One in-flight call; ``started`` is set by the pool thread that runs it"""
+
+    def __init__(self, route):
+        self.route = route
+        self.cancel = threading.Event()
+        self.started: Optional[float] = None
+
+    def elapsed(self, now: float) -> Optional[float]:
+        return None if self.started is None else now - self.started
+
+
+class Route:
+    def __init__(self, provider, model: str, window: int):
+        self.provider = provider
+        self.model = model
+        self.stats = RouteStats(window)
+
+    @property
+    def name(self) -> str:
+        return f'{self.provider.name}:{self.model}'
+
+
+class ProviderRouter:
+    """Send each completion to the fastest healthy route, hedging slow calls"""
+
+    def __init__(self, providers: Dict[str, object], routes: List[Dict], config: Dict):
+        self.config = config
+        self.providers = providers
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='ai-route')
+        self.default_routes = [self.route(route['PROVIDER'], route['MODEL']) for route in routes]
+
+    @classmethod
+    def from_settings(cls, config: Optional[Dict] = None) -> 'ProviderRouter':
+        config = config or get_routing_config()
+        providers = {
+            name: build_provider(name, options, config['REQUEST_TIMEOUT_SECONDS'])
+            for name, options in config['PROVIDERS'].items()
+            # Providers without credentials are left out rather than failing every call
+            if options.get('KIND', 'openai') != 'openai' or options.get('API_KEY')
+        }
+        routes = [route for route in config['ROUTES'] if route['PROVIDER'] in providers]
+        return cls(providers, routes, config)
+
+    def route(self, provider_name: str, model: str) -> Route:
+        """Route for a provider and model; stats persist for the router's lifetime"""
+        key = (provider_name, model)
+        with self._lock:
+            if key not in self._routes:
+                self._routes[key] = Route(self.providers[provider_name], model, self.config['WINDOW'])
+            return self._routes[key]
+
+    @property
+    def cache_scope(self) -> str:
+        """Identifies the default routes, for response cache keys"""
+        return ','.join(route.name for route in self.default_routes)
+
+    def _healthy(self, route: Route, now: float) -> bool:
+        samples = len(route.stats.snapshot())
+        if samples < self.config['MIN_SAMPLES']:
+            return True
+        unhealthy = route.stats.error_rate() >= self.config['ERROR_RATE_THRESHOLD']
+        # After the cooldown the route gets traffic again to prove itself
+        return not unhealthy or now - route.stats.last_failure >= self.config['COOLDOWN_SECONDS']
+
+    def ranked(self, routes: Optional[List[Route]] = None) -> List[Route]:
+        """Healthy routes by median latency, then unhealthy ones as a last resort"""
+        routes = list(dict.fromkeys(routes or self.default_routes))
+        now = time.monotonic()
+
+        def key(indexed):
+            index, route = indexed
+            median = route.stats.latency_percentile(50, self.config['MIN_SAMPLES'])
+            return (
+                not self._healthy(route, now),
+                median if median is not None else self.config['DEFAULT_HEDGE_DELAY_SECONDS'],
+                index,
+            )
+
+        return [route for _, route in sorted(enumerate(routes), key=key)]
+
+    def hedge_delay(self, route: Route) -> float:
+        delay = route.stats.latency_percentile(self.config['HEDGE_PERCENTILE'], self.config['MIN_SAMPLES'])
+        if delay is None:
+            delay = self.config['DEFAULT_HEDGE_DELAY_SECONDS']
+        return max(self.config['MIN_HEDGE_DELAY_SECONDS'], delay)
+
+    def _attempt(self, attempt: _Attempt, messages, max_tokens, temperature):
+        attempt.started = time.monotonic()
+        if attempt.cancel.is_set():
+            raise AttemptCancelled()
+        return attempt.route.provider.complete(attempt.route.model, messages, max_tokens, temperature, attempt.cancel)
+
+    def complete(self, messages: List[Dict], max_tokens: int, temperature: float,
+                 routes: Optional[List[Route]] = None) -> Completion:
+        """
+        Completion from the first route to answer. Raises ProviderError when
+        every route failed or none answered within REQUEST_TIMEOUT_SECONDS.
+        """
+        candidates = self.ranked(routes)
+        if not candidates:
+            raise ProviderError("No AI providers configured")
+        started = time.monotonic()
+        deadline = started + self.config['REQUEST_TIMEOUT_SECONDS']
+        pending = {}
+        launched = []
+        hedges, last_error = 0, None
+
+        def launch() -> _Attempt:
+            attempt = _Attempt(candidates[len(launched)])
+            launched.append(attempt)
+            future = self._executor.submit(self._attempt, attempt, messages, max_tokens, temperature)
+            pending[future] = attempt
+            return attempt
+
+        def next_hedge_at(attempt: _Attempt) -> float:
+            # Hedge once the attempt has run past its route's p95; one still
+            # waiting for a pool thread is checked again shortly
+            if attempt.started is None:
+                return time.monotonic() + self.config['MIN_HEDGE_DELAY_SECONDS']
+            return attempt.started + self.hedge_delay(attempt.route)
+
+        leading = launch()
+        hedge_at = next_hedge_at(leading)
+        while pending:
+            can_hedge = len(launched) < len(candidates) and hedges < self.config['MAX_HEDGES']
+            wake_at = min(hedge_at, deadline) if can_hedge else deadline
+            done, _ = wait(list(pending), timeout=max(0.0, wake_at - time.monotonic()), return_when=FIRST_COMPLETED)
+
+            if not done:
+                if time.monotonic() >= deadline:
+                    break
+                hedge_at = next_hedge_at(leading)
+                if hedge_at > time.monotonic():
+                    continue
+                # The leading attempt is past its p95: race it against the next route
+                hedges += 1
+                leading = launch()
+                hedge_at = next_hedge_at(leading)
+                logger.info(f"AI routing: hedging to {leading.route.name}")
+                continue
+
+            for future in done:
+                attempt = pending.pop(future)
+                route = attempt.route
+                latency = attempt.elapsed(time.monotonic()) or 0.0
+                try:
+                    completion = future.result()
+                except AttemptCancelled:
+                    continue
+                except Exception as e:
+                    route.stats.record(latency, ok=False)
+                    last_error = e
+                    logger.warning(f"AI routing: {route.name} failed after {latency:.2f}s: {str(e)}")
+                    continue
+
+                route.stats.record(latency, ok=True)
+                self._cancel(pending, ok=True)
+                completion.latency_ms = int((time.monotonic() - started) * 1000)
+                completion.hedged = hedges > 0
+                return completion
+
+            # Fail over straight away when nothing is left in flight
+            if not pending and len(launched) < len(candidates):
+                leading = launch()
+                hedge_at = next_hedge_at(leading)
+
+        # Attempts still running at the deadline count as failures
+        self._cancel(pending, ok=False)
+        if last_error is not None:
+            raise ProviderError(f"All AI providers failed: {str(last_error)}") from last_error
+        raise ProviderError(f"No AI provider answered within {self.config['REQUEST_TIMEOUT_SECONDS']}s")
+
+    async def stream(self, messages: List[Dict], max_tokens: int, temperature: float,
+                     routes: Optional[List[Route]] = None) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Stream a completion as ('delta', text) events, then ('done', Completion)
+        naming the route that answered. Routes are tried in ranked order and
+        one that fails before its first delta fails over to the next. Raises
+        ProviderError when every route failed, or when the answering route
+        fails after deltas were relayed.
+        """
+        candidates = self.ranked(routes)
+        if not candidates:
+            raise ProviderError("No AI providers configured")
+        started = time.monotonic()
+        last_error = None
+        for route in candidates:
+            attempt_started = time.monotonic()
+            parts, total_tokens = [], None
+            events = route.provider.stream(route.model, messages, max_tokens, temperature)
+            try:
+                async for kind, value in events:
+                    if kind == 'usage':
+                        total_tokens = value
+                        continue
+                    parts.append(value)
+                    yield 'delta', value
+            except Exception as e:
+                route.stats.record(time.monotonic() - attempt_started, ok=False)
+                if parts:
+                    raise ProviderError(f"{route.name} failed mid-stream: {str(e)}") from e
+                last_error = e
+                logger.warning(f"AI routing: {route.name} failed before streaming: {str(e)}")
+                continue
+            finally:
+                await events.aclose()
+
+            route.stats.record(time.monotonic() - attempt_started, ok=True)
+            # Providers that ignore include_usage: one delta is roughly one token
+            completion = Completion(
+                ''.join(parts), total_tokens if total_tokens is not None else len(parts),
+                route.provider.name, route.model, latency_ms=int((time.monotonic() - started) * 1000)
+            )
+            yield 'done', completion
+            return
+        raise ProviderError(f"All AI providers failed: {str(last_error)}") from last_error
+
+    def _cancel(self, pending: Dict, ok: bool):
+        """Abandon in-flight attempts; their elapsed time still counts as a sample"""
+        now = time.monotonic()
+        for attempt in pending.values():
+            attempt.cancel.set()
+            elapsed = attempt.elapsed(now)
+            # A lower bound on the loser's latency keeps slow routes from looking fast;
+            # attempts that never left the queue say nothing about their route
+            if elapsed is not None:
+                attempt.route.stats.record(elapsed, ok=ok)
+        pending.clear()
+
+    def status(self) -> List[Dict]:
+        """Per-route latency and health, for the health endpoint"""
+        now = time.monotonic()
+        status = []
+        for route in self.ranked(list(self._routes.values())):
+            p50 = route.stats.latency_percentile(50, 1)
+            p95 = route.stats.latency_percentile(95, 1)
+            status.append({
+                'route': route.name,
+                'healthy': self._healthy(route, now),
+                'samples': len(route.stats.snapshot()),
+                'error_rate': round(route.stats.error_rate(), 4),
+                'p50_ms': int(p50 * 1000) if p50 is not None else None,
+                'p95_ms': int(p95 * 1000) if p95 is not None else None,
+            })
+        return status
@@ -0,0 +1,380 @@
+"""
+Semantic Answer Reuse for AgriConnect
+Serves vetted past answers to questions that mean the same thing
+
+Farmers ask the same things in many phrasings over SMS, USSD and the chat
+API. Standalone questions whose answers farmers rated well are embedded
+with a small multilingual CPU model (fastembed / ONNX) and stored as a
+NumPy index in default storage, which the web, worker and beat processes
+share. Each process copies the current generation to local disk and
+memory-maps it. Search is an inverted-file (IVF) approximate
+nearest-neighbour lookup: vectors are grouped under k-means centroids and
+a query only scans the lists of its NPROBE closest centroids.
+
+A new question whose cosine similarity to an indexed question reaches
+SIMILARITY_THRESHOLD (same language) is answered with that conversation's
+answer; the new AIConversation records the reuse. The index is rebuilt
+hourly, re-embedding only answers that were not in the previous build, so
+newly vetted answers become reusable after the next build.
+
+Serving processes refresh their copy of the index and load the embedding
+model in a background thread. Until both are ready, and whenever the index
+holds nothing in the question's language, questions are not embedded at all.
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEMANTIC_REUSE_CONFIG = {
+    'ENABLED': True,
+    # Multilingual, 384 dimensions, runs on CPU
+    'EMBEDDING_MODEL': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+    'SIMILARITY_THRESHOLD': 0.9,
+    # Conversation types whose answers do not depend on farm-specific inputs
+    'REUSABLE_TYPES': ('general_farming',),
+    # Vetting: a rating at least this high, or an explicit thumbs-up
+    'MIN_RATING': 4,
+    'MAX_INDEXED': 200000,
+    'EMBED_BATCH_SIZE': 256,
+    # IVF layout: about sqrt(N) lists, NPROBE of them scanned per query
+    'MIN_VECTORS_PER_LIST': 64,
+    'NPROBE': 8,
+    'KMEANS_ITERATIONS': 10,
+    # Index generations in default storage
+    'STORAGE_PREFIX': 'ai/semantic_index',
+    'RELOAD_CHECK_SECONDS': 60,
+}
+
+
+def get_reuse_config() -> Dict:
+    config = dict(DEFAULT_SEMANTIC_REUSE_CONFIG)
+    # Where each process keeps the local copy it memory-maps
+    config['LOCAL_DIR'] = os.path.join(tempfile.gettempdir(), 'agriconnect-semantic-index')
+    config.update(getattr(settings, 'SEMANTIC_REUSE_CONFIG', {}))
+    return config
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _embedding_model(name: str):
+    with _models_lock:
+        if name not in _models:
+            # Imported lazily: loading ONNX runtime is only worth it in processes that embed
+            from fastembed import TextEmbedding
+
+            _models[name] = TextEmbedding(model_name=name)
+        return _models[name]
+
+
+def _loaded_model(name: str):
+    """The embedding model if this process has loaded it, without loading it"""
+    with _models_lock:
+        return _models.get(name)
+
+
+def embed(texts: Iterable[str], config: Optional[Dict] = None, model=None) -> np.ndarray:
+    """Unit-length float32 embeddings, one row per text"""
+    config = config or get_reuse_config()
+    model = model or _embedding_model(config['EMBEDDING_MODEL'])
+    vectors = np.array(list(model.embed(list(texts), batch_size=config['EMBED_BATCH_SIZE'])), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _storage_path(config: Dict, name: str) -> str:
+    return f"{config['STORAGE_PREFIX']}/{name}"
+
+
+def read_meta(config: Optional[Dict] = None) -> Optional[Dict]:
+    """The current generation's meta.json from storage, or None before the first build"""
+    config = config or get_reuse_config()
+    try:
+        with default_storage.open(_storage_path(config, 'meta.json'), 'rb') as handle:
+            return json.loads(handle.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _read_array(config: Dict, name: str, build: str) -> np.ndarray:
+    with default_storage.open(_storage_path(config, f'{name}-{build}.npy'), 'rb') as handle:
+        return np.load(io.BytesIO(handle.read()))
+
+
+def _write_array(config: Dict, name: str, build: str, array: np.ndarray):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    default_storage.save(_storage_path(config, f'{name}-{build}.npy'), ContentFile(buffer.getvalue()))
+
+
+def normalize_question(text: str) -> str:
+    return ' '.join((text or '').split())
+
+
+def vetted_conversations(config: Optional[Dict] = None):
+    """Answers eligible for reuse: well rated, standalone, never escalated or flagged"""
+    from .models import AIConversation
+
+    config = config or get_reuse_config()
+    return AIConversation.objects.filter(
+        Q(farmer_rating__gte=config['MIN_RATING'])
+        | Q(farmer_satisfied=True)
+        | Q(feedback__rating__gte=config['MIN_RATING'], feedback__feedback_type='helpful'),
+        Q(thread_id__isnull=True) | Q(thread_id=F('id')),
+        conversation_type__in=config['REUSABLE_TYPES'],
+        job_status='completed',
+        answer_reused=False,
+        escalated_to_human=False,
+        follow_up_needed=False,
+    ).exclude(
+        feedback__feedback_type__in=['not_helpful', 'incorrect']
+    ).exclude(ai_response='')
+
+
+def _kmeans(vectors: np.ndarray, lists: int, iterations: int) -> np.ndarray:
+    """Spherical k-means centroids (unit length) for the IVF lists"""
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        filled = np.linalg.norm(sums, axis=1) > 0
+        # Empty lists keep their previous centroid
+        centroids[filled] = sums[filled] / np.linalg.norm(sums[filled], axis=1, keepdims=True)
+    return centroids
+
+
+def _embed_rows(rows, meta: Optional[Dict], config: Dict) -> np.ndarray:
+    """Embeddings for (id, question, language) rows, reusing the previous build's vectors"""
+    previous, old_vectors = {}, None
+    try:
+        if meta and meta['model'] == config['EMBEDDING_MODEL'] and meta['count']:
+            old_ids = _read_array(config, 'ids', meta['build'])
+            old_vectors = _read_array(config, 'vectors', meta['build'])
+            previous = {conversation_id.tobytes(): index for index, conversation_id in enumerate(old_ids)}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    known = [i for i, row in enumerate(rows) if row[0].bytes in previous]
+    missing = [i for i, row in enumerate(rows) if row[0].bytes not in previous]
+    fresh = embed((normalize_question(rows[i][1]) for i in missing), config) if missing else None
+    dimension = fresh.shape[1] if fresh is not None else old_vectors.shape[1]
+    vectors = np.empty((len(rows), dimension), dtype=np.float32)
+    if missing:
+        vectors[missing] = fresh
+    if known:
+        vectors[known] = old_vectors[[previous[rows[i][0].bytes] for i in known]]
+    return vectors
+
+
+def build_index(config: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Embed every vetted question and write a new IVF index generation.
+
+    Arrays are written to storage as .npy files named after the build;
+    meta.json is replaced last, so readers only ever see complete
+    generations. The previous generation is kept for readers still copying
+    it, older ones are removed.
+    """
+    config = config or get_reuse_config()
+    previous = read_meta(config)
+
+    rows = list(
+        vetted_conversations(config).distinct().order_by('-created_at')
+        .values_list('id', 'farmer_question', 'language')[:config['MAX_INDEXED']]
+    )
+    build = uuid.uuid4().hex[:12]
+    languages = sorted({language for _, _, language in rows})
+    if rows:
+        vectors = _embed_rows(rows, previous, config)
+        lists = 1
+        if len(rows) >= config['MIN_VECTORS_PER_LIST'] * 4:
+            lists = min(int(np.sqrt(len(rows))), len(rows) // config['MIN_VECTORS_PER_LIST'])
+        if lists > 1:
+            centroids = _kmeans(vectors, lists, config['KMEANS_ITERATIONS'])
+        else:
+            centroids = vectors.mean(axis=0, keepdims=True)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+        # Raw uint8 rows: numpy's S16 strips trailing NUL bytes from a UUID
+        ids = np.frombuffer(b''.join(row[0].bytes for row in rows), dtype=np.uint8).reshape(-1, 16)[order]
+        codes = np.array([languages.index(language) for _, _, language in rows], dtype=np.int16)[order]
+        vectors = vectors[order]
+    else:
+        vectors = centroids = np.zeros((0, 0), dtype=np.float32)
+        ids, codes = np.empty((0, 16), dtype=np.uint8), np.array([], dtype=np.int16)
+        offsets = np.zeros(1, dtype=np.int64)
+
+    arrays = {'vectors': vectors, 'ids': ids, 'languages': codes, 'centroids': centroids, 'offsets': offsets}
+    for name, array in arrays.items():
+        _write_array(config, name, build, array)
+
+    meta = {'build': build, 'count': len(rows), 'languages': languages, 'model': config['EMBEDDING_MODEL'], 'built_at': time.time()}
+    meta_path = _storage_path(config, 'meta.json')
+    default_storage.delete(meta_path)
+    default_storage.save(meta_path, ContentFile(json.dumps(meta).encode()))
+
+    keep = {f'-{build}.npy'}
+    if previous:
+        keep.add(f"-{previous['build']}.npy")
+    _, files = default_storage.listdir(config['STORAGE_PREFIX'])
+    for name in files:
+        if name.endswith('.npy') and not any(name.endswith(suffix) for suffix in keep):
+            default_storage.delete(_storage_path(config, name))
+    logger.info(f"Semantic reuse index {build}: {len(rows)} answers in {len(centroids)} lists")
+    return {'answers': len(rows), 'lists': len(centroids)}
+
+
+@dataclass
+class Match:
+    conversation_id: uuid.UUID
+    similarity: float
+
+
+class SemanticIndex:
+    """
+    Read side of the shared index. The current generation is copied from
+    storage to LOCAL_DIR and memory-mapped; new builds and the embedding
+    model are picked up by a background refresh, never on the request path.
+    """
+
+    ARRAYS = ('vectors', 'ids', 'languages', 'centroids', 'offsets')
+
+    def __init__(self, config: Optional[Dict] = None):
+        self._config = config
+        self._lock = threading.Lock()
+        # (arrays, meta), replaced as a whole
+        self._loaded = (None, None)
+        self._checked_at = None
+        self._refreshing = False
+
+    @property
+    def config(self) -> Dict:
+        return self._config or get_reuse_config()
+
+    def current(self):
+        """Loaded (arrays, meta), starting a background refresh when RELOAD_CHECK_SECONDS have passed"""
+        with self._lock:
+            due = self._checked_at is None or time.monotonic() - self._checked_at >= self.config['RELOAD_CHECK_SECONDS']
+            if due and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            return self._loaded
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Semantic index refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._checked_at = time.monotonic()
+
+    def refresh(self) -> Optional[Dict]:
+        """Copy a newly built generation from storage and load its embedding model"""
+        config = self.config
+        meta = read_meta(config)
+        if meta is not None and meta['build'] != (self._loaded[1] or {}).get('build'):
+            arrays = self._fetch(meta['build'], config)
+            with self._lock:
+                self._loaded = (arrays, meta)
+        if meta is not None and meta['count']:
+            _embedding_model(meta['model'])
+        with self._lock:
+            self._checked_at = time.monotonic()
+        return meta
+
+    def _fetch(self, build: str, config: Dict) -> Dict[str, np.ndarray]:
+        directory = Path(config['LOCAL_DIR'])
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            path = directory / f'{name}-{build}.npy'
+            if path.exists():
+                continue
+            partial = directory / f'{name}-{build}.{uuid.uuid4().hex}.part'
+            with default_storage.open(_storage_path(config, path.name), 'rb') as source, open(partial, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.replace(partial, path)
+        arrays = {name: np.load(directory / f'{name}-{build}.npy', mmap_mode='r') for name in self.ARRAYS}
+        # Mapped arrays stay readable after their files are unlinked
+        for path in directory.glob('*.npy'):
+            if not path.name.endswith(f'-{build}.npy'):
+                path.unlink(missing_ok=True)
+        return arrays
+
+    def search(self, vector: np.ndarray, language: str) -> Optional[Match]:
+        """Nearest indexed question in the same language, scanning the NPROBE closest lists"""
+        arrays, meta = self._loaded
+        if not arrays or not meta['count'] or language not in meta['languages']:
+            return None
+        centroids, offsets = arrays['centroids'], arrays['offsets']
+        nprobe = min(self.config['NPROBE'], len(centroids))
+        probes = np.argpartition(-(centroids @ vector), nprobe - 1)[:nprobe]
+
+        code = meta['languages'].index(language)
+        best = None
+        for probe in probes:
+            start, end = int(offsets[probe]), int(offsets[probe + 1])
+            if start == end:
+                continue
+            scores = np.where(arrays['languages'][start:end] == code, arrays['vectors'][start:end] @ vector, -1.0)
+            index = int(np.argmax(scores))
+            if best is None or scores[index] > best[1]:
+                best = (start + index, float(scores[index]))
+        if best is None or best[1] < 0:
+            return None
+        return Match(uuid.UUID(bytes=arrays['ids'][best[0]].tobytes()), best[1])
+
+
+semantic_index = SemanticIndex()
+
+
+def find_reusable_answer(question: str, language: str, config: Optional[Dict] = None):
+    """
+    (AIConversation, similarity) of a vetted past answer to an equivalent
+    question, or None. The source is re-checked against the vetting rules,
+    so answers flagged since the last build are not served.
+    """
+    config = config or get_reuse_config()
+    if not config['ENABLED']:
+        return None
+    arrays, meta = semantic_index.current()
+    # No point embedding a question with nothing to compare it against
+    if not arrays or not meta['count'] or language not in meta['languages']:
+        return None
+    model = _loaded_model(meta['model'])
+    if model is None:
+        return None
+    try:
+        match = semantic_index.search(embed([normalize_question(question)], config, model)[0], language)
+    except Exception as e:
+        logger.warning(f"Semantic reuse lookup failed: {str(e)}")
+        return None
+    if match is None or match.similarity < config['SIMILARITY_THRESHOLD']:
+        return None
+    source = vetted_conversations(config).filter(pk=match.conversation_id).first()
+    if source is None:
+        return None
+    return source, match.similarity
@@ -6,14 +6,24 @@ crop advisory, disease detection, and market intelligence.
 
 import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.cache import cache
 from django.db import transaction
 from django.db import models
 from django.utils import timezone
-from openai import OpenAI
+from asgiref.sync import sync_to_async
+from .concurrency import AIBusyError, ai_call_gate
+from .context import ContextWindow, build_context, resolve_thread, schedule_summary, turn_tokens
+from .image_pipeline import find_recent_match
+from .price_forecast import get_price_forecast, summarize_forecast
+from .response_cache import fingerprint, location_bucket, response_cache
+from .routing import ProviderRouter
+from .semantic_reuse import find_reusable_answer
+from .usage import usage_accountant
 from .models import (
     AIConversation, CropAdvisory, DiseaseDetection, 
     MarketIntelligence, AIUsageAnalytics, AIFeedback
@@ -22,82 +32,95 @@ from .models import (
 logger = logging.getLogger(__name__)
 
 
-def _update_daily_analytics(user, service_type: str, tokens_used: int):
-    """Update daily analytics for a user with race condition protection"""
-    from .models import AIUsageAnalytics
-    from django.db import transaction, IntegrityError
-    
-    today = timezone.now().date()
+LANGUAGE_NAMES = {
+    'tw': 'Twi (Akan)',
+    'ha': 'Hausa',
+    'yo': 'Yoruba'
+}
+
+
+def _language_instruction(language: str) -> str:
+    """Prompt suffix asking for a non-English response"""
+    if not language or language == 'en':
+        return ""
+    return f"Please respond in {LANGUAGE_NAMES.get(language, language)}."
+
+
+def _cached_completion(router: ProviderRouter, service_type: str, cache_key: str,
+                       messages: List[Dict], temperature: float) -> Tuple[str, int, int, str]:
+    """
+    Completion text for ``messages``, served from the response cache when an
+    identical request was answered recently. Identical requests in flight at
+    the same time share one upstream call.
+
+    Returns (content, tokens_used, tokens_saved, model), where model is the
+    one that actually answered; a cache hit or coalesced request spends no
+    tokens and saves what the original completion cost.
+    Raises AIBusyError when no upstream capacity frees up in time.
+    """
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached['content'], 0, cached['tokens_used'], cached.get('model', settings.OPENAI_MODEL)
+
+    def complete():
+        completion = router.complete(messages, settings.OPENAI_MAX_TOKENS, temperature)
+        result = {
+            'content': completion.content,
+            'tokens_used': completion.total_tokens,
+            'model': completion.model
+        }
+        response_cache.set(service_type, cache_key, result)
+        return result
+
+    result, leader = ai_call_gate.coalesce(
+        cache_key, service_type, complete, lambda: response_cache.get(cache_key)
+    )
+    model = result.get('model', settings.OPENAI_MODEL)
+    if leader:
+        return result['content'], result['tokens_used'], 0, model
+    return result['content'], 0, result['tokens_used'], model
+
+
+def _busy_response(error: AIBusyError) -> Dict[str, Any]:
+    """Service result for a request turned away by the concurrency limiter"""
+    return {
+        'success': False,
+        'busy': True,
+        'error': str(error),
+        'retry_after': error.retry_after
+    }
+
+
+def _save_conversation(conversation: Optional[AIConversation], **fields) -> AIConversation:
+    """Create the conversation record, or fill in a queued job's placeholder"""
+    if conversation is None:
+        return AIConversation.objects.create(**fields)
+    for name, value in fields.items():
+        setattr(conversation, name, value)
+    conversation.save()
+    return conversation
+
+
+def _update_daily_analytics(user, service_type: str, tokens_used: int,
+                            cache_hit: Optional[bool] = None, tokens_saved: int = 0):
+    """Account an AI call against the user's daily usage (buffered, lock-free)"""
     try:
-        # Retry logic to handle potential race conditions
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with transaction.atomic():
-                    # First try to get existing record with lock
-                    try:
-                        analytics = AIUsageAnalytics.objects.select_for_update().get(
-                            user=user,
-                            date=today
-                        )
-                        created = False
-                    except AIUsageAnalytics.DoesNotExist:
-                        # Create new record if doesn't exist
-                        analytics = AIUsageAnalytics.objects.create(
-                            user=user,
-                            date=today,
-                            daily_queries=0,
-                            total_tokens_used=0,
-                            general_queries=0,
-                            crop_advisory_queries=0,
-                            disease_detection_queries=0,
-                            market_intelligence_queries=0,
-                        )
-                        created = True
-                    
-                    # Update counters
-                    analytics.daily_queries += 1
-                    analytics.total_tokens_used += tokens_used
-                    
-                    # Update service-specific counters
-                    if service_type == 'crop_advisory':
-                        analytics.crop_advisory_queries += 1
-                    elif service_type == 'disease_detection':
-                        analytics.disease_detection_queries += 1
-                    elif service_type == 'market_intelligence':
-                        analytics.market_intelligence_queries += 1
-                    else:
-                        analytics.general_queries += 1
-                    
-                    analytics.save()
-                    break  # Success, exit retry loop
-                    
-            except IntegrityError:
-                # Handle duplicate key constraint - retry
-                if attempt == max_retries - 1:
-                    logger.error(f"Analytics update failed after {max_retries} attempts for user {user.id}")
-                    raise
-                continue
-                
+        usage_accountant.record(user, service_type, tokens_used, cache_hit, tokens_saved)
     except Exception as e:
         # Log the error but don't fail the main request
         logger.warning(f"Analytics update failed: {str(e)}")
-        pass
 
 
 class AIServiceManager:
     """Central manager for all AI services"""
     
     def __init__(self):
-        self.client = OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            base_url=settings.OPENAI_BASE_URL,
-            timeout=settings.OPENAI_TIMEOUT
-        )
-        self.conversation_service = ConversationalAIService(self.client)
-        self.crop_service = CropAdvisoryService(self.client)
-        self.disease_service = DiseaseDetectionService(self.client)
-        self.market_service = MarketIntelligenceService(self.client)
+        # Latency-aware routing with hedging and failover across providers
+        self.router = ProviderRouter.from_settings()
+        self.conversation_service = ConversationalAIService(self.router)
+        self.crop_service = CropAdvisoryService(self.router)
+        self.disease_service = DiseaseDetectionService(self.router)
+        self.market_service = MarketIntelligenceService(self.router)
         self.analytics_service = AIAnalyticsService()
     
     def get_service(self, service_type: str):
@@ -114,33 +137,17 @@ class AIServiceManager:
     def check_usage_limits(self, user, service_type: str) -> bool:
         """Check if user has exceeded usage limits"""
         daily_limit = settings.AI_USAGE_LIMITS['DAILY_REQUESTS_PER_USER']
-        monthly_limit = settings.AI_USAGE_LIMITS['MONTHLY_REQUESTS_PER_USER']          # Check daily usage
-        today = timezone.now().date()
-        daily_analytics = AIUsageAnalytics.objects.filter(
-            user=user,
-            date=today
-        ).first()
-        
-        if daily_analytics and daily_analytics.daily_queries >= daily_limit:
-            return False
-          # Check monthly usage
-        month_start = timezone.now().replace(day=1).date()
-        
-        monthly_usage = AIUsageAnalytics.objects.filter(
-            user=user,
-            date__gte=month_start
-        ).aggregate(
-            total=models.Sum('daily_queries')
-        )['total'] or 0
-        
-        return monthly_usage < monthly_limit
+        monthly_limit = settings.AI_USAGE_LIMITS['MONTHLY_REQUESTS_PER_USER']
+        # Served from the shared usage counters, not AIUsageAnalytics
+        daily_usage, monthly_usage = usage_accountant.query_counts(user.pk)
+        return daily_usage < daily_limit and monthly_usage < monthly_limit
     
 
 class ConversationalAIService:
     """AI-powered conversational assistant for farmers"""
     
-    def __init__(self, client: OpenAI):
-        self.client = client
+    def __init__(self, router: ProviderRouter):
+        self.router = router
         self.system_prompt = """
         You are AgriBot, an AI assistant for AgriConnect - Africa's premier agricultural commerce platform.
         
@@ -167,61 +174,133 @@ class ConversationalAIService:
         - Respect traditional knowledge while introducing modern techniques
         """
 
+    def _build_context(self, user, message: str, language: str,
+                       conversation_id: Optional[str]) -> ContextWindow:
+        """
+        System prompt (with language instruction), the thread's rolling summary
+        and recent turns under the token budget, then the farmer's message.
+        Raises AIConversation.DoesNotExist for an unknown conversation_id.
+        """
+        thread_id = resolve_thread(user, conversation_id) if conversation_id else None
+        return build_context(self.system_prompt + " " + _language_instruction(language), message, thread_id)
+
+    def _finish_turn(self, window: ContextWindow, thread_id):
+        """Fold history that no longer fits into the summary, off the request path"""
+        if not window.overflow:
+            return
+        try:
+            schedule_summary(thread_id)
+        except Exception as e:
+            logger.warning(f"Could not schedule summary for thread {thread_id}: {str(e)}")
+
+    def _reuse_answer(self, user, message: str, language: str) -> Optional[Dict[str, Any]]:
+        """Answer a standalone question with a vetted answer to an equivalent past one"""
+        found = find_reusable_answer(message, language)
+        if found is None:
+            return None
+        source, similarity = found
+        
+        turn_id = uuid.uuid4()
+        conversation = AIConversation.objects.create(
+            id=turn_id,
+            thread_id=turn_id,
+            user=user,
+            conversation_type='general_farming',
+            language=language,
+            farmer_question=message,
+            ai_response=source.ai_response,
+            context_tokens=turn_tokens(message, source.ai_response),
+            openai_model_used=source.openai_model_used,
+            tokens_used=0,
+            answer_reused=True,
+            reused_from=source,
+            reuse_similarity=similarity
+        )
+        _update_daily_analytics(
+            user=user,
+            service_type='general',
+            tokens_used=0,
+            cache_hit=True,
+            tokens_saved=source.tokens_used
+        )
+        return {
+            'success': True,
+            'response': source.ai_response,
+            'conversation_id': str(conversation.id),
+            'thread_id': str(turn_id),
+            'context': {'history_turns': 0, 'summary_used': False, 'prompt_tokens': 0},
+            'language': language,
+            'tokens_used': 0,
+            'reused': True,
+            'reused_from': str(source.id),
+            'similarity': round(similarity, 4)
+        }
+
     def chat(self, user, message: str, language: str = 'en', 
              conversation_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle conversational AI interaction"""
         try:
-            # Add language instruction if not English
-            language_instruction = ""
-            if language != 'en':
-                lang_names = {
-                    'tw': 'Twi (Akan)',
-                    'ha': 'Hausa',
-                    'yo': 'Yoruba'
-                }
-                language_instruction = f"Please respond in {lang_names.get(language, language)}."
-            
             # Build conversation context
-            messages = [
-                {"role": "system", "content": self.system_prompt + " " + language_instruction},
-                {"role": "user", "content": message}
-            ]
+            window = self._build_context(user, message, language, conversation_id)
+            
+            # Standalone questions may have been answered before in other words
+            if window.thread_id is None:
+                reused = self._reuse_answer(user, message, language)
+                if reused is not None:
+                    return reused
             
             # Get AI response
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=settings.OPENAI_TEMPERATURE
-            )
+            with ai_call_gate.slot('general'):
+                completion = self.router.complete(
+                    window.messages, settings.OPENAI_MAX_TOKENS, settings.OPENAI_TEMPERATURE
+                )
             
-            ai_response = response.choices[0].message.content
+            ai_response = completion.content
             
             # Save conversation
+            turn_id = uuid.uuid4()
+            thread_id = window.thread_id or turn_id
             conversation = AIConversation.objects.create(
+                id=turn_id,
+                thread_id=thread_id,
                 user=user,
                 conversation_type='general_farming',
                 language=language,
                 farmer_question=message,
                 ai_response=ai_response,
-                openai_model_used=settings.OPENAI_MODEL,
-                tokens_used=response.usage.total_tokens,
-                processing_time_ms=0  # Could be calculated if needed
-            )              # Update daily usage analytics
+                context_tokens=turn_tokens(message, ai_response),
+                openai_model_used=completion.model,
+                tokens_used=completion.total_tokens,
+                processing_time_ms=completion.latency_ms
+            )
+            self._finish_turn(window, thread_id)
+            
+            # Update daily usage analytics
             _update_daily_analytics(
                 user=user,
                 service_type='general',
-                tokens_used=response.usage.total_tokens
+                tokens_used=completion.total_tokens
             )
             
             return {
                 'success': True,
                 'response': ai_response,
                 'conversation_id': str(conversation.id),
+                'thread_id': str(thread_id),
+                'context': window.stats(),
                 'language': language,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': completion.total_tokens,
+                'reused': False
             }
             
+        except AIConversation.DoesNotExist:
+            return {
+                'success': False,
+                'error': 'Conversation not found',
+                'not_found': True
+            }
+        except AIBusyError as e:
+            return _busy_response(e)
         except Exception as e:
             logger.error(f"Conversational AI error: {str(e)}")
             return {
@@ -230,15 +309,93 @@ class ConversationalAIService:
                 'fallback_response': "I'm sorry, I'm having trouble processing your request right now. Please try again later."
             }
 
+    async def stream_chat(self, user, message: str, language: str = 'en',
+                          conversation_id: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Relay a chat completion as it is generated.
+
+        Yields (event, data) pairs: one 'token' per content delta, then either
+        'done' with the saved conversation id and token usage, or 'error'. The
+        conversation is only persisted once the completion has finished.
+        Completions go through the provider router, failing over to the next
+        route until the first token has been relayed. The stream holds a
+        'general' upstream slot; when none frees up in time the only event is
+        an 'error' with ``busy`` and ``retry_after``.
+        """
+        started = time.monotonic()
+        try:
+            window = await sync_to_async(self._build_context)(user, message, language, conversation_id)
+            if window.thread_id is None:
+                reused = await sync_to_async(self._reuse_answer)(user, message, language)
+                if reused is not None:
+                    yield 'token', {'delta': reused.pop('response')}
+                    reused.pop('success')
+                    yield 'done', reused
+                    return
+            # Held for the whole stream: the upstream call runs until the last token
+            async with ai_call_gate.aslot('general'):
+                async for event, value in self.router.stream(
+                    window.messages, settings.OPENAI_MAX_TOKENS, settings.OPENAI_TEMPERATURE
+                ):
+                    if event == 'done':
+                        completion = value
+                    else:
+                        yield 'token', {'delta': value}
+
+            ai_response = completion.content
+            tokens_used = completion.total_tokens
+
+            turn_id = uuid.uuid4()
+            thread_id = window.thread_id or turn_id
+            conversation = await AIConversation.objects.acreate(
+                id=turn_id,
+                thread_id=thread_id,
+                user=user,
+                conversation_type='general_farming',
+                language=language,
+                farmer_question=message,
+                ai_response=ai_response,
+                context_tokens=turn_tokens(message, ai_response),
+                openai_model_used=completion.model,
+                tokens_used=tokens_used,
+                processing_time_ms=int((time.monotonic() - started) * 1000)
+            )
+            await sync_to_async(self._finish_turn)(window, thread_id)
+            await sync_to_async(_update_daily_analytics)(
+                user=user,
+                service_type='general',
+                tokens_used=tokens_used
+            )
+            yield 'done', {
+                'conversation_id': str(conversation.id),
+                'thread_id': str(thread_id),
+                'context': window.stats(),
+                'language': language,
+                'tokens_used': tokens_used,
+                'reused': False
+            }
+
+        except AIConversation.DoesNotExist:
+            yield 'error', {'error': 'Conversation not found'}
+        except AIBusyError as e:
+            yield 'error', {'busy': True, 'error': str(e), 'retry_after': e.retry_after}
+        except Exception as e:
+            logger.error(f"Streaming conversational AI error: {str(e)}")
+            yield 'error', {
+                'error': str(e),
+                'fallback_response': "I'm sorry, I'm having trouble processing your request right now. Please try again later."
+            }
+
 
 class CropAdvisoryService:
     """AI-powered crop advisory and farming guidance"""
     
-    def __init__(self, client: OpenAI):
-        self.client = client
+    def __init__(self, router: ProviderRouter):
+        self.router = router
     
     def get_crop_advice(self, user, crop_type: str, farming_stage: str,
-                       location: str, season: str, specific_question: str = None) -> Dict[str, Any]:
+                       location: str, season: str, specific_question: str = None,
+                       language: str = 'en', conversation: Optional[AIConversation] = None) -> Dict[str, Any]:
         """Get comprehensive crop advisory"""
         try:
             prompt = f"""
@@ -259,30 +416,36 @@ class CropAdvisoryService:
             8. Local climate considerations
             
             Format the response as practical, actionable advice suitable for African farmers.
+            {_language_instruction(language)}
             """
             
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
+            cache_key = fingerprint(
+                'crop_advisory', self.router.cache_scope, language,
+                crop=crop_type, stage=farming_stage, season=season,
+                location=location_bucket(location), question=specific_question
+            )
+            advice, tokens_used, tokens_saved, model_used = _cached_completion(
+                self.router, 'crop_advisory', cache_key,
                 messages=[
                     {"role": "system", "content": "You are an expert agricultural advisor specializing in African farming systems."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=settings.OPENAI_MAX_TOKENS,
                 temperature=0.3  # Lower temperature for more consistent advice
             )
             
-            advice = response.choices[0].message.content
-              # Create AI conversation record first
-            conversation = AIConversation.objects.create(
+            # Create AI conversation record first
+            conversation = _save_conversation(
+                conversation,
                 user=user,
                 conversation_type='crop_advisory',
+                language=language,
                 farmer_question=specific_question or f"Crop advice for {crop_type}",
                 ai_response=advice,
                 farmer_location=location,
                 crop_context=crop_type,
                 season_context=season,
-                tokens_used=response.usage.total_tokens,
-                openai_model_used=settings.OPENAI_MODEL
+                tokens_used=tokens_used,
+                openai_model_used=model_used
             )
             
             # Save advisory record
@@ -298,7 +461,9 @@ class CropAdvisoryService:
             _update_daily_analytics(
                 user=user,
                 service_type='crop_advisory',
-                tokens_used=response.usage.total_tokens
+                tokens_used=tokens_used,
+                cache_hit=bool(tokens_saved),
+                tokens_saved=tokens_saved
             )
             
             return {
@@ -306,9 +471,12 @@ class CropAdvisoryService:
                 'advice': advice,
                 'advisory_id': str(advisory.id),
                 'confidence_score': 0.85,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': tokens_used,
+                'cached': bool(tokens_saved)
             }
             
+        except AIBusyError as e:
+            return _busy_response(e)
         except Exception as e:
             logger.error(f"Crop advisory error: {str(e)}")
             return {
@@ -320,12 +488,20 @@ class CropAdvisoryService:
 class DiseaseDetectionService:
     """AI-powered plant disease detection and treatment recommendations"""
     
-    def __init__(self, client: OpenAI):
-        self.client = client
+    def __init__(self, router: ProviderRouter):
+        self.router = router
     
     def detect_disease(self, user, crop_type: str, symptoms: str,
-                      image_url: str = None, location: str = None) -> Dict[str, Any]:
-        """Detect plant diseases and provide treatment recommendations"""
+                      image_url: str = None, location: str = None,
+                      language: str = 'en', image_hash: str = '',
+                      conversation: Optional[AIConversation] = None) -> Dict[str, Any]:
+        """
+        Detect plant diseases and provide treatment recommendations.
+        
+        ``image_hash`` is the perceptual hash from ai.image_pipeline; a recent
+        detection of a near-identical photo of the same crop is reused
+        instead of calling the model again.
+        """
         try:
             # Build context based on available information
             if symptoms and image_url:
@@ -404,7 +580,7 @@ class DiseaseDetectionService:
                 """
             
             messages = [
-                {"role": "system", "content": "You are an expert plant pathologist specializing in African crop diseases."},
+                {"role": "system", "content": "You are an expert plant pathologist specializing in African crop diseases. " + _language_instruction(language)},
                 {"role": "user", "content": prompt}
             ]
             
@@ -418,25 +594,37 @@ class DiseaseDetectionService:
                     ]
                 })
             
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=0.2  # Lower temperature for medical-like diagnosis
-            )
-            
-            diagnosis = response.choices[0].message.content
+            previous = find_recent_match(user, crop_type, image_hash) if image_hash else None
+            if previous is not None:
+                diagnosis = previous.conversation.ai_response
+                tokens_used, tokens_saved = 0, previous.conversation.tokens_used
+                model_used = previous.conversation.openai_model_used
+            else:
+                # Uploaded photos are keyed by their hash; external images by URL
+                cache_key = fingerprint(
+                    'disease_detection', self.router.cache_scope, language,
+                    crop=crop_type, symptoms=symptoms, image=image_hash or image_url or '',
+                    location=location_bucket(location)
+                )
+                diagnosis, tokens_used, tokens_saved, model_used = _cached_completion(
+                    self.router, 'disease_detection', cache_key,
+                    messages=messages,
+                    temperature=0.2  # Lower temperature for medical-like diagnosis
+                )
+            cached = previous is not None or bool(tokens_saved)
             
             # Create AI conversation record first
-            conversation = AIConversation.objects.create(
+            conversation = _save_conversation(
+                conversation,
                 user=user,
                 conversation_type='disease_detection',
+                language=language,
                 farmer_question=f"Disease symptoms: {symptoms}",
                 ai_response=diagnosis,
                 farmer_location=location or "",
                 crop_context=crop_type,
-                tokens_used=response.usage.total_tokens,
-                openai_model_used=settings.OPENAI_MODEL
+                tokens_used=tokens_used,
+                openai_model_used=model_used
             )
             
             # Save detection record
@@ -446,24 +634,33 @@ class DiseaseDetectionService:
                 farmer_description=symptoms,
                 primary_diagnosis=diagnosis[:100] if diagnosis else "",  # Truncate for field limit
                 confidence_percentage=80.0,  # Placeholder
-                image_analyzed=bool(image_url)
+                image_analyzed=bool(image_url),
+                image_hash=image_hash or ''
             )
             
             # Update daily usage analytics
             _update_daily_analytics(
                 user=user,
                 service_type='disease_detection',
-                tokens_used=response.usage.total_tokens
+                tokens_used=tokens_used,
+                cache_hit=cached,
+                tokens_saved=tokens_saved
             )
             
-            return {
+            result = {
                 'success': True,
                 'diagnosis': diagnosis,
                 'detection_id': str(detection.id),
                 'confidence_score': 0.8,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': tokens_used,
+                'cached': cached
             }
+            if previous is not None:
+                result['reused_detection_id'] = str(previous.id)
+            return result
             
+        except AIBusyError as e:
+            return _busy_response(e)
         except Exception as e:
             logger.error(f"Disease detection error: {str(e)}")
             return {
@@ -475,17 +672,25 @@ class DiseaseDetectionService:
 class MarketIntelligenceService:
     """AI-powered market intelligence and price predictions"""
     
-    def __init__(self, client: OpenAI):
-        self.client = client
+    def __init__(self, router: ProviderRouter):
+        self.router = router
     
     def get_market_intelligence(self, user, crop_type: str, location: str,
-                               market_type: str = 'local') -> Dict[str, Any]:
+                               market_type: str = 'local', language: str = 'en',
+                               conversation: Optional[AIConversation] = None) -> Dict[str, Any]:
         """Get market intelligence and price predictions"""
         try:
+            # Ground the analysis in the forecast fitted from platform sales
+            forecast = get_price_forecast(crop_type, location, weeks=13)
+            forecast_context = ''
+            if forecast:
+                forecast_context = "AgriConnect sales-based price forecast:\n" + "\n".join(summarize_forecast(forecast))
+            
             prompt = f"""
             Provide comprehensive market intelligence for {crop_type} in {location}, Africa.
             
             Market scope: {market_type}
+            {forecast_context}
             
             Please provide:
             1. Current market price trends
@@ -500,29 +705,35 @@ class MarketIntelligenceService:
             10. Market risks and opportunities
             
             Focus on actionable insights for African farmers to maximize their profits.
+            {_language_instruction(language)}
             """
             
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
+            cache_key = fingerprint(
+                'market_intelligence', self.router.cache_scope, language,
+                crop=crop_type, location=location_bucket(location), market_type=market_type,
+                forecast=forecast['fitted_at'] if forecast else ''
+            )
+            intelligence, tokens_used, tokens_saved, model_used = _cached_completion(
+                self.router, 'market_intelligence', cache_key,
                 messages=[
                     {"role": "system", "content": "You are an expert agricultural market analyst specializing in African markets."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=settings.OPENAI_MAX_TOKENS,
                 temperature=0.3
             )
             
-            intelligence = response.choices[0].message.content
-              # Create AI conversation record first
-            conversation = AIConversation.objects.create(
+            # Create AI conversation record first
+            conversation = _save_conversation(
+                conversation,
                 user=user,
                 conversation_type='market_inquiry',
+                language=language,
                 farmer_question=f"Market intelligence for {crop_type} in {location}",
                 ai_response=intelligence,
                 farmer_location=location,
                 crop_context=crop_type,
-                tokens_used=response.usage.total_tokens,
-                openai_model_used=settings.OPENAI_MODEL
+                tokens_used=tokens_used,
+                openai_model_used=model_used
             )
             
             # Save intelligence record
@@ -531,6 +742,12 @@ class MarketIntelligenceService:
                 crop_name=crop_type,
                 target_region=location,
                 prediction_timeframe='3_months',
+                current_price_ghs=forecast['last_observed_price'] if forecast else None,
+                predicted_price_range={
+                    'min': min(week['lower_price'] for week in forecast['weekly']),
+                    'max': max(week['upper_price'] for week in forecast['weekly']),
+                    'unit': forecast['unit'],
+                } if forecast else {},
                 market_trends=[intelligence[:500]] if intelligence else []  # Truncate for field
             )
             
@@ -538,17 +755,23 @@ class MarketIntelligenceService:
             _update_daily_analytics(
                 user=user,
                 service_type='market_intelligence',
-                tokens_used=response.usage.total_tokens
+                tokens_used=tokens_used,
+                cache_hit=bool(tokens_saved),
+                tokens_saved=tokens_saved
             )
             
             return {
                 'success': True,
                 'intelligence': intelligence,
                 'intelligence_id': str(market_intel.id),
+                'price_forecast': forecast,
                 'confidence_score': 0.75,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': tokens_used,
+                'cached': bool(tokens_saved)
             }
             
+        except AIBusyError as e:
+            return _busy_response(e)
         except Exception as e:
             logger.error(f"Market intelligence error: {str(e)}")
             return {
@@ -560,6 +783,22 @@ class MarketIntelligenceService:
 class AIAnalyticsService:
     """Analytics and insights for AI usage and performance"""
     
+    def _cache_statistics(self, analytics) -> Dict[str, Any]:
+        """Response cache hit rate and tokens saved over an analytics queryset"""
+        totals = analytics.aggregate(
+            hits=models.Sum('cache_hits'),
+            misses=models.Sum('cache_misses'),
+            tokens_saved=models.Sum('tokens_saved')
+        )
+        hits = totals['hits'] or 0
+        lookups = hits + (totals['misses'] or 0)
+        return {
+            'hits': hits,
+            'misses': lookups - hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'tokens_saved': totals['tokens_saved'] or 0
+        }
+    
     def get_user_analytics(self, user, days: int = 30) -> Dict[str, Any]:
         """Get user AI usage analytics"""
         try:
@@ -597,6 +836,7 @@ class AIAnalyticsService:
                 'service_breakdown': service_breakdown,
                 'average_rating': round(avg_rating, 2),
                 'feedback_count': feedback.count(),
+                'response_cache': self._cache_statistics(analytics),
                 'period_days': days
             }
             
@@ -646,6 +886,7 @@ class AIAnalyticsService:
                 'total_requests': total_requests,
                 'total_tokens_used': total_tokens,
                 'service_statistics': service_stats,
+                'response_cache': self._cache_statistics(analytics),
                 'period_days': days
             }
             
@@ -0,0 +1,57 @@
+"""
+Celery tasks for the AI app
+"""
+
+from celery import shared_task
+
+from .concurrency import AIBusyError
+from .jobs import fail_job, run_job
+
+
+@shared_task(bind=True, max_retries=5, acks_late=True)
+def run_ai_job(self, conversation_id):
+    """Run a queued AI job, backing off while upstream capacity is exhausted"""
+    try:
+        run_job(conversation_id)
+    except AIBusyError as e:
+        # Eager mode has no broker to schedule a retry on
+        if self.request.is_eager or self.request.retries >= self.max_retries:
+            fail_job(conversation_id, str(e))
+            return
+        raise self.retry(exc=e, countdown=e.retry_after * (self.request.retries + 1))
+
+
+@shared_task
+def refresh_market_price_forecasts():
+    """Nightly refit of the stored market price forecasts"""
+    from .price_forecast import refresh_price_forecasts
+
+    return refresh_price_forecasts()
+
+
+@shared_task(bind=True, max_retries=3)
+def summarize_conversation_thread(self, thread_id):
+    """Fold chat turns that no longer fit the context budget into the thread summary"""
+    from .context import fold_into_summary, release_summary_lock
+    from .services import ai_service_manager
+
+    try:
+        folded = fold_into_summary(ai_service_manager.router, thread_id)
+    except AIBusyError as e:
+        if not self.request.is_eager and self.request.retries < self.max_retries:
+            # The pending-summary lock stays held across the retry
+            raise self.retry(exc=e, countdown=e.retry_after * (self.request.retries + 1))
+        folded = 0
+    except Exception:
+        release_summary_lock(thread_id)
+        raise
+    release_summary_lock(thread_id)
+    return folded
+
+
+@shared_task
+def rebuild_semantic_index():
+    """Re-embed vetted answers so newly rated ones become reusable"""
+    from .semantic_reuse import build_index
+
+    return build_index()
@@ -0,0 +1,811 @@
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageEnhance
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .concurrency import AICallGate, get_concurrency_config
+from .context import fold_into_summary, get_context_config
+from .image_pipeline import (
+    InvalidImageError, decode_data_url, find_recent_match, get_image_config, hash_distance, prepare_image,
+)
+from .jobs import run_job, submit_job
+from .models import AIConversation, AIUsageAnalytics, ConversationSummary, DiseaseDetection
+from .price_forecast import (
+    fit_forecasts, get_forecast_config, get_price_forecast, refresh_price_forecasts, summarize_forecast,
+)
+from .response_cache import ResponseCache, fingerprint, get_cache_config, location_bucket
+from .routing import DEFAULT_AI_ROUTING_CONFIG, FakeProvider, ProviderError, ProviderRouter
+from .semantic_reuse import SemanticIndex, build_index, find_reusable_answer, get_reuse_config
+from .services import ConversationalAIService, DiseaseDetectionService, _cached_completion
+from .tasks import run_ai_job
+from .usage import UsageAccountant
+from .views import AIConversationStreamView
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ai-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OPENAI_TIMEOUT=30)
+class AICallGateTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.gate = AICallGate(dict(get_concurrency_config(), GLOBAL_LIMIT=1, SERVICE_LIMITS={}))
+
+    def test_expired_owner_does_not_release_the_next_owners_slot(self):
+        key, stale_token = self.gate._acquire_slot('global', 1, time.monotonic())
+        # The lease runs out and another caller takes the slot
+        caches['default'].delete(key)
+        _, token = self.gate._acquire_slot('global', 1, time.monotonic())
+
+        self.gate._release(key, stale_token)
+        self.assertEqual(caches['default'].get(key), token)
+        self.gate._release(key, token)
+        self.assertIsNone(caches['default'].get(key))
+
+    def test_slot_is_released_after_the_block(self):
+        with self.gate.slot('general'):
+            self.assertIsNotNone(caches['default'].get(self.gate._key('slot', 'global', 0)))
+        self.assertIsNone(caches['default'].get(self.gate._key('slot', 'global', 0)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UsageAccountantTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('+233200000301', password='secret', roles=['FARMER'])
+
+    def test_process_local_cache_counts_from_the_table(self):
+        # Two workers, each with its own local-memory counters
+        first, second = UsageAccountant(), UsageAccountant()
+        self.assertFalse(first.counters_shared)
+        first.record(self.user, 'crop_advisory', tokens_used=100)
+        second.record(self.user, 'general', tokens_used=50)
+
+        self.assertEqual(first.query_counts(self.user.pk), (2, 2))
+        self.assertEqual(second.query_counts(self.user.pk), (2, 2))
+        usage = AIUsageAnalytics.objects.get(user=self.user)
+        self.assertEqual((usage.total_tokens_used, usage.crop_advisory_queries, usage.general_queries), (150, 1, 1))
+
+
+class FakeCropService:
+    """Stands in for the crop advisory service of a job"""
+
+    def __init__(self, result=None):
+        self.calls = 0
+        self.result = result or {'success': True, 'advice': 'Plant after the first rains'}
+
+    def get_crop_advice(self, user, conversation, **params):
+        self.calls += 1
+        return self.result
+
+
+class AIJobTests(TestCase):
+    """Tasks run eagerly through apply(); delay() is patched where a broker would be needed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('+233200000302', password='secret', roles=['FARMER'])
+        self.service = FakeCropService()
+        patcher = mock.patch('ai.services.ai_service_manager.get_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self):
+        with mock.patch('ai.tasks.run_ai_job.delay', side_effect=lambda job_id: run_ai_job.apply(args=[job_id])):
+            with self.captureOnCommitCallbacks(execute=True):
+                conversation = submit_job(self.user, 'crop_advisory', {'crop_type': 'maize'}, 'When to plant?')
+        conversation.refresh_from_db()
+        return conversation
+
+    def test_job_runs_eagerly_to_completion(self):
+        conversation = self.submit()
+        self.assertEqual(conversation.job_status, 'completed')
+        self.assertEqual(conversation.job_result['advice'], 'Plant after the first rains')
+        self.assertEqual(self.service.calls, 1)
+
+    def test_redelivered_task_does_not_rerun_a_live_job(self):
+        conversation = self.submit()
+        AIConversation.objects.filter(pk=conversation.pk).update(job_status='running', job_started_at=timezone.now())
+        self.assertFalse(run_job(str(conversation.pk)))
+        self.assertEqual(self.service.calls, 1)
+
+    def test_stale_running_job_is_reclaimed(self):
+        conversation = self.submit()
+        AIConversation.objects.filter(pk=conversation.pk).update(
+            job_status='running', job_started_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertTrue(run_job(str(conversation.pk)))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.job_status, 'completed')
+        self.assertEqual(self.service.calls, 2)
+
+    def test_superseded_run_does_not_finish_the_job(self):
+        conversation = self.submit()
+        AIConversation.objects.filter(pk=conversation.pk).update(job_status='queued', job_result={})
+
+        def reclaimed_meanwhile(user, conversation, **params):
+            AIConversation.objects.filter(pk=conversation.pk).update(job_started_at=timezone.now() + timedelta(seconds=1))
+            return {'success': True}
+
+        self.service.get_crop_advice = reclaimed_meanwhile
+        self.assertTrue(run_job(str(conversation.pk)))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.job_status, 'running')
+
+    def test_busy_upstream_fails_an_eager_job(self):
+        self.service.result = {'success': False, 'busy': True, 'error': 'busy', 'retry_after': 5}
+        conversation = self.submit()
+        self.assertEqual(conversation.job_status, 'failed')
+
+    def test_unreachable_broker_fails_the_job(self):
+        with mock.patch('ai.tasks.run_ai_job.delay', side_effect=ConnectionError('broker down')):
+            with self.captureOnCommitCallbacks(execute=True):
+                conversation = submit_job(self.user, 'crop_advisory', {'crop_type': 'maize'}, 'When to plant?')
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.job_status, 'failed')
+        self.assertEqual(self.service.calls, 0)
+
+
+class SummaryRouter:
+    """Records summary prompts and answers with the exchanges it was given"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, messages, max_tokens, temperature):
+        self.prompts.append(messages[-1]['content'])
+        exchanges = messages[-1]['content'].split('New exchanges:\n', 1)[1]
+        return SimpleNamespace(content=exchanges, total_tokens=10)
+
+
+class WordEncoding:
+    """Offline stand-in for the tiktoken encoding"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class ConversationSummaryTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('ai.context._encoding', return_value=WordEncoding())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('+233200000303', password='secret', roles=['FARMER'])
+        self.thread_id = uuid.uuid4()
+        start = timezone.now() - timedelta(hours=1)
+        for number in range(8):
+            turn = AIConversation.objects.create(
+                user=self.user, conversation_type='general', thread_id=self.thread_id,
+                farmer_question=f'question {number}', ai_response=f'answer {number}', context_tokens=10
+            )
+            AIConversation.objects.filter(pk=turn.pk).update(created_at=start + timedelta(minutes=number))
+        self.config = dict(get_context_config(), MAX_HISTORY_TURNS=2, SUMMARY_BATCH_TURNS=4)
+
+    def test_folds_oldest_first_until_only_the_window_is_left(self):
+        router = SummaryRouter()
+        self.assertEqual(fold_into_summary(router, self.thread_id, self.config), 6)
+
+        self.assertEqual(len(router.prompts), 2)
+        self.assertIn('question 0', router.prompts[0])
+        self.assertNotIn('question 4', router.prompts[0])
+        self.assertIn('question 4', router.prompts[1])
+        summary = ConversationSummary.objects.get(pk=self.thread_id)
+        self.assertEqual(summary.turns_summarized, 6)
+        self.assertEqual(
+            summary.summarized_through,
+            AIConversation.objects.get(farmer_question='question 5').created_at
+        )
+        # Nothing left outside the window
+        self.assertEqual(fold_into_summary(router, self.thread_id, self.config), 0)
+
+
+class ProviderRouterTests(SimpleTestCase):
+
+    def router(self, providers, **config):
+        config = dict(DEFAULT_AI_ROUTING_CONFIG, MIN_SAMPLES=3, MIN_HEDGE_DELAY_SECONDS=0.05, **config)
+        routes = [{'PROVIDER': name, 'MODEL': f'{name}-model'} for name in providers]
+        return ProviderRouter(providers, routes, config)
+
+    def complete(self, router):
+        return router.complete([{'role': 'user', 'content': 'Hello'}], 50, 0.2)
+
+    def test_failover_to_the_next_route(self):
+        router = self.router({
+            'primary': FakeProvider('primary', latency_seconds=0.01, error_rate=1.0),
+            'backup': FakeProvider('backup', latency_seconds=0.01),
+        })
+        completion = self.complete(router)
+        self.assertEqual((completion.provider, completion.model), ('backup', 'backup-model'))
+        self.assertFalse(completion.hedged)
+        self.assertEqual(router.route('primary', 'primary-model').stats.error_rate(), 1.0)
+
+    def test_slow_attempt_is_hedged(self):
+        router = self.router({
+            'primary': FakeProvider('primary', latency_seconds=2.0),
+            'backup': FakeProvider('backup', latency_seconds=0.01),
+        })
+        # The primary has been fast so far, so it leads and its p95 is short
+        for _ in range(3):
+            router.route('primary', 'primary-model').stats.record(0.01, ok=True)
+
+        completion = self.complete(router)
+        self.assertEqual(completion.provider, 'backup')
+        self.assertTrue(completion.hedged)
+        self.assertLess(completion.latency_ms, 1000)
+
+    def test_all_routes_failing_raises(self):
+        router = self.router({'primary': FakeProvider('primary', latency_seconds=0.01, error_rate=1.0)})
+        with self.assertRaises(ProviderError):
+            self.complete(router)
+
+    async def test_stream_does_not_fail_over_after_the_first_token(self):
+        class BrokenStream(FakeProvider):
+            async def stream(self, model, messages, max_tokens, temperature):
+                yield 'delta', 'Plant '
+                raise ProviderError('connection reset')
+
+        backup = FakeProvider('backup', latency_seconds=0.01)
+        router = self.router({'primary': BrokenStream('primary'), 'backup': backup})
+        deltas = []
+        with self.assertRaises(ProviderError):
+            async for event, value in router.stream([{'role': 'user', 'content': 'Hello'}], 50, 0.2):
+                deltas.append(value)
+        # A second answer would be appended to the half the farmer already has
+        self.assertEqual(deltas, ['Plant '])
+        self.assertEqual(router.route('backup', 'backup-model').stats.snapshot(), [])
+
+    def test_pool_queueing_is_not_counted_as_latency(self):
+        router = self.router({'primary': FakeProvider('primary', latency_seconds=0.1)}, MAX_WORKERS=2)
+        threads = [threading.Thread(target=self.complete, args=(router,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies = [latency for latency, ok in router.route('primary', 'primary-model').stats.snapshot()]
+        self.assertEqual(len(latencies), 8)
+        # Eight calls on two threads take ~0.4s end to end; each attempt still ran ~0.1s
+        self.assertLess(max(latencies), 0.2)
+
+
+class FakeClock:
+    """Stands in for the time module of ai.response_cache"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class CountingRouter:
+    """Answers every completion and counts the upstream calls"""
+
+    cache_scope = 'primary:primary-model'
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, max_tokens, temperature):
+        self.calls += 1
+        return SimpleNamespace(content='Plant after the first rains', total_tokens=120, model='primary-model')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OPENAI_TIMEOUT=30)
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.clock = FakeClock()
+        patcher = mock.patch('ai.response_cache.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ResponseCache(dict(get_cache_config(), TTL_SECONDS={'crop_advisory': 60}))
+
+    def test_equivalent_requests_share_a_fingerprint(self):
+        self.assertEqual(location_bucket('6.6885, -1.6244'), location_bucket('6.71,-1.62'))
+        self.assertEqual(
+            fingerprint('crop_advisory', 'model', 'en', crop='Maize', location=location_bucket('Kumasi, Ghana')),
+            fingerprint('crop_advisory', 'model', 'EN', crop='maize ', location=location_bucket('kumasi ghana'))
+        )
+        self.assertNotEqual(
+            fingerprint('crop_advisory', 'model', 'en', crop='maize'),
+            fingerprint('crop_advisory', 'model', 'tw', crop='maize')
+        )
+
+    def test_entries_are_shared_across_workers_and_expire(self):
+        self.cache.set('crop_advisory', 'key', {'content': 'advice'})
+        other_worker = ResponseCache(self.cache.config)
+        self.assertEqual(other_worker.get('key'), {'content': 'advice'})
+
+        self.clock.now += 59
+        self.assertEqual(self.cache.get('key'), {'content': 'advice'})
+        # Promoted from the shared tier with its remaining lifetime, not a fresh TTL
+        self.assertEqual(other_worker.get('key'), {'content': 'advice'})
+        self.clock.now += 1
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(other_worker.get('key'))
+
+    def test_services_without_a_ttl_are_not_cached(self):
+        self.cache.set('market_intelligence', 'key', {'content': 'prices'})
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_repeat_request_is_served_without_a_completion(self):
+        router = CountingRouter()
+        messages = [{'role': 'user', 'content': 'When do I plant maize?'}]
+        with mock.patch('ai.services.response_cache', self.cache):
+            first = _cached_completion(router, 'crop_advisory', 'key', messages, 0.3)
+            second = _cached_completion(router, 'crop_advisory', 'key', messages, 0.3)
+
+        self.assertEqual(router.calls, 1)
+        self.assertEqual(first, ('Plant after the first rains', 120, 0, 'primary-model'))
+        self.assertEqual(second, ('Plant after the first rains', 0, 120, 'primary-model'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OPENAI_TIMEOUT=30)
+class StreamChatTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        patcher = mock.patch('ai.context._encoding', return_value=WordEncoding())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gate = AICallGate(dict(get_concurrency_config(), GLOBAL_LIMIT=1, QUEUE_DEADLINE_SECONDS=0))
+        for target, value in (('ai.services.ai_call_gate', self.gate),
+                              ('ai.services.ConversationalAIService._reuse_answer', lambda *args: None)):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('+233200000305', password='secret', roles=['FARMER'])
+        providers = {
+            'primary': FakeProvider('primary', latency_seconds=0.01, error_rate=1.0),
+            'backup': FakeProvider('backup', latency_seconds=0.01, content='Plant after the rains'),
+        }
+        routes = [{'PROVIDER': name, 'MODEL': f'{name}-model'} for name in providers]
+        self.router = ProviderRouter(providers, routes, DEFAULT_AI_ROUTING_CONFIG)
+        self.service = ConversationalAIService(self.router)
+
+    async def events(self):
+        return [event async for event in self.service.stream_chat(self.user, 'When do I plant maize?')]
+
+    async def test_stream_fails_over_and_records_the_answering_model(self):
+        events = await self.events()
+
+        self.assertEqual([event for event, _ in events], ['token'] * 4 + ['done'])
+        self.assertEqual(''.join(data['delta'] for event, data in events[:-1]), 'Plant after the rains')
+        conversation = await AIConversation.objects.aget(pk=events[-1][1]['conversation_id'])
+        self.assertEqual((conversation.openai_model_used, conversation.tokens_used), ('backup-model', 4))
+        # The slot is held only while the completion streams
+        self.assertIsNone(caches['default'].get(self.gate._key('slot', 'global', 0)))
+
+    async def post(self, data, within_limits=True):
+        request = APIRequestFactory().post('/api/v1/ai/chat/stream/', data, format='json')
+        force_authenticate(request, self.user)
+        manager = SimpleNamespace(
+            check_usage_limits=lambda user, service_type: within_limits,
+            get_service=lambda name: self.service
+        )
+        with mock.patch('ai.views.ai_service_manager', manager):
+            return await sync_to_async(AIConversationStreamView.as_view())(request)
+
+    async def test_view_relays_events_as_server_sent_events(self):
+        response = await self.post({'message': 'When do I plant maize?', 'language': 'en'})
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        body = b''.join([chunk async for chunk in response]).decode()
+        events = [
+            (lines[0].removeprefix('event: '), json.loads(lines[1].removeprefix('data: ')))
+            for lines in (block.split('\n') for block in body.strip().split('\n\n'))
+        ]
+        self.assertEqual([event for event, _ in events], ['start'] + ['token'] * 4 + ['done'])
+        self.assertEqual(events[0][1], {'language': 'en'})
+        self.assertEqual(''.join(data['delta'] for event, data in events if event == 'token'), 'Plant after the rains')
+
+    async def test_view_rejects_before_streaming(self):
+        self.assertEqual((await self.post({'message': ' '})).status_code, 400)
+        self.assertEqual((await self.post({'message': 'Hello'}, within_limits=False)).status_code, 429)
+
+    async def test_full_gate_reports_busy_without_calling_upstream(self):
+        self.gate._acquire_slot('global', 1, time.monotonic())
+
+        events = await self.events()
+
+        self.assertEqual(len(events), 1)
+        event, data = events[0]
+        self.assertEqual(event, 'error')
+        self.assertTrue(data['busy'])
+        self.assertEqual(data['retry_after'], 0)
+        self.assertEqual([route['samples'] for route in self.router.status()], [0, 0])
+
+
+class WordEmbedding:
+    """Offline stand-in for the fastembed model: hashed bag of lower-cased words"""
+
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, texts, batch_size=256):
+        for text in texts:
+            self.texts.append(text)
+            vector = [0.0] * 32
+            for word in text.lower().split():
+                vector[sum(map(ord, word)) % 32] += 1.0
+            yield vector
+
+
+class SemanticReuseTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.config = dict(get_reuse_config(), LOCAL_DIR=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.config['LOCAL_DIR'], ignore_errors=True)
+        self.model = WordEmbedding()
+        patcher = mock.patch.dict('ai.semantic_reuse._models', {self.config['EMBEDDING_MODEL']: self.model})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user('+233200000304', password='secret', roles=['FARMER'])
+        self.source = self.vetted('When should I plant maize', 'Plant maize at the start of the rains')
+
+    def vetted(self, question, answer):
+        return AIConversation.objects.create(
+            user=self.user, conversation_type='general_farming', farmer_question=question,
+            ai_response=answer, farmer_rating=5
+        )
+
+    def serving_index(self):
+        """A reader with its own local copy, as in a web process"""
+        index = SemanticIndex(dict(self.config, LOCAL_DIR=tempfile.mkdtemp()))
+        self.addCleanup(shutil.rmtree, index.config['LOCAL_DIR'], ignore_errors=True)
+        patcher = mock.patch('ai.semantic_reuse.semantic_index', index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return index
+
+    def test_other_processes_read_the_index_from_storage(self):
+        build_index(self.config)
+        self.assertTrue(default_storage.exists(f"{self.config['STORAGE_PREFIX']}/meta.json"))
+
+        self.serving_index().refresh()
+        source, similarity = find_reusable_answer('when should i  plant MAIZE', 'en', self.config)
+        self.assertEqual(source, self.source)
+        self.assertAlmostEqual(similarity, 1.0, places=5)
+        self.assertIsNone(find_reusable_answer('How do I store cassava', 'en', self.config))
+
+    def test_questions_are_not_embedded_without_an_index(self):
+        self.serving_index().refresh()
+        self.assertIsNone(find_reusable_answer('When should I plant maize', 'en', self.config))
+
+        build_index(dict(self.config, REUSABLE_TYPES=('crop_advisory',)))
+        self.serving_index().refresh()
+        self.assertIsNone(find_reusable_answer('When should I plant maize', 'en', self.config))
+        self.assertEqual(self.model.texts, [])
+
+    def test_questions_are_not_embedded_in_other_languages(self):
+        build_index(self.config)
+        self.model.texts.clear()
+        self.serving_index().refresh()
+        self.assertIsNone(find_reusable_answer('When should I plant maize', 'tw', self.config))
+        self.assertEqual(self.model.texts, [])
+
+    def test_request_path_does_not_load_the_model(self):
+        build_index(self.config)
+        self.serving_index().refresh()
+        with mock.patch.dict('ai.semantic_reuse._models', clear=True):
+            with mock.patch('ai.semantic_reuse._embedding_model') as load:
+                self.assertIsNone(find_reusable_answer('When should I plant maize', 'en', self.config))
+        load.assert_not_called()
+
+    def test_ids_ending_in_nul_bytes_round_trip(self):
+        nul_id = uuid.UUID(bytes=uuid.uuid4().bytes[:14] + b'\0\0')
+        AIConversation.objects.filter(pk=self.source.pk).update(id=nul_id)
+        self.source = AIConversation.objects.get(pk=nul_id)
+        build_index(self.config)
+        build_index(self.config)
+        # Found again in the previous build, so not embedded twice
+        self.assertEqual(self.model.texts, ['When should I plant maize'])
+
+        self.serving_index().refresh()
+        source, _ = find_reusable_answer('When should I plant maize', 'en', self.config)
+        self.assertEqual(source, self.source)
+
+    def test_rebuild_embeds_only_new_answers_and_drops_old_generations(self):
+        build_index(self.config)
+        self.vetted('How do I store cassava', 'Dry it well first')
+        build_index(self.config)
+        self.assertEqual(self.model.texts, ['When should I plant maize', 'How do I store cassava'])
+
+        build_index(self.config)
+        meta = self.serving_index().refresh()
+        _, files = default_storage.listdir(self.config['STORAGE_PREFIX'])
+        # The current and previous generations: five arrays each
+        self.assertEqual(len([name for name in files if name.endswith('.npy')]), 10)
+        self.assertIn(f"vectors-{meta['build']}.npy", files)
+        self.assertEqual(meta['count'], 2)
+
+
+def photo(seed, size=(1600, 1200), **save_options):
+    """JPEG bytes of a synthetic leaf photo with blotches placed by ``seed``"""
+    rng = random.Random(seed)
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image = Image.blend(image, Image.new('RGB', size, (40, 140, 50)), 0.6)
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randrange(60, 240)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=(rng.randrange(90, 160), 70, 30))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=90, **save_options)
+    return output.getvalue()
+
+
+def resend(data, scale=0.5, brightness=1.05, quality=60):
+    """The same photo as it comes back from a messaging app: smaller, recompressed, re-exposed"""
+    image = Image.open(io.BytesIO(data))
+    image = image.resize((int(image.width * scale), int(image.height * scale)))
+    image = ImageEnhance.Brightness(image).enhance(brightness)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OPENAI_TIMEOUT=30)
+class ImagePipelineTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('+233200000306', password='secret', roles=['FARMER'])
+        self.config = get_image_config()
+
+    def detection(self, image_hash, crop_type='maize', user=None):
+        conversation = AIConversation.objects.create(
+            user=user or self.user, conversation_type='disease_detection', farmer_question='Yellow spots',
+            ai_response='Maize streak virus', tokens_used=300, openai_model_used='primary-model'
+        )
+        return DiseaseDetection.objects.create(
+            conversation=conversation, crop_type=crop_type, farmer_description='Yellow spots', image_hash=image_hash
+        )
+
+    def test_uploads_are_oriented_and_downsized(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Taken with the phone held upright
+        prepared = prepare_image(photo(1, exif=exif), self.config)
+
+        self.assertEqual((prepared.width, prepared.height), (768, 1024))
+        self.assertTrue(prepared.data_url.startswith('data:image/jpeg;base64,'))
+        self.assertLess(prepared.prepared_bytes, prepared.original_bytes)
+        self.assertEqual(decode_data_url(prepared.data_url)[:2], b'\xff\xd8')
+
+    def test_undecodable_uploads_are_rejected(self):
+        for data in (b'', b'not an image', photo(1)[:200]):
+            with self.assertRaises(InvalidImageError):
+                prepare_image(data, self.config)
+        with self.assertRaises(InvalidImageError):
+            decode_data_url('data:image/jpeg;base64,***')
+
+    def test_near_duplicate_photos_match_within_the_distance(self):
+        original = prepare_image(photo(1), self.config).image_hash
+        resent = prepare_image(resend(photo(1)), self.config).image_hash
+        other = prepare_image(photo(2), self.config).image_hash
+
+        self.assertLessEqual(hash_distance(original, resent), self.config['MATCH_MAX_DISTANCE'])
+        self.assertGreater(hash_distance(original, other), self.config['MATCH_MAX_DISTANCE'])
+
+    def test_recent_match_is_scoped_to_crop_user_and_window(self):
+        original = prepare_image(photo(1), self.config).image_hash
+        resent = prepare_image(resend(photo(1)), self.config).image_hash
+        other_farmer = User.objects.create_user('+233200000307', password='secret', roles=['FARMER'])
+        self.detection(original, crop_type='cassava')
+        self.detection(original, user=other_farmer)
+        self.assertIsNone(find_recent_match(self.user, 'maize', resent, self.config))
+
+        detection = self.detection(original)
+        self.assertEqual(find_recent_match(self.user, 'maize', resent, self.config), detection)
+        self.assertIsNone(find_recent_match(self.user, 'maize', prepare_image(photo(2)).image_hash, self.config))
+
+        DiseaseDetection.objects.filter(pk=detection.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertIsNone(find_recent_match(self.user, 'maize', resent, self.config))
+        across_users = dict(self.config, REUSE_ACROSS_USERS=True)
+        self.assertEqual(find_recent_match(self.user, 'maize', resent, across_users).conversation.user, other_farmer)
+
+    def test_resent_photo_reuses_the_detection(self):
+        router = CountingRouter()
+        service = DiseaseDetectionService(router)
+        first = prepare_image(photo(1), self.config)
+        resent = prepare_image(resend(photo(1)), self.config)
+
+        result = service.detect_disease(
+            self.user, 'maize', 'Yellow spots', image_url=first.data_url, image_hash=first.image_hash
+        )
+        again = service.detect_disease(
+            self.user, 'maize', 'Yellow streaks', image_url=resent.data_url, image_hash=resent.image_hash
+        )
+
+        self.assertEqual(router.calls, 1)
+        self.assertEqual(again['reused_detection_id'], result['detection_id'])
+        self.assertEqual((again['diagnosis'], again['tokens_used'], again['cached']), (result['diagnosis'], 0, True))
+
+
+class PriceForecastTests(TestCase):
+
+    def setUp(self):
+        self.config = dict(get_forecast_config(), HORIZON_WEEKS=8)
+
+    def test_fit_recovers_a_level_and_a_trend(self):
+        weeks = np.arange(80)
+        prices = np.array([np.full(80, 12.0), 10.0 * 1.01 ** weeks])
+        # Weeks without sales
+        prices[:, 30:34] = np.nan
+        fit = fit_forecasts(prices, self.config)
+
+        np.testing.assert_allclose(fit['predicted'][0], 12.0, rtol=1e-3)
+        self.assertAlmostEqual(fit['predicted'][1, 0], 10.0 * 1.01 ** 80, delta=0.1)
+        # The trend carries on, damped below the straight extrapolation
+        self.assertTrue((np.diff(fit['predicted'][1]) > 0).all())
+        self.assertTrue((fit['predicted'][1, 1:] < 10.0 * 1.01 ** np.arange(81, 88)).all())
+        self.assertTrue((fit['lower'] <= fit['predicted']).all() and (fit['predicted'] <= fit['upper']).all())
+        self.assertFalse(fit['seasonal'].any())
+
+    def test_fit_follows_the_season_with_two_years_of_history(self):
+        season = self.config['SEASON_LENGTH']
+        weeks = np.arange(2 * season + 8)
+
+        def pattern(week):
+            return 10.0 * np.exp(0.2 * np.sin(2 * np.pi * week / season))
+
+        fit = fit_forecasts(pattern(weeks)[None, :], self.config)
+
+        self.assertTrue(fit['seasonal'][0])
+        np.testing.assert_allclose(fit['predicted'][0], pattern(len(weeks) + np.arange(8)), rtol=0.03)
+
+    def test_forecasts_are_refreshed_from_sales_and_fall_back_to_all_regions(self):
+        farmer = User.objects.create_user('+233200000308', password='secret', roles=['FARMER'])
+        buyer = User.objects.create_user('+233200000309', password='secret', roles=['BUYER'])
+        category = Category.objects.create(name='Grains')
+        maize = Product.objects.bulk_create([Product(
+            name='Maize', description='Maize', category=category, seller=farmer,
+            price_per_unit=Decimal('10.00'), slug='maize'
+        )])[0]
+
+        def sale(weeks_ago, region, price, status='delivered'):
+            order = Order.objects.create(
+                buyer=buyer, seller=farmer, total_amount=price, status=status, delivery_address='1 Market Road',
+                delivery_city='Kumasi', delivery_region=region, delivery_phone='+233200000309'
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(weeks=weeks_ago))
+            OrderItem.objects.create(
+                order=order, product=maize, product_name=' MAIZE ', quantity=1, unit_price=price, unit='kg'
+            )
+
+        for weeks_ago in range(1, 11):
+            sale(weeks_ago, 'Ashanti', Decimal('10.00'))
+        for weeks_ago in range(1, 4):
+            sale(weeks_ago, 'Greater Accra', Decimal('10.00'))
+        sale(1, 'Ashanti', Decimal('500.00'), status='cancelled')
+
+        stats = refresh_price_forecasts(self.config)
+        self.assertEqual(stats, {'series': 3, 'forecast_series': 2, 'rows': 16})
+
+        forecast = get_price_forecast('Maize', 'ashanti')
+        self.assertEqual((forecast['region'], forecast['unit'], forecast['observations']), ('ashanti', 'kg', 10))
+        self.assertEqual(forecast['last_observed_price'], 10.0)
+        self.assertEqual([week['predicted_price'] for week in forecast['weekly']], [10.0] * 8)
+        self.assertEqual(len(summarize_forecast(forecast)), 4)
+
+        # Too few weeks of sales in Greater Accra for its own series
+        fallback = get_price_forecast('maize', 'Greater Accra', weeks=4)
+        self.assertEqual((fallback['region'], len(fallback['weekly'])), ('all', 4))
+        self.assertIsNone(get_price_forecast('Cassava'))
+
+
+class SMSAskTests(TestCase):
+
+    def setUp(self):
+        import sms_farmer_onboarding
+
+        self.module = sms_farmer_onboarding
+        self.user = User.objects.create_user('+233200000305', password='secret', roles=['FARMER'])
+        patcher = mock.patch.object(
+            sms_farmer_onboarding.ai_service_manager.conversation_service, 'chat',
+            return_value={'success': True, 'response': 'Plant after the first rains'}
+        )
+        self.chat = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sms_ask_command_uses_chat(self):
+        service = self.module.SMSFarmerOnboardingService()
+        with mock.patch.object(service, '_get_or_create_user', return_value=self.user):
+            reply = service._handle_ask_command(self.user.phone_number, 'When to plant maize?', 'en')
+        self.assertIn('Plant after the first rains', reply)
+        self.chat.assert_called_once_with(user=self.user, message='When to plant maize?', language='en')
+
+    def test_ussd_chat_menu_uses_chat(self):
+        service = self.module.USSDService()
+        with mock.patch.object(service, '_get_or_create_user', return_value=self.user):
+            reply = service._process_ai_chat('When to plant maize?', self.user.phone_number)
+        self.assertEqual(reply, 'END 🤖 AgriBot: Plant after the first rains')
+
+
+class BulkCropScoringTests(SimpleTestCase):
+
+    def setUp(self):
+        from ai_crop_recommendation_engine import GhanaAICropRecommendationEngine
+
+        self.engine = GhanaAICropRecommendationEngine()
+        self.farmers = [
+            {
+                'farmer_id': 'f1', 'farm_size_hectares': 3.5, 'experience_years': 8,
+                'previous_crops': ['Maize', 'Cassava'],
+            },
+            {'farmer_id': 'f2', 'farm_size_hectares': 0.5, 'experience_years': 0},
+            {'farmer_id': 'f3', 'farm_size_hectares': 12.0, 'experience_years': 25, 'previous_crops': ['Cocoa']},
+        ]
+        self.regions = ['Ashanti', 'Northern', 'Western']
+        self.conditions = [None, {'drought_risk': True, 'extreme_heat': True}, {'flooding_risk': True}]
+
+    def month(self, month):
+        """The per-farmer path always scores the current month"""
+        return mock.patch('ai_crop_recommendation_engine.datetime', **{'now.return_value.month': month})
+
+    def test_bulk_scores_match_the_per_farmer_path(self):
+        with self.month(4):
+            expected = [
+                self.engine.generate_ai_crop_recommendations(farmer, region, conditions)
+                for farmer, region, conditions in zip(self.farmers, self.regions, self.conditions)
+            ]
+        bulk = self.engine.calculate_bulk_scores(self.farmers, self.regions, self.conditions, current_month=4)
+
+        for row, recommendations in enumerate(expected):
+            for recommendation in recommendations:
+                column = bulk['crops'].index(recommendation['crop_name'])
+                self.assertAlmostEqual(bulk['overall'][row, column], recommendation['overall_score'], delta=1e-3)
+                for key, score in recommendation['scores'].items():
+                    self.assertAlmostEqual(bulk[key][row, column], score, delta=1e-3)
+
+    def test_bulk_recommendations_rank_the_top_crops(self):
+        with self.month(4):
+            expected = self.engine.generate_ai_crop_recommendations(self.farmers[0], 'Ashanti')
+        [result] = self.engine.generate_bulk_crop_recommendations(
+            self.farmers[:1], 'Ashanti', top_n=3, current_month=4
+        )
+
+        self.assertEqual(result['farmer_id'], 'f1')
+        self.assertEqual(
+            [(rec['crop_name'], rec['overall_score']) for rec in result['recommendations']],
+            [(rec['crop_name'], rec['overall_score']) for rec in expected[:3]]
+        )
+        self.assertEqual(result['recommendations'][0]['projections'], {
+            key: expected[0]['projections'][key] for key in ('projected_yield_kg', 'projected_revenue_ghs')
+        })
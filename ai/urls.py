@@ -20,9 +20,11 @@ def ai_api_root(request, format=None):
         'description': 'AI-powered agricultural intelligence and advisory system',
         'endpoints': {
             'chat': request.build_absolute_uri('chat/'),
+            'chat_stream': request.build_absolute_uri('chat/stream/'),
             'crop_advisory': request.build_absolute_uri('crop-advisory/'),
             'disease_detection': request.build_absolute_uri('disease-detection/'),
             'market_intelligence': request.build_absolute_uri('market-intelligence/'),
+            'market_forecast': request.build_absolute_uri('market-forecast/'),
             'feedback': request.build_absolute_uri('feedback/'),
             'analytics': request.build_absolute_uri('analytics/'),
             'health': request.build_absolute_uri('health/'),
@@ -37,6 +39,9 @@ api_urlpatterns = [
     
     # Conversational AI
     path('chat/', views.AIConversationView.as_view(), name='chat'),
+    path('chat/stream/', views.AIConversationStreamView.as_view(), name='chat-stream'),
+    path('jobs/<uuid:job_id>/', views.AIJobView.as_view(), name='job-detail'),
+    path('jobs/<uuid:job_id>/stream/', views.AIJobStreamView.as_view(), name='job-stream'),
     
     # Crop Advisory
     path('crop-advisory/', views.CropAdvisoryView.as_view(), name='crop-advisory'),
@@ -46,6 +51,7 @@ api_urlpatterns = [
       # Market Intelligence
     path('market-intelligence/', views.MarketIntelligenceView.as_view(), name='market-intelligence'),
     path('market-insights/', views.MarketIntelligenceView.as_view(), name='market-insights'),  # Alternative endpoint
+    path('market-forecast/', views.MarketPriceForecastView.as_view(), name='market-forecast'),
     
     # Feedback
     path('feedback/', views.AIFeedbackView.as_view(), name='feedback'),
@@ -74,10 +80,14 @@ urlpatterns = [
     # Direct API endpoints for frontend compatibility (original structure)
     path('', ai_api_root, name='api-root'),
     path('chat/', views.AIConversationView.as_view(), name='chat'),
+    path('chat/stream/', views.AIConversationStreamView.as_view(), name='chat-stream'),
+    path('jobs/<uuid:job_id>/', views.AIJobView.as_view(), name='job-detail'),
+    path('jobs/<uuid:job_id>/stream/', views.AIJobStreamView.as_view(), name='job-stream'),
     path('crop-advisory/', views.CropAdvisoryView.as_view(), name='crop-advisory'),
     path('disease-detection/', views.DiseaseDetectionView.as_view(), name='disease-detection'),
     path('market-intelligence/', views.MarketIntelligenceView.as_view(), name='market-intelligence'),
     path('market-insights/', views.MarketIntelligenceView.as_view(), name='market-insights'),  # Alternative endpoint
+    path('market-forecast/', views.MarketPriceForecastView.as_view(), name='market-forecast'),
     path('feedback/', views.AIFeedbackView.as_view(), name='feedback'),
     path('analytics/', views.AIAnalyticsView.as_view(), name='analytics'),
     path('health/', views.AIHealthCheckView.as_view(), name='health-check'),
@@ -0,0 +1,249 @@
+"""
+AI Usage Accounting for AgriConnect
+Lock-free usage counters with batched persistence to AIUsageAnalytics
+
+Every AI call used to lock the user's AIUsageAnalytics row, and every limit
+check queried the same table. Now the request path does two things only:
+
+* increments day and month query counters in the shared Django cache, which
+  is what limit checks read (``cache.incr`` is atomic on Redis; a missing
+  counter is seeded once from the table);
+* adds the call's deltas to an in-process buffer.
+
+A background thread drains the buffer every few seconds into a single
+``INSERT ... ON CONFLICT (user_id, date) DO UPDATE SET col = col + excluded.col``
+statement, so no request ever waits on a row lock. Rows are written in key
+order so concurrent flushes lock them in the same order. Buffered deltas
+are also flushed at interpreter exit; a hard crash loses at most one
+interval.
+
+The cache counters only enforce limits when every worker shares the cache
+(Redis in deployment). With a per-process cache (local memory, dummy or
+file based) each worker would count on its own, so the limit is instead
+checked against the table and every call is written through immediately.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections, models
+from django.utils import timezone
+
+from .models import AIUsageAnalytics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_USAGE_ACCOUNTING_CONFIG = {
+    'SHARED_CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'ai:usage',
+    'FLUSH_INTERVAL_SECONDS': 10,
+}
+
+# Cache backends whose counters are not shared between worker processes
+PROCESS_LOCAL_CACHE_BACKENDS = frozenset([
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+])
+
+# Per-service query counter on AIUsageAnalytics
+SERVICE_COUNTERS = {
+    'crop_advisory': 'crop_advisory_queries',
+    'disease_detection': 'disease_detection_queries',
+    'market_intelligence': 'market_intelligence_queries',
+}
+
+# Columns the upsert adds to; everything else keeps its insert default
+COUNTER_FIELDS = [
+    'daily_queries', 'total_tokens_used', 'crop_advisory_queries', 'disease_detection_queries',
+    'market_intelligence_queries', 'general_queries', 'cache_hits', 'cache_misses', 'tokens_saved',
+]
+
+
+def get_usage_config() -> Dict:
+    config = dict(DEFAULT_AI_USAGE_ACCOUNTING_CONFIG)
+    config.update(getattr(settings, 'AI_USAGE_ACCOUNTING_CONFIG', {}))
+    return config
+
+
+def usage_deltas(service_type: str, tokens_used: int, cache_hit: Optional[bool] = None,
+                 tokens_saved: int = 0) -> Counter:
+    """AIUsageAnalytics counter increments for one AI call"""
+    deltas = Counter(daily_queries=1, total_tokens_used=tokens_used)
+    deltas[SERVICE_COUNTERS.get(service_type, 'general_queries')] += 1
+    # Services without a response cache pass None
+    if cache_hit:
+        deltas['cache_hits'] += 1
+        deltas['tokens_saved'] += tokens_saved
+    elif cache_hit is not None:
+        deltas['cache_misses'] += 1
+    return deltas
+
+
+def upsert_usage(rows: Dict[Tuple[int, date], Counter]) -> int:
+    """Add buffered deltas to AIUsageAnalytics in one INSERT ... ON CONFLICT"""
+    if not rows:
+        return 0
+    meta = AIUsageAnalytics._meta
+    fields = meta.local_concrete_fields
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+
+    params: List = []
+    # A fixed row order keeps concurrent upserts from deadlocking each other
+    for (user_id, day), deltas in sorted(rows.items()):
+        instance = AIUsageAnalytics(user_id=user_id, date=day, **{
+            name: deltas.get(name, 0) for name in COUNTER_FIELDS
+        })
+        # Raw attribute values: pre_save would stamp auto_now_add dates with today
+        params.extend(field.get_db_prep_save(getattr(instance, field.attname), connection) for field in fields)
+
+    placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+    updates = ', '.join(
+        f'{quote(name)} = {table}.{quote(name)} + EXCLUDED.{quote(name)}' for name in COUNTER_FIELDS
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES {', '.join([placeholders] * len(rows))} "
+        f"ON CONFLICT ({quote(meta.get_field('user').column)}, {quote(meta.get_field('date').column)}) "
+        f"DO UPDATE SET {updates}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return len(rows)
+
+
+class UsageAccountant:
+    """Shared limit counters plus a buffered writer for AIUsageAnalytics"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or get_usage_config()
+        self._pending: Dict[Tuple[int, date], Counter] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def shared(self):
+        return caches[self.config['SHARED_CACHE_ALIAS']]
+
+    @property
+    def counters_shared(self) -> bool:
+        """Whether the cache counters are seen by every worker process"""
+        backend = settings.CACHES.get(self.config['SHARED_CACHE_ALIAS'], {}).get('BACKEND', '')
+        return backend not in PROCESS_LOCAL_CACHE_BACKENDS
+
+    # Limit counters
+
+    def _day_key(self, user_id, day: date) -> str:
+        return f"{self.config['KEY_PREFIX']}:day:{user_id}:{day.isoformat()}"
+
+    def _month_key(self, user_id, day: date) -> str:
+        return f"{self.config['KEY_PREFIX']}:month:{user_id}:{day:%Y-%m}"
+
+    def _stored_queries(self, user_id, since: date) -> int:
+        return AIUsageAnalytics.objects.filter(user_id=user_id, date__gte=since).aggregate(
+            total=models.Sum('daily_queries')
+        )['total'] or 0
+
+    def _counters(self, user_id, day: date):
+        """(key, seed query, lifetime) for the day and month counters"""
+        return [
+            (self._day_key(user_id, day), day, 2 * 24 * 60 * 60),
+            (self._month_key(user_id, day), day.replace(day=1), 32 * 24 * 60 * 60),
+        ]
+
+    def _seed(self, key: str, user_id, since: date, lifetime: int):
+        # add() keeps whichever worker seeded first
+        self.shared.add(key, self._stored_queries(user_id, since), timeout=lifetime)
+
+    def query_counts(self, user_id) -> Tuple[int, int]:
+        """(today, this month) query counts for limit checks"""
+        day = timezone.now().date()
+        if not self.counters_shared:
+            return self._stored_queries(user_id, day), self._stored_queries(user_id, day.replace(day=1))
+        counters = self._counters(user_id, day)
+        values = self.shared.get_many([key for key, _, _ in counters])
+        for key, since, lifetime in counters:
+            if key not in values:
+                self._seed(key, user_id, since, lifetime)
+                values[key] = self.shared.get(key, 0)
+        return tuple(values[key] for key, _, _ in counters)
+
+    def _count_query(self, user_id, day: date):
+        for key, since, lifetime in self._counters(user_id, day):
+            try:
+                self.shared.incr(key)
+            except ValueError:
+                self._seed(key, user_id, since, lifetime)
+                self.shared.incr(key)
+
+    # Buffered persistence
+
+    def record(self, user, service_type: str, tokens_used: int,
+               cache_hit: Optional[bool] = None, tokens_saved: int = 0):
+        """Account one AI call; takes no database locks when the cache is shared"""
+        day = timezone.now().date()
+        shared = self.counters_shared
+        if shared:
+            self._count_query(user.pk, day)
+        deltas = usage_deltas(service_type, tokens_used, cache_hit, tokens_saved)
+        with self._lock:
+            self._pending.setdefault((user.pk, day), Counter()).update(deltas)
+        if not shared:
+            # The table is the only count other workers see; write through
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"AI usage write failed, will retry: {str(e)}")
+            else:
+                return
+        self._ensure_flusher()
+
+    def flush(self) -> int:
+        """Write buffered deltas; they are put back if the write fails"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        try:
+            return upsert_usage(pending)
+        except Exception:
+            with self._lock:
+                for key, deltas in pending.items():
+                    self._pending.setdefault(key, Counter()).update(deltas)
+            raise
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._run, name='ai-usage-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.config['FLUSH_INTERVAL_SECONDS']):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"AI usage flush failed, will retry: {str(e)}")
+            finally:
+                # This thread owns its own connection; don't let it go stale
+                connections.close_all()
+
+    def shutdown(self):
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"AI usage flush at exit failed: {str(e)}")
+
+
+usage_accountant = UsageAccountant()
+atexit.register(usage_accountant.shutdown)
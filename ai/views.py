@@ -4,10 +4,11 @@ API endpoints for AI-powered agricultural intelligence
 """
 
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.views.generic import ListView
 from django.core.paginator import Paginator
@@ -20,13 +21,18 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
 from django.conf import settings
+import asyncio
 import json
 import logging
+import time
 
 from .models import (
     AIConversation, CropAdvisory, DiseaseDetection, 
     MarketIntelligence, AIUsageAnalytics, AIFeedback
 )
+from .jobs import FINISHED_STATUSES, job_payload, submit_job
+from .image_pipeline import InvalidImageError, decode_data_url, prepare_image
+from .price_forecast import get_price_forecast
 from .services import ai_service_manager
 from .serializers import (
     AIConversationSerializer, CropAdvisorySerializer,
@@ -37,6 +43,48 @@ from .serializers import (
 logger = logging.getLogger(__name__)
 
 
+def _sse_event(event: str, data) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _service_error_response(result) -> Response:
+    """Failed service result; requests shed by the concurrency limiter get a 503, unknown conversations a 404"""
+    if result.get('busy'):
+        response = Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(result['retry_after'])
+        return response
+    if result.get('not_found'):
+        return Response(result, status=status.HTTP_404_NOT_FOUND)
+    return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _wants_job(request) -> bool:
+    """Clients opt into background job mode with mode=async (body or query string)"""
+    return (request.data.get('mode') or request.query_params.get('mode')) == 'async'
+
+
+def _submit_job_response(request, conversation_type: str, params, farmer_question: str) -> Response:
+    conversation = submit_job(request.user, conversation_type, params, farmer_question)
+    payload = job_payload(conversation)
+    if conversation.job_status == 'failed':
+        # Never queued; report it with the job id rather than a bare 500
+        payload.update({'success': False, 'error': conversation.job_error})
+        return Response(payload, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    # ai.urls is mounted under several namespaces; link within the one in use
+    current_app = request.resolver_match.namespace if request.resolver_match else None
+    payload.update({
+        'success': True,
+        'poll_url': request.build_absolute_uri(
+            reverse('ai:job-detail', args=[conversation.id], current_app=current_app)
+        ),
+        'stream_url': request.build_absolute_uri(
+            reverse('ai:job-stream', args=[conversation.id], current_app=current_app)
+        ),
+    })
+    return Response(payload, status=status.HTTP_202_ACCEPTED)
+
+
 class AIConversationView(APIView):
     """Handle conversational AI interactions"""
     permission_classes = [IsAuthenticated]
@@ -76,7 +124,7 @@ class AIConversationView(APIView):
             if result['success']:
                 return Response(result, status=status.HTTP_200_OK)
             else:
-                return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return _service_error_response(result)
                 
         except Exception as e:
             logger.error(f"Conversation API error: {str(e)}")
@@ -108,6 +156,96 @@ class AIConversationView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AIConversationStreamView(APIView):
+    """
+    Conversational AI over server-sent events.
+
+    Tokens are relayed as the model produces them, so the first bytes reach
+    the farmer long before the full answer is ready. The event stream is an
+    async iterator and is only delivered incrementally when served by the
+    ASGI application.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """Stream a reply from the AI assistant"""
+        if not ai_service_manager.check_usage_limits(request.user, 'conversational_ai'):
+            return Response({
+                'success': False,
+                'error': 'Daily usage limit exceeded'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        message = request.data.get('message', '').strip()
+        language = request.data.get('language', 'en')
+        conversation_id = request.data.get('conversation_id')
+        
+        if not message:
+            return Response({
+                'success': False,
+                'error': 'Message is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        conversation_service = ai_service_manager.get_service('conversation')
+        user = request.user
+        
+        async def event_stream():
+            # Sent before the provider is contacted so clients see a byte immediately
+            yield _sse_event('start', {'language': language})
+            async for event, data in conversation_service.stream_chat(user, message, language, conversation_id):
+                yield _sse_event(event, data)
+        
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AIJobView(APIView):
+    """Poll the state of a background AI job"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        conversation = get_object_or_404(AIConversation, pk=job_id, user=request.user)
+        return Response(job_payload(conversation), status=status.HTTP_200_OK)
+
+
+class AIJobStreamView(APIView):
+    """Follow a background AI job over server-sent events until it finishes"""
+    permission_classes = [IsAuthenticated]
+    poll_interval = 1.0
+    timeout = 120
+    
+    def get(self, request, job_id):
+        get_object_or_404(AIConversation, pk=job_id, user=request.user)
+        jobs = AIConversation.objects.filter(pk=job_id)
+        poll_interval, timeout = self.poll_interval, self.timeout
+        
+        async def event_stream():
+            deadline = time.monotonic() + timeout
+            last_status = None
+            while True:
+                conversation = await jobs.afirst()
+                if conversation is None:
+                    yield _sse_event('error', {'error': 'Job not found'})
+                    return
+                if conversation.job_status != last_status:
+                    last_status = conversation.job_status
+                    yield _sse_event('status', job_payload(conversation))
+                if last_status in FINISHED_STATUSES:
+                    return
+                if time.monotonic() >= deadline:
+                    # Clients reconnect or fall back to polling
+                    yield _sse_event('timeout', {'job_id': str(job_id)})
+                    return
+                await asyncio.sleep(poll_interval)
+        
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class CropAdvisoryView(APIView):
     """Handle crop advisory requests"""
     permission_classes = [IsAuthenticated]
@@ -135,6 +273,17 @@ class CropAdvisoryView(APIView):
                     'error': 'crop_type, farming_stage, location, and season are required'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Job mode: queue and return immediately
+            if _wants_job(request):
+                return _submit_job_response(request, 'crop_advisory', {
+                    'crop_type': crop_type,
+                    'farming_stage': farming_stage,
+                    'location': location,
+                    'season': season,
+                    'specific_question': specific_question,
+                    'language': request.data.get('language', 'en'),
+                }, specific_question or f"Crop advice for {crop_type}")
+            
             # Get crop advisory service
             crop_service = ai_service_manager.get_service('crop')
             
@@ -145,13 +294,14 @@ class CropAdvisoryView(APIView):
                 farming_stage=farming_stage,
                 location=location,
                 season=season,
-                specific_question=specific_question
+                specific_question=specific_question,
+                language=request.data.get('language', 'en')
             )
             
             if result['success']:
                 return Response(result, status=status.HTTP_200_OK)
             else:
-                return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return _service_error_response(result)
                 
         except Exception as e:
             logger.error(f"Crop advisory API error: {str(e)}")
@@ -207,48 +357,47 @@ class DiseaseDetectionView(APIView):
                 location = request.data.get('location', '').strip()
                 
                 # Process the uploaded image file
-                image_file = request.FILES['image']
-                
-                # Convert image to base64 for AI processing
-                import base64
-                import io
-                from PIL import Image
+                image_data = request.FILES['image'].read()
                 
-                try:
-                    # Read and convert image
-                    image_data = image_file.read()
+                # If no symptoms provided, create a descriptive default
+                if not symptoms:
+                    symptoms = f"Plant disease analysis from uploaded image for {crop_type} crop"
                     
-                    # Validate image data
-                    if len(image_data) == 0:
-                        logger.error("Uploaded image file is empty")
+            else:
+                # Handle JSON data (original functionality)
+                crop_type = request.data.get('crop_type', '').strip()
+                symptoms = request.data.get('symptoms', '').strip()
+                image_url = request.data.get('image_url', '').strip()
+                location = request.data.get('location', '').strip()
+                image_data = None
+                
+                # Inline base64 images go through the same pipeline as uploads
+                if image_url.startswith('data:'):
+                    try:
+                        image_data = decode_data_url(image_url)
+                    except InvalidImageError as img_error:
                         return Response({
                             'success': False,
-                            'error': 'Uploaded image file is empty'
+                            'error': str(img_error)
                         }, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    # Convert to base64
-                    image_base64 = base64.b64encode(image_data).decode('utf-8')
-                    image_url = f"data:image/jpeg;base64,{image_base64}"
-                    
-                    # If no symptoms provided, create a descriptive default
-                    if not symptoms:
-                        symptoms = f"Plant disease analysis from uploaded image for {crop_type} crop"
-                    
-                    logger.info(f"Image file processed - size: {len(image_data)} bytes, crop_type: '{crop_type}'")
-                    
-                except Exception as img_error:
+            
+            # Orient, downsize and recompress before inference; hash for reuse
+            image_hash = ''
+            if image_data is not None:
+                try:
+                    prepared = prepare_image(image_data)
+                except InvalidImageError as img_error:
                     logger.error(f"Image processing error: {img_error}")
                     return Response({
                         'success': False,
-                        'error': 'Failed to process uploaded image'
+                        'error': str(img_error)
                     }, status=status.HTTP_400_BAD_REQUEST)
-                    
-            else:
-                # Handle JSON data (original functionality)
-                crop_type = request.data.get('crop_type', '').strip()
-                symptoms = request.data.get('symptoms', '').strip()
-                image_url = request.data.get('image_url', '').strip()
-                location = request.data.get('location', '').strip()
+                image_url = prepared.data_url
+                image_hash = prepared.image_hash
+                logger.info(
+                    f"Image prepared - {prepared.original_bytes} -> {prepared.prepared_bytes} bytes, "
+                    f"{prepared.width}x{prepared.height}, hash {image_hash}, crop_type: '{crop_type}'"
+                )
             
             logger.info(f"Parsed data - crop_type: '{crop_type}', symptoms: '{symptoms}', image_url: {'[base64_image]' if image_url.startswith('data:') else image_url}, location: '{location}'")
               # Crop type is required and must be valid
@@ -277,6 +426,17 @@ class DiseaseDetectionView(APIView):
                     'error': 'Either symptoms description or image_url must be provided for disease detection'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Job mode: queue and return immediately
+            if _wants_job(request):
+                return _submit_job_response(request, 'disease_detection', {
+                    'crop_type': crop_type,
+                    'symptoms': symptoms,
+                    'image_url': image_url,
+                    'location': location,
+                    'language': request.data.get('language', 'en'),
+                    'image_hash': image_hash,
+                }, f"Disease symptoms: {symptoms}")
+            
             # Get disease detection service
             disease_service = ai_service_manager.get_service('disease')
             
@@ -286,13 +446,15 @@ class DiseaseDetectionView(APIView):
                 crop_type=crop_type,
                 symptoms=symptoms,
                 image_url=image_url,
-                location=location
+                location=location,
+                language=request.data.get('language', 'en'),
+                image_hash=image_hash
             )
             
             if result['success']:
                 return Response(result, status=status.HTTP_200_OK)
             else:
-                return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return _service_error_response(result)
                 
         except Exception as e:
             logger.error(f"Disease detection API error: {str(e)}")
@@ -349,6 +511,15 @@ class MarketIntelligenceView(APIView):
                     'error': 'crop_type and location are required'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Job mode: queue and return immediately
+            if _wants_job(request):
+                return _submit_job_response(request, 'market_inquiry', {
+                    'crop_type': crop_type,
+                    'location': location,
+                    'market_type': market_type,
+                    'language': request.data.get('language', 'en'),
+                }, f"Market intelligence for {crop_type} in {location}")
+            
             # Get market intelligence service
             market_service = ai_service_manager.get_service('market')
             
@@ -357,13 +528,14 @@ class MarketIntelligenceView(APIView):
                 user=request.user,
                 crop_type=crop_type,
                 location=location,
-                market_type=market_type
+                market_type=market_type,
+                language=request.data.get('language', 'en')
             )
             
             if result['success']:
                                 return Response(result, status=status.HTTP_200_OK)
             else:
-                return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return _service_error_response(result)
                 
         except Exception as e:
             logger.error(f"Market intelligence API error: {str(e)}")
@@ -395,6 +567,43 @@ class MarketIntelligenceView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class MarketPriceForecastView(APIView):
+    """Stored weekly price forecast for a crop, fitted nightly from platform sales"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        crop = request.query_params.get('crop', '').strip()
+        if not crop:
+            return Response({
+                'success': False,
+                'error': 'crop is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            weeks = int(request.query_params['weeks']) if 'weeks' in request.query_params else None
+        except ValueError:
+            weeks = 0
+        if weeks is not None and weeks < 1:
+            return Response({
+                'success': False,
+                'error': 'weeks must be a positive integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        forecast = get_price_forecast(
+            crop,
+            region=request.query_params.get('region', ''),
+            unit=request.query_params.get('unit') or None,
+            weeks=weeks
+        )
+        if forecast is None:
+            return Response({
+                'success': False,
+                'error': f'No price forecast available for {crop}'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({'success': True, 'forecast': forecast}, status=status.HTTP_200_OK)
+
+
 class AIFeedbackView(APIView):
     """Handle AI feedback collection"""
     permission_classes = [IsAuthenticated]
@@ -484,20 +693,22 @@ class AIHealthCheckView(APIView):
     def get(self, request):
         """Check AI service health"""
         try:
-            # Test OpenAI connection
-            test_response = ai_service_manager.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
+            # Test provider connectivity through the router
+            completion = ai_service_manager.router.complete(
+                [
                     {"role": "system", "content": "You are a helpful assistant."},
                     {"role": "user", "content": "Hello, this is a health check."}
                 ],
-                max_tokens=50
+                50,
+                settings.OPENAI_TEMPERATURE
             )
             
             return Response({
                 'success': True,
                 'status': 'healthy',
-                'model': settings.OPENAI_MODEL,
+                'model': completion.model,
+                'provider': completion.provider,
+                'routes': ai_service_manager.router.status(),
                 'timestamp': timezone.now().isoformat()
             }, status=status.HTTP_200_OK)
             
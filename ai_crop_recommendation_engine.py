@@ -401,6 +401,18 @@ class GhanaAICropRecommendationEngine:
     def calculate_market_profitability_score(self, crop_name, farmer_profile):
         """Calculate expected profitability for the farmer"""
         
+        # Farm size consideration
+        farm_size = farmer_profile.get('farm_size_hectares', 2.0)
+        size_efficiency = min(1.2, 1.0 + (farm_size - 1.0) * 0.05)  # Economies of scale
+        
+        # Calculate final profitability score
+        profitability_score = self.calculate_market_base_value(crop_name) * size_efficiency / 50000  # Normalize to 0-1 scale
+        
+        return min(profitability_score, 1.0)
+    
+    def calculate_market_base_value(self, crop_name):
+        """Market-adjusted revenue per hectare, before farm size effects"""
+        
         crop = self.crop_database[crop_name]
         market = crop['market_data']
         growth = crop['growth_characteristics']
@@ -437,25 +449,32 @@ class GhanaAICropRecommendationEngine:
             'limited': 0.9
         }.get(market['local_market'], 1.0)
         
-        # Farm size consideration
-        farm_size = farmer_profile.get('farm_size_hectares', 2.0)
-        size_efficiency = min(1.2, 1.0 + (farm_size - 1.0) * 0.05)  # Economies of scale
-        
-        # Calculate final profitability score
-        profitability_score = (
+        return (
             base_revenue * 
             stability_multiplier * 
             volatility_penalty * 
             export_bonus * 
-            local_bonus * 
-            size_efficiency
-        ) / 50000  # Normalize to 0-1 scale
-        
-        return min(profitability_score, 1.0)
+            local_bonus
+        )
     
     def calculate_risk_assessment_score(self, crop_name, region_name, farmer_profile):
         """Calculate risk score for crop-region combination"""
         
+        # Farmer experience risk
+        farmer_experience = farmer_profile.get('experience_years', 5)
+        experience_risk = max(0.0, (5 - farmer_experience) * 0.05)
+        
+        # Total risk calculation
+        total_risk = self.calculate_crop_risk(crop_name) + experience_risk
+        
+        # Convert to score (lower risk = higher score)
+        risk_score = max(0.0, 1.0 - total_risk)
+        
+        return risk_score
+    
+    def calculate_crop_risk(self, crop_name):
+        """Climate, market and investment risk of a crop, independent of the farmer"""
+        
         crop = self.crop_database[crop_name]
         resilience = crop['climate_resilience']
         
@@ -481,17 +500,7 @@ class GhanaAICropRecommendationEngine:
         maturity_months = crop['growth_characteristics']['maturity_months']
         investment_risk = min(0.3, maturity_months / 100)  # Longer maturity = higher risk
         
-        # Farmer experience risk
-        farmer_experience = farmer_profile.get('experience_years', 5)
-        experience_risk = max(0.0, (5 - farmer_experience) * 0.05)
-        
-        # Total risk calculation
-        total_risk = climate_risk + market_risk + investment_risk + experience_risk
-        
-        # Convert to score (lower risk = higher score)
-        risk_score = max(0.0, 1.0 - total_risk)
-        
-        return risk_score
+        return climate_risk + market_risk + investment_risk
     
     def calculate_farmer_experience_score(self, crop_name, farmer_profile):
         """Calculate score based on farmer's experience with similar crops"""
@@ -665,6 +674,249 @@ class GhanaAICropRecommendationEngine:
             recommendations.append("Consider mechanized farming for efficiency")
         
         return recommendations[:3]  # Return top 3 recommendations
+    
+    # ------------------------------------------------------------------
+    # Vectorized scoring: a batch of farmers x every crop at once
+    # ------------------------------------------------------------------
+    
+    WEATHER_FLAGS = ('extreme_heat', 'drought_risk', 'flooding_risk')
+    
+    @staticmethod
+    def range_scores(values, low, high):
+        """Array form of calculate_range_score for (low, high) optimal ranges"""
+        values, low, high = np.broadcast_arrays(
+            np.asarray(values, dtype=float), np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            below = np.maximum(0.0, 1.0 - (low - values) / low)
+            above = np.maximum(0.0, 1.0 - (values - high) / high)
+        return np.where(values < low, below, np.where(values > high, above, 1.0))
+    
+    def compile_score_tables(self):
+        """Compile the crop and region dictionaries into arrays (cached)"""
+        if getattr(self, '_score_tables', None) is not None:
+            return self._score_tables
+        
+        crops = list(self.crop_database)
+        regions = list(self.ghana_regions)
+        categories = sorted({crop['category'] for crop in self.crop_database.values()})
+        
+        # Climate suitability per region x crop, before weather and the 1.0 cap
+        region_values = np.array([
+            [region['rainfall_mm'], region['temperature_avg'],
+             (region['ph_range'][0] + region['ph_range'][1]) / 2, region['elevation']]
+            for region in self.ghana_regions.values()
+        ])
+        optimal = np.array([
+            [crop['optimal_conditions'][key] for key in ('rainfall_mm', 'temperature_c', 'ph_range', 'elevation_m')]
+            for crop in self.crop_database.values()
+        ])  # crops x 4 x (low, high)
+        factor_scores = self.range_scores(
+            region_values[:, None, :], optimal[None, :, :, 0], optimal[None, :, :, 1]
+        )  # regions x crops x 4
+        suitable = np.array([
+            [region_name in crop['suitable_regions'] for crop in self.crop_database.values()]
+            for region_name in regions
+        ])
+        climate_base = (
+            factor_scores[..., 0] * 0.35 +
+            factor_scores[..., 1] * 0.30 +
+            factor_scores[..., 2] * 0.20 +
+            factor_scores[..., 3] * 0.15
+        ) * np.where(suitable, 1.2, 0.8)
+        
+        self._score_tables = {
+            'crops': crops,
+            'region_index': {name: position for position, name in enumerate(regions)},
+            'climate_base': climate_base,
+            # Multiplier each weather flag applies to each crop
+            'weather_multipliers': np.array([
+                [self.assess_current_weather_impact(crop_name, {flag: True}) for flag in self.WEATHER_FLAGS]
+                for crop_name in crops
+            ]),
+            'market_base': np.array([self.calculate_market_base_value(crop_name) for crop_name in crops]),
+            'crop_risk': np.array([self.calculate_crop_risk(crop_name) for crop_name in crops]),
+            'category_onehot': np.array([
+                [crop['category'] == category for category in categories]
+                for crop in self.crop_database.values()
+            ], dtype=float),
+            'timing': np.array([
+                [self.calculate_seasonal_timing_score(crop_name, month) for month in range(1, 13)]
+                for crop_name in crops
+            ]),
+            'yield_per_hectare': np.array([
+                crop['growth_characteristics']['yield_kg_per_hectare'] for crop in self.crop_database.values()
+            ], dtype=float),
+            'price_per_kg': np.array([
+                crop['market_data']['price_ghs_per_kg'] for crop in self.crop_database.values()
+            ]),
+        }
+        return self._score_tables
+    
+    def calculate_bulk_scores(self, farmer_profiles, region_names, current_conditions=None, current_month=None):
+        """
+        All five scores plus the weighted overall score for many farmers.
+        
+        ``region_names`` and ``current_conditions`` are either one value for
+        every farmer or one entry per farmer. Returns a dict of
+        (farmers x crops) arrays keyed like the per-crop 'scores' dict, plus
+        'overall' and 'crops' (column order).
+        """
+        tables = self.compile_score_tables()
+        crop_index = {name: position for position, name in enumerate(tables['crops'])}
+        farmer_count = len(farmer_profiles)
+        current_month = current_month or datetime.now().month
+        
+        if isinstance(region_names, str):
+            region_names = [region_names] * farmer_count
+        regions = np.array([tables['region_index'][name] for name in region_names], dtype=np.intp)
+        
+        farm_size = np.array([profile.get('farm_size_hectares', 2.0) for profile in farmer_profiles], dtype=float)
+        # The risk and experience scores use different defaults, as in the scalar path
+        risk_experience = np.array([profile.get('experience_years', 5) for profile in farmer_profiles], dtype=float)
+        experience_years = np.array([profile.get('experience_years', 0) for profile in farmer_profiles], dtype=float)
+        grown = np.zeros((farmer_count, len(tables['crops'])))
+        for row, profile in enumerate(farmer_profiles):
+            for crop_name in profile.get('previous_crops', []):
+                if crop_name in crop_index:
+                    grown[row, crop_index[crop_name]] = 1.0
+        
+        # Climate suitability with per-farmer weather
+        climate = tables['climate_base'][regions]
+        if current_conditions:
+            if isinstance(current_conditions, dict):
+                current_conditions = [current_conditions] * farmer_count
+            flags = np.array([
+                [bool(conditions and conditions.get(flag, False)) for flag in self.WEATHER_FLAGS]
+                for conditions in current_conditions
+            ])
+            # Product over the flags that are set: farmers x crops
+            climate = climate * np.prod(
+                np.where(flags[:, None, :], tables['weather_multipliers'][None, :, :], 1.0), axis=2
+            )
+        climate = np.minimum(climate, 1.0)
+        
+        size_efficiency = np.minimum(1.2, 1.0 + (farm_size - 1.0) * 0.05)
+        profitability = np.minimum(tables['market_base'][None, :] * size_efficiency[:, None] / 50000, 1.0)
+        
+        experience_risk = np.maximum(0.0, (5 - risk_experience) * 0.05)
+        risk = np.maximum(0.0, 1.0 - (tables['crop_risk'][None, :] + experience_risk[:, None]))
+        
+        familiar = (grown @ tables['category_onehot'] @ tables['category_onehot'].T) > 0
+        experience = np.minimum(1.0, experience_years / 10)[:, None] * np.ones_like(grown)
+        experience = np.where(familiar, experience * 1.3, experience)
+        experience = np.where(grown > 0, experience * 1.5, experience)
+        experience = np.minimum(experience, 1.0)
+        
+        timing = np.broadcast_to(tables['timing'][:, current_month - 1], grown.shape)
+        
+        overall = (
+            climate * self.ai_weights['climate_suitability'] +
+            profitability * self.ai_weights['market_profitability'] +
+            risk * self.ai_weights['risk_assessment'] +
+            experience * self.ai_weights['farmer_experience'] +
+            timing * self.ai_weights['seasonal_timing']
+        )
+        return {
+            'crops': tables['crops'],
+            'overall': overall,
+            'climate_suitability': climate,
+            'market_profitability': profitability,
+            'risk_assessment': risk,
+            'farmer_experience': experience,
+            'seasonal_timing': timing,
+            'farm_size': farm_size,
+        }
+    
+    def generate_bulk_crop_recommendations(self, farmer_profiles, region_names, current_conditions=None,
+                                           top_n=3, current_month=None):
+        """Top ``top_n`` crops per farmer, for campaigns that score a whole region"""
+        tables = self.compile_score_tables()
+        scores = self.calculate_bulk_scores(farmer_profiles, region_names, current_conditions, current_month)
+        overall = scores['overall']
+        top_n = min(top_n, overall.shape[1])
+        # Stable sort keeps crop order on ties, like list.sort in the scalar path
+        best = np.argsort(-overall, axis=1, kind='stable')[:, :top_n]
+        
+        projected_yield = tables['yield_per_hectare'][None, :] * scores['farm_size'][:, None]
+        projected_revenue = projected_yield * tables['price_per_kg'][None, :] * scores['climate_suitability']
+        
+        results = []
+        for row, columns in enumerate(best):
+            farmer_recommendations = []
+            for column in columns:
+                overall_score = float(overall[row, column])
+                farmer_recommendations.append({
+                    'crop_name': scores['crops'][column],
+                    'overall_score': round(overall_score, 3),
+                    'recommendation_level': self.get_recommendation_level(overall_score),
+                    'scores': {
+                        key: round(float(scores[key][row, column]), 3)
+                        for key in self.ai_weights
+                    },
+                    'projections': {
+                        'projected_yield_kg': round(float(projected_yield[row, column]), 2),
+                        'projected_revenue_ghs': round(float(projected_revenue[row, column]), 2),
+                    },
+                })
+            results.append({
+                'farmer_id': farmer_profiles[row].get('farmer_id'),
+                'recommendations': farmer_recommendations,
+            })
+        return results
+
+
+def run_bulk_scoring_benchmark(farmer_count=5000, seed=7):
+    """Compare per-farmer loop scoring with the vectorized bulk path"""
+    import time
+    
+    engine = GhanaAICropRecommendationEngine()
+    rng = random.Random(seed)
+    crops = list(engine.crop_database)
+    regions = list(engine.ghana_regions)
+    farmers = [
+        {
+            'farmer_id': f'bench_{i}',
+            'farm_size_hectares': round(rng.uniform(0.5, 12.0), 1),
+            'experience_years': rng.randint(0, 25),
+            'previous_crops': rng.sample(crops, rng.randint(0, 3)),
+        }
+        for i in range(farmer_count)
+    ]
+    farmer_regions = [rng.choice(regions) for _ in farmers]
+    conditions = [
+        {flag: rng.random() < 0.2 for flag in GhanaAICropRecommendationEngine.WEATHER_FLAGS}
+        for _ in farmers
+    ]
+    month = datetime.now().month
+    
+    started = time.perf_counter()
+    loop_overall = np.array([
+        [rec['overall_score'] for rec in sorted(
+            engine.generate_ai_crop_recommendations(farmer, region, condition),
+            key=lambda rec: crops.index(rec['crop_name'])
+        )]
+        for farmer, region, condition in zip(farmers, farmer_regions, conditions)
+    ])
+    loop_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    bulk = engine.calculate_bulk_scores(farmers, farmer_regions, conditions, current_month=month)
+    bulk_seconds = time.perf_counter() - started
+    
+    # The loop path rounds overall scores to 3 decimals
+    max_difference = float(np.max(np.abs(np.round(bulk['overall'], 3) - loop_overall)))
+    
+    print(f"Scored {farmer_count:,} farmers x {len(crops)} crops")
+    print(f"  Loop path: {loop_seconds:.3f}s")
+    print(f"  Bulk path: {bulk_seconds:.3f}s ({loop_seconds / max(bulk_seconds, 1e-9):.0f}x faster)")
+    print(f"  Max overall score difference: {max_difference:.4f}")
+    return {
+        'farmer_count': farmer_count,
+        'loop_seconds': loop_seconds,
+        'bulk_seconds': bulk_seconds,
+        'max_difference': max_difference,
+    }
 
 def run_ai_crop_recommendation_demo():
     """Run AI crop recommendation demonstration"""
@@ -777,6 +1029,11 @@ def run_ai_crop_recommendation_demo():
     }
 
 if __name__ == "__main__":
+    import sys
+    if '--benchmark' in sys.argv:
+        run_bulk_scoring_benchmark()
+        sys.exit(0)
+    
     try:
         ai_results = run_ai_crop_recommendation_demo()
         
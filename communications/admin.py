@@ -6,7 +6,7 @@ Enhanced SMS & OTP Integration System (PRD Section 4.7)
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
-    SMSProvider, SMSTemplate, SMSMessage, OTPCode,
+    SMSProvider, SMSTemplate, SMSMessage, SMSBroadcast, OTPCode,
     CommunicationPreference, CommunicationLog
 )
 
@@ -42,6 +42,16 @@ class SMSMessageAdmin(admin.ModelAdmin):
     readonly_fields = ['sent_at', 'delivered_at']
     date_hierarchy = 'sent_at'
 
+@admin.register(SMSBroadcast)
+class SMSBroadcastAdmin(admin.ModelAdmin):
+    """Admin for bulk SMS broadcasts"""
+    list_display = ['id', 'status', 'target_country', 'total_recipients', 'sent_count', 'failed_count', 'created_at']
+    list_filter = ['status', 'target_country', 'created_at']
+    search_fields = ['message']
+    readonly_fields = ['total_recipients', 'sent_count', 'failed_count', 'last_recipient_id', 'total_cost',
+                       'started_at', 'heartbeat_at', 'completed_at']
+    date_hierarchy = 'created_at'
+
 @admin.register(OTPCode)
 class OTPCodeAdmin(admin.ModelAdmin):
     """Admin for OTP codes"""
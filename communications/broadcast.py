@@ -0,0 +1,351 @@
+"""
+Bulk SMS Broadcasts for AgriConnect
+Sends one message to many farmers as a resumable background job
+
+A broadcast is an SMSBroadcast row processed by a Celery task. Recipients
+are streamed in primary-key order with ``iterator()``, so memory stays flat
+however many farmers are targeted, and each chunk is sent through a
+bounded thread pool. Every send first takes a token from its provider's
+rate limiter (PROVIDER_RATE_LIMITS, messages per second per worker
+process).
+
+After a chunk is sent its SMSMessage rows are written with one
+``bulk_create`` and the job's checkpoint (``last_recipient_id``) and
+counters advance in the same transaction. The running job heartbeats every
+HEARTBEAT_SECONDS while it sends, including within a chunk. A job whose
+worker died stops heartbeating and is claimed again by
+``resume_stalled_broadcasts``, which continues after the checkpoint.
+
+Every claim gets a new ``run_token``. Only the run holding the current
+token advances the checkpoint, finishes or fails the job; a run that finds
+its claim gone stops sending. Delivery is at least once: recipients after
+the checkpoint that a dead or superseded run had already reached are sent
+the message again by the run that takes over.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SMSBroadcast, SMSMessage
+from .services import AVRSMSService, SMSService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SMS_BROADCAST_CONFIG = {
+    # Concurrent sends per broadcast
+    'MAX_WORKERS': 16,
+    # Recipients per checkpoint; also the most a resumed job can resend
+    'CHUNK_SIZE': 500,
+    # Messages per second by SMSProvider.provider_code
+    'PROVIDER_RATE_LIMITS': {
+        'avrsms': 20,
+    },
+    'DEFAULT_RATE_LIMIT': 5,
+    # Heartbeat interval while sending; well below STALE_AFTER_SECONDS
+    'HEARTBEAT_SECONDS': 30,
+    # A running job without a heartbeat for this long is resumed
+    'STALE_AFTER_SECONDS': 300,
+}
+
+SMS_FARMER_EMAIL_DOMAIN = '@sms.agriconnect.com'
+
+DEFAULT_COUNTRY_PREFIXES = {
+    'ghana': '+233',
+    'nigeria': '+234',
+    'kenya': '+254',
+    'south_africa': '+27',
+    'senegal': '+221',
+}
+
+
+def get_broadcast_config() -> Dict:
+    config = dict(DEFAULT_SMS_BROADCAST_CONFIG)
+    config.update(getattr(settings, 'SMS_BROADCAST_CONFIG', {}))
+    return config
+
+
+def country_prefix(country: str) -> Optional[str]:
+    """Dialling prefix for a country name such as 'ghana' or 'south_africa'"""
+    prefixes = getattr(settings, 'SMS_OTP_SETTINGS', {}).get('SUPPORTED_COUNTRIES', DEFAULT_COUNTRY_PREFIXES)
+    return prefixes.get((country or '').strip().lower().replace(' ', '_'))
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second"""
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def provider_limiter(provider_code: str, config: Dict) -> RateLimiter:
+    """Process-wide limiter, shared by every broadcast sending through a provider"""
+    rate = config['PROVIDER_RATE_LIMITS'].get(provider_code, config['DEFAULT_RATE_LIMIT'])
+    with _limiters_lock:
+        limiter = _limiters.get(provider_code)
+        if limiter is None or limiter.rate != float(rate):
+            limiter = _limiters[provider_code] = RateLimiter(rate)
+        return limiter
+
+
+def broadcast_recipients(broadcast: SMSBroadcast):
+    """SMS-onboarded farmers targeted by the broadcast who have not opted out of SMS"""
+    User = get_user_model()
+    recipients = User.objects.filter(
+        email__endswith=SMS_FARMER_EMAIL_DOMAIN,
+        is_active=True,
+    ).exclude(communication_preferences__sms_enabled=False)
+
+    prefix = country_prefix(broadcast.target_country)
+    if prefix:
+        recipients = recipients.filter(Q(phone_number__startswith=prefix) | Q(username__startswith=prefix))
+    if broadcast.target_region:
+        recipients = recipients.filter(region__iexact=broadcast.target_region)
+    return recipients
+
+
+class BroadcastSender:
+    """Sends a broadcast's chunks through the provider chosen for each recipient"""
+
+    def __init__(self, broadcast: SMSBroadcast, config: Dict):
+        self.broadcast = broadcast
+        self.config = config
+        self.sms_service = SMSService()
+        self.senders = {'avrsms': AVRSMSService().send_sms}
+        self._providers = {}
+        # Set once this run no longer owns the job; pending sends are skipped
+        self.stopped = threading.Event()
+        self._beat_at = time.monotonic()
+
+    def owned(self):
+        """The job row, as long as this run's claim holds"""
+        return SMSBroadcast.objects.filter(pk=self.broadcast.pk, status='running', run_token=self.broadcast.run_token)
+
+    def heartbeat(self):
+        """Refresh the claim every HEARTBEAT_SECONDS; stop sending once it is lost"""
+        now = time.monotonic()
+        if now - self._beat_at < self.config['HEARTBEAT_SECONDS']:
+            return
+        self._beat_at = now
+        if not self.owned().update(heartbeat_at=timezone.now()):
+            logger.info(f"SMS broadcast {self.broadcast.pk} claim lost, stopping this run")
+            self.stopped.set()
+
+    def provider_for(self, phone: str):
+        """Active provider for the phone's country, looked up once per country"""
+        country = self.sms_service._extract_country_code(phone)
+        if country not in self._providers:
+            self._providers[country] = self.sms_service.get_active_provider(country)
+        return self._providers[country]
+
+    def _send(self, phone: str, provider_code: str) -> Optional[Dict]:
+        """Provider result for one recipient, or None if the run stopped before sending"""
+        send = self.senders.get(provider_code)
+        if send is None:
+            return {'success': False, 'error': f'No sending integration for provider {provider_code}', 'response': {}}
+        provider_limiter(provider_code, self.config).acquire()
+        if self.stopped.is_set():
+            return None
+        try:
+            return send(phone, self.broadcast.message)
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'response': {}}
+
+    def send_chunk(self, executor: ThreadPoolExecutor, recipients: List) -> List[SMSMessage]:
+        """
+        Unsaved SMSMessage rows for a chunk of (user_id, phone) recipients.
+        Recipients skipped after the run stopped get no row.
+        """
+        # Provider lookups hit the database, so they stay on this thread
+        providers = [self.provider_for(phone) for _, phone in recipients]
+        codes = [provider.provider_code if provider else 'avrsms' for provider in providers]
+        results = executor.map(self._send, [phone for _, phone in recipients], codes)
+
+        batch_id = uuid.uuid4()
+        now = timezone.now()
+        messages = []
+        for (user_id, phone), provider, result in zip(recipients, providers, results):
+            # Results arrive on this thread, so the claim is kept fresh mid-chunk
+            self.heartbeat()
+            if result is None:
+                continue
+            sent = bool(result.get('success'))
+            messages.append(SMSMessage(
+                recipient_phone=phone,
+                recipient_id=user_id,
+                message_type=self.broadcast.message_type,
+                content=self.broadcast.message,
+                language=self.broadcast.language,
+                status='sent' if sent else 'failed',
+                provider=provider,
+                provider_message_id=str(result.get('message_id') or ''),
+                provider_response=result.get('response') or {},
+                failure_reason='' if sent else result.get('error', 'Unknown error'),
+                sent_at=now if sent else None,
+                cost=provider.cost_per_sms if sent and provider else Decimal('0'),
+                currency=provider.currency if provider else 'USD',
+                campaign_id=self.broadcast.id,
+                batch_id=batch_id,
+            ))
+        return messages
+
+
+def claim_broadcast(broadcast_id, config: Dict) -> Optional[SMSBroadcast]:
+    """
+    Mark a queued or stalled broadcast as running under a new run token;
+    None if another worker owns it
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=config['STALE_AFTER_SECONDS'])
+    claimed = SMSBroadcast.objects.filter(
+        Q(status='queued') | Q(status='running', heartbeat_at__lt=stale),
+        pk=broadcast_id,
+    ).update(
+        status='running', run_token=uuid.uuid4(), started_at=Coalesce('started_at', now), heartbeat_at=now, error=''
+    )
+    if not claimed:
+        return None
+    return SMSBroadcast.objects.get(pk=broadcast_id)
+
+
+def run_broadcast(broadcast_id, config: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Send a broadcast from its checkpoint to the end of its recipient list.
+    Returns the job's counters, or None when it was not claimable.
+    """
+    config = config or get_broadcast_config()
+    broadcast = claim_broadcast(broadcast_id, config)
+    if broadcast is None:
+        return None
+
+    sender = BroadcastSender(broadcast, config)
+    try:
+        finished = _send_from_checkpoint(broadcast, sender, config)
+    except Exception as e:
+        fail_broadcast(broadcast.pk, str(e), broadcast.run_token)
+        raise
+    if finished:
+        sender.owned().update(status='completed', completed_at=timezone.now())
+
+    broadcast.refresh_from_db()
+    logger.info(f"SMS broadcast {broadcast.pk} {broadcast.status}: {broadcast.sent_count} sent, {broadcast.failed_count} failed")
+    return {'status': broadcast.status, 'sent': broadcast.sent_count, 'failed': broadcast.failed_count}
+
+
+def _send_from_checkpoint(broadcast: SMSBroadcast, sender: BroadcastSender, config: Dict) -> bool:
+    """Send chunk by chunk after the checkpoint; False if the run lost its claim"""
+    recipients = broadcast_recipients(broadcast)
+    if broadcast.total_recipients is None:
+        broadcast.total_recipients = recipients.count()
+        sender.owned().update(total_recipients=broadcast.total_recipients)
+
+    stream = (
+        recipients.filter(pk__gt=broadcast.last_recipient_id)
+        .order_by('pk')
+        .values_list('pk', 'phone_number', 'username')
+        .iterator(chunk_size=config['CHUNK_SIZE'])
+    )
+    with ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='sms-broadcast') as executor:
+        while True:
+            chunk = [(pk, phone or username) for pk, phone, username in islice(stream, config['CHUNK_SIZE'])]
+            if not chunk:
+                return True
+            messages = sender.send_chunk(executor, chunk)
+            sent = sum(1 for message in messages if message.status == 'sent')
+            with transaction.atomic():
+                # Messages that went out are recorded even when the claim was lost
+                SMSMessage.objects.bulk_create(messages)
+                # Only the owning run advances the checkpoint; a cancelled or reclaimed job stops here
+                owned = not sender.stopped.is_set() and sender.owned().update(
+                    last_recipient_id=chunk[-1][0],
+                    sent_count=F('sent_count') + sent,
+                    failed_count=F('failed_count') + len(messages) - sent,
+                    total_cost=F('total_cost') + sum((message.cost for message in messages), Decimal('0')),
+                    heartbeat_at=timezone.now(),
+                )
+            if not owned:
+                logger.info(f"SMS broadcast {broadcast.pk} stopped after recipient {chunk[-1][0]}")
+                return False
+
+
+def fail_broadcast(broadcast_id, error: str, run_token):
+    """Fail the job, unless another run has claimed it since"""
+    SMSBroadcast.objects.filter(pk=broadcast_id, status='running', run_token=run_token).update(
+        status='failed', error=error, completed_at=timezone.now()
+    )
+
+
+def enqueue_broadcast(broadcast_id: str):
+    """Send the job to the workers; fail it if the broker is unreachable"""
+    from .tasks import send_sms_broadcast
+
+    try:
+        send_sms_broadcast.delay(broadcast_id)
+    except Exception as e:
+        logger.error(f"Could not queue SMS broadcast {broadcast_id}: {str(e)}")
+        # Still queued, so the stalled-job sweep would send it later; a retried request must not double it
+        SMSBroadcast.objects.filter(pk=broadcast_id, status='queued').update(
+            status='failed', error='Broadcast queue unavailable, please retry shortly', completed_at=timezone.now()
+        )
+
+
+def start_broadcast(message: str, language: str = 'en', target_country: str = '',
+                    target_region: str = '', created_by=None) -> SMSBroadcast:
+    """
+    Create a broadcast and queue it once the creating transaction commits.
+    Outside a transaction that is immediately, and a broadcast that could not
+    be queued comes back already failed.
+    """
+    broadcast = SMSBroadcast.objects.create(
+        message=message,
+        language=language,
+        target_country=target_country or '',
+        target_region=target_region or '',
+        created_by=created_by,
+    )
+    transaction.on_commit(lambda: enqueue_broadcast(str(broadcast.pk)))
+    if not transaction.get_connection().in_atomic_block:
+        broadcast.refresh_from_db(fields=['status', 'error', 'completed_at'])
+    return broadcast
+
+
+def stalled_broadcasts(config: Optional[Dict] = None):
+    """Queued jobs and running jobs whose worker stopped heartbeating"""
+    config = config or get_broadcast_config()
+    stale = timezone.now() - timedelta(seconds=config['STALE_AFTER_SECONDS'])
+    return SMSBroadcast.objects.filter(
+        Q(status='queued', created_at__lt=stale) | Q(status='running', heartbeat_at__lt=stale)
+    )
@@ -0,0 +1,55 @@
+"""
+Resume SMS Broadcasts Management Command
+Continues bulk SMS broadcasts that stalled or failed from their checkpoint
+"""
+
+from django.core.management.base import BaseCommand
+
+from communications.broadcast import get_broadcast_config, run_broadcast, stalled_broadcasts
+from communications.models import SMSBroadcast
+
+
+class Command(BaseCommand):
+    help = 'Resume stalled SMS broadcasts from their last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--broadcast', help='Resume only this broadcast id')
+        parser.add_argument('--include-failed', action='store_true', help='Also retry broadcasts that failed')
+        parser.add_argument('--queue', action='store_true', help='Queue on Celery instead of sending in this process')
+
+    def handle(self, *args, **options):
+        config = get_broadcast_config()
+        if options['broadcast']:
+            broadcasts = SMSBroadcast.objects.filter(pk=options['broadcast'])
+        else:
+            broadcasts = stalled_broadcasts(config)
+        broadcast_ids = set(broadcasts.values_list('pk', flat=True))
+
+        if options['include_failed']:
+            failed = SMSBroadcast.objects.filter(status='failed')
+            if options['broadcast']:
+                failed = failed.filter(pk=options['broadcast'])
+            broadcast_ids.update(failed.values_list('pk', flat=True))
+            # Requeued jobs keep their checkpoint and counters
+            failed.update(status='queued', error='', completed_at=None)
+
+        broadcasts = SMSBroadcast.objects.filter(pk__in=broadcast_ids).order_by('created_at')
+        resumed = 0
+        for broadcast in broadcasts:
+            if options['queue']:
+                from communications.tasks import send_sms_broadcast
+
+                send_sms_broadcast.delay(str(broadcast.pk))
+                self.stdout.write(f"Queued broadcast {broadcast.pk} after recipient {broadcast.last_recipient_id}")
+                resumed += 1
+                continue
+
+            # Stalled jobs are claimed once their heartbeat is older than STALE_AFTER_SECONDS
+            result = run_broadcast(broadcast.pk, config)
+            if result is None:
+                self.stdout.write(f"Broadcast {broadcast.pk} is owned by a running worker; skipped")
+                continue
+            self.stdout.write(f"Broadcast {broadcast.pk} {result['status']}: {result['sent']} sent, {result['failed']} failed")
+            resumed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Resumed {resumed} broadcasts'))
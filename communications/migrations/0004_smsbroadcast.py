@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_communicationlog_ai_content_generated_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSBroadcast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('message', models.TextField()),
+                ('language', models.CharField(default='en', max_length=10)),
+                ('message_type', models.CharField(default='broadcast', max_length=30)),
+                ('target_country', models.CharField(blank=True, max_length=50)),
+                ('target_region', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('total_recipients', models.IntegerField(blank=True, null=True)),
+                ('sent_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('last_recipient_id', models.BigIntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_broadcasts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'SMS Broadcast',
+                'verbose_name_plural': 'SMS Broadcasts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'heartbeat_at'], name='communicati_status_7b5df2_idx')],
+            },
+        ),
+    ]
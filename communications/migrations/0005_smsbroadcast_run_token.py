@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0004_smsbroadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsbroadcast',
+            name='run_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
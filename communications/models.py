@@ -227,6 +227,53 @@ class SMSMessage(models.Model):
     def __str__(self):
         return f"SMS to {self.recipient_phone} - {self.status}"
 
+class SMSBroadcast(models.Model):
+    """Bulk SMS job sent in the background; its messages share campaign_id=id"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='sms_broadcasts')
+    message = models.TextField()
+    language = models.CharField(max_length=10, default='en')
+    message_type = models.CharField(max_length=30, default='broadcast')
+
+    # Targeting
+    target_country = models.CharField(max_length=50, blank=True)
+    target_region = models.CharField(max_length=100, blank=True)
+
+    # Progress; last_recipient_id is the checkpoint a resumed job continues after
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_recipients = models.IntegerField(null=True, blank=True)
+    sent_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    last_recipient_id = models.BigIntegerField(default=0)
+    # Set on every claim; only the run holding it may update the job
+    run_token = models.UUIDField(null=True, blank=True, editable=False)
+    total_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+        verbose_name = "SMS Broadcast"
+        verbose_name_plural = "SMS Broadcasts"
+
+    def __str__(self):
+        return f"Broadcast {self.id} - {self.status} ({self.sent_count} sent)"
+
 class OTPCode(models.Model):
     """Enhanced OTP management with multi-purpose support"""
     PURPOSE_CHOICES = [
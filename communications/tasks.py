@@ -0,0 +1,33 @@
+"""
+Celery tasks for the communications app
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(acks_late=True)
+def send_sms_broadcast(broadcast_id):
+    """Send (or continue) a bulk SMS broadcast from its checkpoint"""
+    from .broadcast import run_broadcast
+
+    try:
+        return run_broadcast(broadcast_id)
+    except Exception as e:
+        # run_broadcast has already failed the job if this run still owned it
+        logger.error(f"SMS broadcast {broadcast_id} failed: {str(e)}")
+        raise
+
+
+@shared_task
+def resume_stalled_broadcasts():
+    """Requeue broadcasts that were never picked up or whose worker died"""
+    from .broadcast import stalled_broadcasts
+
+    broadcast_ids = [str(pk) for pk in stalled_broadcasts().values_list('pk', flat=True)]
+    for broadcast_id in broadcast_ids:
+        send_sms_broadcast.delay(broadcast_id)
+    return len(broadcast_ids)
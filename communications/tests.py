@@ -1,3 +1,161 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .broadcast import (
+    SMS_FARMER_EMAIL_DOMAIN, BroadcastSender, claim_broadcast, fail_broadcast, get_broadcast_config, run_broadcast,
+    stalled_broadcasts, start_broadcast,
+)
+from .models import SMSBroadcast, SMSMessage
+
+User = get_user_model()
+
+
+class FakeAVRSMS:
+    """Records sends instead of calling the provider"""
+
+    def __init__(self):
+        self.phones = []
+        self.lock = threading.Lock()
+        self.on_send = None
+
+    def send_sms(self, phone, message):
+        with self.lock:
+            self.phones.append(phone)
+        if self.on_send:
+            self.on_send(phone)
+        return {'success': True, 'message_id': f'msg-{phone}', 'response': {}}
+
+
+class SMSBroadcastTests(TestCase):
+
+    def setUp(self):
+        self.farmers = []
+        for number in range(5):
+            phone = f'+23320000040{number}'
+            farmer = User.objects.create_user(phone, password='secret', roles=['FARMER'])
+            User.objects.filter(pk=farmer.pk).update(email=f'{phone}{SMS_FARMER_EMAIL_DOMAIN}')
+            self.farmers.append(farmer)
+        self.provider = FakeAVRSMS()
+        patcher = mock.patch('communications.broadcast.AVRSMSService', return_value=self.provider)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config = dict(get_broadcast_config(), CHUNK_SIZE=2, MAX_WORKERS=2, HEARTBEAT_SECONDS=0)
+
+    def create(self, **fields):
+        return SMSBroadcast.objects.create(message='Rains expected on Friday', **fields)
+
+    def test_broadcast_checkpoints_every_chunk(self):
+        broadcast = self.create()
+        result = run_broadcast(broadcast.pk, self.config)
+
+        self.assertEqual(result, {'status': 'completed', 'sent': 5, 'failed': 0})
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.total_recipients, 5)
+        self.assertEqual(broadcast.last_recipient_id, self.farmers[-1].pk)
+        self.assertEqual(SMSMessage.objects.filter(campaign_id=broadcast.pk).values('batch_id').distinct().count(), 3)
+
+    def test_resume_continues_after_the_checkpoint(self):
+        broadcast = self.create(
+            status='running', run_token=uuid.uuid4(), heartbeat_at=timezone.now() - timedelta(hours=1),
+            total_recipients=5, sent_count=2, last_recipient_id=self.farmers[1].pk
+        )
+        self.assertEqual(list(stalled_broadcasts(self.config)), [broadcast])
+
+        result = run_broadcast(broadcast.pk, self.config)
+        self.assertEqual(result, {'status': 'completed', 'sent': 5, 'failed': 0})
+        self.assertEqual(sorted(self.provider.phones), [farmer.phone_number for farmer in self.farmers[2:]])
+
+    def test_live_broadcast_is_not_reclaimed(self):
+        broadcast = self.create(status='running', run_token=uuid.uuid4(), heartbeat_at=timezone.now())
+        self.assertIsNone(claim_broadcast(broadcast.pk, self.config))
+
+        SMSBroadcast.objects.filter(pk=broadcast.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        reclaimed = claim_broadcast(broadcast.pk, self.config)
+        self.assertNotEqual(reclaimed.run_token, broadcast.run_token)
+
+    def test_superseded_run_stops_without_moving_the_checkpoint(self):
+        broadcast = self.create()
+        new_token = uuid.uuid4()
+        heartbeat = BroadcastSender.heartbeat
+
+        def reclaimed_by_another_worker(sender):
+            # Another worker takes the job over mid-chunk
+            SMSBroadcast.objects.filter(pk=broadcast.pk).update(run_token=new_token, heartbeat_at=timezone.now())
+            heartbeat(sender)
+
+        self.provider.on_send = lambda phone: time.sleep(0.05)
+        with mock.patch.object(BroadcastSender, 'heartbeat', reclaimed_by_another_worker):
+            result = run_broadcast(broadcast.pk, dict(self.config, CHUNK_SIZE=5, MAX_WORKERS=1))
+
+        self.assertEqual(result['status'], 'running')
+        broadcast.refresh_from_db()
+        self.assertEqual((broadcast.run_token, broadcast.last_recipient_id, broadcast.sent_count), (new_token, 0, 0))
+        # Sends still in flight are recorded, the rest of the chunk is skipped
+        self.assertLess(len(self.provider.phones), 5)
+        self.assertEqual(SMSMessage.objects.filter(campaign_id=broadcast.pk).count(), len(self.provider.phones))
+
+    def test_superseded_run_cannot_fail_the_job(self):
+        broadcast = self.create(status='running', run_token=uuid.uuid4(), heartbeat_at=timezone.now())
+        fail_broadcast(broadcast.pk, 'worker lost', uuid.uuid4())
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.status, 'running')
+
+    def test_unreachable_broker_fails_the_broadcast(self):
+        with mock.patch('communications.tasks.send_sms_broadcast.delay', side_effect=ConnectionError('broker down')):
+            with self.captureOnCommitCallbacks(execute=True):
+                broadcast = start_broadcast('Rains expected on Friday')
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.status, 'failed')
+        # Not picked up later by the stalled-job sweep
+        SMSBroadcast.objects.filter(pk=broadcast.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertFalse(stalled_broadcasts(self.config).exists())
+        self.assertEqual(self.provider.phones, [])
+
+
+class BulkSMSBroadcastViewTests(TestCase):
+
+    def setUp(self):
+        import sms_views
+
+        self.views = sms_views
+        self.factory = APIRequestFactory()
+        self.staff = User.objects.create_user('+233200000410', password='secret', roles=['FARMER'], is_staff=True)
+        self.farmer = User.objects.create_user('+233200000411', password='secret', roles=['FARMER'])
+
+    def post(self, user=None):
+        request = self.factory.post('/api/v1/sms/broadcast/', {'message': 'Rains expected on Friday'}, format='json')
+        if user:
+            force_authenticate(request, user)
+        return self.views.bulk_sms_broadcast(request)
+
+    def test_broadcast_requires_staff(self):
+        with mock.patch('communications.tasks.send_sms_broadcast.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertIn(self.post().status_code, (401, 403))
+                self.assertEqual(self.post(self.farmer).status_code, 403)
+                response = self.post(self.staff)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(delay.call_count, 1)
+        self.assertEqual(SMSBroadcast.objects.get().created_by, self.staff)
+
+    def test_status_requires_staff(self):
+        broadcast = SMSBroadcast.objects.create(message='Rains expected on Friday')
+        for user, status_code in ((self.farmer, 403), (self.staff, 200)):
+            request = self.factory.get(f'/api/v1/sms/broadcast/{broadcast.pk}/')
+            force_authenticate(request, user)
+            self.assertEqual(self.views.bulk_sms_broadcast_status(request, broadcast.pk).status_code, status_code)
 
-# Create your tests here.
+    def test_unqueued_broadcast_is_reported_with_its_id(self):
+        failed = SMSBroadcast.objects.create(message='Rains expected on Friday', status='failed', error='queue down')
+        with mock.patch('communications.broadcast.start_broadcast', return_value=failed):
+            response = self.post(self.staff)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(str(failed.pk), response.content.decode())
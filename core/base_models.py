@@ -0,0 +1,24 @@
+"""
+AgriConnect Shared Model Bases
+Abstract models reused across apps
+"""
+
+from django.db import models
+
+
+class TrendingScoreModel(models.Model):
+    """
+    Exponentially time-decayed popularity score (see core.trending).
+    
+    trending_score is the decayed sum of event weights as of
+    trending_updated_at. Events decay-and-add in a single UPDATE, and a
+    periodic renormalization brings every live score forward to "now" so
+    ordering by the column stays correct between events. Concrete models
+    should index ['-trending_score'].
+    """
+    
+    trending_score = models.FloatField(default=0)
+    trending_updated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        abstract = True
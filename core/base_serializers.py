@@ -0,0 +1,53 @@
+"""
+AgriConnect Shared Serializer Bases
+Per-page batch context for list serialization
+"""
+
+from django.db.models.manager import BaseManager
+from rest_framework import serializers
+
+
+class BatchContextListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer that lets its child load per-page lookups up front.
+
+    The child's load_batch() runs once for the whole page, so per-object
+    fields (the viewer's vote, related users, child rows) read from dicts
+    instead of issuing a query per object.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        objects = list(iterable)
+        self.child.set_batch(objects)
+        return [self.child.to_representation(item) for item in objects]
+
+
+class BatchContextMixin:
+    """
+    Serializer mixin for batched per-viewer and related-object lookups.
+
+    Subclasses implement load_batch(objects) returning a dict of lookups and
+    read it with batch(obj) from their SerializerMethodFields. Serializing a
+    single object loads a batch of one, so results are identical either way.
+    Pair with Meta.list_serializer_class = BatchContextListSerializer.
+    """
+
+    def load_batch(self, objects):
+        return {}
+
+    def set_batch(self, objects):
+        self._batch = self.load_batch(objects)
+        self._batch_keys = {obj.pk for obj in objects}
+
+    def batch(self, obj):
+        if obj.pk not in getattr(self, '_batch_keys', ()):
+            self.set_batch([obj])
+        return self._batch
+
+    @property
+    def viewer(self):
+        """Authenticated requesting user, or None"""
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        return user if user is not None and user.is_authenticated else None
@@ -0,0 +1,16 @@
+"""
+AgriConnect Ranking Helpers
+Vectorized top-K selection shared by the offline recommendation jobs
+"""
+
+import numpy as np
+
+
+def top_k_columns(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k best scores per row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
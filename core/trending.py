@@ -0,0 +1,181 @@
+"""
+AgriConnect Trending Scores
+Exponentially time-decayed popularity shared by reviews, peer
+recommendations and processing recipes
+
+Models inherit core.base_models.TrendingScoreModel and register the event
+tables that feed them (votes, interactions, usage logs). Each new event
+decays the target's stored score to "now" and adds the event weight in one
+UPDATE, so no interaction table is scanned at read time. A periodic
+renormalization (refresh_trending_scores) brings every live score forward
+to the same instant, which keeps ORDER BY trending_score correct for rows
+that have not seen an event recently, and zeroes scores that have decayed
+below the floor so they drop out of later passes.
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, FloatField, Func, Value
+from django.db.models.functions import Coalesce, Exp, Greatest
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+DEFAULT_TRENDING_CONFIG = {
+    'HALF_LIFE_HOURS': 48,
+    'SCORE_FLOOR': 0.001,
+    'BACKFILL_DAYS': 30,
+}
+
+# EXP() of anything below this underflows double precision (PostgreSQL raises)
+_MIN_EXPONENT = -700
+
+
+def get_trending_config() -> Dict:
+    config = dict(DEFAULT_TRENDING_CONFIG)
+    config.update(getattr(settings, 'TRENDING_CONFIG', {}))
+    return config
+
+
+def decay_rate() -> float:
+    """Per-second decay constant for the configured half-life"""
+    return math.log(2) / (get_trending_config()['HALF_LIFE_HOURS'] * 3600)
+
+
+class ElapsedSeconds(Func):
+    """Seconds in a duration expression"""
+
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # Without a native interval type (SQLite, MySQL) durations are integer microseconds
+        return super().as_sql(compiler, connection, template='(%(expressions)s / 1000000.0)', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='EXTRACT(EPOCH FROM (%(expressions)s))::double precision', **extra_context
+        )
+
+
+def decay_factor(now, rate):
+    """EXP(-rate * seconds since trending_updated_at), clamped to avoid underflow"""
+    now_value = Value(now, output_field=DateTimeField())
+    elapsed = ExpressionWrapper(
+        now_value - Coalesce('trending_updated_at', now_value),
+        output_field=DurationField()
+    )
+    exponent = ExpressionWrapper(Value(-float(rate)) * ElapsedSeconds(elapsed), output_field=FloatField())
+    return Exp(Greatest(Value(float(_MIN_EXPONENT)), exponent))
+
+
+def decayed_score(now, rate=None):
+    return F('trending_score') * decay_factor(now, rate if rate is not None else decay_rate())
+
+
+@dataclass
+class TrendingSource:
+    """An event table whose new rows add weight to a trending target"""
+
+    model: type
+    target_field: str
+    weight: Union[float, Callable]
+    timestamp_field: str = 'created_at'
+
+    @property
+    def target_model(self):
+        return self.model._meta.get_field(self.target_field).related_model
+
+    def weight_for(self, instance) -> float:
+        return float(self.weight(instance) if callable(self.weight) else self.weight)
+
+    def target_id(self, instance):
+        return getattr(instance, f'{self.target_field}_id')
+
+
+_sources: List[TrendingSource] = []
+
+
+def register_source(model, target_field: str, weight: Union[float, Callable] = 1.0,
+                    timestamp_field: str = 'created_at') -> TrendingSource:
+    """
+    Feed a trending target from new rows of ``model``.
+
+    Call from AppConfig.ready(); ``weight`` is a number or a callable taking
+    the new row.
+    """
+    source = TrendingSource(model, target_field, weight, timestamp_field)
+    _sources.append(source)
+
+    def on_created(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            record_event(source.target_model, source.target_id(instance), source.weight_for(instance))
+
+    post_save.connect(
+        on_created, sender=model, weak=False,
+        dispatch_uid=f'trending:{model._meta.label}:{target_field}'
+    )
+    return source
+
+
+def trending_models() -> List[type]:
+    models = []
+    for source in _sources:
+        if source.target_model not in models:
+            models.append(source.target_model)
+    return models
+
+
+def record_event(model, pk, weight: float = 1.0, now=None) -> int:
+    """Decay the target's score to now and add the event weight (one UPDATE)"""
+    if pk is None or weight <= 0:
+        return 0
+    now = now or timezone.now()
+    return model.objects.filter(pk=pk).update(
+        trending_score=decayed_score(now) + weight,
+        trending_updated_at=now
+    )
+
+
+def renormalize(model, now=None) -> int:
+    """Bring every live score forward to ``now`` and drop those below the floor"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        updated = model.objects.filter(trending_score__gt=0).update(
+            trending_score=decayed_score(now),
+            trending_updated_at=now
+        )
+        model.objects.filter(
+            trending_score__gt=0, trending_score__lt=get_trending_config()['SCORE_FLOOR']
+        ).update(trending_score=0)
+    return updated
+
+
+def rebuild(model, days=None, now=None) -> int:
+    """Recompute scores for ``model`` from its registered event tables"""
+    config = get_trending_config()
+    now = now or timezone.now()
+    since = now - timedelta(days=days or config['BACKFILL_DAYS'])
+    rate = decay_rate()
+
+    scores = defaultdict(float)
+    for source in _sources:
+        if source.target_model is not model:
+            continue
+        events = source.model.objects.filter(**{f'{source.timestamp_field}__gte': since})
+        for event in events.iterator(chunk_size=2000):
+            age = (now - getattr(event, source.timestamp_field)).total_seconds()
+            scores[source.target_id(event)] += source.weight_for(event) * math.exp(-rate * age)
+
+    rows = [
+        model(pk=pk, trending_score=score, trending_updated_at=now)
+        for pk, score in scores.items() if score >= config['SCORE_FLOOR']
+    ]
+    with transaction.atomic():
+        model.objects.filter(trending_score__gt=0).update(trending_score=0, trending_updated_at=now)
+        model.objects.bulk_update(rows, ['trending_score', 'trending_updated_at'], batch_size=1000)
+    return len(rows)
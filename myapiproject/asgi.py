@@ -0,0 +1,12 @@
+"""
+ASGI config for myapiproject.
+Serves the same app as wsgi.py; required for streaming (server-sent event) responses.
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+# Use App Platform optimized settings for DigitalOcean App Platform
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myapiproject.settings_appplatform')
+
+application = get_asgi_application()
@@ -6,6 +6,8 @@ import os
 import dj_database_url
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -165,6 +167,53 @@ AI_USAGE_LIMITS = {
 # Weather API Configuration
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', '')
 
+# Cache shared by every web and worker process; AI concurrency slots and
+# in-flight markers are only global when this is Redis
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'agriconnect-default',
+        }
+    }
+
+# Celery: web requests queue tasks on the broker the worker and beat use
+CELERY_BROKER_URL = REDIS_URL or 'redis://127.0.0.1:6379/0'
+CELERY_RESULT_BACKEND = CELERY_BROKER_URL
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() in ('true', '1', 'yes')
+CELERY_TASK_EAGER_PROPAGATES = True
+# Periodic tasks, run by the beat process (`celery -A agriconnect beat`)
+CELERY_BEAT_SCHEDULE = {
+    'refresh-market-price-forecasts': {
+        'task': 'ai.tasks.refresh_market_price_forecasts',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'rebuild-semantic-index': {
+        'task': 'ai.tasks.rebuild_semantic_index',
+        'schedule': crontab(minute=15),
+    },
+    'resume-stalled-sms-broadcasts': {
+        'task': 'communications.tasks.resume_stalled_broadcasts',
+        'schedule': crontab(minute='*/5'),
+    },
+    'resume-stalled-recall-notifications': {
+        'task': 'traceability.tasks.resume_stalled_recall_notifications',
+        'schedule': crontab(minute='*/5'),
+    },
+}
+
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -67,6 +67,34 @@ class OpenRouterDjangoIntegration:
         }
 
     def _make_request(self, model: str, messages: List[Dict], max_tokens: int = 1000) -> Dict:
+        """
+        Chat completion for ``model`` on OpenRouter, in the OpenRouter response
+        shape. When OpenRouter is a configured AI route, calls go through the
+        shared provider router, so a slow or failing model is hedged or failed
+        over to the default routes; otherwise OpenRouter is called directly.
+        """
+        from ai.routing import ProviderError
+        from ai.services import ai_service_manager
+        
+        router = ai_service_manager.router
+        if 'openrouter' not in router.providers:
+            return self._direct_request(model, messages, max_tokens)
+        routes = [router.route('openrouter', model)] + list(router.default_routes)
+        
+        try:
+            completion = router.complete(messages, max_tokens, 0.7, routes=routes)
+        except ProviderError as e:
+            logger.error(f"OpenRouter request failed: {str(e)}")
+            return {"error": f"Request failed: {str(e)}"}
+        
+        return {
+            "model": completion.model,
+            "provider": completion.provider,
+            "choices": [{"message": {"role": "assistant", "content": completion.content}}],
+            "usage": {"total_tokens": completion.total_tokens}
+        }
+
+    def _direct_request(self, model: str, messages: List[Dict], max_tokens: int = 1000) -> Dict:
         """Make synchronous request to OpenRouter API"""
         try:
             payload = {
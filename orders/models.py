@@ -158,10 +158,17 @@ class OrderItem(models.Model):
     # Processing requirements (for processing orders)
     processing_requirements = models.JSONField(default=dict, blank=True)
     
+    # Traceability batch the item was fulfilled from (stamped from the product trace)
+    batch_number = models.CharField(max_length=100, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'order_items'
+        indexes = [
+            models.Index(fields=['product', 'order']),  # Recall impact lookups
+            models.Index(fields=['product', 'batch_number']),  # Batch recall lookups
+        ]
     
     def __str__(self):
         return f"{self.product_name} x {self.quantity} {self.unit}"
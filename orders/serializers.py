@@ -28,9 +28,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'quantity', 'unit_price', 'total_price',
             'product_name', 'product_description', 'unit',
             'quality_specifications', 'processing_requirements',
-            'created_at'
+            'batch_number', 'created_at'
         ]
-        read_only_fields = ['id', 'total_price', 'created_at']
+        read_only_fields = ['id', 'total_price', 'batch_number', 'created_at']
 
     def validate_product_id(self, value):
         """Validate that product exists and is available"""
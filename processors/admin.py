@@ -94,8 +94,8 @@ class ProcessingRecipeAdmin(admin.ModelAdmin):
         'processor__processor_profile__business_name'
     ]
     readonly_fields = [
-        'processor', 'times_used', 'success_rate_percentage', 'average_rating',
-        'rating_count', 'verified_by', 'verification_date', 'created_at', 'updated_at'
+        'processor', 'times_used', 'successful_uses', 'success_rate_percentage', 'average_rating',
+        'rating_count', 'rating_sum', 'verified_by', 'verification_date', 'created_at', 'updated_at'
     ]
     inlines = [RecipeRatingInline, RecipeCommentInline]
     
@@ -134,7 +134,10 @@ class ProcessingRecipeAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Metrics', {
-            'fields': ('times_used', 'success_rate_percentage', 'average_rating', 'rating_count'),
+            'fields': (
+                'times_used', 'successful_uses', 'success_rate_percentage',
+                'average_rating', 'rating_count', 'rating_sum'
+            ),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -13,4 +13,4 @@ class ProcessorsConfig(AppConfig):
     
     def ready(self):
         """Import signals when the app is ready"""
-        pass
+        import processors.signals
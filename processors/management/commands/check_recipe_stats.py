@@ -0,0 +1,38 @@
+"""
+Check Recipe Statistics Management Command
+Recounts recipe ratings and usage logs and repairs drifted running totals
+"""
+
+from django.core.management.base import BaseCommand
+
+from processors.recipe_stats import check_recipe_stats
+
+
+class Command(BaseCommand):
+    help = 'Verify recipe rating / success-rate totals against ratings and usage logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Rewrite drifted totals instead of only reporting them',
+        )
+        parser.add_argument(
+            '--recipe',
+            action='append',
+            type=int,
+            dest='recipes',
+            help='Only check this recipe id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        drifted = check_recipe_stats(repair=options['repair'], recipe_ids=options['recipes'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All recipe statistics are consistent'))
+            return
+
+        if options['repair']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired statistics for {len(drifted)} recipes"))
+            return
+        self.stdout.write(self.style.WARNING(f"Found drifted statistics in {len(drifted)} recipes"))
+        self.stdout.write(f"Recipe ids: {', '.join(str(pk) for pk in drifted[:50])}")
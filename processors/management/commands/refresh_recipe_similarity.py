@@ -0,0 +1,31 @@
+"""
+Refresh Recipe Similarity Management Command
+Rebuilds the content-based similar-recipe index (full or incremental)
+"""
+
+from django.core.management.base import BaseCommand
+
+from processors.similarity import rebuild_index, refresh_queued
+
+
+class Command(BaseCommand):
+    help = 'Recompute top-K similar recipes from tags, inputs, equipment, steps and processor type'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only recompute recipes affected by queued content changes',
+        )
+        parser.add_argument('--limit', type=int, default=1000, help='Max queued recipes per incremental run')
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            result = refresh_queued(limit=options['limit'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Refreshed {result['recomputed']} recipes for {result['queued']} queued changes"
+            ))
+            return
+
+        rows = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} similar recipe entries"))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingrecipe',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='processingrecipe',
+            name='trending_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='processingrecipe',
+            index=models.Index(fields=['-trending_score'], name='processors__trendin_adec41_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_running_totals(apps, schema_editor):
+    ProcessingRecipe = apps.get_model('processors', 'ProcessingRecipe')
+    RecipeRating = apps.get_model('processors', 'RecipeRating')
+    RecipeUsageLog = apps.get_model('processors', 'RecipeUsageLog')
+
+    def grouped(queryset, aggregate):
+        return Coalesce(Subquery(
+            queryset.filter(recipe=OuterRef('pk')).values('recipe').annotate(value=aggregate).values('value'),
+            output_field=IntegerField()
+        ), 0)
+
+    ProcessingRecipe.objects.update(
+        rating_sum=grouped(RecipeRating.objects.all(), Sum('overall_rating')),
+        successful_uses=grouped(RecipeUsageLog.objects.all(), Count('id', filter=Q(success=True))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processors', '0002_processingrecipe_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingrecipe',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of overall ratings'),
+        ),
+        migrations.AddField(
+            model_name='processingrecipe',
+            name='successful_uses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_running_totals, migrations.RunPython.noop),
+    ]
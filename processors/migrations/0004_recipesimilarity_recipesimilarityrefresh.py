@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processors', '0003_processingrecipe_running_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarityRefresh',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='processors.processingrecipe')),
+                ('requested_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='processors.processingrecipe')),
+                ('similar_recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='processors.processingrecipe')),
+            ],
+            options={
+                'verbose_name_plural': 'Recipe similarities',
+                'ordering': ['recipe', 'rank'],
+                'indexes': [models.Index(fields=['recipe', 'rank'], name='processors__recipe__6a3f8e_idx')],
+                'unique_together': {('recipe', 'similar_recipe')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 14:50
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_comment_paths(apps, schema_editor):
+    RecipeComment = apps.get_model('processors', 'RecipeComment')
+
+    children = defaultdict(list)
+    reply_counts = defaultdict(int)
+    for pk, parent_id in RecipeComment.objects.values_list('pk', 'parent_id').iterator():
+        children[parent_id].append(pk)
+        if parent_id is not None:
+            reply_counts[parent_id] += 1
+
+    updated = []
+    frontier = [(pk, '', 0) for pk in children[None]]
+    while frontier:
+        next_frontier = []
+        for pk, prefix, depth in frontier:
+            path = f'{prefix}{pk}/'
+            updated.append(RecipeComment(pk=pk, path=path, depth=depth, reply_count=reply_counts[pk]))
+            next_frontier.extend((child, path, depth + 1) for child in children[pk])
+        frontier = next_frontier
+
+    RecipeComment.objects.bulk_update(updated, ['path', 'depth', 'reply_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processors', '0004_recipesimilarity_recipesimilarityrefresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipecomment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='recipecomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipecomment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='recipecomment',
+            index=models.Index(fields=['recipe', 'depth', '-created_at'], name='processors__recipe__07ca79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipecomment',
+            index=models.Index(fields=['path'], name='processors_comment_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processors', '0005_recipecomment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeFeatureVector',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='processors.processingrecipe')),
+                ('buckets', models.JSONField(default=list, help_text='[[bucket, weight], ...]')),
+                ('hash_bits', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
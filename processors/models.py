@@ -12,14 +12,16 @@ Features:
 
 import uuid
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
+from core.base_models import TrendingScoreModel
 
 User = get_user_model()
 
 
-class ProcessingRecipe(models.Model):
+class ProcessingRecipe(TrendingScoreModel):
     """
     Processing recipes for value-addition and technical support.
     Enables processors to share best practices and standardized procedures.
@@ -131,8 +133,9 @@ class ProcessingRecipe(models.Model):
     )
     verification_date = models.DateTimeField(null=True, blank=True)
     
-    # Usage Tracking
+    # Usage Tracking (running totals maintained by processors.recipe_stats)
     times_used = models.PositiveIntegerField(default=0)
+    successful_uses = models.PositiveIntegerField(default=0)
     success_rate_percentage = models.DecimalField(
         max_digits=5, decimal_places=2, null=True, blank=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
@@ -144,6 +147,7 @@ class ProcessingRecipe(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)]
     )
     rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0, help_text="Sum of overall ratings")
     
     # Metadata
     tags = models.JSONField(default=list, help_text="Recipe tags for categorization")
@@ -160,6 +164,7 @@ class ProcessingRecipe(models.Model):
             models.Index(fields=['status', 'is_public']),
             models.Index(fields=['skill_level_required']),
             models.Index(fields=['-average_rating']),
+            models.Index(fields=['-trending_score']),
         ]
     
     def __str__(self):
@@ -272,14 +277,37 @@ class RecipeComment(models.Model):
     # Helpful voting
     helpful_count = models.PositiveIntegerField(default=0)
     
+    # Thread structure: materialized path of ancestor ids ending with this
+    # comment's id (e.g. "12/57/103/"), so a subtree is one prefix query
+    path = models.CharField(max_length=500, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    MAX_DEPTH = 30
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipe', 'depth', '-created_at']),
+            models.Index(fields=['path'], name='processors_comment_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
     
     def __str__(self):
         return f"Comment on {self.recipe.recipe_name} by {self.user.username}"
+    
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        if creating:
+            self.depth = self.parent.depth + 1 if self.parent_id else 0
+        super().save(*args, **kwargs)
+        if creating:
+            self.path = f"{self.parent.path if self.parent_id else ''}{self.pk}/"
+            RecipeComment.objects.filter(pk=self.pk).update(path=self.path)
+            if self.parent_id:
+                RecipeComment.objects.filter(pk=self.parent_id).update(reply_count=F('reply_count') + 1)
 
 
 class ProcessorProfile(models.Model):
@@ -350,3 +378,53 @@ class ProcessorProfile(models.Model):
     
     def __str__(self):
         return f"{self.business_name} - {self.user.username}"
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Precomputed nearest public recipes for each recipe.
+    Cosine similarity over hashed TF-IDF features (tags, inputs, equipment,
+    outputs, step text, processor type); written by processors.similarity.
+    """
+    
+    recipe = models.ForeignKey(ProcessingRecipe, on_delete=models.CASCADE, related_name='similarities')
+    similar_recipe = models.ForeignKey(ProcessingRecipe, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['recipe', 'similar_recipe']
+        ordering = ['recipe', 'rank']
+        indexes = [
+            models.Index(fields=['recipe', 'rank']),
+        ]
+        verbose_name_plural = 'Recipe similarities'
+    
+    def __str__(self):
+        return f"{self.similar_recipe_id} #{self.rank} for recipe {self.recipe_id}"
+
+
+class RecipeFeatureVector(models.Model):
+    """
+    A recipe's weighted, hashed term frequencies (before IDF).
+    Incremental similarity runs reuse these instead of re-reading every recipe.
+    """
+    
+    recipe = models.OneToOneField(ProcessingRecipe, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    buckets = models.JSONField(default=list, help_text="[[bucket, weight], ...]")
+    hash_bits = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Feature vector for recipe {self.recipe_id}"
+
+
+class RecipeSimilarityRefresh(models.Model):
+    """Recipes whose features changed since the similarity index was built"""
+    
+    recipe = models.OneToOneField(ProcessingRecipe, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    requested_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Similarity refresh for recipe {self.recipe_id}"
@@ -0,0 +1,134 @@
+"""
+AgriConnect Recipe Statistics
+Incremental maintenance of ProcessingRecipe rating and success-rate fields
+
+Ratings and usage logs keep running totals on the recipe (rating_sum /
+rating_count, successful_uses / times_used). Each insert, edit or delete
+applies its delta with one F() UPDATE that also recomputes the derived
+average_rating and success_rate_percentage from the new totals, so the
+cost no longer grows with a recipe's popularity and concurrent writers
+never lose updates. check_recipe_stats() recounts everything in grouped
+queries and repairs any drift in bulk.
+"""
+
+from typing import Dict, List
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import ProcessingRecipe, RecipeRating, RecipeUsageLog
+
+# The derived columns round to two decimals on assignment
+_RATIO_OUTPUT = FloatField()
+
+_ZERO_TOTALS = {'rating_sum': 0, 'rating_count': 0, 'times_used': 0, 'successful_uses': 0}
+
+
+def _ratio(numerator, denominator, scale=1):
+    """numerator * scale / denominator as a float, NULL when the denominator is 0"""
+    return Cast(numerator, _RATIO_OUTPUT) * scale / NullIf(denominator, Value(0))
+
+
+def apply_rating_delta(recipe_id, rating_delta: int, count_delta: int) -> int:
+    """Add to a recipe's rating totals and refresh its average in one UPDATE"""
+    if not rating_delta and not count_delta:
+        return 0
+    rating_sum = F('rating_sum') + rating_delta
+    rating_count = F('rating_count') + count_delta
+    return ProcessingRecipe.objects.filter(pk=recipe_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        average_rating=Coalesce(_ratio(rating_sum, rating_count), Value(0.0)),
+    )
+
+
+def apply_usage_delta(recipe_id, uses_delta: int, success_delta: int) -> int:
+    """Add to a recipe's usage totals and refresh its success rate in one UPDATE"""
+    if not uses_delta and not success_delta:
+        return 0
+    times_used = F('times_used') + uses_delta
+    successful_uses = F('successful_uses') + success_delta
+    return ProcessingRecipe.objects.filter(pk=recipe_id).update(
+        times_used=times_used,
+        successful_uses=successful_uses,
+        success_rate_percentage=_ratio(successful_uses, times_used, scale=100),
+    )
+
+
+def _expected_totals(recipe_ids=None) -> Dict[int, Dict[str, int]]:
+    """Recount totals per recipe with one grouped query per source table"""
+    ratings = RecipeRating.objects.all()
+    usage = RecipeUsageLog.objects.all()
+    if recipe_ids is not None:
+        ratings = ratings.filter(recipe_id__in=recipe_ids)
+        usage = usage.filter(recipe_id__in=recipe_ids)
+
+    totals: Dict[int, Dict[str, int]] = {}
+    for row in ratings.values('recipe_id').annotate(
+        total=Sum('overall_rating'), count=Count('id')
+    ).order_by():
+        totals.setdefault(row['recipe_id'], dict(_ZERO_TOTALS)).update(
+            rating_sum=row['total'], rating_count=row['count']
+        )
+    for row in usage.values('recipe_id').annotate(
+        count=Count('id'), successes=Count('id', filter=Q(success=True))
+    ).order_by():
+        totals.setdefault(row['recipe_id'], dict(_ZERO_TOTALS)).update(
+            times_used=row['count'], successful_uses=row['successes']
+        )
+    return totals
+
+
+def _derived(totals: Dict[str, int]) -> Dict:
+    rating_count = totals['rating_count']
+    times_used = totals['times_used']
+    return {
+        'average_rating': round(totals['rating_sum'] / rating_count, 2) if rating_count else 0,
+        'success_rate_percentage': (
+            round(totals['successful_uses'] * 100 / times_used, 2) if times_used else None
+        ),
+    }
+
+
+def _close(stored, expected) -> bool:
+    if stored is None or expected is None:
+        return stored is None and expected is None
+    return abs(float(stored) - expected) < 0.006
+
+
+def check_recipe_stats(repair: bool = False, recipe_ids=None, batch_size: int = 1000) -> List[int]:
+    """
+    Compare stored recipe totals with a recount of ratings and usage logs.
+
+    Returns the ids of recipes that drifted; with ``repair`` their totals and
+    derived fields are rewritten in bulk.
+    """
+    expected = _expected_totals(recipe_ids)
+    recipes = ProcessingRecipe.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    stored = recipes.values_list(
+        'pk', 'rating_sum', 'rating_count', 'times_used', 'successful_uses',
+        'average_rating', 'success_rate_percentage'
+    )
+
+    drifted = []
+    for pk, *counters, average_rating, success_rate in stored.iterator(chunk_size=5000):
+        totals = expected.get(pk, _ZERO_TOTALS)
+        derived = _derived(totals)
+        in_sync = (
+            counters == [totals[field] for field in _ZERO_TOTALS]
+            and _close(average_rating, derived['average_rating'])
+            and _close(success_rate, derived['success_rate_percentage'])
+        )
+        if not in_sync:
+            drifted.append(ProcessingRecipe(pk=pk, **totals, **derived))
+
+    if repair and drifted:
+        ProcessingRecipe.objects.bulk_update(
+            drifted,
+            ['rating_sum', 'rating_count', 'average_rating', 'times_used', 'successful_uses',
+             'success_rate_percentage'],
+            batch_size=batch_size
+        )
+    return [recipe.pk for recipe in drifted]
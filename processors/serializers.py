@@ -9,9 +9,12 @@ Features:
 - Processor profile management
 """
 
+from collections import defaultdict
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db.models import Avg, Count, Q
+from core.base_serializers import BatchContextListSerializer, BatchContextMixin
 from .models import (
     ProcessingRecipe, RecipeRating, RecipeUsageLog, 
     RecipeComment, ProcessorProfile
@@ -20,6 +23,58 @@ from .models import (
 User = get_user_model()
 
 
+def _users_by_id(user_ids, with_processor_profile=False):
+    """Users for a page of objects in one query"""
+    users = User.objects.all()
+    if with_processor_profile:
+        users = users.select_related('processor_profile')
+    return users.in_bulk(set(user_ids))
+
+
+def load_comment_threads(comments, inline_depth):
+    """
+    Reply subtrees of ``comments`` down to ``inline_depth`` levels below each.
+    
+    Returns the authors of every loaded comment, replies grouped by parent
+    id, and the ids whose direct replies were loaded ("expanded").
+    """
+    comments = list(comments)
+    subtrees = Q()
+    for comment in comments:
+        if comment.path:
+            subtrees |= Q(path__startswith=comment.path, depth__gt=comment.depth,
+                          depth__lte=comment.depth + inline_depth)
+    
+    replies = defaultdict(list)
+    loaded = list(comments)
+    if subtrees:
+        for reply in RecipeComment.objects.filter(subtrees).order_by('depth', '-created_at'):
+            replies[reply.parent_id].append(reply)
+            loaded.append(reply)
+    
+    # A comment is expanded when it lies above the inline depth of its top comment
+    expanded = set()
+    for comment in comments:
+        frontier = [comment]
+        for _ in range(inline_depth):
+            expanded.update(node.pk for node in frontier)
+            frontier = [reply for node in frontier for reply in replies.get(node.pk, [])]
+    
+    return {
+        'users': _users_by_id(comment.user_id for comment in loaded),
+        'replies': replies,
+        'expanded': expanded,
+    }
+
+
+def _basic_user_details(user):
+    return {
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+    }
+
+
 class ProcessorProfileSerializer(serializers.ModelSerializer):
     """Serializer for processor profiles"""
     
@@ -52,7 +107,7 @@ class ProcessorProfileSerializer(serializers.ModelSerializer):
         }
 
 
-class RecipeRatingSerializer(serializers.ModelSerializer):
+class RecipeRatingSerializer(BatchContextMixin, serializers.ModelSerializer):
     """Serializer for recipe ratings"""
     
     user_details = serializers.SerializerMethodField()
@@ -67,44 +122,74 @@ class RecipeRatingSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['user', 'created_at', 'updated_at']
+        list_serializer_class = BatchContextListSerializer
+    
+    def load_batch(self, ratings):
+        return {'users': _users_by_id(rating.user_id for rating in ratings)}
     
     def get_user_details(self, obj):
-        return {
-            'username': obj.user.username,
-            'first_name': obj.user.first_name,
-            'last_name': obj.user.last_name,
-        }
+        return _basic_user_details(self.batch(obj)['users'][obj.user_id])
 
 
-class RecipeCommentSerializer(serializers.ModelSerializer):
-    """Serializer for recipe comments"""
+class RecipeCommentSerializer(BatchContextMixin, serializers.ModelSerializer):
+    """
+    Serializer for recipe comments with their reply threads.
+    
+    Each serialized comment carries its replies up to INLINE_REPLY_DEPTH levels
+    below it, loaded for the whole page with one materialized-path query;
+    deeper branches report has_more_replies and load lazily from the
+    comment's replies endpoint.
+    """
+    
+    INLINE_REPLY_DEPTH = 3
     
     user_details = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
+    has_more_replies = serializers.SerializerMethodField()
     
     class Meta:
         model = RecipeComment
         fields = [
             'id', 'recipe', 'user', 'user_details', 'parent',
             'content', 'is_question', 'is_answered', 'helpful_count',
-            'replies', 'created_at', 'updated_at'
+            'depth', 'reply_count', 'replies', 'has_more_replies',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['user', 'helpful_count', 'created_at', 'updated_at']
+        read_only_fields = [
+            'user', 'helpful_count', 'depth', 'reply_count', 'created_at', 'updated_at'
+        ]
+        list_serializer_class = BatchContextListSerializer
     
-    def get_user_details(self, obj):
-        return {
-            'username': obj.user.username,
-            'first_name': obj.user.first_name,
-            'last_name': obj.user.last_name,
+    def validate_parent(self, parent):
+        if parent is not None and parent.depth + 1 > RecipeComment.MAX_DEPTH:
+            raise serializers.ValidationError("This thread is too deep to reply to")
+        return parent
+    
+    def load_batch(self, comments):
+        """Authors and reply subtrees for the page: one query each"""
+        return load_comment_threads(comments, self.INLINE_REPLY_DEPTH)
+    
+    def set_batch(self, objects):
+        super().set_batch(objects)
+        # Replies are serialized from the same batch
+        self._batch_keys |= self._batch['expanded'] | {
+            reply.pk for replies in self._batch['replies'].values() for reply in replies
         }
     
+    def get_user_details(self, obj):
+        return _basic_user_details(self.batch(obj)['users'][obj.user_id])
+    
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return RecipeCommentSerializer(obj.replies.all(), many=True, context=self.context).data
-        return []
+        batch = self.batch(obj)
+        if obj.pk not in batch['expanded']:
+            return []
+        return [self.to_representation(reply) for reply in batch['replies'].get(obj.pk, [])]
+    
+    def get_has_more_replies(self, obj):
+        return obj.reply_count > 0 and obj.pk not in self.batch(obj)['expanded']
 
 
-class RecipeUsageLogSerializer(serializers.ModelSerializer):
+class RecipeUsageLogSerializer(BatchContextMixin, serializers.ModelSerializer):
     """Serializer for recipe usage logs"""
     
     user_details = serializers.SerializerMethodField()
@@ -117,15 +202,22 @@ class RecipeUsageLogSerializer(serializers.ModelSerializer):
             'actual_yield', 'processing_time_actual', 'notes', 'issues_encountered'
         ]
         read_only_fields = ['user', 'used_at']
+        list_serializer_class = BatchContextListSerializer
+    
+    def load_batch(self, usage_logs):
+        return {
+            'users': _users_by_id((log.user_id for log in usage_logs), with_processor_profile=True)
+        }
     
     def get_user_details(self, obj):
+        user = self.batch(obj)['users'][obj.user_id]
         return {
-            'username': obj.user.username,
-            'business_name': getattr(obj.user.processor_profile, 'business_name', '') if hasattr(obj.user, 'processor_profile') else '',
+            'username': user.username,
+            'business_name': getattr(user.processor_profile, 'business_name', '') if hasattr(user, 'processor_profile') else '',
         }
 
 
-class ProcessingRecipeListSerializer(serializers.ModelSerializer):
+class ProcessingRecipeListSerializer(BatchContextMixin, serializers.ModelSerializer):
     """Serializer for recipe listing (minimal data)"""
     
     processor_details = serializers.SerializerMethodField()
@@ -145,28 +237,42 @@ class ProcessingRecipeListSerializer(serializers.ModelSerializer):
             'processor', 'times_used', 'average_rating', 'rating_count',
             'created_at', 'updated_at'
         ]
+        list_serializer_class = BatchContextListSerializer
+    
+    def load_batch(self, recipes):
+        """Processors (with profiles) and rating histograms for the page, one query each"""
+        distribution = defaultdict(dict)
+        rows = RecipeRating.objects.filter(
+            recipe_id__in=[recipe.pk for recipe in recipes]
+        ).values('recipe_id', 'overall_rating').annotate(count=Count('id')).order_by()
+        for row in rows:
+            distribution[row['recipe_id']][row['overall_rating']] = row['count']
+        return {
+            'processors': _users_by_id(
+                (recipe.processor_id for recipe in recipes), with_processor_profile=True
+            ),
+            'rating_distribution': distribution,
+        }
     
     def get_processor_details(self, obj):
-        processor_profile = getattr(obj.processor, 'processor_profile', None)
+        processor = self.batch(obj)['processors'][obj.processor_id]
+        processor_profile = getattr(processor, 'processor_profile', None)
         return {
-            'username': obj.processor.username,
-            'first_name': obj.processor.first_name,
-            'last_name': obj.processor.last_name,
+            'username': processor.username,
+            'first_name': processor.first_name,
+            'last_name': processor.last_name,
             'business_name': processor_profile.business_name if processor_profile else '',
             'processor_type': processor_profile.processor_type if processor_profile else '',
             'is_verified': processor_profile.is_verified if processor_profile else False,
         }
     
     def get_rating_summary(self, obj):
+        counts = self.batch(obj)['rating_distribution'].get(obj.pk, {})
         return {
             'average_rating': float(obj.average_rating),
             'rating_count': obj.rating_count,
             'rating_distribution': {
-                '5_star': obj.ratings.filter(overall_rating=5).count(),
-                '4_star': obj.ratings.filter(overall_rating=4).count(),
-                '3_star': obj.ratings.filter(overall_rating=3).count(),
-                '2_star': obj.ratings.filter(overall_rating=2).count(),
-                '1_star': obj.ratings.filter(overall_rating=1).count(),
+                f'{stars}_star': counts.get(stars, 0) for stars in range(5, 0, -1)
             }
         }
 
@@ -174,10 +280,12 @@ class ProcessingRecipeListSerializer(serializers.ModelSerializer):
 class ProcessingRecipeDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed recipe view"""
     
+    COMMENT_PREVIEW_COUNT = 10
+    
     processor_details = serializers.SerializerMethodField()
     rating_summary = serializers.SerializerMethodField()
     recent_ratings = RecipeRatingSerializer(source='ratings', many=True, read_only=True)
-    comments = RecipeCommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     usage_statistics = serializers.SerializerMethodField()
     
     class Meta:
@@ -216,6 +324,11 @@ class ProcessingRecipeDetailSerializer(serializers.ModelSerializer):
             'average_recipe_rating': float(processor_profile.average_recipe_rating) if processor_profile else 0.0,
         }
     
+    def get_comments(self, obj):
+        """Latest top-level threads; the recipe's comments endpoint pages through the rest"""
+        roots = obj.comments.filter(depth=0).order_by('-created_at')[:self.COMMENT_PREVIEW_COUNT]
+        return RecipeCommentSerializer(roots, many=True, context=self.context).data
+    
     def get_rating_summary(self, obj):
         ratings = obj.ratings.all()
         return {
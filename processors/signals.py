@@ -0,0 +1,135 @@
+"""
+AgriConnect Processors Signals
+Keep recipe rating / success-rate totals in step with ratings and usage
+logs, keep comment reply counts current, queue recipes for the similarity
+index when their content changes, and feed recipe usage, ratings and
+comments into trending scores
+"""
+
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from core import trending
+from .models import (
+    ProcessingRecipe, ProcessorProfile, RecipeComment, RecipeRating, RecipeSimilarity, RecipeUsageLog
+)
+from .recipe_stats import apply_rating_delta, apply_usage_delta
+from .similarity import FEATURE_SOURCE_FIELDS, queue_refresh
+
+
+def _recipe_cascade(origin):
+    """True when the delete comes from removing the recipe itself"""
+    return origin is not None and getattr(origin, 'model', type(origin)) is ProcessingRecipe
+
+
+def _stored(model, instance, *fields):
+    """Persisted values of ``fields`` for an existing row, or None when adding"""
+    if instance._state.adding:
+        return None
+    return model.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=RecipeRating)
+def capture_rating_state(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._stats_previous = _stored(RecipeRating, instance, 'recipe_id', 'overall_rating')
+
+
+@receiver(post_save, sender=RecipeRating)
+def update_recipe_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_stats_previous', None)
+    if previous and previous['recipe_id'] != instance.recipe_id:
+        apply_rating_delta(previous['recipe_id'], -previous['overall_rating'], -1)
+        previous = None
+    if previous:
+        apply_rating_delta(instance.recipe_id, instance.overall_rating - previous['overall_rating'], 0)
+    else:
+        apply_rating_delta(instance.recipe_id, instance.overall_rating, 1)
+    instance._stats_previous = None
+
+
+@receiver(post_delete, sender=RecipeRating)
+def remove_recipe_rating(sender, instance, origin=None, **kwargs):
+    if not _recipe_cascade(origin):
+        apply_rating_delta(instance.recipe_id, -instance.overall_rating, -1)
+
+
+@receiver(pre_save, sender=RecipeUsageLog)
+def capture_usage_state(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._stats_previous = _stored(RecipeUsageLog, instance, 'recipe_id', 'success')
+
+
+@receiver(post_save, sender=RecipeUsageLog)
+def update_recipe_usage(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_stats_previous', None)
+    if previous and previous['recipe_id'] != instance.recipe_id:
+        apply_usage_delta(previous['recipe_id'], -1, -int(previous['success']))
+        previous = None
+    if previous:
+        apply_usage_delta(instance.recipe_id, 0, int(instance.success) - int(previous['success']))
+    else:
+        apply_usage_delta(instance.recipe_id, 1, int(instance.success))
+    instance._stats_previous = None
+
+
+@receiver(post_delete, sender=RecipeUsageLog)
+def remove_recipe_usage(sender, instance, origin=None, **kwargs):
+    if not _recipe_cascade(origin):
+        apply_usage_delta(instance.recipe_id, -1, -int(instance.success))
+
+
+@receiver(post_delete, sender=RecipeComment)
+def decrement_parent_reply_count(sender, instance, origin=None, **kwargs):
+    """Replies deleted with their parent find no row to update, so only survivors change"""
+    if instance.parent_id and not _recipe_cascade(origin):
+        RecipeComment.objects.filter(pk=instance.parent_id, reply_count__gt=0).update(
+            reply_count=F('reply_count') - 1
+        )
+
+
+@receiver(post_save, sender=ProcessingRecipe)
+def queue_recipe_similarity(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not set(update_fields) & FEATURE_SOURCE_FIELDS):
+        return
+    queue_refresh([instance.pk])
+
+
+@receiver(pre_delete, sender=ProcessingRecipe)
+def capture_similarity_neighbours(sender, instance, **kwargs):
+    """Recipes listing this one lose an entry once it is deleted"""
+    instance._similarity_neighbours = list(
+        RecipeSimilarity.objects.filter(similar_recipe_id=instance.pk).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=ProcessingRecipe)
+def queue_similarity_neighbours(sender, instance, **kwargs):
+    neighbours = getattr(instance, '_similarity_neighbours', [])
+    if neighbours:
+        # Skip neighbours removed in the same cascade
+        queue_refresh(ProcessingRecipe.objects.filter(pk__in=neighbours).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=ProcessorProfile)
+def queue_processor_recipes_similarity(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Processor type is one of the recipe features"""
+    if raw or (update_fields is not None and 'processor_type' not in update_fields):
+        return
+    queue_refresh(ProcessingRecipe.objects.filter(processor_id=instance.user_id).values_list('pk', flat=True))
+
+
+trending.register_source(
+    RecipeUsageLog, 'recipe',
+    weight=lambda usage: 2.0 if usage.success else 1.0,
+    timestamp_field='used_at'
+)
+trending.register_source(
+    RecipeRating, 'recipe',
+    weight=lambda rating: 0.5 + rating.overall_rating / 5
+)
+trending.register_source(RecipeComment, 'recipe', weight=0.5)
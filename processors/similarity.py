@@ -0,0 +1,323 @@
+"""
+AgriConnect Recipe Similarity Index
+Content-based nearest neighbours for ProcessingRecipeViewSet.similar
+
+Every recipe is turned into a bag of namespaced features (tags, input
+materials, equipment, output products, words from the processing steps and
+the processor type), hashed into a fixed-width sparse vector, weighted by
+IDF over the catalog and L2-normalised. Cosine similarity against the
+public catalog is then a sparse matrix product, evaluated in row blocks,
+and the top-K public neighbours per recipe are stored in RecipeSimilarity.
+
+Each recipe's weighted, hashed term frequencies are stored in
+RecipeFeatureVector. Incremental runs take the recipes queued in
+RecipeSimilarityRefresh, re-extract features for those recipes only and
+reuse the stored vectors of the rest. They recompute the changed recipes'
+own lists plus those other recipes whose lists the changed recipes can
+enter (similarity above their current K-th score) or must leave (currently
+listed). IDF is recomputed from the stored vectors on every run; changes
+to FIELD_WEIGHTS take effect at the next full rebuild, which re-extracts
+every recipe.
+"""
+
+import logging
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.ranking import top_k_columns
+from .models import ProcessingRecipe, RecipeFeatureVector, RecipeSimilarity, RecipeSimilarityRefresh
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECIPE_SIMILARITY_CONFIG = {
+    'TOP_K': 10,
+    'BLOCK_SIZE': 256,
+    'HASH_BITS': 18,
+    'MIN_SCORE': 0.05,
+    # Relative weight of each feature namespace
+    'FIELD_WEIGHTS': {
+        'tag': 1.0,
+        'input': 1.5,
+        'equipment': 1.0,
+        'output': 1.2,
+        'step': 0.4,
+        'processor_type': 0.8,
+    },
+}
+
+# Statuses whose public recipes may be recommended
+LISTED_STATUSES = ['public', 'verified']
+
+# Recipe fields that feed the feature vector; saves touching none skip reindexing
+FEATURE_SOURCE_FIELDS = frozenset([
+    'tags', 'input_materials', 'equipment_required', 'output_products', 'processing_steps',
+    'status', 'is_public', 'processor', 'processor_id',
+])
+
+_WORD_RE = re.compile(r'[a-z][a-z]+')
+
+_STOP_WORDS = frozenset("""
+    the and for with into from then until each all any are was were has have had this that
+    them they its per about after before over under while when use using used minutes minute
+    hours hour step steps add let make sure well
+""".split())
+
+
+def get_similarity_config() -> Dict:
+    config = dict(DEFAULT_RECIPE_SIMILARITY_CONFIG)
+    config.update(getattr(settings, 'RECIPE_SIMILARITY_CONFIG', {}))
+    return config
+
+
+def _label(item) -> str:
+    """Display name of a JSON list entry (plain string or dict with a name)"""
+    if isinstance(item, dict):
+        item = item.get('name') or item.get('material') or item.get('product') or ''
+    return ' '.join(str(item).lower().replace('_', ' ').split())
+
+
+def recipe_features(tags, inputs, equipment, outputs, steps, processor_type) -> Counter:
+    """Namespaced feature counts for one recipe"""
+    features = Counter()
+    for namespace, items in (('tag', tags), ('input', inputs), ('equipment', equipment), ('output', outputs)):
+        for item in items or []:
+            label = _label(item)
+            if label:
+                features[f'{namespace}:{label}'] += 1
+                # Single words let "maize kernels" match "white maize"
+                for word in _WORD_RE.findall(label):
+                    if word not in _STOP_WORDS:
+                        features[f'{namespace}~{word}'] += 0.5
+    for step in steps or []:
+        text = step.get('description', '') if isinstance(step, dict) else str(step)
+        for word in _WORD_RE.findall(text.lower()):
+            if word not in _STOP_WORDS:
+                features[f'step:{word}'] += 1
+    if processor_type:
+        features[f'processor_type:{processor_type}'] += 1
+    return features
+
+
+def _bucket(feature: str, bits: int) -> int:
+    return zlib.crc32(feature.encode('utf-8')) & ((1 << bits) - 1)
+
+
+def _term_vector(row, config: Dict) -> List:
+    """[[bucket, weight], ...] for a (tags, inputs, equipment, outputs, steps, processor_type) row"""
+    bits = config['HASH_BITS']
+    field_weights = config['FIELD_WEIGHTS']
+    buckets = Counter()
+    for feature, count in recipe_features(*row).items():
+        namespace = re.split('[:~]', feature, maxsplit=1)[0]
+        # Sublinear term frequency
+        buckets[_bucket(feature, bits)] += field_weights.get(namespace, 1.0) * float(np.log1p(count))
+    return [[bucket, weight] for bucket, weight in sorted(buckets.items())]
+
+
+def term_vectors(recipe_ids: List, config: Dict, refresh_ids: Optional[Iterable] = None) -> Dict:
+    """
+    Term vectors by recipe id. Recipes in ``refresh_ids`` (every recipe when
+    None) and recipes without a stored vector are extracted and stored; the
+    rest are read from RecipeFeatureVector.
+    """
+    vectors = {}
+    if refresh_ids is not None:
+        refresh_ids = set(refresh_ids)
+        stored = RecipeFeatureVector.objects.filter(hash_bits=config['HASH_BITS']).values_list('recipe_id', 'buckets')
+        vectors = {
+            recipe_id: buckets for recipe_id, buckets in stored.iterator(chunk_size=5000)
+            if recipe_id not in refresh_ids
+        }
+
+    stale = [recipe_id for recipe_id in recipe_ids if recipe_id not in vectors]
+    sources = ProcessingRecipe.objects.values_list(
+        'id', 'tags', 'input_materials', 'equipment_required', 'output_products',
+        'processing_steps', 'processor__processor_profile__processor_type'
+    )
+    now = timezone.now()
+    for start in range(0, len(stale), 2000):
+        chunk = stale[start:start + 2000]
+        fresh = []
+        for row in sources.filter(pk__in=chunk):
+            vectors[row[0]] = _term_vector(row[1:], config)
+            fresh.append(RecipeFeatureVector(
+                recipe_id=row[0], buckets=vectors[row[0]], hash_bits=config['HASH_BITS'], computed_at=now
+            ))
+        RecipeFeatureVector.objects.bulk_create(
+            fresh,
+            update_conflicts=True,
+            unique_fields=['recipe'],
+            update_fields=['buckets', 'hash_bits', 'computed_at']
+        )
+    return vectors
+
+
+class RecipeIndex:
+    """
+    Hashed TF-IDF vectors for the whole catalog. Only ``refresh_ids`` are
+    re-extracted (every recipe when None); see term_vectors.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, refresh_ids: Optional[Iterable] = None):
+        self.config = config or get_similarity_config()
+        recipes = list(ProcessingRecipe.objects.values_list('id', 'is_public', 'status').order_by('id'))
+        self.recipe_ids = [row[0] for row in recipes]
+        self.index = {recipe_id: position for position, recipe_id in enumerate(self.recipe_ids)}
+        self.listed = np.array(
+            [bool(row[1]) and row[2] in LISTED_STATUSES for row in recipes], dtype=bool
+        )
+
+        vectors = term_vectors(self.recipe_ids, self.config, refresh_ids)
+        rows, cols, values = [], [], []
+        for position, recipe_id in enumerate(self.recipe_ids):
+            for bucket, weight in vectors.get(recipe_id, []):
+                rows.append(position)
+                cols.append(bucket)
+                values.append(weight)
+        counts = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, cols)),
+            shape=(len(recipes), 1 << self.config['HASH_BITS'])
+        )
+        counts.sum_duplicates()
+
+        # Smoothed IDF over the catalog
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + len(recipes)) / (1 + document_frequency)).astype(np.float32) + 1
+        vectors = counts @ sparse.diags(idf)
+
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.vectors = sparse.csr_matrix(sparse.diags(1 / norms) @ vectors)
+        self.candidates = self.vectors[self.listed].T.tocsc()
+        self.candidate_positions = np.flatnonzero(self.listed)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def similarities(self, positions: np.ndarray) -> np.ndarray:
+        """Dense cosine similarity of ``positions`` against every listed recipe"""
+        scores = (self.vectors[positions] @ self.candidates).toarray()
+        # Never recommend a recipe as similar to itself
+        own = np.searchsorted(self.candidate_positions, positions)
+        hit = (own < len(self.candidate_positions)) & (
+            self.candidate_positions[np.minimum(own, len(self.candidate_positions) - 1)] == positions
+        )
+        scores[np.flatnonzero(hit), own[hit]] = -np.inf
+        return scores
+
+
+def compute_similarities(index: RecipeIndex, recipe_ids: Optional[Iterable] = None) -> List[RecipeSimilarity]:
+    """Top-K RecipeSimilarity rows for the given recipes (all by default)"""
+    config = index.config
+    if recipe_ids is None:
+        positions = np.arange(len(index))
+    else:
+        positions = np.array(
+            sorted(index.index[recipe_id] for recipe_id in recipe_ids if recipe_id in index.index),
+            dtype=np.int64
+        )
+
+    now = timezone.now()
+    rows = []
+    for start in range(0, len(positions), config['BLOCK_SIZE']):
+        block = positions[start:start + config['BLOCK_SIZE']]
+        scores = index.similarities(block)
+        best = top_k_columns(scores, config['TOP_K'])
+        for offset, position in enumerate(block):
+            rank = 0
+            for column in best[offset]:
+                score = scores[offset, column]
+                if not score >= config['MIN_SCORE']:
+                    break
+                rank += 1
+                rows.append(RecipeSimilarity(
+                    recipe_id=index.recipe_ids[position],
+                    similar_recipe_id=index.recipe_ids[index.candidate_positions[column]],
+                    rank=rank,
+                    score=float(score),
+                    computed_at=now,
+                ))
+    return rows
+
+
+def affected_recipes(index: RecipeIndex, changed_ids: Iterable) -> Set:
+    """Recipes whose stored lists a change to ``changed_ids`` can alter"""
+    config = index.config
+    changed = [recipe_id for recipe_id in changed_ids if recipe_id in index.index]
+    affected = set(changed)
+    # Currently listed neighbours may drop out
+    affected.update(
+        RecipeSimilarity.objects.filter(similar_recipe_id__in=changed).values_list('recipe_id', flat=True)
+    )
+    if not changed:
+        return affected
+
+    # Lowest stored score per recipe; recipes with short lists accept anything above MIN_SCORE
+    thresholds = np.full(len(index), config['MIN_SCORE'], dtype=np.float32)
+    full_lists = RecipeSimilarity.objects.filter(rank=config['TOP_K']).values_list('recipe_id', 'score')
+    for recipe_id, score in full_lists.iterator(chunk_size=5000):
+        if recipe_id in index.index:
+            thresholds[index.index[recipe_id]] = score
+
+    # Changed recipes that are listed can enter other recipes' lists (cosine is symmetric)
+    positions = np.array([index.index[recipe_id] for recipe_id in changed], dtype=np.int64)
+    listed = positions[index.listed[positions]]
+    for start in range(0, len(listed), config['BLOCK_SIZE']):
+        block = listed[start:start + config['BLOCK_SIZE']]
+        scores = (index.vectors[block] @ index.vectors.T).toarray()
+        scores[np.arange(len(block)), block] = -np.inf
+        hits = np.flatnonzero((scores > thresholds[None, :]).any(axis=0))
+        affected.update(index.recipe_ids[position] for position in hits)
+    return affected
+
+
+def rebuild_index() -> int:
+    """Recompute every recipe's neighbours; returns rows written"""
+    started = timezone.now()
+    index = RecipeIndex()
+    rows = compute_similarities(index)
+    with transaction.atomic():
+        RecipeSimilarity.objects.all().delete()
+        RecipeSimilarity.objects.bulk_create(rows, batch_size=2000)
+        RecipeSimilarityRefresh.objects.filter(requested_at__lte=started).delete()
+    logger.info("Rebuilt recipe similarity index: %s rows for %s recipes", len(rows), len(index))
+    return len(rows)
+
+
+def refresh_queued(limit: int = 1000) -> Dict[str, int]:
+    """Incremental pass over recipes queued by content changes"""
+    started = timezone.now()
+    queued = list(
+        RecipeSimilarityRefresh.objects.order_by('requested_at').values_list('recipe_id', flat=True)[:limit]
+    )
+    if not queued:
+        return {'queued': 0, 'recomputed': 0}
+
+    index = RecipeIndex(refresh_ids=queued)
+    recompute = sorted(affected_recipes(index, queued), key=str)
+    rows = compute_similarities(index, recompute)
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id__in=recompute).delete()
+        RecipeSimilarity.objects.bulk_create(rows, batch_size=2000)
+        RecipeSimilarityRefresh.objects.filter(recipe_id__in=queued, requested_at__lte=started).delete()
+    logger.info("Refreshed similar recipes for %s queued / %s affected recipes", len(queued), len(recompute))
+    return {'queued': len(queued), 'recomputed': len(recompute)}
+
+
+def queue_refresh(recipe_ids: Iterable):
+    """Mark recipes for the next incremental similarity run"""
+    RecipeSimilarityRefresh.objects.bulk_create(
+        [RecipeSimilarityRefresh(recipe_id=recipe_id) for recipe_id in set(recipe_ids)],
+        update_conflicts=True,
+        unique_fields=['recipe'],
+        update_fields=['requested_at']
+    )
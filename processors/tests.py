@@ -0,0 +1,182 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import ProcessingRecipe, RecipeComment, RecipeRating, RecipeSimilarity, RecipeSimilarityRefresh, RecipeUsageLog
+from .recipe_stats import check_recipe_stats
+from .serializers import RecipeCommentSerializer
+from .similarity import rebuild_index, refresh_queued
+
+User = get_user_model()
+
+
+class RecipeFixtureMixin:
+    """A processor and a few users to rate, use and discuss recipes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.processor = User.objects.create_user('+233200000500', password='secret', roles=['PROCESSOR'])
+        cls.users = [
+            User.objects.create_user(f'+23320000051{number}', password='secret', roles=['FARMER'])
+            for number in range(4)
+        ]
+
+    @classmethod
+    def make_recipe(cls, name, **fields):
+        fields.setdefault('status', 'public')
+        fields.setdefault('is_public', True)
+        return ProcessingRecipe.objects.create(
+            recipe_name=name, processor=cls.processor, description=name, processing_time_minutes=60, **fields
+        )
+
+
+class RecipeStatsTests(RecipeFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.recipe = self.make_recipe('Gari')
+
+    def rate(self, user, rating):
+        return RecipeRating.objects.create(
+            recipe=self.recipe, user=user, overall_rating=rating,
+            clarity_rating=rating, effectiveness_rating=rating, accuracy_rating=rating
+        )
+
+    def test_running_totals_match_a_recount(self):
+        ratings = [self.rate(user, rating) for user, rating in zip(self.users, (5, 4, 2, 1))]
+        ratings[2].overall_rating = 3
+        ratings[2].save()
+        ratings[3].delete()
+        logs = [RecipeUsageLog.objects.create(recipe=self.recipe, user=user) for user in self.users]
+        logs[0].success = False
+        logs[0].save()
+        logs[1].delete()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual((self.recipe.rating_sum, self.recipe.rating_count), (12, 3))
+        self.assertEqual(float(self.recipe.average_rating), 4.0)
+        self.assertEqual((self.recipe.times_used, self.recipe.successful_uses), (3, 2))
+        self.assertAlmostEqual(float(self.recipe.success_rate_percentage), 66.67, places=2)
+        self.assertEqual(check_recipe_stats(), [])
+
+    def test_drift_is_reported_and_repaired(self):
+        self.rate(self.users[0], 4)
+        ProcessingRecipe.objects.filter(pk=self.recipe.pk).update(rating_sum=0, average_rating=0)
+
+        self.assertEqual(check_recipe_stats(), [self.recipe.pk])
+        self.assertEqual(check_recipe_stats(repair=True), [self.recipe.pk])
+        self.recipe.refresh_from_db()
+        self.assertEqual((self.recipe.rating_sum, float(self.recipe.average_rating)), (4, 4.0))
+        self.assertEqual(check_recipe_stats(), [])
+
+
+class RecipeSimilarityTests(RecipeFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.flour = self.make_recipe(
+            'Maize flour', tags=['milling'], input_materials=['white maize'], equipment_required=['hammer mill'],
+            output_products=['maize flour'], processing_steps=['Dry the maize kernels', 'Mill the kernels finely']
+        )
+        self.meal = self.make_recipe(
+            'Maize meal', tags=['milling'], input_materials=['yellow maize'], equipment_required=['hammer mill'],
+            output_products=['maize meal'], processing_steps=['Clean the maize kernels', 'Mill the kernels coarsely']
+        )
+        self.oil = self.make_recipe(
+            'Palm oil', tags=['pressing'], input_materials=['palm fruit'], equipment_required=['screw press'],
+            output_products=['palm oil'], processing_steps=['Boil the fruit', 'Press out the oil']
+        )
+        self.draft = self.make_recipe(
+            'Maize grits', status='draft', is_public=False, tags=['milling'], input_materials=['white maize'],
+            equipment_required=['hammer mill'], output_products=['maize grits']
+        )
+
+    def neighbours(self, recipe):
+        return list(
+            RecipeSimilarity.objects.filter(recipe=recipe).order_by('rank').values_list('similar_recipe', flat=True)
+        )
+
+    def rows(self):
+        return {
+            (recipe_id, similar_id, rank, round(score, 4))
+            for recipe_id, similar_id, rank, score in RecipeSimilarity.objects.values_list(
+                'recipe_id', 'similar_recipe_id', 'rank', 'score'
+            )
+        }
+
+    def test_similar_recipes_share_ingredients_and_equipment(self):
+        rebuild_index()
+        self.assertEqual(self.neighbours(self.flour)[0], self.meal.pk)
+        # Unlisted recipes get neighbours but are never recommended
+        self.assertEqual(self.neighbours(self.draft)[0], self.flour.pk)
+        self.assertFalse(RecipeSimilarity.objects.filter(similar_recipe=self.draft).exists())
+        self.assertFalse(RecipeSimilarityRefresh.objects.exists())
+
+    def test_incremental_refresh_matches_a_full_rebuild(self):
+        rebuild_index()
+        self.oil.input_materials = ['white maize']
+        self.oil.equipment_required = ['hammer mill']
+        self.oil.save()
+        self.draft.status = 'public'
+        self.draft.is_public = True
+        self.draft.save(update_fields=['status', 'is_public'])
+        self.assertEqual(RecipeSimilarityRefresh.objects.count(), 2)
+
+        refresh_queued()
+        incremental = self.rows()
+        self.assertIn(self.draft.pk, self.neighbours(self.flour))
+        rebuild_index()
+        self.assertEqual(incremental, self.rows())
+
+
+class RecipeCommentThreadTests(RecipeFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.recipe = self.make_recipe('Gari')
+
+    def thread(self, length):
+        """A top-level comment with a single chain of ``length`` replies below it"""
+        comments = [RecipeComment.objects.create(recipe=self.recipe, user=self.users[0], content='How long to ferment?')]
+        for number in range(length):
+            comments.append(RecipeComment.objects.create(
+                recipe=self.recipe, user=self.users[number % 4], parent=comments[-1], content=f'Reply {number}'
+            ))
+        return comments
+
+    def serialize_roots(self):
+        roots = RecipeComment.objects.filter(recipe=self.recipe, depth=0).order_by('created_at')
+        return RecipeCommentSerializer(roots, many=True).data
+
+    def test_paths_and_reply_counts_follow_the_tree(self):
+        root, reply, nested = self.thread(2)
+        sibling = RecipeComment.objects.create(recipe=self.recipe, user=self.users[1], parent=root, content='Two days')
+        for comment in (root, reply, nested):
+            comment.refresh_from_db()
+
+        self.assertEqual((reply.depth, nested.depth), (1, 2))
+        self.assertEqual(nested.path, f'{root.pk}/{reply.pk}/{nested.pk}/')
+        self.assertEqual(root.reply_count, 2)
+        sibling.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+    def test_threads_are_inlined_down_to_the_inline_depth(self):
+        self.thread(RecipeCommentSerializer.INLINE_REPLY_DEPTH + 1)
+        [root] = self.serialize_roots()
+
+        node = root
+        for _ in range(RecipeCommentSerializer.INLINE_REPLY_DEPTH):
+            self.assertFalse(node['has_more_replies'])
+            [node] = node['replies']
+        # The last inlined reply has a reply of its own, left for the replies endpoint
+        self.assertEqual(node['replies'], [])
+        self.assertTrue(node['has_more_replies'])
+
+    def test_queries_do_not_grow_with_the_threads(self):
+        self.thread(1)
+        with CaptureQueriesContext(connection) as small:
+            self.serialize_roots()
+        for _ in range(3):
+            self.thread(3)
+        with CaptureQueriesContext(connection) as large:
+            self.serialize_roots()
+        self.assertEqual(len(large), len(small))
@@ -15,6 +15,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Q, Avg, Count
 from django.utils import timezone
 from datetime import timedelta
@@ -28,6 +29,7 @@ from .serializers import (
     ProcessingRecipeCreateUpdateSerializer, RecipeRatingSerializer,
     RecipeUsageLogSerializer, RecipeCommentSerializer, ProcessorProfileSerializer
 )
+from .similarity import LISTED_STATUSES
 
 
 class ProcessorProfileViewSet(viewsets.ModelViewSet):
@@ -103,7 +105,7 @@ class ProcessingRecipeViewSet(viewsets.ModelViewSet):
     ViewSet for processing recipe management
     """
     
-    queryset = ProcessingRecipe.objects.select_related('processor').prefetch_related('ratings', 'comments').all()
+    queryset = ProcessingRecipe.objects.select_related('processor').prefetch_related('ratings').all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = [
@@ -162,13 +164,12 @@ class ProcessingRecipeViewSet(viewsets.ModelViewSet):
             serializer = RecipeRatingSerializer(data=request.data)
         
         if serializer.is_valid():
-            if existing_rating:
-                serializer.save()
-            else:
-                serializer.save(recipe=recipe, user=request.user)
-            
-            # Update recipe average rating
-            self._update_recipe_rating(recipe)
+            # Recipe rating totals are updated by signal in the same transaction
+            with transaction.atomic():
+                if existing_rating:
+                    serializer.save()
+                else:
+                    serializer.save(recipe=recipe, user=request.user)
             
             return Response(serializer.data, status=status.HTTP_200_OK)
         
@@ -181,15 +182,9 @@ class ProcessingRecipeViewSet(viewsets.ModelViewSet):
         
         serializer = RecipeUsageLogSerializer(data=request.data)
         if serializer.is_valid():
-            usage_log = serializer.save(recipe=recipe, user=request.user)
-            
-            # Update recipe usage count
-            recipe.times_used += 1
-            recipe.save(update_fields=['times_used'])
-            
-            # Update success rate if applicable
-            if usage_log.success is not None:
-                self._update_recipe_success_rate(recipe)
+            # Usage count and success rate are updated by signal in the same transaction
+            with transaction.atomic():
+                serializer.save(recipe=recipe, user=request.user)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -207,47 +202,42 @@ class ProcessingRecipeViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """Top-level comments with their reply threads, paginated"""
+        recipe = self.get_object()
+        threads = RecipeComment.objects.filter(recipe=recipe, depth=0).order_by('-created_at')
+        
+        page = self.paginate_queryset(threads)
+        if page is not None:
+            serializer = RecipeCommentSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = RecipeCommentSerializer(threads, many=True, context={'request': request})
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['get'])
     def similar(self, request, pk=None):
-        """Get similar recipes"""
+        """Get similar recipes from the precomputed content similarity index"""
         recipe = self.get_object()
         
-        # Find similar recipes based on tags, input materials, and processor type
         similar_recipes = ProcessingRecipe.objects.filter(
+            similar_to__recipe=recipe,
             is_public=True,
-            status='public'
-        ).exclude(id=recipe.id)
-        
-        # Filter by similar tags
-        if recipe.tags:
-            similar_recipes = similar_recipes.filter(
-                tags__overlap=recipe.tags
-            )
-        
-        # Filter by processor type if available
-        if hasattr(recipe.processor, 'processor_profile'):
-            processor_type = recipe.processor.processor_profile.processor_type
-            similar_recipes = similar_recipes.filter(
-                processor__processor_profile__processor_type=processor_type
-            )
-        
-        similar_recipes = similar_recipes.order_by('-average_rating', '-times_used')[:5]
+            status__in=LISTED_STATUSES
+        ).select_related('processor').order_by('similar_to__rank')[:5]
         
         serializer = ProcessingRecipeListSerializer(similar_recipes, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        """Get trending recipes"""
-        # Get recipes with high usage in the last 30 days
-        recent_date = timezone.now() - timedelta(days=30)
+        """Get trending recipes by time-decayed usage, ratings and comments"""
         trending_recipes = ProcessingRecipe.objects.filter(
             is_public=True,
             status='public',
-            usage_logs__used_at__gte=recent_date
-        ).annotate(
-            recent_uses=Count('usage_logs', filter=Q(usage_logs__used_at__gte=recent_date))
-        ).order_by('-recent_uses', '-average_rating')[:10]
+            trending_score__gt=0
+        ).select_related('processor').order_by('-trending_score', '-average_rating')[:10]
         
         serializer = ProcessingRecipeListSerializer(trending_recipes, many=True, context={'request': request})
         return Response(serializer.data)
@@ -274,25 +264,6 @@ class ProcessingRecipeViewSet(viewsets.ModelViewSet):
         
         serializer = ProcessingRecipeListSerializer(my_recipes, many=True, context={'request': request})
         return Response(serializer.data)
-    
-    def _update_recipe_rating(self, recipe):
-        """Update recipe average rating"""
-        ratings = recipe.ratings.all()
-        if ratings.exists():
-            avg_rating = ratings.aggregate(avg=Avg('overall_rating'))['avg']
-            recipe.average_rating = round(avg_rating, 2)
-            recipe.rating_count = ratings.count()
-            recipe.save(update_fields=['average_rating', 'rating_count'])
-    
-    def _update_recipe_success_rate(self, recipe):
-        """Update recipe success rate"""
-        usage_logs = recipe.usage_logs.filter(success__isnull=False)
-        if usage_logs.exists():
-            successful_uses = usage_logs.filter(success=True).count()
-            total_uses = usage_logs.count()
-            success_rate = (successful_uses / total_uses) * 100
-            recipe.success_rate_percentage = round(success_rate, 2)
-            recipe.save(update_fields=['success_rate_percentage'])
 
 
 class RecipeRatingViewSet(viewsets.ModelViewSet):
@@ -311,8 +282,18 @@ class RecipeRatingViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return super().get_queryset().filter(user=self.request.user)
     
+    # Recipe rating totals change by signal; keep them in the rating's transaction
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
 
 class RecipeCommentViewSet(viewsets.ModelViewSet):
@@ -331,6 +312,20 @@ class RecipeCommentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    @action(detail=True, methods=['get'])
+    def replies(self, request, pk=None):
+        """Direct replies to a comment with their own threads, for lazily loading deep branches"""
+        comment = self.get_object()
+        replies = RecipeComment.objects.filter(parent=comment).order_by('-created_at')
+        
+        page = self.paginate_queryset(replies)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(replies, many=True)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def mark_helpful(self, request, pk=None):
         """Mark a comment as helpful"""
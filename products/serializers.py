@@ -3,10 +3,20 @@ AgriConnect Product Serializers
 Handles product catalog, categories, and traceability - Corrected Version
 """
 
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
 from .models import Category, Product, ProductVariation, ProductImage, Certification, TraceabilityRecord
 
 
+def _review_stats(product):
+    """Compact review stats from the denormalized stats row (select_related('review_stats'))"""
+    try:
+        return product.review_stats.compact()
+    except ObjectDoesNotExist:
+        return {'review_count': 0, 'average_rating': 0, 'verified_count': 0,
+                'rating_distribution': {str(i): 0 for i in range(1, 6)}}
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Category serializer with hierarchy support"""
     children = serializers.SerializerMethodField()
@@ -35,6 +45,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     seller_name = serializers.CharField(source='seller.get_full_name', read_only=True)
     seller_username = serializers.CharField(source='seller.username', read_only=True)
     image_url = serializers.ImageField(source='featured_image', read_only=True)
+    review_stats = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -44,8 +55,11 @@ class ProductListSerializer(serializers.ModelSerializer):
             'price_per_unit', 'unit', 'minimum_order_quantity', 'stock_quantity',
             'origin_country', 'origin_region', 'quality_grade',
             'image_url', 'is_featured', 'status', 'views_count', 'orders_count',
-            'created_at', 'updated_at'
+            'review_stats', 'created_at', 'updated_at'
         ]
+    
+    def get_review_stats(self, obj):
+        return _review_stats(obj)
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -54,6 +68,7 @@ class ProductSerializer(serializers.ModelSerializer):
     seller_name = serializers.CharField(source='seller.get_full_name', read_only=True)
     seller_username = serializers.CharField(source='seller.username', read_only=True)
     seller_country = serializers.CharField(source='seller.country', read_only=True)
+    review_stats = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -67,12 +82,15 @@ class ProductSerializer(serializers.ModelSerializer):
             'additional_images', 'raw_materials', 'processing_method',
             'processing_facility', 'nutritional_info', 'status', 'is_featured',
             'search_keywords', 'views_count', 'orders_count', 'blockchain_hash',
-            'blockchain_verified', 'created_at', 'updated_at'
+            'blockchain_verified', 'review_stats', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'slug', 'seller_name', 'seller_username', 'seller_country',
-            'views_count', 'orders_count', 'created_at', 'updated_at'
+            'views_count', 'orders_count', 'review_stats', 'created_at', 'updated_at'
         ]
+    
+    def get_review_stats(self, obj):
+        return _review_stats(obj)
 
 
 class ProductCreateSerializer(serializers.ModelSerializer):
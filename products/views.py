@@ -60,7 +60,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         products = Product.objects.filter(
             category=category,
             status='active'
-        ).select_related('seller', 'category')
+        ).select_related('seller', 'category', 'review_stats')
         
         serializer = ProductListSerializer(products, many=True, context={'request': request})
         return Response(serializer.data)
@@ -89,7 +89,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter products based on query parameters"""
-        queryset = super().get_queryset().select_related('seller', 'category')
+        queryset = super().get_queryset().select_related('seller', 'category', 'review_stats')
         
         # Price range filtering
         min_price = self.request.query_params.get('min_price', None)
@@ -189,7 +189,7 @@ class ProductSearchView(generics.ListAPIView):
     
     def get_queryset(self):
         """Custom search functionality"""
-        queryset = Product.objects.filter(status='active').select_related('seller', 'category')
+        queryset = Product.objects.filter(status='active').select_related('seller', 'category', 'review_stats')
         
         # Search query
         search_query = self.request.query_params.get('q', None)
@@ -234,7 +234,7 @@ class FeaturedProductsView(generics.ListAPIView):
         return Product.objects.filter(
             status='active',
             is_featured=True
-        ).select_related('seller', 'category').order_by('-created_at')[:10]
+        ).select_related('seller', 'category', 'review_stats').order_by('-created_at')[:10]
 
 
 class ProductsByCategoryView(generics.ListAPIView):
@@ -250,7 +250,7 @@ class ProductsByCategoryView(generics.ListAPIView):
         return Product.objects.filter(
             category_id=category_id,
             status='active'
-        ).select_related('seller', 'category').order_by('-created_at')
+        ).select_related('seller', 'category', 'review_stats').order_by('-created_at')
 
 
 class ProductVariationListView(generics.ListCreateAPIView):
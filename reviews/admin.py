@@ -4,7 +4,8 @@ from django.utils import timezone
 from .models import (
     Review, ReviewHelpfulVote, ReviewFlag, ReviewResponse,
     ExpertReview, ReviewRecipe, SeasonalInsight,
-    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction
+    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction,
+    ProductReviewStats, ReviewSentiment, ReviewInsightRollup
 )
 
 
@@ -199,6 +200,22 @@ class ExpertReviewAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
 
 
+@admin.register(ProductReviewStats)
+class ProductReviewStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        'product', 'review_count', 'average_rating', 'verified_count',
+        'expert_review_count', 'updated_at'
+    ]
+    search_fields = ['product__name']
+    list_select_related = ['product']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ReviewRecipe)
 class ReviewRecipeAdmin(admin.ModelAdmin):
     list_display = [
@@ -456,3 +473,32 @@ class PeerRecommendationInteractionAdmin(admin.ModelAdmin):
     recommendation_title.short_description = 'Recommendation'
     
     ordering = ['-created_at']
+
+
+@admin.register(ReviewSentiment)
+class ReviewSentimentAdmin(admin.ModelAdmin):
+    list_display = ['review', 'label', 'score', 'topics', 'analyzer_version', 'analyzed_at']
+    list_filter = ['label', 'analyzer_version']
+    list_select_related = ['review__product', 'review__reviewer']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReviewInsightRollup)
+class ReviewInsightRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'scope', 'key', 'review_count', 'average_rating', 'average_sentiment',
+        'positive_count', 'negative_count', 'dirty', 'updated_at'
+    ]
+    list_filter = ['scope', 'dirty']
+    search_fields = ['key']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,239 @@
+"""
+AgriConnect Farmer Recommendation Graph
+Offline "farmers you may want to follow" scoring over the follow graph
+
+The job loads every farmer once and builds sparse matrices:
+- S: undirected follow adjacency, so (S @ S)[i, j] counts mutual connections
+- C: farmer x crop incidence, so (C @ C.T)[i, j] is the crop overlap used
+  for Jaccard similarity
+plus dense region / country codes for regional proximity. Scores are
+evaluated in row blocks to bound memory (mutual counts are multiplied
+per block, never for the whole graph), already-followed farmers are masked
+out, and the top-K candidates per farmer are written to
+FarmerRecommendation.
+
+Incremental runs recompute only farmers queued in
+FarmerRecommendationRefresh. They still read every farmer's crops and
+region, since any farmer can be a candidate, but load only the follow
+edges within two hops of the queued farmers - all that their mutual
+connection counts depend on.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.ranking import top_k_columns
+from .models import FarmerNetwork, FarmerRecommendation, FarmerRecommendationRefresh
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_FARMER_RECOMMENDATION_CONFIG = {
+    'TOP_K': 20,
+    'BLOCK_SIZE': 256,
+    # Mutual connection counts saturate: m / (m + MUTUAL_SATURATION)
+    'MUTUAL_SATURATION': 2.0,
+    'SAME_COUNTRY_SCORE': 0.3,
+    'EXPERIENCE_CAP_YEARS': 15,
+    'WEIGHTS': {
+        'mutual': 0.5,
+        'crops': 0.3,
+        'region': 0.15,
+        'experience': 0.05,
+    },
+}
+
+
+def get_recommendation_config() -> Dict:
+    config = dict(DEFAULT_FARMER_RECOMMENDATION_CONFIG)
+    config.update(getattr(settings, 'FARMER_RECOMMENDATION_CONFIG', {}))
+    return config
+
+
+def _codes(values: List[str]) -> np.ndarray:
+    """Integer codes per distinct non-empty value, -1 for blanks"""
+    lookup = {}
+    codes = np.full(len(values), -1, dtype=np.int32)
+    for position, value in enumerate(values):
+        value = (value or '').strip().lower()
+        if value:
+            codes[position] = lookup.setdefault(value, len(lookup))
+    return codes
+
+
+def _follow_edges(focus_ids: Optional[List[int]] = None):
+    """
+    (follower_id, following_id) pairs; with focus_ids, only edges touching
+    those farmers or their direct connections
+    """
+    edges = FarmerNetwork.objects.values_list('follower_id', 'following_id')
+    if focus_ids is None:
+        return edges.iterator()
+    touching = edges.filter(Q(follower_id__in=focus_ids) | Q(following_id__in=focus_ids))
+    neighbours = set(focus_ids)
+    for follower_id, following_id in touching.iterator():
+        neighbours.update((follower_id, following_id))
+    return edges.filter(Q(follower_id__in=neighbours) | Q(following_id__in=neighbours)).iterator()
+
+
+class FarmerGraph:
+    """
+    Sparse follow graph and crop features for every farmer. With focus_ids
+    the follow graph is only complete enough to score those farmers.
+    """
+
+    def __init__(self, focus_ids: Optional[List[int]] = None):
+        farmers = list(
+            User.objects.filter(farmer_profile__isnull=False).values_list(
+                'id', 'region', 'country',
+                'farmer_profile__primary_crops', 'farmer_profile__years_of_experience'
+            ).order_by('id')
+        )
+        self.user_ids = np.array([row[0] for row in farmers], dtype=np.int64)
+        self.index = {user_id: position for position, user_id in enumerate(self.user_ids.tolist())}
+        n = len(farmers)
+
+        # Crop incidence matrix (farmer x crop)
+        crop_codes: Dict[str, int] = {}
+        rows, cols = [], []
+        for position, row in enumerate(farmers):
+            crops = {str(crop).strip().lower() for crop in (row[3] or []) if str(crop).strip()}
+            for crop in crops:
+                rows.append(position)
+                cols.append(crop_codes.setdefault(crop, len(crop_codes)))
+        self.crops = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n, max(len(crop_codes), 1))
+        )
+        self.crop_counts = np.asarray(self.crops.sum(axis=1), dtype=np.float32).ravel()
+
+        # Follow adjacency (directed) and its undirected closure for mutual counts
+        edge_rows, edge_cols = [], []
+        for follower_id, following_id in _follow_edges(focus_ids):
+            if follower_id in self.index and following_id in self.index:
+                edge_rows.append(self.index[follower_id])
+                edge_cols.append(self.index[following_id])
+        self.follows = sparse.csr_matrix(
+            (np.ones(len(edge_rows), dtype=np.float32), (edge_rows, edge_cols)), shape=(n, n)
+        )
+        self.undirected = (self.follows + self.follows.T).tocsr()
+        self.undirected.data[:] = 1
+
+        self.regions = _codes([row[1] for row in farmers])
+        self.countries = _codes([row[2] for row in farmers])
+        self.experience = np.array([row[4] or 0 for row in farmers], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def score_block(self, positions: np.ndarray, config: Dict):
+        """Dense score matrix (len(positions) x n) plus its components"""
+        weights = config['WEIGHTS']
+
+        overlap = (self.crops[positions] @ self.crops.T).toarray()
+        union = self.crop_counts[positions][:, None] + self.crop_counts[None, :] - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+        mutual = (self.undirected[positions] @ self.undirected).toarray()
+        mutual_score = mutual / (mutual + config['MUTUAL_SATURATION'])
+
+        block_regions = self.regions[positions][:, None]
+        same_region = (block_regions == self.regions[None, :]) & (block_regions >= 0)
+        block_countries = self.countries[positions][:, None]
+        same_country = (block_countries == self.countries[None, :]) & (block_countries >= 0)
+        region_score = np.where(same_region, 1.0, np.where(same_country, config['SAME_COUNTRY_SCORE'], 0.0))
+
+        experience_score = np.minimum(self.experience / config['EXPERIENCE_CAP_YEARS'], 1.0)
+
+        scores = (
+            weights['mutual'] * mutual_score
+            + weights['crops'] * jaccard
+            + weights['region'] * region_score
+            + weights['experience'] * experience_score[None, :]
+        ).astype(np.float32)
+
+        # Only recommend farmers with a real connection, never self or already followed
+        scores[(mutual == 0) & (overlap == 0) & ~same_region] = -np.inf
+        scores[np.arange(len(positions)), positions] = -np.inf
+        followed = self.follows[positions].nonzero()
+        scores[followed] = -np.inf
+        return scores, mutual, jaccard, same_region
+
+
+def compute_recommendations(graph: FarmerGraph, farmer_ids: Optional[Iterable[int]] = None) -> List[FarmerRecommendation]:
+    """Top-K FarmerRecommendation rows for the given farmers (all by default)"""
+    config = get_recommendation_config()
+    if farmer_ids is None:
+        positions = np.arange(len(graph))
+    else:
+        positions = np.array(sorted(graph.index[user_id] for user_id in farmer_ids if user_id in graph.index),
+                             dtype=np.int64)
+
+    now = timezone.now()
+    rows = []
+    for start in range(0, len(positions), config['BLOCK_SIZE']):
+        block = positions[start:start + config['BLOCK_SIZE']]
+        scores, mutual, jaccard, same_region = graph.score_block(block, config)
+        best = top_k_columns(scores, config['TOP_K'])
+        for offset, position in enumerate(block):
+            rank = 0
+            for candidate in best[offset]:
+                score = scores[offset, candidate]
+                if not np.isfinite(score):
+                    break
+                rank += 1
+                rows.append(FarmerRecommendation(
+                    farmer_id=int(graph.user_ids[position]),
+                    candidate_id=int(graph.user_ids[candidate]),
+                    rank=rank,
+                    score=float(score),
+                    mutual_connections=int(mutual[offset, candidate]),
+                    crop_similarity=float(jaccard[offset, candidate]),
+                    same_region=bool(same_region[offset, candidate]),
+                    computed_at=now,
+                ))
+    return rows
+
+
+def refresh_recommendations(farmer_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute and replace stored recommendations; returns rows written"""
+    started = timezone.now()
+    farmer_ids = None if farmer_ids is None else list(farmer_ids)
+    graph = FarmerGraph(farmer_ids)
+    rows = compute_recommendations(graph, farmer_ids)
+
+    with transaction.atomic():
+        stale = FarmerRecommendation.objects.all()
+        # Requests queued while the graph was being built stay queued
+        queued = FarmerRecommendationRefresh.objects.filter(requested_at__lte=started)
+        if farmer_ids is not None:
+            stale = stale.filter(farmer_id__in=farmer_ids)
+            queued = queued.filter(farmer_id__in=farmer_ids)
+        stale.delete()
+        FarmerRecommendation.objects.bulk_create(rows, batch_size=2000)
+        queued.delete()
+
+    logger.info("Wrote %s farmer recommendations for %s farmers",
+                len(rows), len(graph) if farmer_ids is None else len(farmer_ids))
+    return len(rows)
+
+
+def refresh_queued_recommendations(limit: int = 5000) -> int:
+    """Incremental pass over farmers queued by follow graph changes"""
+    farmer_ids = list(
+        FarmerRecommendationRefresh.objects.order_by('requested_at').values_list('farmer_id', flat=True)[:limit]
+    )
+    if not farmer_ids:
+        return 0
+    refresh_recommendations(farmer_ids)
+    return len(farmer_ids)
@@ -0,0 +1,353 @@
+"""
+AgriConnect Review Insights Pipeline
+Batch sentiment / topic analysis of review text and the rollups behind
+ReviewViewSet.analytics
+
+New and edited reviews are picked up incrementally (no ReviewSentiment row,
+or the review's updated_at has moved past the analyzed version), scored in
+batches with the lexicon in reviews.sentiment, and upserted. Only the
+product, farmer and month rollups those reviews touch are rebuilt, with one
+grouped pass per scope; the platform-wide rollup is summed from the month
+rows. The analytics endpoint then reads a handful of precomputed rows.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+
+from products.models import Product
+from .models import Review, ReviewInsightRollup, ReviewSentiment
+from .sentiment import ANALYZER_VERSION, analyze, review_text
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_REVIEW_INSIGHTS_CONFIG = {
+    'BATCH_SIZE': 500,
+    'TREND_MONTHS': 12,
+    'TOP_LIMIT': 10,
+    # Products / farmers need this many analyzed reviews to be ranked
+    'MIN_REVIEWS_FOR_RANKING': 3,
+    'TOP_TOPICS': 8,
+}
+
+OVERALL_KEY = 'all'
+
+ROLLUP_FIELDS = [
+    'review_count', 'rating_sum', 'average_rating', 'positive_count', 'neutral_count',
+    'negative_count', 'sentiment_sum', 'topic_counts', 'dirty',
+]
+
+RollupKey = Tuple[str, str]
+
+
+def get_insights_config() -> Dict:
+    config = dict(DEFAULT_REVIEW_INSIGHTS_CONFIG)
+    config.update(getattr(settings, 'REVIEW_INSIGHTS_CONFIG', {}))
+    return config
+
+
+def month_key(value) -> str:
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m')
+
+
+def month_start(key: str, offset: int = 0) -> datetime:
+    """UTC start of a YYYY-MM month, optionally shifted by whole months"""
+    year, month = map(int, key.split('-'))
+    year, month = divmod(year * 12 + month - 1 + offset, 12)
+    return datetime(year, month + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def pending_reviews():
+    """Reviews never analyzed, edited since, or analyzed by an older lexicon"""
+    return Review.objects.filter(
+        Q(sentiment__isnull=True)
+        | Q(sentiment__source_updated_at__lt=F('updated_at'))
+        | Q(sentiment__analyzer_version__lt=ANALYZER_VERSION)
+    )
+
+
+def analyze_batch(rows) -> Tuple[list, Set[RollupKey]]:
+    """ReviewSentiment objects and the rollup keys touched for a batch of review rows"""
+    sentiments = []
+    keys = set()
+    for row in rows:
+        result = analyze(review_text(row['title'], row['content'], row['pros'], row['cons']))
+        sentiments.append(ReviewSentiment(
+            review_id=row['id'],
+            score=result.score,
+            label=result.label,
+            topics=result.topics,
+            analyzer_version=ANALYZER_VERSION,
+            source_updated_at=row['updated_at'],
+        ))
+        keys.update([
+            ('product', str(row['product_id'])),
+            ('farmer', str(row['product__seller_id'])),
+            ('month', month_key(row['created_at'])),
+        ])
+    return sentiments, keys
+
+
+def process_pending(batch_size: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, int]:
+    """Analyze pending reviews in batches, then rebuild the rollups they touch"""
+    batch_size = batch_size or get_insights_config()['BATCH_SIZE']
+    processed = 0
+    touched: Set[RollupKey] = set()
+
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        rows = list(
+            pending_reviews().order_by('updated_at').values(
+                'id', 'title', 'content', 'pros', 'cons', 'updated_at', 'created_at',
+                'product_id', 'product__seller_id'
+            )[:size]
+        )
+        if not rows:
+            break
+        sentiments, keys = analyze_batch(rows)
+        ReviewSentiment.objects.bulk_create(
+            sentiments,
+            update_conflicts=True,
+            unique_fields=['review'],
+            update_fields=['score', 'label', 'topics', 'analyzer_version', 'source_updated_at', 'analyzed_at']
+        )
+        touched |= keys
+        processed += len(rows)
+
+    # Rollups flagged by review deletions
+    touched |= set(ReviewInsightRollup.objects.filter(dirty=True).values_list('scope', 'key'))
+    rollups = rebuild_rollups(touched) if touched else 0
+    logger.info("Analyzed %s reviews, rebuilt %s insight rollups", processed, rollups)
+    return {'reviews': processed, 'rollups': rollups}
+
+
+def _empty_rollup(scope: str, key: str) -> ReviewInsightRollup:
+    return ReviewInsightRollup(scope=scope, key=key, topic_counts={})
+
+
+def _add_review(rollup: ReviewInsightRollup, rating: int, score: float, label: str, topics: Dict[str, int]):
+    rollup.review_count += 1
+    rollup.rating_sum += rating
+    rollup.sentiment_sum += score
+    setattr(rollup, f'{label}_count', getattr(rollup, f'{label}_count') + 1)
+    for topic, polarity in (topics or {}).items():
+        counts = rollup.topic_counts.setdefault(topic, {'mentions': 0, 'positive': 0, 'negative': 0})
+        counts['mentions'] += 1
+        if polarity > 0:
+            counts['positive'] += 1
+        elif polarity < 0:
+            counts['negative'] += 1
+
+
+def _merge(target: ReviewInsightRollup, source: ReviewInsightRollup):
+    for field in ['review_count', 'rating_sum', 'positive_count', 'neutral_count', 'negative_count', 'sentiment_sum']:
+        setattr(target, field, getattr(target, field) + getattr(source, field))
+    for topic, counts in source.topic_counts.items():
+        merged = target.topic_counts.setdefault(topic, {'mentions': 0, 'positive': 0, 'negative': 0})
+        for name, value in counts.items():
+            merged[name] += value
+
+
+def _finish(rollup: ReviewInsightRollup) -> ReviewInsightRollup:
+    rollup.average_rating = round(rollup.rating_sum / rollup.review_count, 2) if rollup.review_count else 0
+    rollup.dirty = False
+    return rollup
+
+
+def _scan(scope: str, keys: Set[str]) -> Dict[str, ReviewInsightRollup]:
+    """Recompute rollups for one scope from published, analyzed reviews"""
+    reviews = Review.objects.filter(status='published', sentiment__isnull=False)
+    if scope == 'product':
+        reviews = reviews.filter(product_id__in=keys)
+        key_field = 'product_id'
+    elif scope == 'farmer':
+        reviews = reviews.filter(product__seller_id__in=keys)
+        key_field = 'product__seller_id'
+    else:
+        months = sorted(keys)
+        reviews = reviews.filter(
+            created_at__gte=month_start(months[0]),
+            created_at__lt=month_start(months[-1], offset=1),
+        )
+        key_field = 'created_at'
+
+    rollups = {}
+    rows = reviews.values_list(
+        key_field, 'overall_rating', 'sentiment__score', 'sentiment__label', 'sentiment__topics'
+    )
+    for group, rating, score, label, topics in rows.iterator(chunk_size=2000):
+        key = month_key(group) if scope == 'month' else str(group)
+        if key not in keys:
+            continue
+        if key not in rollups:
+            rollups[key] = _empty_rollup(scope, key)
+        _add_review(rollups[key], rating, score, label, topics)
+    return rollups
+
+
+def rebuild_rollups(keys: Iterable[RollupKey]) -> int:
+    """Rebuild the given (scope, key) rollups plus the platform-wide row"""
+    by_scope = defaultdict(set)
+    for scope, key in keys:
+        if scope != 'overall':
+            by_scope[scope].add(key)
+
+    # A product's reviews also feed its seller's rollup
+    if by_scope['product']:
+        by_scope['farmer'].update(
+            str(seller_id) for seller_id in
+            Product.objects.filter(pk__in=by_scope['product']).values_list('seller_id', flat=True)
+        )
+
+    rows = []
+    empty = []
+    for scope, scope_keys in by_scope.items():
+        if not scope_keys:
+            continue
+        rebuilt = _scan(scope, scope_keys)
+        rows.extend(_finish(rollup) for rollup in rebuilt.values())
+        empty.extend((scope, key) for key in scope_keys - set(rebuilt))
+
+    with transaction.atomic():
+        if empty:
+            stale = Q()
+            for scope, key in empty:
+                stale |= Q(scope=scope, key=key)
+            ReviewInsightRollup.objects.filter(stale).delete()
+        ReviewInsightRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['scope', 'key'],
+            update_fields=ROLLUP_FIELDS,
+            batch_size=500
+        )
+        overall = _empty_rollup('overall', OVERALL_KEY)
+        for month in ReviewInsightRollup.objects.filter(scope='month'):
+            _merge(overall, month)
+        ReviewInsightRollup.objects.bulk_create(
+            [_finish(overall)],
+            update_conflicts=True,
+            unique_fields=['scope', 'key'],
+            update_fields=ROLLUP_FIELDS
+        )
+    return len(rows) + 1
+
+
+def rebuild_all_rollups() -> int:
+    """Recompute every rollup from scratch"""
+    keys = set()
+    rows = Review.objects.filter(status='published', sentiment__isnull=False).values_list(
+        'product_id', 'created_at'
+    )
+    for product_id, created_at in rows.iterator(chunk_size=5000):
+        keys.add(('product', str(product_id)))
+        keys.add(('month', month_key(created_at)))
+    # Rows for scopes with no remaining reviews are rebuilt to empty and removed
+    keys |= set(ReviewInsightRollup.objects.exclude(scope='overall').values_list('scope', 'key'))
+    return rebuild_rollups(keys)
+
+
+def mark_review_removed(review: Review, seller_id=None):
+    """Flag rollups a deleted review fed; the next pipeline run rebuilds them"""
+    stale = Q(scope='product', key=str(review.product_id)) | Q(scope='month', key=month_key(review.created_at))
+    if seller_id is not None:
+        stale |= Q(scope='farmer', key=str(seller_id))
+    ReviewInsightRollup.objects.filter(stale).update(dirty=True)
+
+
+def _ranked(scope: str, config: Dict):
+    return list(
+        ReviewInsightRollup.objects.filter(
+            scope=scope, review_count__gte=config['MIN_REVIEWS_FOR_RANKING']
+        ).order_by('-average_rating', '-review_count')[:config['TOP_LIMIT']]
+    )
+
+
+def _ranking_entry(rollup: ReviewInsightRollup) -> Dict:
+    return {
+        'review_count': rollup.review_count,
+        'average_rating': rollup.average_rating,
+        'average_sentiment': rollup.average_sentiment,
+        'positive_share': round(rollup.positive_count / rollup.review_count, 3),
+    }
+
+
+def _top_topics(topic_counts: Dict, limit: int):
+    topics = sorted(topic_counts.items(), key=lambda item: item[1]['mentions'], reverse=True)[:limit]
+    return [{'topic': topic, **counts} for topic, counts in topics]
+
+
+def get_review_analytics() -> Dict:
+    """Analytics payload for ReviewViewSet.analytics, read from rollups only"""
+    config = get_insights_config()
+    overall = ReviewInsightRollup.objects.filter(scope='overall', key=OVERALL_KEY).first()
+    overall = overall or _empty_rollup('overall', OVERALL_KEY)
+
+    months = list(
+        ReviewInsightRollup.objects.filter(scope='month').order_by('-key')[:config['TREND_MONTHS']]
+    )
+    review_trends = {
+        'monthly': [
+            {
+                'month': month.key,
+                'review_count': month.review_count,
+                'average_rating': month.average_rating,
+                'average_sentiment': month.average_sentiment,
+                'sentiment_distribution': month.sentiment_distribution,
+            }
+            for month in reversed(months)
+        ]
+    }
+
+    total = overall.review_count
+    sentiment_analysis = {
+        'analyzed_reviews': total,
+        'average_sentiment': overall.average_sentiment,
+        'distribution': overall.sentiment_distribution,
+        'distribution_percent': {
+            label: round(count * 100 / total, 1) if total else 0
+            for label, count in overall.sentiment_distribution.items()
+        },
+        'top_topics': _top_topics(overall.topic_counts, config['TOP_TOPICS']),
+    }
+
+    top_products = _ranked('product', config)
+    product_names = {
+        str(pk): name for pk, name in
+        Product.objects.filter(pk__in=[rollup.key for rollup in top_products]).values_list('pk', 'name')
+    }
+    top_rated_products = [
+        {
+            'product_id': rollup.key,
+            'product_name': product_names.get(rollup.key, ''),
+            **_ranking_entry(rollup),
+        }
+        for rollup in top_products
+    ]
+
+    top_farmers = _ranked('farmer', config)
+    farmers = User.objects.in_bulk([int(rollup.key) for rollup in top_farmers])
+    top_rated_farmers = [
+        {
+            'farmer_id': int(rollup.key),
+            'username': farmers[int(rollup.key)].username,
+            'name': farmers[int(rollup.key)].get_full_name(),
+            **_ranking_entry(rollup),
+        }
+        for rollup in top_farmers if int(rollup.key) in farmers
+    ]
+
+    return {
+        'review_trends': review_trends,
+        'sentiment_analysis': sentiment_analysis,
+        'top_rated_products': top_rated_products,
+        'top_rated_farmers': top_rated_farmers,
+    }
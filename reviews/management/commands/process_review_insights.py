@@ -0,0 +1,30 @@
+"""
+Process Review Insights Management Command
+Runs the batch sentiment / topic pipeline and rebuilds analytics rollups
+"""
+
+from django.core.management.base import BaseCommand
+
+from reviews.insights import process_pending, rebuild_all_rollups
+
+
+class Command(BaseCommand):
+    help = 'Analyze new and edited reviews and update sentiment / rating rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Reviews analyzed per batch')
+        parser.add_argument('--limit', type=int, help='Max reviews to analyze in this run')
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every rollup from stored sentiment after processing',
+        )
+
+    def handle(self, *args, **options):
+        result = process_pending(batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Analyzed {result['reviews']} reviews, rebuilt {result['rollups']} rollups"
+        ))
+        if options['rebuild']:
+            rollups = rebuild_all_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt all {rollups} insight rollups"))
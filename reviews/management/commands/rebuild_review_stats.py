@@ -0,0 +1,26 @@
+"""
+Rebuild Review Statistics Management Command
+Recomputes denormalized ProductReviewStats rows from the review tables
+"""
+
+from django.core.management.base import BaseCommand
+
+from reviews.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-product review statistics from published reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            action='append',
+            dest='products',
+            help='Only rebuild stats for this product id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_stats(options['products'])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt review stats for {rows} products")
+        )
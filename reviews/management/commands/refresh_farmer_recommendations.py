@@ -0,0 +1,29 @@
+"""
+Refresh Farmer Recommendations Management Command
+Runs the offline follow-graph recommendation job (full or incremental)
+"""
+
+from django.core.management.base import BaseCommand
+
+from reviews.farmer_graph import refresh_queued_recommendations, refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute top-K farmer follow recommendations from the follow graph and crop features'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only recompute farmers queued by recent follow graph changes',
+        )
+        parser.add_argument('--limit', type=int, default=5000, help='Max queued farmers per incremental run')
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            farmers = refresh_queued_recommendations(limit=options['limit'])
+            self.stdout.write(self.style.SUCCESS(f"Refreshed recommendations for {farmers} queued farmers"))
+            return
+
+        rows = refresh_recommendations()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} farmer recommendations"))
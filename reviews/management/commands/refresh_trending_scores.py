@@ -0,0 +1,30 @@
+"""
+Refresh Trending Scores Management Command
+Renormalizes time-decayed trending scores, or rebuilds them from event history
+"""
+
+from django.core.management.base import BaseCommand
+
+from core import trending
+
+
+class Command(BaseCommand):
+    help = 'Renormalize trending scores for reviews, peer recommendations and recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute scores from votes, interactions and usage logs instead of renormalizing',
+        )
+        parser.add_argument('--days', type=int, help='History window for --rebuild')
+
+    def handle(self, *args, **options):
+        for model in trending.trending_models():
+            if options['rebuild']:
+                rows = trending.rebuild(model, days=options['days'])
+                self.stdout.write(f"Rebuilt {rows} {model._meta.verbose_name_plural} trending scores")
+            else:
+                rows = trending.renormalize(model)
+                self.stdout.write(f"Renormalized {rows} {model._meta.verbose_name_plural} trending scores")
+        self.stdout.write(self.style.SUCCESS('Trending scores refreshed'))
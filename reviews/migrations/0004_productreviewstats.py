@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('reviews', '0003_peerrecommendation_peerrecommendationinteraction_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReviewStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='products.product')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('verified_count', models.PositiveIntegerField(default=0)),
+                ('expert_review_count', models.PositiveIntegerField(default=0)),
+                ('overall_sum', models.PositiveIntegerField(default=0)),
+                ('rating_1_count', models.PositiveIntegerField(default=0)),
+                ('rating_2_count', models.PositiveIntegerField(default=0)),
+                ('rating_3_count', models.PositiveIntegerField(default=0)),
+                ('rating_4_count', models.PositiveIntegerField(default=0)),
+                ('rating_5_count', models.PositiveIntegerField(default=0)),
+                ('quality_sum', models.PositiveIntegerField(default=0)),
+                ('quality_count', models.PositiveIntegerField(default=0)),
+                ('freshness_sum', models.PositiveIntegerField(default=0)),
+                ('freshness_count', models.PositiveIntegerField(default=0)),
+                ('taste_sum', models.PositiveIntegerField(default=0)),
+                ('taste_count', models.PositiveIntegerField(default=0)),
+                ('packaging_sum', models.PositiveIntegerField(default=0)),
+                ('packaging_count', models.PositiveIntegerField(default=0)),
+                ('value_sum', models.PositiveIntegerField(default=0)),
+                ('value_count', models.PositiveIntegerField(default=0)),
+                ('delivery_sum', models.PositiveIntegerField(default=0)),
+                ('delivery_count', models.PositiveIntegerField(default=0)),
+                ('communication_sum', models.PositiveIntegerField(default=0)),
+                ('communication_count', models.PositiveIntegerField(default=0)),
+                ('consistency_sum', models.PositiveIntegerField(default=0)),
+                ('consistency_count', models.PositiveIntegerField(default=0)),
+                ('farmer_sum', models.PositiveIntegerField(default=0)),
+                ('farmer_count', models.PositiveIntegerField(default=0)),
+                ('logistics_sum', models.PositiveIntegerField(default=0)),
+                ('logistics_count', models.PositiveIntegerField(default=0)),
+                ('warehouse_handling_sum', models.PositiveIntegerField(default=0)),
+                ('warehouse_handling_count', models.PositiveIntegerField(default=0)),
+                ('customer_service_sum', models.PositiveIntegerField(default=0)),
+                ('customer_service_count', models.PositiveIntegerField(default=0)),
+                ('sustainability_sum', models.PositiveIntegerField(default=0)),
+                ('sustainability_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product review stats',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_productreviewstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='peerrecommendation',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='peerrecommendation',
+            name='trending_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='trending_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='peerrecommendation',
+            index=models.Index(fields=['-trending_score'], name='reviews_pee_trendin_0d0d87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-trending_score'], name='reviews_rev_trendin_3288e0_idx'),
+        ),
+    ]
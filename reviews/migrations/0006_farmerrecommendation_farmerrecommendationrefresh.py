@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_trending_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FarmerRecommendationRefresh',
+            fields=[
+                ('farmer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('requested_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FarmerRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('mutual_connections', models.PositiveIntegerField(default=0)),
+                ('crop_similarity', models.FloatField(default=0)),
+                ('same_region', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to_farmers', to=settings.AUTH_USER_MODEL)),
+                ('farmer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='farmer_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['farmer', 'rank'],
+                'indexes': [models.Index(fields=['farmer', 'rank'], name='reviews_far_farmer__aeee81_idx')],
+                'unique_together': {('farmer', 'candidate')},
+            },
+        ),
+    ]
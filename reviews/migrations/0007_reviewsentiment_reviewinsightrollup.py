@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_farmerrecommendation_farmerrecommendationrefresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewInsightRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('overall', 'Overall'), ('product', 'Product'), ('farmer', 'Farmer'), ('month', 'Month')], max_length=10)),
+                ('key', models.CharField(help_text="Product id, farmer id, YYYY-MM month or 'all'", max_length=64)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.FloatField(default=0)),
+                ('positive_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('negative_count', models.PositiveIntegerField(default=0)),
+                ('sentiment_sum', models.FloatField(default=0)),
+                ('topic_counts', models.JSONField(blank=True, default=dict)),
+                ('dirty', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', '-average_rating'], name='reviews_rev_scope_aff812_idx')],
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewSentiment',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sentiment', serialize=False, to='reviews.review')),
+                ('score', models.FloatField(help_text='Sentiment score from -1 (negative) to 1 (positive)')),
+                ('label', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('topics', models.JSONField(blank=True, default=dict)),
+                ('analyzer_version', models.PositiveSmallIntegerField()),
+                ('source_updated_at', models.DateTimeField()),
+                ('analyzed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['label'], name='reviews_rev_label_192441_idx')],
+            },
+        ),
+    ]
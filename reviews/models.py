@@ -2,12 +2,13 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.base_models import TrendingScoreModel
 from products.models import Product
 from orders.models import Order
 
 User = get_user_model()
 
-class Review(models.Model):
+class Review(TrendingScoreModel):
     """
     Multi-dimensional review system for products with comprehensive rating categories.
     Supports verified purchases, blockchain verification, and rich media content.
@@ -83,7 +84,9 @@ class Review(models.Model):
             models.Index(fields=['reviewer', '-created_at']),
             models.Index(fields=['overall_rating']),
             models.Index(fields=['verified_purchase']),
-            models.Index(fields=['status']),        ]
+            models.Index(fields=['status']),
+            models.Index(fields=['-trending_score']),
+        ]
         unique_together = ['product', 'reviewer', 'order']  # One review per product per order
     
     def __str__(self):
@@ -400,7 +403,7 @@ class SeasonalInsight(models.Model):
         return f"{self.product.name} - {self.season} insights for {self.region}"
 
 
-class PeerRecommendation(models.Model):
+class PeerRecommendation(TrendingScoreModel):
     """
     Farmer-to-farmer product endorsements and recommendations.
     Enables experienced farmers to recommend products to fellow farmers.
@@ -486,6 +489,7 @@ class PeerRecommendation(models.Model):
             models.Index(fields=['recommendation_strength']),
             models.Index(fields=['verified_peer']),
             models.Index(fields=['is_featured']),
+            models.Index(fields=['-trending_score']),
         ]
     
     def __str__(self):
@@ -579,6 +583,49 @@ class FarmerNetwork(models.Model):
         return (self.successful_recommendations / self.recommendations_received) * 100
 
 
+class FarmerRecommendation(models.Model):
+    """
+    Precomputed "farmers you may want to follow" candidates.
+    Top-K rows per farmer written by the offline graph job (reviews.farmer_graph)
+    from mutual connections, crop similarity and regional proximity.
+    """
+    
+    farmer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='farmer_recommendations')
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommended_to_farmers')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    # Score components, kept for explanations ("3 mutual connections")
+    mutual_connections = models.PositiveIntegerField(default=0)
+    crop_similarity = models.FloatField(default=0)
+    same_region = models.BooleanField(default=False)
+    
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['farmer', 'candidate']
+        ordering = ['farmer', 'rank']
+        indexes = [
+            models.Index(fields=['farmer', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"Recommend {self.candidate.username} to {self.farmer.username}"
+
+
+class FarmerRecommendationRefresh(models.Model):
+    """
+    Farmers whose recommendations are stale after follow graph changes.
+    Drained by refresh_farmer_recommendations --incremental.
+    """
+    
+    farmer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    requested_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Refresh recommendations for {self.farmer_id}"
+
+
 class PeerRecommendationInteraction(models.Model):
     """
     Track interactions with peer recommendations (saves, shares, implementations)
@@ -613,3 +660,189 @@ class PeerRecommendationInteraction(models.Model):
     
     def __str__(self):
         return f"{self.user.username} {self.interaction_type} recommendation {self.recommendation.id}"
+
+
+class ProductReviewStats(models.Model):
+    """
+    Denormalized review statistics per product.
+    Holds counts, rating sums and the overall rating histogram for published
+    reviews so summaries are a single-row lookup. Maintained incrementally by
+    review signals; rebuild with the rebuild_review_stats command.
+    """
+    
+    RATING_DIMENSIONS = [
+        'quality', 'freshness', 'taste', 'packaging', 'value',
+        'delivery', 'communication', 'consistency', 'farmer',
+        'logistics', 'warehouse_handling', 'customer_service',
+        'sustainability',
+    ]
+    
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='review_stats')
+    
+    # Published review counts
+    review_count = models.PositiveIntegerField(default=0)
+    verified_count = models.PositiveIntegerField(default=0)
+    expert_review_count = models.PositiveIntegerField(default=0)
+    
+    # Overall rating sum and histogram
+    overall_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
+    # Product Quality dimension sums / counts (dimensions are optional per review)
+    quality_sum = models.PositiveIntegerField(default=0)
+    quality_count = models.PositiveIntegerField(default=0)
+    freshness_sum = models.PositiveIntegerField(default=0)
+    freshness_count = models.PositiveIntegerField(default=0)
+    taste_sum = models.PositiveIntegerField(default=0)
+    taste_count = models.PositiveIntegerField(default=0)
+    packaging_sum = models.PositiveIntegerField(default=0)
+    packaging_count = models.PositiveIntegerField(default=0)
+    value_sum = models.PositiveIntegerField(default=0)
+    value_count = models.PositiveIntegerField(default=0)
+    
+    # Farmer Reliability dimension sums / counts
+    delivery_sum = models.PositiveIntegerField(default=0)
+    delivery_count = models.PositiveIntegerField(default=0)
+    communication_sum = models.PositiveIntegerField(default=0)
+    communication_count = models.PositiveIntegerField(default=0)
+    consistency_sum = models.PositiveIntegerField(default=0)
+    consistency_count = models.PositiveIntegerField(default=0)
+    farmer_sum = models.PositiveIntegerField(default=0)
+    farmer_count = models.PositiveIntegerField(default=0)
+    
+    # Service Quality dimension sums / counts
+    logistics_sum = models.PositiveIntegerField(default=0)
+    logistics_count = models.PositiveIntegerField(default=0)
+    warehouse_handling_sum = models.PositiveIntegerField(default=0)
+    warehouse_handling_count = models.PositiveIntegerField(default=0)
+    customer_service_sum = models.PositiveIntegerField(default=0)
+    customer_service_count = models.PositiveIntegerField(default=0)
+    
+    # Sustainability dimension sum / count
+    sustainability_sum = models.PositiveIntegerField(default=0)
+    sustainability_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Product review stats'
+    
+    def __str__(self):
+        return f"Review stats for product {self.product_id}"
+    
+    @staticmethod
+    def _average(total, count):
+        return round(total / count, 2) if count else 0
+    
+    @property
+    def average_rating(self):
+        return self._average(self.overall_sum, self.review_count)
+    
+    @property
+    def rating_distribution(self):
+        return {str(i): getattr(self, f'rating_{i}_count') for i in range(1, 6)}
+    
+    def dimension_average(self, dimension):
+        return self._average(getattr(self, f'{dimension}_sum'), getattr(self, f'{dimension}_count'))
+    
+    @property
+    def dimension_averages(self):
+        return {dimension: self.dimension_average(dimension) for dimension in self.RATING_DIMENSIONS}
+    
+    def compact(self):
+        """Short form embedded in product payloads"""
+        return {
+            'review_count': self.review_count,
+            'average_rating': self.average_rating,
+            'verified_count': self.verified_count,
+            'rating_distribution': self.rating_distribution,
+        }
+
+
+class ReviewSentiment(models.Model):
+    """
+    Lexicon sentiment and topic tags for a review's text.
+    Written by the batch insights pipeline (process_review_insights); a row is
+    stale when the review's updated_at moves past source_updated_at.
+    """
+    
+    LABEL_CHOICES = [
+        ('positive', 'Positive'),
+        ('neutral', 'Neutral'),
+        ('negative', 'Negative'),
+    ]
+    
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True, related_name='sentiment')
+    score = models.FloatField(help_text="Sentiment score from -1 (negative) to 1 (positive)")
+    label = models.CharField(max_length=10, choices=LABEL_CHOICES)
+    # {topic: polarity} with polarity -1, 0 or 1
+    topics = models.JSONField(default=dict, blank=True)
+    analyzer_version = models.PositiveSmallIntegerField()
+    source_updated_at = models.DateTimeField()
+    analyzed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['label']),
+        ]
+    
+    def __str__(self):
+        return f"{self.label} ({self.score:+.2f}) for review {self.review_id}"
+
+
+class ReviewInsightRollup(models.Model):
+    """
+    Aggregated review sentiment, ratings and topic mentions.
+    One row per product, farmer (product seller), calendar month and the
+    platform as a whole, rebuilt for the keys touched by each pipeline batch
+    so the analytics endpoint reads a handful of rows.
+    """
+    
+    SCOPE_CHOICES = [
+        ('overall', 'Overall'),
+        ('product', 'Product'),
+        ('farmer', 'Farmer'),
+        ('month', 'Month'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=64, help_text="Product id, farmer id, YYYY-MM month or 'all'")
+    
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+    positive_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    sentiment_sum = models.FloatField(default=0)
+    # {topic: {"mentions": n, "positive": n, "negative": n}}
+    topic_counts = models.JSONField(default=dict, blank=True)
+    
+    # Set when reviews are deleted; the next pipeline run rebuilds the row
+    dirty = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['scope', 'key']
+        indexes = [
+            models.Index(fields=['scope', '-average_rating']),
+        ]
+    
+    def __str__(self):
+        return f"Review insights for {self.scope} {self.key}"
+    
+    @property
+    def average_sentiment(self):
+        return round(self.sentiment_sum / self.review_count, 3) if self.review_count else 0
+    
+    @property
+    def sentiment_distribution(self):
+        return {
+            'positive': self.positive_count,
+            'neutral': self.neutral_count,
+            'negative': self.negative_count,
+        }
@@ -0,0 +1,141 @@
+"""
+AgriConnect Review Sentiment Lexicon
+CPU-only sentiment scoring and topic tagging for review text
+
+A small produce- and marketplace-aware lexicon with negation and intensifier
+handling. Scoring is a pure function of the text, so the batch pipeline can
+analyze thousands of reviews per second without a model server; bump
+ANALYZER_VERSION whenever the lexicon changes so stored results are redone.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+ANALYZER_VERSION = 1
+
+POSITIVE_WORDS = {
+    'good': 1.0, 'great': 1.5, 'excellent': 2.0, 'amazing': 2.0, 'awesome': 1.8,
+    'fantastic': 2.0, 'perfect': 2.0, 'love': 1.8, 'loved': 1.8, 'best': 1.8,
+    'nice': 1.0, 'happy': 1.2, 'satisfied': 1.2, 'recommend': 1.3, 'recommended': 1.3,
+    'fresh': 1.2, 'crisp': 1.0, 'ripe': 0.8, 'juicy': 1.2, 'sweet': 1.0,
+    'tasty': 1.5, 'delicious': 1.8, 'flavorful': 1.5, 'clean': 0.8, 'healthy': 1.0,
+    'organic': 0.6, 'quality': 0.5, 'affordable': 1.0, 'cheap': 0.6, 'worth': 1.0,
+    'fast': 1.0, 'quick': 1.0, 'prompt': 1.0, 'timely': 1.0, 'friendly': 1.2,
+    'helpful': 1.2, 'responsive': 1.0, 'reliable': 1.3, 'consistent': 0.8,
+    'generous': 1.0, 'neat': 0.8, 'well': 0.5, 'smooth': 0.8,
+}
+
+NEGATIVE_WORDS = {
+    'bad': -1.2, 'poor': -1.3, 'terrible': -2.0, 'awful': -2.0, 'horrible': -2.0,
+    'worst': -2.0, 'disappointed': -1.5, 'disappointing': -1.5, 'hate': -1.8,
+    'rotten': -2.0, 'spoiled': -1.8, 'stale': -1.3, 'moldy': -2.0, 'mouldy': -2.0,
+    'bruised': -1.0, 'damaged': -1.3, 'wilted': -1.2, 'dry': -0.6, 'bitter': -0.8,
+    'sour': -0.6, 'tasteless': -1.3, 'bland': -1.0, 'dirty': -1.3, 'infested': -2.0,
+    'unripe': -0.8, 'overripe': -0.8, 'small': -0.4, 'expensive': -1.0,
+    'overpriced': -1.5, 'late': -1.0, 'delayed': -1.0, 'slow': -0.8, 'rude': -1.5,
+    'unresponsive': -1.3, 'missing': -1.0, 'wrong': -1.0, 'broken': -1.3,
+    'leaking': -1.2, 'torn': -1.0, 'refund': -0.8, 'never': -0.5, 'waste': -1.5,
+}
+
+NEGATIONS = {'not', 'no', 'never', "n't", 'hardly', 'barely', 'without', 'nothing'}
+
+INTENSIFIERS = {
+    'very': 1.5, 'really': 1.4, 'extremely': 1.8, 'super': 1.5, 'so': 1.3,
+    'highly': 1.5, 'too': 1.3, 'quite': 1.2, 'slightly': 0.6, 'somewhat': 0.7,
+    'bit': 0.7,
+}
+
+# Words that trigger each topic tag (matched on whole tokens)
+TOPIC_KEYWORDS = {
+    'freshness': {'fresh', 'freshness', 'stale', 'rotten', 'spoiled', 'wilted', 'moldy', 'mouldy', 'ripe', 'unripe', 'overripe', 'crisp'},
+    'taste': {'taste', 'tasty', 'flavor', 'flavour', 'flavorful', 'delicious', 'sweet', 'bitter', 'sour', 'bland', 'tasteless', 'juicy'},
+    'quality': {'quality', 'size', 'small', 'large', 'grade', 'bruised', 'damaged', 'clean', 'dirty', 'infested', 'organic'},
+    'packaging': {'packaging', 'package', 'packed', 'bag', 'bags', 'box', 'crate', 'wrapped', 'leaking', 'torn', 'sealed'},
+    'delivery': {'delivery', 'delivered', 'shipping', 'arrived', 'late', 'delayed', 'fast', 'quick', 'timely', 'driver', 'pickup', 'transport'},
+    'price': {'price', 'prices', 'priced', 'expensive', 'cheap', 'affordable', 'overpriced', 'worth', 'value', 'cost', 'refund'},
+    'communication': {'communication', 'responsive', 'unresponsive', 'friendly', 'rude', 'helpful', 'reply', 'replied', 'call', 'called', 'message'},
+    'quantity': {'quantity', 'weight', 'kg', 'missing', 'short', 'portion', 'generous', 'amount'},
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?|n't")
+_CLAUSE_RE = re.compile(r"[.!?;,\n]+|\b(?:but|though|although|however|except)\b", re.IGNORECASE)
+
+# Score thresholds for the three labels
+POSITIVE_THRESHOLD = 0.15
+NEGATIVE_THRESHOLD = -0.15
+
+
+@dataclass
+class SentimentResult:
+    score: float
+    label: str
+    # Topic tags with the sign of the sentiment expressed about them,
+    # e.g. {'delivery': -1, 'taste': 1, 'packaging': 0}
+    topics: Dict[str, int] = field(default_factory=dict)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if token.endswith("n't") and token != "n't":
+            tokens.extend([token[:-3], "n't"])
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def _label(score: float) -> str:
+    if score >= POSITIVE_THRESHOLD:
+        return 'positive'
+    if score <= NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def clauses(text: str) -> List[List[str]]:
+    """Token lists per clause; sentiment is attributed to topics within a clause"""
+    return [tokens for tokens in map(tokenize, _CLAUSE_RE.split(text or '')) if tokens]
+
+
+def analyze(text: str) -> SentimentResult:
+    """Sentiment in [-1, 1] plus topic tags for a piece of review text"""
+    total = 0.0
+    token_count = 0
+    topic_scores = {}
+
+    for tokens in clauses(text):
+        token_count += len(tokens)
+        clause_topics = [
+            topic for topic, keywords in TOPIC_KEYWORDS.items() if keywords.intersection(tokens)
+        ]
+        clause_score = 0.0
+        for position, token in enumerate(tokens):
+            weight = POSITIVE_WORDS.get(token) or NEGATIVE_WORDS.get(token)
+            if not weight:
+                continue
+            # Look back over a short window for intensifiers and negations
+            window = tokens[max(0, position - 3):position]
+            for previous in window:
+                weight *= INTENSIFIERS.get(previous, 1.0)
+            if any(previous in NEGATIONS for previous in window):
+                weight *= -0.75
+            clause_score += weight
+
+        total += clause_score
+        for topic in clause_topics:
+            topic_scores[topic] = topic_scores.get(topic, 0.0) + clause_score
+
+    # Squash into [-1, 1]; longer reviews need proportionally more signal
+    score = math.tanh(total / max(math.sqrt(token_count) * 0.6, 1.0)) if token_count else 0.0
+    topics = {
+        topic: (1 if value > 0 else -1 if value < 0 else 0)
+        for topic, value in sorted(topic_scores.items())
+    }
+    return SentimentResult(score=round(score, 4), label=_label(score), topics=topics)
+
+
+def review_text(title: str, content: str, pros: str = '', cons: str = '') -> str:
+    """The text a review is scored on"""
+    return '. '.join(part for part in [title, content, pros, cons] if part)
@@ -4,8 +4,10 @@ from django.db.models import Avg, Count
 from .models import (
     Review, ReviewHelpfulVote, ReviewFlag, ReviewResponse, 
     ExpertReview, ReviewRecipe, SeasonalInsight,
-    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction
+    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction,
+    FarmerRecommendation
 )
+from core.base_serializers import BatchContextListSerializer, BatchContextMixin
 from products.models import Product
 from orders.models import Order
 
@@ -119,7 +121,7 @@ class ReviewListSerializer(serializers.ModelSerializer):
         ]
 
 
-class ReviewDetailSerializer(serializers.ModelSerializer):
+class ReviewDetailSerializer(BatchContextMixin, serializers.ModelSerializer):
     """Detailed serializer for individual review operations"""
     
     reviewer = ReviewerSerializer(read_only=True)
@@ -161,27 +163,48 @@ class ReviewDetailSerializer(serializers.ModelSerializer):
             'reviewer', 'response', 'recipes', 'helpful_votes_detail', 
             'flags', 'can_respond', 'user_vote', 'created_at', 'updated_at'
         ]
+        list_serializer_class = BatchContextListSerializer
+    
+    def load_batch(self, reviews):
+        """Viewer's votes, sellers and responded reviews for the page, one query each"""
+        viewer = self.viewer
+        if viewer is None:
+            return {}
+        
+        review_ids = [review.pk for review in reviews]
+        return {
+            'user_votes': {
+                vote.review_id: vote
+                for vote in ReviewHelpfulVote.objects.filter(review_id__in=review_ids, user=viewer)
+            },
+            'sellers': dict(
+                Product.objects.filter(
+                    pk__in={review.product_id for review in reviews}
+                ).values_list('pk', 'seller_id')
+            ),
+            'responded': set(
+                ReviewResponse.objects.filter(review_id__in=review_ids).values_list('review_id', flat=True)
+            ),
+        }
     
     def get_can_respond(self, obj):
         """Check if current user can respond to this review"""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        batch = self.batch(obj)
+        if not batch:
             return False
         
-        # Only the product seller can respond
-        return obj.product.seller == request.user and not hasattr(obj, 'response')
+        # Only the product seller can respond, once
+        return (
+            batch['sellers'].get(obj.product_id) == self.viewer.pk
+            and obj.pk not in batch['responded']
+        )
     
     def get_user_vote(self, obj):
         """Get current user's helpful vote for this review"""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return None
-        
-        try:
-            vote = obj.helpful_votes_detail.get(user=request.user)
-            return {'is_helpful': vote.is_helpful, 'created_at': vote.created_at}
-        except ReviewHelpfulVote.DoesNotExist:
+        vote = self.batch(obj).get('user_votes', {}).get(obj.pk)
+        if vote is None:
             return None
+        return {'is_helpful': vote.is_helpful, 'created_at': vote.created_at}
     
     def validate(self, data):
         """Validate review data"""
@@ -280,6 +303,7 @@ class ProductReviewSummarySerializer(serializers.Serializer):
     average_value_rating = serializers.DecimalField(max_digits=3, decimal_places=2)
     average_delivery_rating = serializers.DecimalField(max_digits=3, decimal_places=2)
     average_farmer_rating = serializers.DecimalField(max_digits=3, decimal_places=2)
+    dimension_averages = serializers.DictField()
     
     # Recent reviews
     recent_reviews = ReviewListSerializer(many=True)
@@ -488,3 +512,47 @@ class FarmerNetworkSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'follower_details', 'following_details', 'success_rate', 'created_at'
         ]
+
+
+
+class FarmerRecommendationSerializer(serializers.ModelSerializer):
+    """
+    Precomputed farmer follow recommendation. Keeps the farmer fields the
+    endpoint returned before (id is the recommended farmer) and adds the
+    recommendation's rank and score components.
+    """
+    
+    id = serializers.IntegerField(source='candidate.id', read_only=True)
+    username = serializers.CharField(source='candidate.username', read_only=True)
+    user_name = serializers.CharField(source='candidate.get_full_name', read_only=True)
+    experience_level = serializers.SerializerMethodField()
+    farm_size = serializers.SerializerMethodField()
+    years_of_experience = serializers.SerializerMethodField()
+    primary_crops = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = FarmerRecommendation
+        fields = [
+            'id', 'username', 'user_name', 'experience_level', 'farm_size',
+            'years_of_experience', 'primary_crops', 'rank', 'score',
+            'mutual_connections', 'crop_similarity', 'same_region', 'computed_at'
+        ]
+        read_only_fields = fields
+    
+    def _profile(self, obj):
+        return getattr(obj.candidate, 'farmer_profile', None)
+    
+    def get_experience_level(self, obj):
+        return FarmerProfileSerializer.get_experience_level(self, obj.candidate)
+    
+    def get_farm_size(self, obj):
+        profile = self._profile(obj)
+        return profile.farm_size if profile else None
+    
+    def get_years_of_experience(self, obj):
+        profile = self._profile(obj)
+        return profile.years_of_experience if profile else 0
+    
+    def get_primary_crops(self, obj):
+        profile = self._profile(obj)
+        return profile.primary_crops if profile else []
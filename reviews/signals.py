@@ -0,0 +1,111 @@
+"""
+AgriConnect Review Signals
+Keep denormalized product review statistics, insight rollups and trending
+scores in step with reviews, votes and interactions
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from core import trending
+from products.models import Product
+from .models import (
+    ExpertReview, FarmerNetwork, FarmerRecommendation, FarmerRecommendationRefresh,
+    PeerRecommendationInteraction, PeerRecommendationVote, Review, ReviewHelpfulVote
+)
+from .insights import mark_review_removed
+from .stats import (
+    STATS_SOURCE_FIELDS, apply_review_change, refresh_expert_review_count,
+    review_snapshot, stored_snapshot
+)
+
+
+def _skips_stats(update_fields):
+    return update_fields is not None and not (set(update_fields) & STATS_SOURCE_FIELDS)
+
+
+def _product_cascade(origin):
+    """True when the delete comes from removing the product itself"""
+    return origin is not None and getattr(origin, 'model', type(origin)) is Product
+
+
+@receiver(pre_save, sender=Review)
+def capture_review_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember the persisted state so post_save can apply the difference"""
+    if raw or _skips_stats(update_fields):
+        return
+    instance._stats_previous = None if instance._state.adding else stored_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+def update_review_stats(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or _skips_stats(update_fields):
+        return
+    previous = None if created else getattr(instance, '_stats_previous', None)
+    apply_review_change(previous, review_snapshot(instance))
+    instance._stats_previous = None
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_stats(sender, instance, origin=None, **kwargs):
+    if _product_cascade(origin):
+        return
+    apply_review_change(review_snapshot(instance), None)
+
+
+@receiver(post_delete, sender=Review)
+def flag_review_insights(sender, instance, origin=None, **kwargs):
+    """Deleted reviews leave their insight rollups to be rebuilt by the pipeline"""
+    # A deleted product's seller can no longer be looked up by the pipeline
+    seller_id = origin.seller_id if isinstance(origin, Product) else None
+    mark_review_removed(instance, seller_id=seller_id)
+
+
+@receiver([post_save, post_delete], sender=ExpertReview)
+def update_expert_review_count(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _product_cascade(origin):
+        return
+    refresh_expert_review_count(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=FarmerNetwork)
+def queue_farmer_recommendation_refresh(sender, instance, raw=False, created=False, origin=None, **kwargs):
+    """Follow graph changed: drop the now-followed candidate and queue both farmers"""
+    # Skip deletes cascading from a removed user; their rows go with them
+    if raw or (origin is not None and getattr(origin, 'model', type(origin)) is not FarmerNetwork):
+        return
+    if created:
+        FarmerRecommendation.objects.filter(
+            farmer_id=instance.follower_id, candidate_id=instance.following_id
+        ).delete()
+    FarmerRecommendationRefresh.objects.bulk_create(
+        [
+            FarmerRecommendationRefresh(farmer_id=instance.follower_id),
+            FarmerRecommendationRefresh(farmer_id=instance.following_id),
+        ],
+        update_conflicts=True,
+        unique_fields=['farmer'],
+        update_fields=['requested_at']
+    )
+
+
+# Trending score sources: "not helpful" votes still signal attention, but less
+PEER_INTERACTION_WEIGHTS = {
+    'implement': 3.0,
+    'share': 2.0,
+    'save': 1.5,
+    'connect': 1.5,
+    'request_info': 1.0,
+}
+
+trending.register_source(
+    ReviewHelpfulVote, 'review',
+    weight=lambda vote: 1.0 if vote.is_helpful else 0.25
+)
+trending.register_source(
+    PeerRecommendationVote, 'recommendation',
+    weight=lambda vote: 1.0 if vote.is_helpful else 0.25
+)
+trending.register_source(
+    PeerRecommendationInteraction, 'recommendation',
+    weight=lambda interaction: PEER_INTERACTION_WEIGHTS.get(interaction.interaction_type, 1.0)
+)
@@ -0,0 +1,144 @@
+"""
+AgriConnect Review Statistics
+Incremental maintenance of ProductReviewStats
+
+Each published review contributes a fixed set of counter deltas (review
+count, verified count, histogram bucket, and a sum/count pair for every
+rating dimension it fills in). Saves and deletes apply the difference
+between a review's old and new contribution with F() expressions, so
+concurrent reviews on the same product never lose updates.
+"""
+
+from collections import Counter
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ExpertReview, ProductReviewStats, Review
+
+# Review fields that affect a review's contribution; saves restricted to
+# other fields (e.g. helpful vote counters) skip stats maintenance.
+STATS_SOURCE_FIELDS = frozenset(
+    ['product', 'product_id', 'status', 'verified_purchase', 'overall_rating'] +
+    [f'{dimension}_rating' for dimension in ProductReviewStats.RATING_DIMENSIONS]
+)
+
+_SNAPSHOT_FIELDS = ['product_id', 'status', 'verified_purchase', 'overall_rating'] + [
+    f'{dimension}_rating' for dimension in ProductReviewStats.RATING_DIMENSIONS
+]
+
+
+def review_contribution(values: Optional[Dict]) -> Counter:
+    """Counter deltas a review contributes to its product's stats"""
+    if not values or values['status'] != 'published':
+        return Counter()
+
+    contribution = Counter(review_count=1, overall_sum=values['overall_rating'])
+    contribution[f"rating_{values['overall_rating']}_count"] = 1
+    if values['verified_purchase']:
+        contribution['verified_count'] = 1
+    for dimension in ProductReviewStats.RATING_DIMENSIONS:
+        rating = values[f'{dimension}_rating']
+        if rating is not None:
+            contribution[f'{dimension}_sum'] = rating
+            contribution[f'{dimension}_count'] = 1
+    return contribution
+
+
+def review_snapshot(review: Review) -> Dict:
+    return {field: getattr(review, field) for field in _SNAPSHOT_FIELDS}
+
+
+def stored_snapshot(review_id) -> Optional[Dict]:
+    """The persisted state of a review, or None if it is not saved yet"""
+    return Review.objects.filter(pk=review_id).values(*_SNAPSHOT_FIELDS).first()
+
+
+def apply_delta(product_id, delta: Dict[str, int]):
+    """Add counter deltas to a product's stats row, creating it if needed"""
+    delta = {field: amount for field, amount in delta.items() if amount}
+    if not delta:
+        return
+    with transaction.atomic():
+        ProductReviewStats.objects.get_or_create(product_id=product_id)
+        ProductReviewStats.objects.filter(product_id=product_id).update(
+            **{field: F(field) + amount for field, amount in delta.items()}
+        )
+
+
+def apply_review_change(old: Optional[Dict], new: Optional[Dict]):
+    """Move a review's contribution from its old state to its new state"""
+    old_contribution = review_contribution(old)
+    new_contribution = review_contribution(new)
+    old_product = old['product_id'] if old else None
+    new_product = new['product_id'] if new else None
+
+    if old_product == new_product:
+        delta = Counter(new_contribution)
+        delta.subtract(old_contribution)
+        apply_delta(new_product, delta)
+        return
+
+    if old_product is not None:
+        apply_delta(old_product, {field: -amount for field, amount in old_contribution.items()})
+    if new_product is not None:
+        apply_delta(new_product, new_contribution)
+
+
+def refresh_expert_review_count(product_id):
+    count = ExpertReview.objects.filter(product_id=product_id, is_published=True).count()
+    with transaction.atomic():
+        ProductReviewStats.objects.get_or_create(product_id=product_id)
+        ProductReviewStats.objects.filter(product_id=product_id).update(expert_review_count=count)
+
+
+def get_product_stats(product_id) -> Optional[ProductReviewStats]:
+    return ProductReviewStats.objects.filter(product_id=product_id).first()
+
+
+def rebuild_stats(product_ids=None) -> int:
+    """Recompute stats rows from scratch with one grouped aggregate per model"""
+    published = Q(reviews__status='published')
+    aggregates = {
+        'review_count': Count('reviews', filter=published),
+        'verified_count': Count('reviews', filter=published & Q(reviews__verified_purchase=True)),
+        'overall_sum': Sum('reviews__overall_rating', filter=published),
+        'expert_review_count': Count('expert_reviews', filter=Q(expert_reviews__is_published=True)),
+    }
+    for rating in range(1, 6):
+        aggregates[f'rating_{rating}_count'] = Count(
+            'reviews', filter=published & Q(reviews__overall_rating=rating)
+        )
+    for dimension in ProductReviewStats.RATING_DIMENSIONS:
+        aggregates[f'{dimension}_sum'] = Sum(f'reviews__{dimension}_rating', filter=published)
+        aggregates[f'{dimension}_count'] = Count(f'reviews__{dimension}_rating', filter=published)
+
+    from products.models import Product
+
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    # The expert join multiplies review rows; aggregate the two relations separately
+    expert_counts = dict(
+        products.annotate(value=aggregates.pop('expert_review_count')).values_list('pk', 'value')
+    )
+    rows = []
+    for values in products.annotate(**aggregates).values('pk', *aggregates):
+        product_id = values.pop('pk')
+        row = ProductReviewStats(
+            product_id=product_id,
+            expert_review_count=expert_counts.get(product_id, 0),
+            **{field: value or 0 for field, value in values.items()}
+        )
+        if row.review_count or row.expert_review_count:
+            rows.append(row)
+
+    with transaction.atomic():
+        stale = ProductReviewStats.objects.all()
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        stale.delete()
+        ProductReviewStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -1,3 +1,277 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import trending
+from products.models import Category, Product
+from users.models import FarmerProfile
+from .farmer_graph import FarmerGraph, compute_recommendations, refresh_queued_recommendations, refresh_recommendations
+from .insights import process_pending, rebuild_all_rollups
+from .models import (
+    FarmerNetwork, FarmerRecommendation, FarmerRecommendationRefresh, ProductReviewStats, Review, ReviewHelpfulVote,
+    ReviewInsightRollup, ReviewResponse, ReviewSentiment,
+)
+from .sentiment import analyze
+from .serializers import ReviewDetailSerializer
+from .stats import rebuild_stats
+from .views import ReviewViewSet
+
+User = get_user_model()
+
+COLUMNS = ('farmer_id', 'candidate_id', 'rank', 'score', 'mutual_connections', 'crop_similarity', 'same_region')
+
+
+class FarmerRecommendationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = []
+        crops = [['maize'], ['maize', 'cassava'], ['cassava'], ['cocoa'], ['maize', 'cocoa'], ['yam']]
+        for position, farmer_crops in enumerate(crops):
+            farmer = User.objects.create_user(
+                f'+23320000010{position}', password='secret', roles=['FARMER'],
+                region='Ashanti' if position % 2 else 'Volta'
+            )
+            FarmerProfile.objects.update_or_create(
+                user=farmer, defaults={'primary_crops': farmer_crops, 'years_of_experience': position * 3}
+            )
+            cls.farmers.append(farmer)
+        a, b, c, d, e, f = cls.farmers
+        FarmerNetwork.objects.bulk_create([
+            FarmerNetwork(follower=follower, following=following)
+            for follower, following in [(a, b), (b, c), (c, d), (d, e), (e, f), (f, a), (b, d)]
+        ])
+
+    def rows(self, recommendations):
+        return {
+            tuple(round(value, 5) if isinstance(value, float) else value for value in row)
+            for row in ((getattr(rec, column) for column in COLUMNS) for rec in recommendations)
+        }
+
+    def test_focused_graph_matches_full_graph(self):
+        focus = [self.farmers[0].pk, self.farmers[3].pk]
+        full = [rec for rec in compute_recommendations(FarmerGraph()) if rec.farmer_id in focus]
+        focused = compute_recommendations(FarmerGraph(focus), focus)
+        self.assertTrue(full)
+        self.assertEqual(self.rows(focused), self.rows(full))
+
+    def test_incremental_refresh_only_replaces_queued_farmers(self):
+        refresh_recommendations()
+        untouched = FarmerRecommendation.objects.exclude(farmer=self.farmers[0]).count()
+        FarmerRecommendationRefresh.objects.all().delete()
+        FarmerRecommendationRefresh.objects.create(farmer=self.farmers[0])
+
+        self.assertEqual(refresh_queued_recommendations(), 1)
+        self.assertFalse(FarmerRecommendationRefresh.objects.exists())
+        self.assertEqual(FarmerRecommendation.objects.exclude(farmer=self.farmers[0]).count(), untouched)
+
+    def test_recommended_farmers_keeps_profile_fields(self):
+        refresh_recommendations()
+        client = APIClient()
+        client.force_authenticate(self.farmers[0])
+
+        response = client.get('/api/v1/reviews/farmer-network/recommended_farmers/', {'limit': -1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        recommendation = response.data[0]
+        for field in ('id', 'username', 'user_name', 'experience_level', 'farm_size',
+                      'years_of_experience', 'primary_crops', 'rank', 'score'):
+            self.assertIn(field, recommendation)
+        self.assertEqual(recommendation['rank'], 1)
+
+
+class ReviewFixtureMixin:
+    """A product with reviews, created without Product.save's broken dashboard signal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('+233200000120', password='secret', roles=['FARMER'])
+        cls.buyers = [
+            User.objects.create_user(f'+23320000013{number}', password='secret', roles=['CONSUMER'])
+            for number in range(4)
+        ]
+        category = Category.objects.create(name='Tubers')
+        cls.product = Product.objects.bulk_create([Product(
+            name='Cassava', description='Cassava', category=category, seller=cls.seller,
+            price_per_unit=Decimal('8.00'), slug='cassava', product_type='raw'
+        )])[0]
+
+    def make_review(self, reviewer, rating=5, **fields):
+        fields.setdefault('content', 'Good cassava')
+        return Review.objects.create(
+            product=self.product, reviewer=reviewer, overall_rating=rating, status='published', **fields
+        )
+
+
+class TrendingScoreTests(ReviewFixtureMixin, TestCase):
+
+    def half_lives_ago(self, count, now):
+        return now - timedelta(hours=trending.get_trending_config()['HALF_LIFE_HOURS'] * count)
+
+    def test_votes_bump_the_score(self):
+        review = self.make_review(self.buyers[0])
+        ReviewHelpfulVote.objects.create(review=review, user=self.buyers[1], is_helpful=True)
+        ReviewHelpfulVote.objects.create(review=review, user=self.buyers[2], is_helpful=False)
+
+        review.refresh_from_db()
+        self.assertAlmostEqual(review.trending_score, 1.25, places=4)
+        self.assertIsNotNone(review.trending_updated_at)
+
+    def test_event_decays_the_stored_score_first(self):
+        now = timezone.now()
+        review = self.make_review(self.buyers[0], trending_score=4.0, trending_updated_at=self.half_lives_ago(1, now))
+
+        trending.record_event(Review, review.pk, 1.0, now=now)
+        review.refresh_from_db()
+        self.assertAlmostEqual(review.trending_score, 3.0, places=4)
+        self.assertEqual(review.trending_updated_at, now)
+
+    def test_renormalize_brings_scores_forward_and_drops_faded_ones(self):
+        now = timezone.now()
+        stale = self.make_review(self.buyers[0], trending_score=8.0, trending_updated_at=self.half_lives_ago(3, now))
+        recent = self.make_review(self.buyers[1], trending_score=2.0, trending_updated_at=now)
+        faded = self.make_review(self.buyers[2], trending_score=0.5, trending_updated_at=self.half_lives_ago(20, now))
+        # The raw column still favours the stale review
+        self.assertEqual(Review.objects.order_by('-trending_score').first(), stale)
+
+        self.assertEqual(trending.renormalize(Review, now=now), 3)
+        scores = dict(Review.objects.values_list('pk', 'trending_score'))
+        self.assertAlmostEqual(scores[stale.pk], 1.0, places=4)
+        self.assertAlmostEqual(scores[recent.pk], 2.0, places=4)
+        self.assertEqual(scores[faded.pk], 0)
+        self.assertEqual(list(Review.objects.order_by('-trending_score')), [recent, stale, faded])
+
+    def test_rebuild_matches_incremental_scores(self):
+        review = self.make_review(self.buyers[0])
+        for buyer, helpful in zip(self.buyers[1:], (True, False, True)):
+            ReviewHelpfulVote.objects.create(review=review, user=buyer, is_helpful=helpful)
+        review.refresh_from_db()
+        incremental = review.trending_score
+
+        Review.objects.filter(pk=review.pk).update(trending_score=0)
+        self.assertEqual(trending.rebuild(Review), 1)
+        review.refresh_from_db()
+        self.assertAlmostEqual(review.trending_score, incremental, places=4)
+
+
+class ReviewStatsTests(ReviewFixtureMixin, TestCase):
+
+    def stats(self):
+        stats = ProductReviewStats.objects.filter(product=self.product).values().first()
+        stats.pop('updated_at')
+        return stats
+
+    def test_incremental_stats_match_a_full_rebuild(self):
+        self.make_review(self.buyers[0], rating=4, quality_rating=5, verified_purchase=True)
+        edited = self.make_review(self.buyers[1], rating=2)
+        hidden = self.make_review(self.buyers[2], rating=5, freshness_rating=3)
+        self.make_review(self.buyers[3], rating=1).delete()
+        edited.overall_rating = 3
+        edited.taste_rating = 4
+        edited.save()
+        hidden.status = 'hidden'
+        hidden.save()
+
+        incremental = self.stats()
+        self.assertEqual(
+            (incremental['review_count'], incremental['verified_count'], incremental['overall_sum']), (2, 1, 7)
+        )
+        self.assertEqual((incremental['rating_2_count'], incremental['rating_3_count']), (0, 1))
+        self.assertEqual((incremental['freshness_count'], incremental['taste_sum']), (0, 4))
+
+        rebuild_stats([self.product.pk])
+        self.assertEqual(self.stats(), incremental)
+
+    def test_vote_counter_saves_leave_stats_alone(self):
+        review = self.make_review(self.buyers[0])
+        # Knock the row out of step so any recount would show
+        ProductReviewStats.objects.filter(product=self.product).update(review_count=0)
+
+        review.helpful_votes = 3
+        review.save(update_fields=['helpful_votes'])
+        self.assertEqual(self.stats()['review_count'], 0)
+
+
+class ReviewBatchSerializationTests(ReviewFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.reviews = [self.make_review(buyer) for buyer in self.buyers]
+        ReviewHelpfulVote.objects.create(review=self.reviews[0], user=self.seller, is_helpful=False)
+        ReviewResponse.objects.create(review=self.reviews[1], responder=self.seller, content='Thank you')
+
+    def page(self, size=None):
+        return list(ReviewViewSet.queryset.order_by('created_at')[:size])
+
+    def serialize(self, data, many=True):
+        request = APIRequestFactory().get('/api/v1/reviews/reviews/')
+        request.user = self.seller
+        return ReviewDetailSerializer(data, many=many, context={'request': request}).data
+
+    def test_page_matches_single_object_output(self):
+        page = self.serialize(self.page())
+        self.assertEqual(page, [self.serialize(review, many=False) for review in self.page()])
+        self.assertEqual([review['can_respond'] for review in page], [True, False, True, True])
+        self.assertEqual(page[0]['user_vote']['is_helpful'], False)
+        self.assertIsNone(page[2]['user_vote'])
+
+    def test_viewer_lookups_do_not_grow_with_the_page(self):
+        with CaptureQueriesContext(connection) as short_page:
+            self.serialize(self.page(2))
+        with CaptureQueriesContext(connection) as full_page:
+            self.serialize(self.page())
+        self.assertEqual(len(full_page), len(short_page))
+
+
+class ReviewInsightTests(ReviewFixtureMixin, TestCase):
+
+    def rollups(self):
+        return {
+            (rollup.pop('scope'), rollup.pop('key')): rollup
+            for rollup in ReviewInsightRollup.objects.values(
+                'scope', 'key', 'review_count', 'rating_sum', 'positive_count', 'neutral_count',
+                'negative_count', 'topic_counts', 'dirty'
+            )
+        }
+
+    def test_sentiment_is_attributed_per_clause(self):
+        result = analyze('Very fresh cassava but the delivery was late')
+        self.assertEqual(result.topics, {'delivery': -1, 'freshness': 1})
+        self.assertEqual(analyze('The cassava was not good').label, 'negative')
+        self.assertEqual(analyze('Excellent, really tasty and fresh').label, 'positive')
+
+    def test_only_new_and_edited_reviews_are_analyzed(self):
+        first = self.make_review(self.buyers[0], content='Fresh and tasty')
+        self.make_review(self.buyers[1], rating=2, content='Rotten and overpriced')
+        self.assertEqual(process_pending()['reviews'], 2)
+        self.assertEqual(process_pending()['reviews'], 0)
+
+        first.content = 'Stale by the time it arrived'
+        first.save()
+        self.assertEqual(process_pending()['reviews'], 1)
+        self.assertEqual(ReviewSentiment.objects.get(review=first).label, 'negative')
+        self.assertEqual(self.rollups()[('overall', 'all')]['negative_count'], 2)
+
+    def test_incremental_rollups_match_a_full_rebuild(self):
+        self.make_review(self.buyers[0], content='Fresh and tasty')
+        self.make_review(self.buyers[1], rating=3, content='Good taste but the bag was torn')
+        process_pending()
+        removed = self.make_review(self.buyers[2], rating=1, content='Rotten')
+        self.make_review(self.buyers[3], rating=4, content='Quick delivery')
+        process_pending()
+        removed.delete()
+        self.assertTrue(self.rollups()[('product', str(self.product.pk))]['dirty'])
+
+        process_pending()
+        incremental = self.rollups()
+        self.assertEqual(incremental[('product', str(self.product.pk))]['review_count'], 3)
+        self.assertEqual(incremental[('farmer', str(self.seller.pk))]['rating_sum'], 12)
 
-# Create your tests here.
+        ReviewInsightRollup.objects.all().delete()
+        rebuild_all_rollups()
+        self.assertEqual(self.rollups(), incremental)
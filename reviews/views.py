@@ -1,5 +1,5 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Count, Q, Case, When, IntegerField, F
+from django.db.models import Q, Case, When, IntegerField
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework import viewsets, status, permissions, serializers
@@ -12,7 +12,8 @@ from rest_framework import filters
 from .models import (
     Review, ReviewHelpfulVote, ReviewFlag, ReviewResponse,
     ExpertReview, ReviewRecipe, SeasonalInsight,
-    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction
+    PeerRecommendation, PeerRecommendationVote, FarmerNetwork, PeerRecommendationInteraction,
+    ProductReviewStats, FarmerRecommendation, FarmerRecommendationRefresh
 )
 from .serializers import (
     ReviewDetailSerializer, ReviewListSerializer, ReviewCreateSerializer,
@@ -21,8 +22,11 @@ from .serializers import (
     ProductReviewSummarySerializer, ReviewAnalyticsSerializer,
     PeerRecommendationListSerializer, PeerRecommendationDetailSerializer, 
     PeerRecommendationCreateSerializer, PeerRecommendationVoteSerializer,
-    FarmerNetworkSerializer, PeerRecommendationInteractionSerializer
+    FarmerNetworkSerializer, PeerRecommendationInteractionSerializer,
+    FarmerRecommendationSerializer
 )
+from .insights import get_review_analytics
+from .stats import get_product_stats
 from products.models import Product
 from orders.models import Order
 
@@ -38,7 +42,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.select_related(
         'reviewer', 'product', 'order', 'response__responder'
     ).prefetch_related(
-        'recipes', 'helpful_votes_detail', 'flags'
+        'recipes__author', 'helpful_votes_detail__user', 'flags__flagger', 'flags__reviewed_by'
     ).filter(status='published')
     
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -105,7 +109,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
             if (review.order.buyer == self.request.user and 
                 review.order.status == 'delivered'):
                 review.verified_purchase = True
-                review.save()
+                review.save(update_fields=['verified_purchase', 'updated_at'])
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def helpful_vote(self, request, pk=None):
@@ -131,7 +135,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
         
         review.helpful_votes = helpful_count
         review.total_votes = total_count
-        review.save()
+        review.save(update_fields=['helpful_votes', 'total_votes', 'updated_at'])
         
         serializer = ReviewHelpfulVoteSerializer(vote)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -205,79 +209,62 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
-            return Response(
-                {'error': 'Product not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        stats = get_product_stats(product_id)
+        if stats is None:
+            if not Product.objects.filter(id=product_id).exists():
+                return Response(
+                    {'error': 'Product not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            stats = ProductReviewStats(product_id=product_id)
         
-        reviews = Review.objects.filter(product=product, status='published')
+        recent_reviews = Review.objects.filter(
+            product_id=product_id, status='published'
+        ).select_related('reviewer', 'response__responder').order_by('-created_at')[:5]
         
-        # Calculate summary statistics
         summary_data = {
-            'total_reviews': reviews.count(),
-            'average_rating': reviews.aggregate(
-                avg=Avg('overall_rating')
-            )['avg'] or 0,
-            'verified_reviews_count': reviews.filter(verified_purchase=True).count(),
+            'total_reviews': stats.review_count,
+            'average_rating': stats.average_rating,
+            'verified_reviews_count': stats.verified_count,
             
             # Rating distribution
-            'rating_distribution': {
-                str(i): reviews.filter(overall_rating=i).count()
-                for i in range(1, 6)
-            },
+            'rating_distribution': stats.rating_distribution,
             
             # Detailed rating averages
-            'average_quality_rating': reviews.aggregate(
-                avg=Avg('quality_rating')
-            )['avg'] or 0,
-            'average_freshness_rating': reviews.aggregate(
-                avg=Avg('freshness_rating')
-            )['avg'] or 0,
-            'average_packaging_rating': reviews.aggregate(
-                avg=Avg('packaging_rating')
-            )['avg'] or 0,
-            'average_value_rating': reviews.aggregate(
-                avg=Avg('value_rating')
-            )['avg'] or 0,
-            'average_delivery_rating': reviews.aggregate(
-                avg=Avg('delivery_rating')
-            )['avg'] or 0,
-            'average_farmer_rating': reviews.aggregate(
-                avg=Avg('farmer_rating')
-            )['avg'] or 0,
+            'average_quality_rating': stats.dimension_average('quality'),
+            'average_freshness_rating': stats.dimension_average('freshness'),
+            'average_packaging_rating': stats.dimension_average('packaging'),
+            'average_value_rating': stats.dimension_average('value'),
+            'average_delivery_rating': stats.dimension_average('delivery'),
+            'average_farmer_rating': stats.dimension_average('farmer'),
+            'dimension_averages': stats.dimension_averages,
             
             # Recent reviews
             'recent_reviews': ReviewListSerializer(
-                reviews.order_by('-created_at')[:5],
+                recent_reviews,
                 many=True,
                 context={'request': request}
             ).data,
             
             # Expert reviews
-            'expert_reviews_count': ExpertReview.objects.filter(
-                product=product, is_published=True
-            ).count(),
-            'has_expert_reviews': ExpertReview.objects.filter(
-                product=product, is_published=True
-            ).exists(),        }
+            'expert_reviews_count': stats.expert_review_count,
+            'has_expert_reviews': stats.expert_review_count > 0,
+        }
         
         serializer = ProductReviewSummarySerializer(summary_data)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        """Get trending reviews based on recent activity"""
-        days_back = int(request.query_params.get('days', 7))
-        since_date = timezone.now() - timezone.timedelta(days=days_back)
+        """Get trending reviews by time-decayed vote activity"""
+        trending_reviews = self.get_queryset()
         
-        trending_reviews = self.get_queryset().filter(
-            created_at__gte=since_date
-        ).annotate(
-            popularity_score=F('helpful_votes') + F('total_votes')
-        ).order_by('-popularity_score', '-created_at')[:20]
+        days_back = request.query_params.get('days')
+        if days_back:
+            since_date = timezone.now() - timezone.timedelta(days=int(days_back))
+            trending_reviews = trending_reviews.filter(created_at__gte=since_date)
+        
+        trending_reviews = trending_reviews.order_by('-trending_score', '-created_at')[:20]
         
         serializer = self.get_serializer(trending_reviews, many=True)
         return Response(serializer.data)
@@ -285,13 +272,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def analytics(self, request):
         """Get review analytics and insights"""
-        # This would include comprehensive analytics
-        # For now, return basic structure
+        # Sentiment, trends and rankings come from rollups maintained by the
+        # process_review_insights pipeline
         analytics_data = {
-            'review_trends': {},
-            'sentiment_analysis': {},
-            'top_rated_products': [],
-            'top_rated_farmers': [],
+            **get_review_analytics(),
             'seasonal_recommendations': [],
             'most_helpful_reviewers': [],
             'most_active_reviewers': []
@@ -597,16 +581,10 @@ class PeerRecommendationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        """Get trending peer recommendations"""
-        # Recommendations with high recent interaction
-        from datetime import timedelta
-        recent_date = timezone.now() - timedelta(days=30)
-        
+        """Get trending peer recommendations by time-decayed votes and interactions"""
         trending = self.get_queryset().filter(
-            created_at__gte=recent_date
-        ).annotate(
-            recent_interactions=Count('interactions', filter=Q(interactions__created_at__gte=recent_date))
-        ).order_by('-recent_interactions', '-peer_helpful_votes')[:10]
+            trending_score__gt=0
+        ).order_by('-trending_score', '-peer_helpful_votes')[:10]
         
         serializer = self.get_serializer(trending, many=True)
         return Response(serializer.data)
@@ -727,34 +705,27 @@ class FarmerNetworkViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def recommended_farmers(self, request):
-        """Get recommended farmers to follow based on similar interests"""
+        """Get precomputed farmer recommendations from the follow graph job"""
         if not hasattr(request.user, 'farmer_profile'):
             return Response(
                 {'error': 'Only farmers can get farmer recommendations'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        farmer_profile = request.user.farmer_profile
-        
-        # Find farmers with similar crops or in same region
-        similar_farmers = User.objects.filter(
-            farmer_profile__isnull=False
-        ).exclude(id=request.user.id).exclude(
-            farmer_followers__follower=request.user
-        )
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            limit = 10
         
-        # Filter by similar crops if available
-        if farmer_profile.primary_crops:
-            similar_farmers = similar_farmers.filter(
-                farmer_profile__primary_crops__overlap=farmer_profile.primary_crops
-            )
+        recommendations = FarmerRecommendation.objects.filter(
+            farmer=request.user
+        ).exclude(
+            candidate__farmer_followers__follower=request.user
+        ).select_related('candidate__farmer_profile').order_by('rank')[:limit]
         
-        # Get top recommended farmers
-        recommended = similar_farmers.order_by(
-            '-farmer_profile__years_of_experience',
-            '-farmer_profile__organic_certified'
-        )[:10]
+        if not recommendations:
+            # Not computed yet; the next incremental refresh picks this farmer up
+            FarmerRecommendationRefresh.objects.get_or_create(farmer=request.user)
         
-        from .serializers import FarmerProfileSerializer
-        serializer = FarmerProfileSerializer(recommended, many=True)
+        serializer = FarmerRecommendationSerializer(recommendations, many=True)
         return Response(serializer.data)
@@ -18,7 +18,6 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 
 import requests
-from twilio.rest import Client
 
 # Import AI services
 from ai.services import ai_service_manager
@@ -495,25 +494,6 @@ class AVRSMSService:
                 'error': str(e),
                 'verification_id': verification_id
             }
-                return {
-                    'success': True,
-                    'verification_id': result.get('verfication_id'),
-                    'status': result.get('status'),
-                    'remarks': result.get('remarks')
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': result.get('remarks', 'Failed to send OTP'),
-                    'status': result.get('status')
-                }
-            
-        except Exception as e:
-            logger.error(f"OTP send failed: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
-            }
     
     def verify_otp(self, verification_id: int, verification_code: str) -> Dict:
         """Verify OTP code"""
@@ -676,7 +656,7 @@ class USSDService:
             user = self._get_or_create_user(phone_number)
             
             # Get AI response
-            response = ai_service_manager.conversation_service.process_conversation(
+            response = ai_service_manager.conversation_service.chat(
                 user=user,
                 message=question,
                 language='en'
@@ -850,7 +830,7 @@ class SMSFarmerOnboardingService:
     """Complete SMS-based farmer onboarding system"""
     
     def __init__(self):
-        self.sms_service = AfricasTalkingSMSService()
+        self.sms_service = AVRSMSService()
         self.ussd_service = USSDService()
         self.language_manager = SMSLanguageManager()
     
@@ -900,7 +880,7 @@ class SMSFarmerOnboardingService:
         try:
             user = self._get_or_create_user(phone_number)
             
-            response = ai_service_manager.conversation_service.process_conversation(
+            response = ai_service_manager.conversation_service.chat(
                 user=user,
                 message=question,
                 language=language
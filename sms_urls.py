@@ -23,4 +23,5 @@ urlpatterns = [
     # Analytics & Management
     path('analytics/', sms_views.sms_analytics, name='sms_analytics'),
     path('broadcast/', sms_views.bulk_sms_broadcast, name='bulk_sms_broadcast'),
+    path('broadcast/<uuid:broadcast_id>/', sms_views.bulk_sms_broadcast_status, name='bulk_sms_broadcast_status'),
 ]
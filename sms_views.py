@@ -9,8 +9,10 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
+from rest_framework.decorators import api_view, permission_classes
 
-from .sms_farmer_onboarding import sms_onboarding_service
+from admin_dashboard.permissions import IsAdminUserEnhanced
+from sms_farmer_onboarding import sms_onboarding_service
 
 logger = logging.getLogger(__name__)
 
@@ -284,82 +286,80 @@ def sms_analytics(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@csrf_exempt  
-@require_http_methods(["POST"])
+@api_view(['POST'])
+@permission_classes([IsAdminUserEnhanced])
 def bulk_sms_broadcast(request):
-    """Send bulk SMS to farmers"""
+    """Queue a bulk SMS broadcast to farmers (staff/admin only); progress is polled by broadcast id"""
     try:
-        data = json.loads(request.body)
+        data = request.data
         message = data.get('message')
         target_country = data.get('target_country')  # e.g., 'ghana', 'nigeria'
+        target_region = data.get('target_region')
         language = data.get('language', 'en')
         
         if not message:
             return JsonResponse({'error': 'Missing message'}, status=400)
         
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
+        from communications.broadcast import country_prefix, start_broadcast
         
-        # Get target farmers
-        if target_country:
-            country_codes = {
-                'ghana': '+233',
-                'nigeria': '+234',
-                'kenya': '+254',
-                'south_africa': '+27',
-                'senegal': '+221'
-            }
-            
-            country_code = country_codes.get(target_country.lower())
-            if country_code:
-                target_users = User.objects.filter(
-                    username__startswith=country_code,
-                    email__endswith='@sms.agriconnect.com'
-                )
-            else:
-                target_users = User.objects.filter(
-                    email__endswith='@sms.agriconnect.com'
-                )
-        else:
-            target_users = User.objects.filter(
-                email__endswith='@sms.agriconnect.com'
-            )
+        if target_country and not country_prefix(target_country):
+            return JsonResponse({'error': f'Unsupported target country: {target_country}'}, status=400)
         
-        # Send SMS to all target users
-        success_count = 0
-        error_count = 0
-        results = []
+        broadcast = start_broadcast(
+            message,
+            language=language,
+            target_country=target_country,
+            target_region=target_region,
+            created_by=request.user
+        )
         
-        for user in target_users[:100]:  # Limit to 100 for safety
-            try:
-                result = sms_onboarding_service.sms_service.send_sms(
-                    user.username, message
-                )
-                results.append({
-                    'phone_number': user.username,
-                    'status': 'sent',
-                    'result': result
-                })
-                success_count += 1
-            except Exception as e:
-                results.append({
-                    'phone_number': user.username,
-                    'status': 'error',
-                    'error': str(e)
-                })
-                error_count += 1
+        if broadcast.status == 'failed':
+            # Never queued; report it with the broadcast id rather than a bare 500
+            return JsonResponse({
+                'success': False,
+                'broadcast_id': str(broadcast.id),
+                'status': broadcast.status,
+                'error': broadcast.error
+            }, status=503)
         
         return JsonResponse({
             'success': True,
+            'broadcast_id': str(broadcast.id),
+            'status': broadcast.status,
             'message_sent': message,
             'target_country': target_country,
+            'target_region': target_region,
             'language': language,
-            'total_targeted': target_users.count(),
-            'success_count': success_count,
-            'error_count': error_count,
-            'results': results
-        })
+            'status_url': request.build_absolute_uri(f'{broadcast.id}/')
+        }, status=202)
         
     except Exception as e:
         logger.error(f"Bulk SMS error: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUserEnhanced])
+def bulk_sms_broadcast_status(request, broadcast_id):
+    """Progress of a bulk SMS broadcast (staff/admin only)"""
+    from communications.models import SMSBroadcast
+    
+    broadcast = SMSBroadcast.objects.filter(pk=broadcast_id).first()
+    if broadcast is None:
+        return JsonResponse({'error': 'Broadcast not found'}, status=404)
+    
+    return JsonResponse({
+        'broadcast_id': str(broadcast.id),
+        'status': broadcast.status,
+        'target_country': broadcast.target_country,
+        'target_region': broadcast.target_region,
+        'language': broadcast.language,
+        'total_targeted': broadcast.total_recipients,
+        'success_count': broadcast.sent_count,
+        'error_count': broadcast.failed_count,
+        'total_cost': str(broadcast.total_cost),
+        'error': broadcast.error,
+        'created_at': broadcast.created_at.isoformat(),
+        'started_at': broadcast.started_at.isoformat() if broadcast.started_at else None,
+        'completed_at': broadcast.completed_at.isoformat() if broadcast.completed_at else None
+    })
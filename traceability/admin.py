@@ -10,7 +10,7 @@ from django.utils.safestring import mark_safe
 from .models import (
     BlockchainNetwork, SmartContract, BlockchainTransaction,
     Farm, FarmCertification, ProductTrace, SupplyChainEvent,
-    ConsumerScan
+    ConsumerScan, ConsumerScanRollup, ProductRecall
 )
 
 @admin.register(BlockchainNetwork)
@@ -107,3 +107,17 @@ class ConsumerScanAdmin(admin.ModelAdmin):
     list_filter = ['device_type', 'feedback_rating', 'scanned_at']
     search_fields = ['product_trace__product__name', 'consumer_id', 'ip_address']
     readonly_fields = ['scan_id', 'scanned_at']
+
+@admin.register(ConsumerScanRollup)
+class ConsumerScanRollupAdmin(admin.ModelAdmin):
+    list_display = ['product_trace', 'bucket_start', 'region', 'device_type', 'scan_count']
+    list_filter = ['device_type', 'bucket_start']
+    search_fields = ['product_trace__product__name', 'product_trace__batch_number', 'region']
+    readonly_fields = ['updated_at']
+
+@admin.register(ProductRecall)
+class ProductRecallAdmin(admin.ModelAdmin):
+    list_display = ['batch_number', 'status', 'notifications_sent', 'notifications_failed', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['batch_number', 'reason']
+    readonly_fields = ['recall_id', 'impact_summary', 'notifications_sent', 'notifications_failed', 'created_at', 'notified_at']
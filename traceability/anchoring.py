@@ -0,0 +1,141 @@
+"""
+AgriConnect Blockchain Anchoring
+Submit supply chain events to a chain backend and track confirmations
+
+Anchoring and confirmation polling work in batches: submissions are
+recorded with one bulk_create, and polling reads receipts for a whole page
+of pending transactions before writing them back with one bulk_update.
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from .blockchain_sim import get_simulated_chain, is_simulated_network
+from .models import BlockchainTransaction, SmartContract, SupplyChainEvent
+
+DEFAULT_REQUIRED_CONFIRMATIONS = 6
+DEFAULT_GAS_LIMIT = 200000
+DEFAULT_GAS_PRICE = 30 * 10 ** 9
+
+
+class ChainBackendUnavailable(Exception):
+    """Raised when a network has no usable chain backend"""
+
+
+def get_chain_backend(network):
+    """Return the chain backend for a network"""
+    if is_simulated_network(network):
+        return get_simulated_chain(network)
+    raise ChainBackendUnavailable(
+        f"No chain backend configured for {network.name}; use a sim:// RPC URL for local testing"
+    )
+
+
+def event_fingerprint(event: SupplyChainEvent) -> str:
+    payload = {
+        'event_id': str(event.event_id),
+        'product_trace': event.product_trace_id,
+        'event_type': event.event_type,
+        'timestamp': event.timestamp.isoformat(),
+        'location': event.location,
+    }
+    return '0x' + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def anchor_events(events: Iterable[SupplyChainEvent], contract: SmartContract, from_address: str,
+                  backend=None) -> List[BlockchainTransaction]:
+    """Submit events to the chain and record one pending transaction per event"""
+    backend = backend or get_chain_backend(contract.network)
+    events = list(events)
+    pending = []
+    for event in events:
+        fingerprint = event_fingerprint(event)
+        parameters = {'event_id': str(event.event_id), 'fingerprint': fingerprint}
+        tx_hash = backend.send_transaction(
+            'recordSupplyChainEvent', parameters, from_address, contract.contract_address,
+            gas_limit=DEFAULT_GAS_LIMIT
+        )
+        event.blockchain_hash = fingerprint
+        pending.append(BlockchainTransaction(
+            transaction_hash=tx_hash,
+            contract=contract,
+            function_name='recordSupplyChainEvent',
+            parameters=parameters,
+            from_address=from_address,
+            to_address=contract.contract_address,
+            gas_limit=DEFAULT_GAS_LIMIT,
+            gas_price=DEFAULT_GAS_PRICE,
+        ))
+
+    with transaction.atomic():
+        created = BlockchainTransaction.objects.bulk_create(pending, batch_size=1000)
+        for event, blockchain_tx in zip(events, created):
+            event.blockchain_transaction = blockchain_tx
+        SupplyChainEvent.objects.bulk_update(
+            events, ['blockchain_hash', 'blockchain_transaction'], batch_size=1000
+        )
+    return created
+
+
+def apply_receipt(blockchain_tx: BlockchainTransaction, receipt: Dict,
+                  required_confirmations: int = DEFAULT_REQUIRED_CONFIRMATIONS) -> bool:
+    """Copy a receipt onto a transaction row; returns True if anything changed"""
+    if receipt is None:
+        return False
+
+    previous = (blockchain_tx.status, blockchain_tx.block_number, blockchain_tx.confirmation_count)
+    blockchain_tx.block_number = receipt['block_number']
+    blockchain_tx.block_hash = receipt['block_hash'] or ''
+    blockchain_tx.gas_used = receipt['gas_used']
+    blockchain_tx.confirmation_count = receipt['confirmations']
+
+    if receipt['status'] == 'failed':
+        blockchain_tx.status = 'failed'
+    elif receipt['status'] == 'confirmed' and receipt['confirmations'] >= required_confirmations:
+        blockchain_tx.status = 'confirmed'
+        blockchain_tx.confirmed_at = blockchain_tx.confirmed_at or timezone.now()
+    else:
+        # Includes transactions knocked back to the mempool by a reorg
+        blockchain_tx.status = 'pending'
+        blockchain_tx.confirmed_at = None
+
+    return previous != (blockchain_tx.status, blockchain_tx.block_number, blockchain_tx.confirmation_count)
+
+
+def poll_pending_transactions(network, backend=None, batch_size: int = 1000,
+                              required_confirmations: int = DEFAULT_REQUIRED_CONFIRMATIONS) -> Dict:
+    """Refresh confirmation state for pending transactions on a network"""
+    backend = backend or get_chain_backend(network)
+    pending = list(
+        BlockchainTransaction.objects.filter(
+            contract__network=network, status='pending'
+        ).order_by('created_at')[:batch_size]
+    )
+    receipts = backend.get_receipts([tx.transaction_hash for tx in pending])
+
+    changed = [
+        tx for tx in pending
+        if apply_receipt(tx, receipts.get(tx.transaction_hash), required_confirmations)
+    ]
+    if changed:
+        BlockchainTransaction.objects.bulk_update(
+            changed,
+            ['status', 'block_number', 'block_hash', 'gas_used', 'confirmation_count', 'confirmed_at'],
+            batch_size=1000
+        )
+        confirmed_ids = [tx.pk for tx in changed if tx.status == 'confirmed']
+        if confirmed_ids:
+            SupplyChainEvent.objects.filter(
+                blockchain_transaction_id__in=confirmed_ids
+            ).update(status='verified', verified_at=timezone.now())
+
+    return {
+        'polled': len(pending),
+        'updated': len(changed),
+        'confirmed': sum(1 for tx in changed if tx.status == 'confirmed'),
+        'failed': sum(1 for tx in changed if tx.status == 'failed'),
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TraceabilityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'traceability'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import traceability.signals
@@ -0,0 +1,221 @@
+"""
+AgriConnect Simulated Blockchain Backend
+In-process chain for exercising traceability anchoring without a live network
+
+Blocks are mined lazily from a clock: whenever the chain is touched it
+produces every block that should have been sealed since the last one, so
+no background thread is needed and benchmarks can drive a virtual clock.
+Failure and reorg injection are seeded for reproducible runs.
+"""
+
+import hashlib
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+SIMULATED_RPC_SCHEME = 'sim://'
+
+
+@dataclass
+class SimulatedTransaction:
+    tx_hash: str
+    function_name: str
+    parameters: Dict
+    from_address: str
+    to_address: str
+    gas_limit: int
+    submitted_at: float
+    block_number: Optional[int] = None
+    block_hash: str = ''
+    status: str = 'pending'  # pending, confirmed, failed
+    gas_used: Optional[int] = None
+
+
+@dataclass
+class SimulatedBlock:
+    number: int
+    block_hash: str
+    parent_hash: str
+    timestamp: float
+    tx_hashes: List[str] = field(default_factory=list)
+
+
+class SimulatedChain:
+    """Thread-safe in-process chain with configurable block time, failures and reorgs"""
+
+    def __init__(
+        self,
+        block_time: float = 2.0,
+        max_block_transactions: int = 5000,
+        failure_rate: float = 0.0,
+        reorg_rate: float = 0.0,
+        max_reorg_depth: int = 3,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.block_time = block_time
+        self.max_block_transactions = max_block_transactions
+        self.failure_rate = failure_rate
+        self.reorg_rate = reorg_rate
+        self.max_reorg_depth = max_reorg_depth
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._nonce = itertools.count()
+        self._mempool: List[str] = []
+        self._transactions: Dict[str, SimulatedTransaction] = {}
+        genesis = SimulatedBlock(0, self._hash('genesis'), '0x' + '0' * 64, self.clock())
+        self._blocks: List[SimulatedBlock] = [genesis]
+        self.reorg_count = 0
+
+    def _hash(self, *parts) -> str:
+        digest = hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+        return f"0x{digest}"
+
+    @property
+    def head(self) -> SimulatedBlock:
+        return self._blocks[-1]
+
+    def block_number(self) -> int:
+        with self._lock:
+            self._mine_due_blocks()
+            return self.head.number
+
+    def send_transaction(
+        self,
+        function_name: str,
+        parameters: Dict,
+        from_address: str,
+        to_address: str,
+        gas_limit: int = 200000,
+    ) -> str:
+        """Submit a transaction to the mempool and return its hash"""
+        with self._lock:
+            self._mine_due_blocks()
+            nonce = next(self._nonce)
+            tx_hash = self._hash(from_address, to_address, function_name, nonce, self._random.random())
+            self._transactions[tx_hash] = SimulatedTransaction(
+                tx_hash=tx_hash,
+                function_name=function_name,
+                parameters=parameters,
+                from_address=from_address,
+                to_address=to_address,
+                gas_limit=gas_limit,
+                submitted_at=self.clock(),
+            )
+            self._mempool.append(tx_hash)
+            return tx_hash
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict]:
+        """Receipt-like view of a transaction, or None when unknown"""
+        with self._lock:
+            self._mine_due_blocks()
+            return self._receipt(tx_hash)
+
+    def get_receipts(self, tx_hashes: List[str]) -> Dict[str, Optional[Dict]]:
+        """Batch receipt lookup under a single lock acquisition"""
+        with self._lock:
+            self._mine_due_blocks()
+            return {tx_hash: self._receipt(tx_hash) for tx_hash in tx_hashes}
+
+    def _receipt(self, tx_hash: str) -> Optional[Dict]:
+        tx = self._transactions.get(tx_hash)
+        if tx is None:
+            return None
+        confirmations = 0
+        if tx.block_number is not None:
+            confirmations = self.head.number - tx.block_number + 1
+        return {
+            'transaction_hash': tx.tx_hash,
+            'status': tx.status,
+            'block_number': tx.block_number,
+            'block_hash': tx.block_hash,
+            'gas_used': tx.gas_used,
+            'confirmations': confirmations,
+        }
+
+    def mine(self, blocks: int = 1):
+        """Force-mine blocks immediately, regardless of the clock"""
+        with self._lock:
+            for _ in range(blocks):
+                self._seal_block(self.clock())
+
+    def _mine_due_blocks(self):
+        now = self.clock()
+        while now - self.head.timestamp >= self.block_time:
+            self._seal_block(self.head.timestamp + self.block_time)
+
+    def _seal_block(self, timestamp: float):
+        if self.reorg_rate and len(self._blocks) > 1 and self._random.random() < self.reorg_rate:
+            self._reorg()
+
+        parent = self.head
+        included = self._mempool[:self.max_block_transactions]
+        self._mempool = self._mempool[self.max_block_transactions:]
+        block = SimulatedBlock(
+            number=parent.number + 1,
+            block_hash=self._hash(parent.block_hash, timestamp, len(included), self._random.random()),
+            parent_hash=parent.block_hash,
+            timestamp=timestamp,
+            tx_hashes=included,
+        )
+        for tx_hash in included:
+            tx = self._transactions[tx_hash]
+            tx.block_number = block.number
+            tx.block_hash = block.block_hash
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+            tx.status = 'failed' if failed else 'confirmed'
+            tx.gas_used = tx.gas_limit if failed else int(tx.gas_limit * 0.6)
+        self._blocks.append(block)
+
+    def _reorg(self):
+        """Orphan the most recent blocks and return their transactions to the mempool"""
+        depth = self._random.randint(1, min(self.max_reorg_depth, len(self._blocks) - 1))
+        orphaned = self._blocks[-depth:]
+        del self._blocks[-depth:]
+        returned = []
+        for block in orphaned:
+            for tx_hash in block.tx_hashes:
+                tx = self._transactions[tx_hash]
+                tx.block_number = None
+                tx.block_hash = ''
+                tx.status = 'pending'
+                tx.gas_used = None
+                returned.append(tx_hash)
+        self._mempool = returned + self._mempool
+        self.reorg_count += 1
+
+
+_chains: Dict[str, SimulatedChain] = {}
+_chains_lock = threading.Lock()
+
+
+def is_simulated_network(network) -> bool:
+    return bool(network and network.rpc_url and network.rpc_url.startswith(SIMULATED_RPC_SCHEME))
+
+
+def get_simulated_chain(network=None, **overrides) -> SimulatedChain:
+    """
+    Process-wide simulated chain for a network.
+
+    Options come from BLOCKCHAIN_CONFIG['SIMULATOR'] and can be overridden
+    per call; the first call for a network fixes its configuration.
+    """
+    from django.conf import settings
+
+    key = network.rpc_url if network is not None else SIMULATED_RPC_SCHEME
+    with _chains_lock:
+        chain = _chains.get(key)
+        if chain is None:
+            options = dict(getattr(settings, 'BLOCKCHAIN_CONFIG', {}).get('SIMULATOR', {}))
+            options.update(overrides)
+            chain = _chains[key] = SimulatedChain(**options)
+        return chain
+
+
+def reset_simulated_chains():
+    with _chains_lock:
+        _chains.clear()
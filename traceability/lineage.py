@@ -0,0 +1,335 @@
+"""
+AgriConnect Provenance Lineage
+Edge table plus transitive closure linking farms, traces, events,
+products and orders
+
+Every direct link (farm -> trace, event -> trace, trace -> product,
+raw product -> processed product, product -> order item -> order) is stored
+once in LineageEdge. LineageClosure holds every ancestor/descendant pair so
+"all upstream farms and events" or "all downstream products and orders" is
+a single indexed query no matter how many processing hops separate them.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from .models import LineageClosure, LineageEdge, ProductTrace
+
+logger = logging.getLogger(__name__)
+
+Node = Tuple[str, str]
+
+UPSTREAM_TYPES = ('farm', 'event', 'trace', 'product')
+DOWNSTREAM_TYPES = ('product', 'order_item', 'order')
+
+
+class LineageCycleError(ValueError):
+    """Raised when an edge would make the provenance graph cyclic"""
+
+
+def node(node_type: str, node_id) -> Node:
+    return node_type, str(node_id)
+
+
+def _ancestors_with_depth(target: Node) -> Dict[Node, int]:
+    rows = LineageClosure.objects.filter(
+        descendant_type=target[0], descendant_id=target[1]
+    ).values_list('ancestor_type', 'ancestor_id', 'depth')
+    return {(a_type, a_id): depth for a_type, a_id, depth in rows}
+
+
+def _descendants_with_depth(source: Node) -> Dict[Node, int]:
+    rows = LineageClosure.objects.filter(
+        ancestor_type=source[0], ancestor_id=source[1]
+    ).values_list('descendant_type', 'descendant_id', 'depth')
+    return {(d_type, d_id): depth for d_type, d_id, depth in rows}
+
+
+def add_edge(source: Node, target: Node) -> bool:
+    """
+    Add a direct edge and extend the closure incrementally.
+
+    Every ancestor of ``source`` (and source itself) becomes an ancestor of
+    every descendant of ``target`` (and target itself). Returns False when
+    the edge already exists.
+    """
+    if source == target:
+        raise LineageCycleError(f"Self-referencing lineage edge for {source}")
+
+    with transaction.atomic():
+        _, created = LineageEdge.objects.get_or_create(
+            source_type=source[0], source_id=source[1],
+            target_type=target[0], target_id=target[1]
+        )
+        if not created:
+            return False
+
+        ancestors = _ancestors_with_depth(source)
+        ancestors[source] = 0
+        descendants = _descendants_with_depth(target)
+        descendants[target] = 0
+
+        if target in ancestors or source in descendants:
+            raise LineageCycleError(f"Edge {source} -> {target} would create a cycle")
+
+        LineageClosure.objects.bulk_create(
+            [
+                LineageClosure(
+                    ancestor_type=a_node[0], ancestor_id=a_node[1],
+                    descendant_type=d_node[0], descendant_id=d_node[1],
+                    depth=a_depth + 1 + d_depth
+                )
+                for a_node, a_depth in ancestors.items()
+                for d_node, d_depth in descendants.items()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+    return True
+
+
+def add_edges(edges: Iterable[Tuple[Node, Node]]) -> int:
+    """Add several edges, skipping any that would create a cycle"""
+    added = 0
+    for source, target in edges:
+        try:
+            added += add_edge(source, target)
+        except LineageCycleError as exc:
+            logger.warning("Skipping lineage edge: %s", exc)
+    return added
+
+
+def _nodes_filter(prefix: str, nodes: Iterable[Node]) -> Q:
+    """Q matching ``{prefix}_type``/``{prefix}_id`` against a set of nodes, one IN per type"""
+    by_type: Dict[str, Set[str]] = {}
+    for node_type, node_id in nodes:
+        by_type.setdefault(node_type, set()).add(node_id)
+    condition = Q(pk__in=[])
+    for node_type, node_ids in by_type.items():
+        condition |= Q(**{f'{prefix}_type': node_type, f'{prefix}_id__in': sorted(node_ids)})
+    return condition
+
+
+def _recompute_ancestors(affected: Set[Node]) -> List[LineageClosure]:
+    """
+    Closure rows for the affected nodes rebuilt from their current parents.
+
+    Parents outside the affected set keep a valid closure, so each node's
+    ancestors are its parents plus their ancestors, resolved in topological
+    order within the affected set.
+    """
+    parents: Dict[Node, Set[Node]] = {affected_node: set() for affected_node in affected}
+    for s_type, s_id, t_type, t_id in LineageEdge.objects.filter(
+        _nodes_filter('target', affected)
+    ).values_list('source_type', 'source_id', 'target_type', 'target_id'):
+        parents[(t_type, t_id)].add((s_type, s_id))
+
+    outside = {parent for node_parents in parents.values() for parent in node_parents if parent not in affected}
+    ancestors: Dict[Node, Dict[Node, int]] = {parent: {} for parent in outside}
+    if outside:
+        for a_type, a_id, d_type, d_id, depth in LineageClosure.objects.filter(
+            _nodes_filter('descendant', outside)
+        ).values_list('ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id', 'depth'):
+            ancestors[(d_type, d_id)][(a_type, a_id)] = depth
+
+    pending = dict(parents)
+    while pending:
+        ready = [pending_node for pending_node, node_parents in pending.items()
+                 if all(parent in ancestors for parent in node_parents)]
+        if not ready:
+            raise LineageCycleError("Lineage edges below the removed edge form a cycle")
+        for ready_node in ready:
+            found: Dict[Node, int] = {}
+            for parent in pending.pop(ready_node):
+                for ancestor, depth in [(parent, 0), *ancestors[parent].items()]:
+                    if depth + 1 < found.get(ancestor, depth + 2):
+                        found[ancestor] = depth + 1
+            ancestors[ready_node] = found
+
+    return [
+        LineageClosure(
+            ancestor_type=a_node[0], ancestor_id=a_node[1],
+            descendant_type=d_node[0], descendant_id=d_node[1], depth=depth
+        )
+        for d_node in affected
+        for a_node, depth in ancestors[d_node].items()
+    ]
+
+
+def remove_edges(edges: Iterable[Tuple[Node, Node]]) -> int:
+    """
+    Delete direct edges and repair the closure below them.
+
+    Only the targets and their descendants can lose ancestors, so their
+    closure rows are dropped and recomputed from the remaining edges.
+    """
+    edges = list(edges)
+    if not edges:
+        return 0
+
+    with transaction.atomic():
+        removed = 0
+        affected: Set[Node] = set()
+        for source, target in edges:
+            deleted, _ = LineageEdge.objects.filter(
+                source_type=source[0], source_id=source[1],
+                target_type=target[0], target_id=target[1]
+            ).delete()
+            if deleted:
+                removed += deleted
+                affected.add(target)
+                affected.update(_descendants_with_depth(target))
+        if not removed:
+            return 0
+
+        rows = _recompute_ancestors(affected)
+        LineageClosure.objects.filter(_nodes_filter('descendant', affected)).delete()
+        LineageClosure.objects.bulk_create(rows, batch_size=1000)
+    return removed
+
+
+def rebuild_closure() -> int:
+    """Recompute the full closure from LineageEdge (used after deletions)"""
+    children: Dict[Node, Set[Node]] = {}
+    for s_type, s_id, t_type, t_id in LineageEdge.objects.values_list(
+        'source_type', 'source_id', 'target_type', 'target_id'
+    ).iterator():
+        children.setdefault((s_type, s_id), set()).add((t_type, t_id))
+
+    rows: List[LineageClosure] = []
+    for root in children:
+        # Breadth-first so the recorded depth is the shortest path
+        seen = {root: 0}
+        frontier = [root]
+        while frontier:
+            next_frontier = []
+            for current in frontier:
+                for child in children.get(current, ()):
+                    if child not in seen:
+                        seen[child] = seen[current] + 1
+                        next_frontier.append(child)
+            frontier = next_frontier
+        rows.extend(
+            LineageClosure(
+                ancestor_type=root[0], ancestor_id=root[1],
+                descendant_type=d_node[0], descendant_id=d_node[1], depth=depth
+            )
+            for d_node, depth in seen.items() if d_node != root
+        )
+
+    with transaction.atomic():
+        LineageClosure.objects.all().delete()
+        LineageClosure.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+def trace_edges(product_trace) -> List[Tuple[Node, Node]]:
+    return [
+        (node('farm', product_trace.farm_id), node('trace', product_trace.pk)),
+        (node('trace', product_trace.pk), node('product', product_trace.product_id)),
+    ]
+
+
+def event_edges(event) -> List[Tuple[Node, Node]]:
+    return [(node('event', event.pk), node('trace', event.product_trace_id))]
+
+
+def processed_product_edges(product) -> List[Tuple[Node, Node]]:
+    return [
+        (node('product', raw_id), node('product', product.pk))
+        for raw_id in (product.raw_materials or [])
+        if raw_id and str(raw_id) != str(product.pk)
+    ]
+
+
+def reconcile_product_edges(product) -> Tuple[int, int]:
+    """
+    Make a product's raw-material edges match its current raw_materials,
+    adding new links and removing dropped ones. Returns (added, removed).
+    """
+    target = node('product', product.pk)
+    current = {
+        (source, target) for source in LineageEdge.objects.filter(
+            target_type='product', target_id=target[1], source_type='product'
+        ).values_list('source_type', 'source_id')
+    }
+    wanted = set(processed_product_edges(product)) if product.product_type == 'processed' else set()
+    removed = remove_edges(current - wanted)
+    added = add_edges(sorted(wanted - current))
+    return added, removed
+
+
+def order_item_edges(order_item) -> List[Tuple[Node, Node]]:
+    return [
+        (node('product', order_item.product_id), node('order_item', order_item.pk)),
+        (node('order_item', order_item.pk), node('order', order_item.order_id)),
+    ]
+
+
+def _batch_node_ids(batch_number: str, field: str = 'id') -> List[str]:
+    """
+    Node ids for a batch's traces. Read in Python rather than cast in SQL:
+    databases disagree on the text form of UUIDs.
+    """
+    return [
+        str(value) for value in
+        ProductTrace.objects.filter(batch_number=batch_number).values_list(field, flat=True)
+    ]
+
+
+def _node_ids(node_ids):
+    if isinstance(node_ids, QuerySet):
+        return node_ids
+    return [str(node_id) for node_id in node_ids]
+
+
+def upstream_of(node_type: str, node_ids, ancestor_types=UPSTREAM_TYPES):
+    """Closure rows for every ancestor of the given nodes (one query)"""
+    return LineageClosure.objects.filter(
+        descendant_type=node_type,
+        descendant_id__in=_node_ids(node_ids),
+        ancestor_type__in=ancestor_types
+    )
+
+
+def downstream_of(node_type: str, node_ids, descendant_types=DOWNSTREAM_TYPES):
+    """Closure rows for every descendant of the given nodes (one query)"""
+    return LineageClosure.objects.filter(
+        ancestor_type=node_type,
+        ancestor_id__in=_node_ids(node_ids),
+        descendant_type__in=descendant_types
+    )
+
+
+def batch_upstream(batch_number: str, ancestor_types=('farm', 'event')):
+    """
+    Upstream farms and events of a batch: those of the batch's own traces,
+    plus the origins of the raw materials its products were processed from.
+    Raw materials are recorded per product rather than per lot, so their
+    origins cover every lot of the raw product.
+    """
+    raw_material_ids = LineageEdge.objects.filter(
+        source_type='product', target_type='product',
+        target_id__in=_batch_node_ids(batch_number, 'product_id')
+    ).values('source_id')
+    return LineageClosure.objects.filter(
+        Q(descendant_type='trace', descendant_id__in=_batch_node_ids(batch_number))
+        | Q(descendant_type='product', descendant_id__in=raw_material_ids),
+        ancestor_type__in=ancestor_types
+    )
+
+
+def batch_downstream(batch_number: str, descendant_types=DOWNSTREAM_TYPES):
+    """All downstream products, order items and orders for a batch"""
+    return downstream_of('trace', _batch_node_ids(batch_number), descendant_types)
+
+
+def group_node_ids(closure_rows, side: str) -> Dict[str, List[str]]:
+    """Collapse closure rows into {node_type: [ids]} for the given side"""
+    grouped: Dict[str, Set[str]] = {}
+    for node_type, node_id in closure_rows.values_list(f'{side}_type', f'{side}_id').distinct():
+        grouped.setdefault(node_type, set()).add(node_id)
+    return {node_type: sorted(ids) for node_type, ids in grouped.items()}
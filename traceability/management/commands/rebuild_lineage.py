@@ -0,0 +1,54 @@
+"""
+Rebuild Provenance Lineage Management Command
+Backfills lineage edges from existing records and recomputes the closure
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderItem
+from products.models import Product
+from traceability import lineage
+from traceability.models import LineageEdge, ProductTrace, SupplyChainEvent
+
+
+class Command(BaseCommand):
+    help = 'Backfill lineage edges and rebuild the provenance closure table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--closure-only',
+            action='store_true',
+            help='Skip edge backfill and only recompute the closure from existing edges',
+        )
+
+    def handle(self, *args, **options):
+        if not options['closure_only']:
+            edges = []
+            for trace in ProductTrace.objects.only('id', 'farm_id', 'product_id').iterator():
+                edges.extend(lineage.trace_edges(trace))
+            for event in SupplyChainEvent.objects.only('id', 'product_trace_id').iterator():
+                edges.extend(lineage.event_edges(event))
+            for product in Product.objects.filter(product_type='processed').only(
+                'id', 'raw_materials'
+            ).iterator():
+                edges.extend(lineage.processed_product_edges(product))
+            for item in OrderItem.objects.only('id', 'product_id', 'order_id').iterator():
+                edges.extend(lineage.order_item_edges(item))
+
+            LineageEdge.objects.bulk_create(
+                [
+                    LineageEdge(
+                        source_type=source[0], source_id=source[1],
+                        target_type=target[0], target_id=target[1]
+                    )
+                    for source, target in edges
+                ],
+                batch_size=2000,
+                ignore_conflicts=True
+            )
+            self.stdout.write(f"Backfilled {len(edges)} lineage edges")
+
+        closure_rows = lineage.rebuild_closure()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt lineage closure with {closure_rows} rows")
+        )
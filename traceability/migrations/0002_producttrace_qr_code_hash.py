@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traceability', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='producttrace',
+            name='qr_code_image',
+        ),
+        migrations.AddField(
+            model_name='producttrace',
+            name='qr_code_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
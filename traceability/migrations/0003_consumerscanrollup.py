@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traceability', '0002_producttrace_qr_code_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumerScanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('region', models.CharField(blank=True, max_length=300)),
+                ('device_type', models.CharField(blank=True, max_length=50)),
+                ('scan_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product_trace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_rollups', to='traceability.producttrace')),
+            ],
+            options={
+                'db_table': 'traceability_consumer_scan_rollup',
+                'indexes': [models.Index(fields=['bucket_start'], name='traceabilit_bucket__24f44f_idx'), models.Index(fields=['product_trace', 'bucket_start'], name='traceabilit_product_2239f2_idx'), models.Index(fields=['region', 'bucket_start'], name='traceabilit_region_fc4818_idx')],
+                'unique_together': {('bucket_start', 'product_trace', 'region', 'device_type')},
+            },
+        ),
+    ]
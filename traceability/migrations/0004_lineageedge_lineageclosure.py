@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traceability', '0003_consumerscanrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineageEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('farm', 'Farm'), ('trace', 'Product Trace'), ('event', 'Supply Chain Event'), ('product', 'Product'), ('order_item', 'Order Item'), ('order', 'Order')], max_length=20)),
+                ('source_id', models.CharField(max_length=64)),
+                ('target_type', models.CharField(choices=[('farm', 'Farm'), ('trace', 'Product Trace'), ('event', 'Supply Chain Event'), ('product', 'Product'), ('order_item', 'Order Item'), ('order', 'Order')], max_length=20)),
+                ('target_id', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'traceability_lineage_edge',
+                'indexes': [models.Index(fields=['target_type', 'target_id'], name='traceabilit_target__bde0bf_idx')],
+                'unique_together': {('source_type', 'source_id', 'target_type', 'target_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LineageClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor_type', models.CharField(choices=[('farm', 'Farm'), ('trace', 'Product Trace'), ('event', 'Supply Chain Event'), ('product', 'Product'), ('order_item', 'Order Item'), ('order', 'Order')], max_length=20)),
+                ('ancestor_id', models.CharField(max_length=64)),
+                ('descendant_type', models.CharField(choices=[('farm', 'Farm'), ('trace', 'Product Trace'), ('event', 'Supply Chain Event'), ('product', 'Product'), ('order_item', 'Order Item'), ('order', 'Order')], max_length=20)),
+                ('descendant_id', models.CharField(max_length=64)),
+                ('depth', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'traceability_lineage_closure',
+                'indexes': [models.Index(fields=['descendant_type', 'descendant_id', 'ancestor_type'], name='traceabilit_descend_72c5d0_idx')],
+                'unique_together': {('ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id')},
+            },
+        ),
+    ]
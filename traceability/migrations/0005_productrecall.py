@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:05
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traceability', '0004_lineageedge_lineageclosure'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recall_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('batch_number', models.CharField(max_length=100)),
+                ('reason', models.TextField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('notifying', 'Notifying Buyers'), ('notified', 'Buyers Notified'), ('closed', 'Closed')], default='open', max_length=20)),
+                ('impact_summary', models.JSONField(blank=True, default=dict)),
+                ('notifications_sent', models.IntegerField(default=0)),
+                ('notifications_failed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('initiated_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='initiated_recalls', to=settings.AUTH_USER_MODEL)),
+                ('product_trace', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recalls', to='traceability.producttrace')),
+            ],
+            options={
+                'db_table': 'traceability_product_recall',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['batch_number'], name='traceabilit_batch_n_12d814_idx'), models.Index(fields=['status'], name='traceabilit_status_41a37a_idx')],
+            },
+        ),
+    ]
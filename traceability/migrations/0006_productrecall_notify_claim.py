@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traceability', '0005_productrecall'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productrecall',
+            name='notify_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productrecall',
+            name='notify_heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
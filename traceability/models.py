@@ -167,7 +167,7 @@ class ProductTrace(models.Model):
     quantity_harvested = models.DecimalField(max_digits=10, decimal_places=2)
     quality_grade = models.CharField(max_length=20, default='good')
     qr_code_data = models.TextField()  # QR code content
-    qr_code_image = models.TextField(blank=True)  # Base64 encoded image
+    qr_code_hash = models.CharField(max_length=64, blank=True)  # Content hash of stored QR assets
     ipfs_hash = models.CharField(max_length=64, blank=True)  # IPFS metadata hash
     consumer_view_count = models.IntegerField(default=0)
     last_viewed_at = models.DateTimeField(null=True, blank=True)
@@ -267,3 +267,110 @@ class ConsumerScan(models.Model):
     
     def __str__(self):
         return f"Scan {self.scan_id} - {self.product_trace.product.name}"
+
+class ConsumerScanRollup(models.Model):
+    """Hourly consumer scan counts per trace, region and device"""
+    bucket_start = models.DateTimeField()  # Truncated to the hour
+    product_trace = models.ForeignKey(ProductTrace, on_delete=models.CASCADE, related_name='scan_rollups')
+    region = models.CharField(max_length=300, blank=True)
+    device_type = models.CharField(max_length=50, blank=True)
+    scan_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'traceability_consumer_scan_rollup'
+        unique_together = ['bucket_start', 'product_trace', 'region', 'device_type']
+        indexes = [
+            models.Index(fields=['bucket_start']),
+            models.Index(fields=['product_trace', 'bucket_start']),
+            models.Index(fields=['region', 'bucket_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_trace_id} @ {self.bucket_start:%Y-%m-%d %H:00} - {self.scan_count} scans"
+
+class LineageEdge(models.Model):
+    """Direct provenance link between two supply chain nodes"""
+    NODE_TYPES = [
+        ('farm', 'Farm'),
+        ('trace', 'Product Trace'),
+        ('event', 'Supply Chain Event'),
+        ('product', 'Product'),
+        ('order_item', 'Order Item'),
+        ('order', 'Order'),
+    ]
+    
+    source_type = models.CharField(max_length=20, choices=NODE_TYPES)
+    source_id = models.CharField(max_length=64)
+    target_type = models.CharField(max_length=20, choices=NODE_TYPES)
+    target_id = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'traceability_lineage_edge'
+        unique_together = ['source_type', 'source_id', 'target_type', 'target_id']
+        indexes = [
+            models.Index(fields=['target_type', 'target_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source_type}:{self.source_id} -> {self.target_type}:{self.target_id}"
+
+class LineageClosure(models.Model):
+    """Transitive closure of LineageEdge for single-query ancestry lookups"""
+    ancestor_type = models.CharField(max_length=20, choices=LineageEdge.NODE_TYPES)
+    ancestor_id = models.CharField(max_length=64)
+    descendant_type = models.CharField(max_length=20, choices=LineageEdge.NODE_TYPES)
+    descendant_id = models.CharField(max_length=64)
+    depth = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'traceability_lineage_closure'
+        unique_together = ['ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id']
+        indexes = [
+            models.Index(fields=['descendant_type', 'descendant_id', 'ancestor_type']),
+        ]
+    
+    def __str__(self):
+        return (
+            f"{self.ancestor_type}:{self.ancestor_id} =>"
+            f" {self.descendant_type}:{self.descendant_id} ({self.depth})"
+        )
+
+class ProductRecall(models.Model):
+    """Contamination recall for a batch and its computed downstream impact"""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('notifying', 'Notifying Buyers'),
+        ('notified', 'Buyers Notified'),
+        ('closed', 'Closed'),
+    ]
+    
+    recall_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    batch_number = models.CharField(max_length=100)
+    product_trace = models.ForeignKey(
+        ProductTrace, on_delete=models.SET_NULL, null=True, blank=True, related_name='recalls'
+    )
+    reason = models.TextField()
+    initiated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='initiated_recalls')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    impact_summary = models.JSONField(default=dict, blank=True)
+    notifications_sent = models.IntegerField(default=0)
+    notifications_failed = models.IntegerField(default=0)
+    # Set on every claim of a notification run; only the run holding it may update progress
+    notify_token = models.UUIDField(null=True, blank=True, editable=False)
+    notify_heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'traceability_product_recall'
+        indexes = [
+            models.Index(fields=['batch_number']),
+            models.Index(fields=['status']),
+        ]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Recall {self.batch_number} ({self.get_status_display()})"
@@ -0,0 +1,154 @@
+"""
+AgriConnect Traceability QR Code Assets
+Content-addressed QR label generation for product traces
+
+QR payloads are serialized canonically and hashed, and the resulting digest
+names the PNG/SVG assets in default storage. A label is rendered once per
+distinct payload and served from storage afterwards, so repeated requests and
+re-printed batches never touch the QR encoder again.
+"""
+
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+QR_ASSET_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+DEFAULT_QR_CONFIG = {
+    'STORAGE_PREFIX': 'traceability/qr',
+    'BATCH_WORKERS': 4,
+    'BATCH_CHUNK_SIZE': 50,
+    'CACHE_MAX_AGE': 60 * 60 * 24 * 365,
+}
+
+
+def get_qr_config() -> Dict:
+    """Merge project overrides from TRACEABILITY_QR_CONFIG with defaults"""
+    config = dict(DEFAULT_QR_CONFIG)
+    config.update(getattr(settings, 'TRACEABILITY_QR_CONFIG', {}))
+    return config
+
+
+def build_qr_payload(product_trace, verification_base_url: str) -> Dict:
+    """Build the QR payload for a product trace"""
+    return {
+        'product_id': str(product_trace.product_id),
+        'product_name': product_trace.product.name,
+        'batch_number': product_trace.batch_number,
+        'blockchain_id': product_trace.blockchain_id,
+        'farm_name': product_trace.farm.name,
+        'farmer_name': product_trace.farm.farmer.get_full_name(),
+        'harvest_date': product_trace.harvest_date.isoformat(),
+        'organic_certified': product_trace.farm.organic_certified,
+        'verification_url': f"{verification_base_url}{product_trace.id}/consumer_view/"
+    }
+
+
+def serialize_qr_payload(payload: Dict) -> str:
+    """Canonical JSON text encoded into the QR symbol"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def qr_content_hash(qr_text: str) -> str:
+    """SHA-256 digest that addresses the rendered assets"""
+    return hashlib.sha256(qr_text.encode('utf-8')).hexdigest()
+
+
+def qr_asset_path(content_hash: str, fmt: str) -> str:
+    """Storage path for a rendered asset, sharded by hash prefix"""
+    prefix = get_qr_config()['STORAGE_PREFIX']
+    return f"{prefix}/{content_hash[:2]}/{content_hash}.{fmt}"
+
+
+def render_qr_assets(qr_text: str) -> Tuple[bytes, bytes]:
+    """
+    Render PNG and SVG bytes for the given QR text.
+
+    Kept free of Django state so it can run inside worker processes.
+    """
+    import qrcode
+    import qrcode.image.svg
+
+    qr = qrcode.QRCode(version=None, box_size=10, border=5)
+    qr.add_data(qr_text)
+    qr.make(fit=True)
+
+    png_buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(png_buffer, format='PNG')
+
+    svg_buffer = io.BytesIO()
+    qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(svg_buffer)
+
+    return png_buffer.getvalue(), svg_buffer.getvalue()
+
+
+def _render_qr_job(job: Tuple[str, str]) -> Tuple[str, bytes, bytes]:
+    content_hash, qr_text = job
+    png_bytes, svg_bytes = render_qr_assets(qr_text)
+    return content_hash, png_bytes, svg_bytes
+
+
+def qr_assets_exist(content_hash: str) -> bool:
+    return all(
+        default_storage.exists(qr_asset_path(content_hash, fmt))
+        for fmt in QR_ASSET_FORMATS
+    )
+
+
+def store_qr_assets(content_hash: str, png_bytes: bytes, svg_bytes: bytes):
+    """Write rendered assets; existing content-addressed files are left alone"""
+    for fmt, data in (('png', png_bytes), ('svg', svg_bytes)):
+        path = qr_asset_path(content_hash, fmt)
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(data))
+
+
+def ensure_qr_assets(qr_text: str) -> str:
+    """Render and store assets for a single payload if missing; return the hash"""
+    content_hash = qr_content_hash(qr_text)
+    if not qr_assets_exist(content_hash):
+        store_qr_assets(content_hash, *render_qr_assets(qr_text))
+    return content_hash
+
+
+def ensure_qr_assets_bulk(qr_texts: Iterable[str], max_workers: int = None) -> List[str]:
+    """
+    Ensure assets exist for many payloads, rendering the missing ones in
+    parallel worker processes. Returns hashes in input order.
+    """
+    config = get_qr_config()
+    max_workers = max_workers or config['BATCH_WORKERS']
+
+    hashes = []
+    pending = {}
+    for qr_text in qr_texts:
+        content_hash = qr_content_hash(qr_text)
+        hashes.append(content_hash)
+        if content_hash not in pending and not qr_assets_exist(content_hash):
+            pending[content_hash] = qr_text
+
+    if not pending:
+        return hashes
+
+    jobs = list(pending.items())
+    if max_workers <= 1 or len(jobs) == 1:
+        rendered = map(_render_qr_job, jobs)
+        for content_hash, png_bytes, svg_bytes in rendered:
+            store_qr_assets(content_hash, png_bytes, svg_bytes)
+        return hashes
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        rendered = executor.map(_render_qr_job, jobs, chunksize=config['BATCH_CHUNK_SIZE'])
+        for content_hash, png_bytes, svg_bytes in rendered:
+            store_qr_assets(content_hash, png_bytes, svg_bytes)
+
+    return hashes
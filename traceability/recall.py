@@ -0,0 +1,378 @@
+"""
+AgriConnect Recall Impact Engine
+Downstream impact of a contaminated batch across orders, warehouses and scans
+
+The recalled batch's own products are matched by batch: order items by the
+batch_number stamped when they were sold, warehouse lots by their
+batch_number and scans by the batch's traces. Products processed from the
+batch are resolved from the lineage closure in one query; raw materials
+are recorded per product rather than per lot, so their order items, lots
+and scans are included product-wide. Order items sold before items were
+stamped with a batch cannot be attributed and are counted separately.
+Everything is streamed with iterator() so a large recall never
+materializes in memory.
+
+Buyer notification runs as a claimed job: each claim sets a new
+notify_token, and only the run holding it records progress, heartbeats
+or finishes the recall. A run whose heartbeat goes stale is picked up
+again by resume_stalled_recall_notifications. Buyers who already have a
+sent or delivered message for the recall are skipped, so a retry or
+resumed run only reaches the rest. Messages are recorded after they are
+sent, so buyers in the batch a dead worker was sending may be notified
+twice; none are missed.
+"""
+
+import csv
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from orders.models import OrderItem
+from warehouses.models import WarehouseInventory
+from .models import ConsumerScan, ProductRecall, ProductTrace
+from . import lineage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECALL_CONFIG = {
+    'STREAM_CHUNK_SIZE': 2000,
+    'NOTIFY_BATCH_SIZE': 200,
+    'NOTIFY_WORKERS': 8,
+    # Heartbeat while notifying; a run silent for NOTIFY_STALE_AFTER_SECONDS is resumed
+    'NOTIFY_HEARTBEAT_SECONDS': 30,
+    'NOTIFY_STALE_AFTER_SECONDS': 300,
+}
+
+IMPACT_CSV_COLUMNS = [
+    'kind', 'id', 'product_id', 'product_name', 'order_number', 'buyer_id',
+    'buyer_phone', 'buyer_email', 'warehouse', 'batch_number', 'quantity',
+    'location', 'timestamp',
+]
+
+
+def get_recall_config() -> Dict:
+    config = dict(DEFAULT_RECALL_CONFIG)
+    config.update(getattr(settings, 'TRACEABILITY_RECALL_CONFIG', {}))
+    return config
+
+
+class RecallImpactEngine:
+    """Computes the downstream impact set of a batch or product trace"""
+
+    def __init__(self, batch_number: Optional[str] = None, product_trace: Optional[ProductTrace] = None):
+        if not batch_number and product_trace is None:
+            raise ValueError("A batch_number or product_trace is required")
+        self.batch_number = batch_number or product_trace.batch_number
+        self.product_trace = product_trace
+        self.chunk_size = get_recall_config()['STREAM_CHUNK_SIZE']
+        self._seeds = None
+        self._derived_product_ids = None
+        self._trace_ids = None
+
+    @property
+    def seed_traces(self):
+        if self.product_trace is not None:
+            return ProductTrace.objects.filter(pk=self.product_trace.pk)
+        return ProductTrace.objects.filter(batch_number=self.batch_number)
+
+    @property
+    def seeds(self) -> List:
+        """(trace_id, product_id) of the recalled batch's own traces"""
+        if self._seeds is None:
+            self._seeds = list(self.seed_traces.values_list('id', 'product_id'))
+        return self._seeds
+
+    @property
+    def seed_product_ids(self) -> List[str]:
+        return sorted({str(product_id) for _, product_id in self.seeds})
+
+    @property
+    def derived_product_ids(self) -> List[str]:
+        """Products processed (directly or not) from the batch's products"""
+        if self._derived_product_ids is None:
+            derived = set(
+                lineage.downstream_of(
+                    'trace', [trace_id for trace_id, _ in self.seeds], ('product',)
+                ).values_list('descendant_id', flat=True)
+            )
+            self._derived_product_ids = sorted(derived - set(self.seed_product_ids))
+        return self._derived_product_ids
+
+    @property
+    def product_ids(self) -> List[str]:
+        return self.seed_product_ids + self.derived_product_ids
+
+    @property
+    def trace_ids(self) -> List[int]:
+        """The batch's traces plus the traces of processed outputs"""
+        if self._trace_ids is None:
+            self._trace_ids = [trace_id for trace_id, _ in self.seeds] + list(
+                ProductTrace.objects.filter(product_id__in=self.derived_product_ids).values_list('id', flat=True)
+            )
+        return self._trace_ids
+
+    def _batch_or_derived(self, **batch_filter) -> Q:
+        return (
+            Q(product_id__in=self.seed_product_ids, **batch_filter)
+            | Q(product_id__in=self.derived_product_ids)
+        )
+
+    def order_items(self):
+        return OrderItem.objects.filter(
+            self._batch_or_derived(batch_number=self.batch_number)
+        ).select_related('order__buyer').order_by('order_id', 'id')
+
+    def unbatched_order_items(self):
+        """Items of the batch's products sold without a recorded batch; not notified"""
+        return OrderItem.objects.filter(product_id__in=self.seed_product_ids, batch_number='')
+
+    def inventory_lots(self):
+        return WarehouseInventory.objects.filter(
+            self._batch_or_derived(batch_number=self.batch_number),
+            is_active=True
+        ).select_related('warehouse', 'product')
+
+    def consumer_scans(self):
+        return ConsumerScan.objects.filter(product_trace_id__in=self.trace_ids)
+
+    def buyers(self):
+        """Distinct affected buyers with their contact details"""
+        return self.order_items().values(
+            'order__buyer_id', 'order__buyer__phone_number', 'order__buyer__email',
+            'order__buyer__first_name', 'order__buyer__last_name'
+        ).order_by('order__buyer_id').distinct()
+
+    def summary(self) -> Dict:
+        items = self.order_items()
+        return {
+            'batch_number': self.batch_number,
+            'affected_products': len(self.product_ids),
+            'derived_products': len(self.derived_product_ids),
+            'affected_traces': len(self.trace_ids),
+            'order_items': items.count(),
+            # Sold before items recorded their batch; they may or may not be from this lot
+            'unbatched_order_items': self.unbatched_order_items().count(),
+            'orders': items.values('order_id').distinct().count(),
+            'buyers': items.values('order__buyer_id').distinct().count(),
+            'inventory_lots': self.inventory_lots().count(),
+            'consumer_scans': self.consumer_scans().count(),
+            'computed_at': timezone.now().isoformat(),
+        }
+
+    def iter_impact(self) -> Iterator[Dict]:
+        """Yield one flat row per affected order item, inventory lot and scan"""
+        for item in self.order_items().iterator(chunk_size=self.chunk_size):
+            buyer = item.order.buyer
+            yield {
+                'kind': 'order_item',
+                'id': str(item.pk),
+                'product_id': str(item.product_id),
+                'product_name': item.product_name,
+                'order_number': item.order.order_number,
+                'buyer_id': buyer.pk,
+                'buyer_phone': buyer.phone_number or item.order.delivery_phone,
+                'buyer_email': buyer.email or '',
+                'quantity': str(item.quantity),
+                'location': item.order.delivery_region,
+                'timestamp': item.created_at.isoformat(),
+            }
+
+        for lot in self.inventory_lots().iterator(chunk_size=self.chunk_size):
+            yield {
+                'kind': 'inventory_lot',
+                'id': str(lot.pk),
+                'product_id': str(lot.product_id),
+                'product_name': lot.product.name,
+                'warehouse': lot.warehouse.code,
+                'batch_number': lot.batch_number,
+                'quantity': str(lot.available_quantity),
+                'timestamp': lot.updated_at.isoformat(),
+            }
+
+        scans = self.consumer_scans().values(
+            'scan_id', 'product_trace_id', 'consumer_id', 'location', 'scanned_at'
+        )
+        for scan in scans.iterator(chunk_size=self.chunk_size):
+            yield {
+                'kind': 'consumer_scan',
+                'id': str(scan['scan_id']),
+                'buyer_id': scan['consumer_id'],
+                'location': scan['location'],
+                'timestamp': scan['scanned_at'].isoformat(),
+            }
+
+    def stream_ndjson(self) -> Iterator[str]:
+        for row in self.iter_impact():
+            yield json.dumps(row) + '\n'
+
+    def stream_csv(self) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=IMPACT_CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for row in self.iter_impact():
+            writer.writerow(row)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+
+def recall_message(recall: ProductRecall) -> str:
+    return (
+        f"AgriConnect RECALL: products from batch {recall.batch_number} you purchased "
+        f"are being recalled. Please stop using them. Ref {str(recall.recall_id)[:8]}."
+    )[:320]
+
+
+def claim_notification(recall_pk, config: Optional[Dict] = None) -> Optional[ProductRecall]:
+    """
+    Take a recall marked for notification under a new notify_token; None if
+    it is not marked or a live run holds it
+    """
+    config = config or get_recall_config()
+    now = timezone.now()
+    stale = now - timedelta(seconds=config['NOTIFY_STALE_AFTER_SECONDS'])
+    claimed = ProductRecall.objects.filter(
+        Q(notify_token__isnull=True) | Q(notify_heartbeat_at__lt=stale),
+        pk=recall_pk, status='notifying',
+    ).update(notify_token=uuid.uuid4(), notify_heartbeat_at=now)
+    if not claimed:
+        return None
+    return ProductRecall.objects.select_related('product_trace').get(pk=recall_pk)
+
+
+def stalled_notifications(config: Optional[Dict] = None):
+    """Recalls marked for notification whose run never started or stopped heartbeating"""
+    config = config or get_recall_config()
+    stale = timezone.now() - timedelta(seconds=config['NOTIFY_STALE_AFTER_SECONDS'])
+    return ProductRecall.objects.filter(
+        Q(notify_heartbeat_at__isnull=True) | Q(notify_heartbeat_at__lt=stale),
+        status='notifying',
+    )
+
+
+class RecallNotifier:
+    """Sends a claimed recall's SMS in bounded batches and records them in bulk"""
+
+    def __init__(self, recall: ProductRecall, config: Dict, engine: Optional[RecallImpactEngine] = None):
+        from communications.services import AVRSMSService
+
+        self.recall = recall
+        self.config = config
+        self.engine = engine or RecallImpactEngine(batch_number=recall.batch_number, product_trace=recall.product_trace)
+        self.sms = AVRSMSService()
+        self.message = recall_message(recall)
+        # Set once this run no longer owns the recall; pending sends are skipped
+        self.stopped = threading.Event()
+        self._beat_at = time.monotonic()
+
+    def owned(self):
+        """The recall row, as long as this run's claim holds"""
+        return ProductRecall.objects.filter(
+            pk=self.recall.pk, status='notifying', notify_token=self.recall.notify_token
+        )
+
+    def heartbeat(self):
+        """Refresh the claim every NOTIFY_HEARTBEAT_SECONDS; stop sending once it is lost"""
+        now = time.monotonic()
+        if now - self._beat_at < self.config['NOTIFY_HEARTBEAT_SECONDS']:
+            return
+        self._beat_at = now
+        if not self.owned().update(notify_heartbeat_at=timezone.now()):
+            logger.info("Recall %s notification claim lost, stopping this run", self.recall.recall_id)
+            self.stopped.set()
+
+    def pending_buyers(self):
+        """Affected buyers with a phone who have not been sent this recall yet"""
+        from communications.models import SMSMessage
+
+        reached = SMSMessage.objects.filter(
+            campaign_id=self.recall.recall_id, status__in=('sent', 'delivered'), recipient_id__isnull=False
+        ).values('recipient_id')
+        return self.engine.buyers().exclude(order__buyer_id__in=reached).exclude(
+            Q(order__buyer__phone_number__isnull=True) | Q(order__buyer__phone_number='')
+        )
+
+    def send(self, buyer) -> Optional[Dict]:
+        """Provider result for one buyer, or None if the run stopped before sending"""
+        if self.stopped.is_set():
+            return None
+        try:
+            return self.sms.send_sms(buyer['order__buyer__phone_number'], self.message)
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'response': {}}
+
+    def flush(self, executor: ThreadPoolExecutor, batch: List[Dict]) -> bool:
+        """Send and record one batch; False once the run has lost its claim"""
+        from communications.models import SMSMessage
+
+        batch_id = uuid.uuid4()
+        messages = []
+        for buyer, result in zip(batch, executor.map(self.send, batch)):
+            # Results arrive on this thread, so the claim is kept fresh mid-batch
+            self.heartbeat()
+            if result is None:
+                continue
+            sent = bool(result.get('success'))
+            messages.append(SMSMessage(
+                recipient_id=buyer['order__buyer_id'],
+                recipient_phone=buyer['order__buyer__phone_number'],
+                message_type='product_recall',
+                content=self.message,
+                status='sent' if sent else 'failed',
+                sent_at=timezone.now() if sent else None,
+                provider_message_id=str(result.get('message_id') or '') if sent else '',
+                failure_reason='' if sent else result.get('error', 'Unknown error'),
+                provider_response=result.get('response') or {},
+                campaign_id=self.recall.recall_id,
+                batch_id=batch_id,
+            ))
+        # Messages that went out are recorded even when the claim was lost
+        SMSMessage.objects.bulk_create(messages)
+        batch_sent = sum(1 for message in messages if message.status == 'sent')
+        self.sent += batch_sent
+        self.failed += len(messages) - batch_sent
+        return not self.stopped.is_set() and bool(self.owned().update(
+            notifications_sent=F('notifications_sent') + batch_sent,
+            notifications_failed=F('notifications_failed') + len(messages) - batch_sent,
+            notify_heartbeat_at=timezone.now(),
+        ))
+
+    def run(self) -> Dict:
+        self.sent = self.failed = 0
+        finished = True
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.config['NOTIFY_WORKERS']) as executor:
+            for buyer in self.pending_buyers().iterator(chunk_size=self.config['STREAM_CHUNK_SIZE']):
+                batch.append(buyer)
+                if len(batch) >= self.config['NOTIFY_BATCH_SIZE']:
+                    finished = self.flush(executor, batch)
+                    batch = []
+                    if not finished:
+                        break
+            if batch and finished:
+                finished = self.flush(executor, batch)
+
+        if finished:
+            self.owned().update(status='notified', notified_at=timezone.now())
+            logger.info("Recall %s notified %s buyers (%s failed)", self.recall.recall_id, self.sent, self.failed)
+        else:
+            logger.info("Recall %s notification stopped after %s sent", self.recall.recall_id, self.sent)
+        return {'sent': self.sent, 'failed': self.failed, 'finished': finished}
+
+
+def notify_affected_buyers(recall: ProductRecall, engine: Optional[RecallImpactEngine] = None,
+                           config: Optional[Dict] = None) -> Dict:
+    """Fan out recall SMS to the affected buyers not reached yet; ``recall`` must be claimed"""
+    return RecallNotifier(recall, config or get_recall_config(), engine).run()
@@ -0,0 +1,282 @@
+"""
+AgriConnect Consumer Scan Ingestion
+Buffered QR scan recording and cached consumer projections
+
+The public consumer view must never hold a lock on a ProductTrace row.
+Scans are appended to an in-process buffer and a background flusher
+bulk-inserts them every few hundred milliseconds, applies the view-count
+increments once per trace, and folds the batch into hourly rollups.
+"""
+
+import atexit
+import logging
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ConsumerScan, ConsumerScanRollup, ProductTrace
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCAN_INGEST_CONFIG = {
+    'FLUSH_INTERVAL_MS': 250,
+    'MAX_BATCH_SIZE': 500,
+    'MAX_BUFFER_SIZE': 20000,
+    'PROJECTION_CACHE_TTL': 300,
+    'SYNCHRONOUS': False,  # Flush on every scan (tests / management shells)
+}
+
+CONSUMER_PROJECTION_CACHE_KEY = 'traceability:consumer_view:{trace_id}'
+
+
+def get_scan_ingest_config() -> Dict:
+    config = dict(DEFAULT_SCAN_INGEST_CONFIG)
+    config.update(getattr(settings, 'TRACEABILITY_SCAN_INGEST', {}))
+    return config
+
+
+def hour_bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+_COORDINATES = re.compile(r'^[\d\s.,+\-°NSEWnsew]+$')
+_REGION_SUFFIX = re.compile(r'\s+region$', re.IGNORECASE)
+
+
+def normalize_region(location: str) -> str:
+    """
+    Rollup key for the free-text ``location`` query parameter: the first
+    comma-separated place name, whitespace-collapsed and title-cased, so
+    "kumasi", "Kumasi, Ghana" and " KUMASI " share one row. Bare
+    coordinates and blanks roll up under ''.
+    """
+    place = ' '.join((location or '').split(',')[0].split())
+    if not place or _COORDINATES.match(place):
+        return ''
+    return _REGION_SUFFIX.sub('', place).title()[:100]
+
+
+class ConsumerScanBuffer:
+    """Thread-safe scan buffer flushed in bulk by a daemon thread"""
+
+    def __init__(self, flush_interval_ms: int, max_batch_size: int, max_buffer_size: int):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_buffer_size = max_buffer_size
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._pid = None
+
+    def append(self, scan: ConsumerScan):
+        with self._lock:
+            if len(self._pending) >= self.max_buffer_size:
+                # Shed the oldest scan rather than block the public endpoint
+                self._pending.popleft()
+                logger.warning("Consumer scan buffer full, dropping oldest scan")
+            self._pending.append(scan)
+            should_wake = len(self._pending) >= self.max_batch_size
+        self._ensure_flusher()
+        if should_wake:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        # Worker processes are forked after import, so each needs its own thread
+        if self._flusher is not None and self._flusher.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._flusher = threading.Thread(
+                target=self._run, name='consumer-scan-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Consumer scan flush failed")
+            finally:
+                connection.close()
+
+    def drain(self) -> List[ConsumerScan]:
+        with self._lock:
+            batch, self._pending = list(self._pending), deque()
+        return batch
+
+    def requeue(self, scans: List[ConsumerScan]):
+        """Put unpersisted scans back in front of anything queued since the drain"""
+        with self._lock:
+            self._pending.extendleft(reversed(scans))
+            overflow = len(self._pending) - self.max_buffer_size
+            for _ in range(max(0, overflow)):
+                self._pending.popleft()
+        if overflow > 0:
+            logger.warning("Consumer scan buffer full, dropped %s oldest scans on requeue", overflow)
+
+    def flush(self) -> int:
+        batch = self.drain()
+        if not batch:
+            return 0
+        for start in range(0, len(batch), self.max_batch_size):
+            try:
+                persist_scan_batch(batch[start:start + self.max_batch_size])
+            except Exception:
+                # Each chunk commits atomically, so this one and the rest are retried next flush
+                self.requeue(batch[start:])
+                raise
+        return len(batch)
+
+
+def persist_scan_batch(scans: List[ConsumerScan]):
+    """Insert a batch of scans, bump view counters and update hourly rollups"""
+    # Traces deleted since the scan was queued would fail the whole batch
+    live_trace_ids = set(
+        ProductTrace.objects.filter(
+            pk__in={scan.product_trace_id for scan in scans}
+        ).values_list('id', flat=True)
+    )
+    scans = [scan for scan in scans if scan.product_trace_id in live_trace_ids]
+    if not scans:
+        return
+
+    view_counts = Counter()
+    last_viewed = {}
+    rollup_counts = Counter()
+    for scan in scans:
+        view_counts[scan.product_trace_id] += 1
+        last_viewed[scan.product_trace_id] = max(
+            scan.scanned_at, last_viewed.get(scan.product_trace_id, scan.scanned_at)
+        )
+        rollup_counts[(
+            hour_bucket(scan.scanned_at), scan.product_trace_id,
+            normalize_region(scan.location), scan.device_type[:50]
+        )] += 1
+
+    with transaction.atomic():
+        ConsumerScan.objects.bulk_create(scans, batch_size=500)
+
+        # One UPDATE per trace per flush, in id order to avoid deadlocks
+        for trace_id in sorted(view_counts):
+            ProductTrace.objects.filter(pk=trace_id).update(
+                consumer_view_count=F('consumer_view_count') + view_counts[trace_id],
+                last_viewed_at=last_viewed[trace_id]
+            )
+
+        upsert_scan_rollups(rollup_counts)
+
+
+def upsert_scan_rollups(rollup_counts: Dict):
+    """Accumulate counts into ConsumerScanRollup rows with a single upsert"""
+    if not rollup_counts:
+        return
+
+    if connection.vendor != 'postgresql':
+        for (bucket, trace_id, region, device), count in sorted(rollup_counts.items()):
+            rollup = ConsumerScanRollup.objects.filter(
+                bucket_start=bucket, product_trace_id=trace_id,
+                region=region, device_type=device
+            )
+            if rollup.update(scan_count=F('scan_count') + count, updated_at=timezone.now()):
+                continue
+            try:
+                with transaction.atomic():
+                    ConsumerScanRollup.objects.create(
+                        bucket_start=bucket, product_trace_id=trace_id,
+                        region=region, device_type=device, scan_count=count
+                    )
+            except IntegrityError:
+                # Another flusher created the row between our update and insert
+                rollup.update(scan_count=F('scan_count') + count, updated_at=timezone.now())
+        return
+
+    table = ConsumerScanRollup._meta.db_table
+    now = timezone.now()
+    rows = sorted(rollup_counts.items())
+    values_sql = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    params = []
+    for (bucket, trace_id, region, device), count in rows:
+        params.extend([bucket, trace_id, region, device, count, now])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (bucket_start, product_trace_id, region, device_type, scan_count, updated_at)
+            VALUES {values_sql}
+            ON CONFLICT (bucket_start, product_trace_id, region, device_type)
+            DO UPDATE SET scan_count = {table}.scan_count + EXCLUDED.scan_count,
+                          updated_at = EXCLUDED.updated_at
+            """,
+            params
+        )
+
+
+_config = get_scan_ingest_config()
+scan_buffer = ConsumerScanBuffer(
+    flush_interval_ms=_config['FLUSH_INTERVAL_MS'],
+    max_batch_size=_config['MAX_BATCH_SIZE'],
+    max_buffer_size=_config['MAX_BUFFER_SIZE'],
+)
+atexit.register(scan_buffer.flush)
+
+
+def record_consumer_scan(product_trace_id: int, **scan_fields):
+    """Queue a consumer scan for buffered insertion"""
+    scan = ConsumerScan(
+        product_trace_id=product_trace_id,
+        scanned_at=timezone.now(),
+        **scan_fields
+    )
+    if get_scan_ingest_config()['SYNCHRONOUS']:
+        persist_scan_batch([scan])
+    else:
+        scan_buffer.append(scan)
+    return scan
+
+
+def get_consumer_projection(trace_id: int) -> Optional[Dict]:
+    """Return the cached consumer-facing projection for a trace, building it on a miss"""
+    from .serializers import ConsumerTraceabilitySerializer
+
+    cache_key = CONSUMER_PROJECTION_CACHE_KEY.format(trace_id=trace_id)
+    projection = cache.get(cache_key)
+    if projection is not None:
+        return projection
+
+    product_trace = (
+        ProductTrace.objects.select_related('product__category', 'farm__farmer')
+        .prefetch_related('events__actor', 'farm__certifications')
+        .filter(pk=trace_id)
+        .first()
+    )
+    if product_trace is None:
+        return None
+
+    projection = ConsumerTraceabilitySerializer(product_trace).data
+    cache.set(cache_key, projection, get_scan_ingest_config()['PROJECTION_CACHE_TTL'])
+    return projection
+
+
+def invalidate_consumer_projection(trace_id: int):
+    cache.delete(CONSUMER_PROJECTION_CACHE_KEY.format(trace_id=trace_id))
+
+
+def invalidate_farm_projections(farm_id: int):
+    cache.delete_many([
+        CONSUMER_PROJECTION_CACHE_KEY.format(trace_id=trace_id)
+        for trace_id in ProductTrace.objects.filter(farm_id=farm_id).values_list('id', flat=True)
+    ])
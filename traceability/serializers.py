@@ -8,7 +8,7 @@ from django.contrib.auth import get_user_model
 from .models import (
     BlockchainNetwork, SmartContract, BlockchainTransaction,
     Farm, FarmCertification, ProductTrace, SupplyChainEvent,
-    ConsumerScan
+    ConsumerScan, ProductRecall
 )
 from products.models import Product
 
@@ -145,11 +145,12 @@ class ProductTraceSerializer(serializers.ModelSerializer):
             'id', 'blockchain_id', 'product', 'product_info', 'farm',
             'farm_info', 'harvest_date', 'harvest_location', 'batch_number',
             'quantity_harvested', 'quality_grade', 'qr_code_data',
-            'qr_code_image', 'ipfs_hash', 'consumer_view_count',
+            'qr_code_hash', 'ipfs_hash', 'consumer_view_count',
             'last_viewed_at', 'events', 'events_count', 'is_active', 'created_at'
         ]
         read_only_fields = [
-            'id', 'blockchain_id', 'consumer_view_count', 'last_viewed_at', 'created_at'
+            'id', 'blockchain_id', 'qr_code_hash', 'consumer_view_count',
+            'last_viewed_at', 'created_at'
         ]
 
 class ConsumerScanSerializer(serializers.ModelSerializer):
@@ -233,3 +234,30 @@ class FarmRegistrationSerializer(serializers.ModelSerializer):
         # Set the farmer to the current user
         validated_data['farmer'] = self.context['request'].user
         return super().create(validated_data)
+
+class ProductRecallSerializer(serializers.ModelSerializer):
+    """Serializer for batch recalls"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    initiated_by_name = serializers.CharField(source='initiated_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = ProductRecall
+        fields = [
+            'id', 'recall_id', 'batch_number', 'product_trace', 'reason',
+            'initiated_by', 'initiated_by_name', 'status', 'status_display',
+            'impact_summary', 'notifications_sent', 'notifications_failed',
+            'created_at', 'notified_at', 'closed_at'
+        ]
+        read_only_fields = [
+            'id', 'recall_id', 'initiated_by', 'status', 'impact_summary',
+            'notifications_sent', 'notifications_failed', 'created_at',
+            'notified_at', 'closed_at'
+        ]
+    
+    def validate(self, attrs):
+        product_trace = attrs.get('product_trace')
+        if product_trace and not attrs.get('batch_number'):
+            attrs['batch_number'] = product_trace.batch_number
+        if not attrs.get('batch_number'):
+            raise serializers.ValidationError('batch_number or product_trace is required')
+        return attrs
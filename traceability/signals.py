@@ -0,0 +1,81 @@
+"""
+AgriConnect Traceability Signals
+Keep cached consumer projections and provenance lineage in step with trace data
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from orders.models import OrderItem
+from products.models import Product
+from .models import Farm, FarmCertification, ProductTrace, SupplyChainEvent
+from .scan_ingest import invalidate_consumer_projection, invalidate_farm_projections
+from . import lineage
+
+
+@receiver([post_save, post_delete], sender=ProductTrace)
+def invalidate_trace_projection(sender, instance, **kwargs):
+    """Drop the consumer projection when the trace itself changes"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'consumer_view_count', 'last_viewed_at'}:
+        return
+    invalidate_consumer_projection(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SupplyChainEvent)
+def invalidate_event_projection(sender, instance, **kwargs):
+    """Supply chain journey is part of the consumer projection"""
+    invalidate_consumer_projection(instance.product_trace_id)
+
+
+@receiver([post_save, post_delete], sender=Farm)
+def invalidate_farm_projection(sender, instance, **kwargs):
+    invalidate_farm_projections(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FarmCertification)
+def invalidate_certification_projection(sender, instance, **kwargs):
+    invalidate_farm_projections(instance.farm_id)
+
+
+def _record_lineage(edges):
+    if edges:
+        transaction.on_commit(lambda: lineage.add_edges(edges))
+
+
+@receiver(post_save, sender=ProductTrace)
+def record_trace_lineage(sender, instance, created, **kwargs):
+    if created:
+        _record_lineage(lineage.trace_edges(instance))
+
+
+@receiver(post_save, sender=SupplyChainEvent)
+def record_event_lineage(sender, instance, created, **kwargs):
+    if created:
+        _record_lineage(lineage.event_edges(instance))
+
+
+@receiver(post_save, sender=Product)
+def record_processed_product_lineage(sender, instance, created, **kwargs):
+    """Keep a product's raw-material edges in step with its raw_materials list"""
+    if created and not (instance.product_type == 'processed' and instance.raw_materials):
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not {'raw_materials', 'product_type'} & set(update_fields):
+        return
+    transaction.on_commit(lambda: lineage.reconcile_product_edges(instance))
+
+
+@receiver(pre_save, sender=OrderItem)
+def stamp_order_item_batch(sender, instance, **kwargs):
+    """Record the traced batch an item is sold from so recalls can be scoped to it"""
+    if instance._state.adding and not instance.batch_number:
+        instance.batch_number = ProductTrace.objects.filter(
+            product_id=instance.product_id
+        ).values_list('batch_number', flat=True).first() or ''
+
+
+@receiver(post_save, sender=OrderItem)
+def record_order_item_lineage(sender, instance, created, **kwargs):
+    if created:
+        _record_lineage(lineage.order_item_edges(instance))
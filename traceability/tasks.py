@@ -0,0 +1,35 @@
+"""
+Celery tasks for the traceability app
+"""
+
+from celery import shared_task
+
+
+@shared_task(acks_late=True)
+def notify_recall_buyers(recall_pk):
+    """Send recall SMS to the affected buyers of a recall marked for notification"""
+    from .models import ProductRecall
+    from .recall import claim_notification, notify_affected_buyers
+
+    recall = claim_notification(recall_pk)
+    if recall is None:
+        return None
+    try:
+        return notify_affected_buyers(recall)
+    except Exception:
+        # Let staff retry; buyers already sent the recall are skipped next time
+        ProductRecall.objects.filter(
+            pk=recall_pk, status='notifying', notify_token=recall.notify_token
+        ).update(status='open', notify_token=None)
+        raise
+
+
+@shared_task
+def resume_stalled_recall_notifications():
+    """Requeue recall notifications that were never picked up or whose worker died"""
+    from .recall import stalled_notifications
+
+    recall_pks = list(stalled_notifications().values_list('pk', flat=True))
+    for recall_pk in recall_pks:
+        notify_recall_buyers.delay(recall_pk)
+    return len(recall_pks)
@@ -1,3 +1,477 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from communications.models import SMSMessage
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from warehouses.models import Warehouse, WarehouseInventory, WarehouseType, WarehouseZone
+from .anchoring import anchor_events, poll_pending_transactions
+from .blockchain_sim import SimulatedChain
+from .models import (
+    BlockchainNetwork, ConsumerScan, ConsumerScanRollup, Farm, ProductRecall, ProductTrace, SmartContract,
+    SupplyChainEvent,
+)
+from .qr_codes import QR_ASSET_FORMATS, qr_asset_path
+from .recall import RecallImpactEngine, claim_notification, notify_affected_buyers, stalled_notifications
+from .tasks import notify_recall_buyers
+from .scan_ingest import ConsumerScanBuffer, normalize_region, persist_scan_batch
+from . import lineage
+
+User = get_user_model()
+
+
+class TraceabilityFixtureMixin:
+    """Farm, products and traces shared by the traceability tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user(
+            '+233200000001', password='secret', roles=['FARMER'], first_name='Ama', last_name='Mensah'
+        )
+        cls.category = Category.objects.create(name='Grains')
+        cls.farm = Farm.objects.create(
+            farmer=cls.farmer, name='Mensah Farm', location='Ashanti',
+            farm_size_hectares=Decimal('4.50'), registration_number='GH-FARM-001'
+        )
+
+    @classmethod
+    def make_product(cls, name, **kwargs):
+        kwargs.setdefault('product_type', 'raw')
+        # bulk_create skips farmer_dashboard's post_save alerts, which expect
+        # fields Product does not have
+        return Product.objects.bulk_create([Product(
+            name=name, description=name, category=cls.category, seller=cls.farmer,
+            price_per_unit=Decimal('10.00'), slug=name.lower().replace(' ', '-'), **kwargs
+        )])[0]
+
+    @classmethod
+    def make_farm(cls, name):
+        return Farm.objects.create(
+            farmer=cls.farmer, name=name, location='Ashanti',
+            farm_size_hectares=Decimal('2.00'), registration_number=f'GH-{name.upper()}'
+        )
+
+    @classmethod
+    def make_trace(cls, product, batch_number, farm=None):
+        return ProductTrace.objects.create(
+            product=product, farm=farm or cls.farm, blockchain_id=f'0x{product.pk.hex}',
+            harvest_date=timezone.now() - timedelta(days=10), harvest_location='Ashanti',
+            batch_number=batch_number, quantity_harvested=Decimal('100.00'), qr_code_data=''
+        )
+
+
+class QRCodeAssetTests(TraceabilityFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.trace = self.make_trace(self.make_product('Maize'), 'MZ-001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.farmer)
+
+    def asset_url(self, fmt):
+        return f'/api/v1/traceability/products/{self.trace.pk}/qr_code/{fmt}/'
+
+    def test_asset_is_rendered_on_first_request(self):
+        response = self.client.get(self.asset_url('svg'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], QR_ASSET_FORMATS['svg'])
+        self.trace.refresh_from_db()
+        self.assertTrue(self.trace.qr_code_hash)
+        self.assertEqual(response['ETag'], f'"{self.trace.qr_code_hash}"')
+
+    def test_missing_stored_asset_is_rendered_again(self):
+        self.client.get(self.asset_url('png'))
+        self.trace.refresh_from_db()
+        default_storage.delete(qr_asset_path(self.trace.qr_code_hash, 'png'))
+
+        response = self.client.get(self.asset_url('png'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+        self.assertTrue(default_storage.exists(qr_asset_path(self.trace.qr_code_hash, 'png')))
+
+    def test_matching_etag_is_not_modified(self):
+        first = self.client.get(self.asset_url('png'))
+        response = self.client.get(self.asset_url('png'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class ConsumerScanIngestTests(TraceabilityFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.trace = self.make_trace(self.make_product('Cassava'), 'CS-001')
+
+    def scan(self, location='Kumasi'):
+        return ConsumerScan(
+            product_trace_id=self.trace.pk, ip_address='127.0.0.1', user_agent='test',
+            device_type='mobile', location=location, scanned_at=timezone.now()
+        )
+
+    def test_failed_flush_keeps_the_batch(self):
+        buffer = ConsumerScanBuffer(flush_interval_ms=1000, max_batch_size=2, max_buffer_size=100)
+        scans = [self.scan() for _ in range(5)]
+        buffer._pending.extend(scans)
+
+        calls = []
+
+        def fail_second_chunk(batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('database unavailable')
+            persist_scan_batch(batch)
+
+        with mock.patch('traceability.scan_ingest.persist_scan_batch', side_effect=fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+
+        # The first chunk committed; the failed chunk and everything after it are queued again
+        self.assertEqual(ConsumerScan.objects.count(), 2)
+        self.assertEqual(list(buffer._pending), scans[2:])
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(ConsumerScan.objects.count(), 5)
+        self.assertEqual(len(buffer._pending), 0)
+
+    def test_requeue_respects_buffer_bound(self):
+        buffer = ConsumerScanBuffer(flush_interval_ms=1000, max_batch_size=10, max_buffer_size=3)
+        newer = [self.scan() for _ in range(2)]
+        buffer._pending.extend(newer)
+        buffer.requeue([self.scan() for _ in range(2)])
+        self.assertEqual(len(buffer._pending), 3)
+        self.assertEqual(list(buffer._pending)[1:], newer)
+
+    def test_rollups_group_normalized_regions(self):
+        persist_scan_batch([self.scan('kumasi'), self.scan(' KUMASI, Ghana'), self.scan('Ashanti Region')])
+        persist_scan_batch([self.scan('Kumasi')])
+
+        rollups = dict(ConsumerScanRollup.objects.values_list('region', 'scan_count'))
+        self.assertEqual(rollups, {'Kumasi': 3, 'Ashanti': 1})
+        self.trace.refresh_from_db()
+        self.assertEqual(self.trace.consumer_view_count, 4)
+
+    def test_scan_activity_filters_by_product_trace(self):
+        other = self.make_trace(self.make_product('Yam'), 'YM-001')
+        persist_scan_batch([self.scan(), self.scan()])
+        url = '/api/v1/traceability/dashboard/scan_activity/'
+
+        response = APIClient().get(url, {'product_trace': other.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_scans'], 0)
+        self.assertEqual(APIClient().get(url, {'product_trace': self.trace.pk}).data['total_scans'], 2)
+
+        response = APIClient().get(url, {'product_trace': 'CS-001'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_normalize_region(self):
+        self.assertEqual(normalize_region('  greater   accra region, Ghana'), 'Greater Accra')
+        self.assertEqual(normalize_region('5.6037, -0.1870'), '')
+        self.assertEqual(normalize_region(''), '')
+
+
+class LineageTests(TraceabilityFixtureMixin, TestCase):
+    """Lineage edges are added directly; on_commit signal handlers do not run in TestCase"""
+
+    def setUp(self):
+        self.raw_farm, self.other_farm = self.make_farm('RawFarm'), self.make_farm('OtherFarm')
+        self.cocoa = self.make_product('Cocoa Beans')
+        self.shea = self.make_product('Shea Nuts')
+        self.butter = self.make_product('Cocoa Butter', product_type='processed',
+                                        raw_materials=[str(self.cocoa.pk), str(self.shea.pk)])
+        self.cocoa_trace = self.make_trace(self.cocoa, 'RAW-1', farm=self.raw_farm)
+        self.shea_trace = self.make_trace(self.shea, 'RAW-2', farm=self.other_farm)
+        self.butter_trace = self.make_trace(self.butter, 'PROC-1')
+        for trace in (self.cocoa_trace, self.shea_trace, self.butter_trace):
+            lineage.add_edges(lineage.trace_edges(trace))
+        lineage.reconcile_product_edges(self.butter)
+        lineage.add_edges([
+            (lineage.node('product', self.butter.pk), lineage.node('order_item', 'item-1')),
+            (lineage.node('order_item', 'item-1'), lineage.node('order', 'order-1')),
+        ])
+
+    def upstream_farms(self, batch_number):
+        return set(lineage.group_node_ids(lineage.batch_upstream(batch_number), 'ancestor').get('farm', []))
+
+    def test_raw_batch_upstream_is_its_own_farm(self):
+        self.assertEqual(self.upstream_farms('RAW-1'), {str(self.raw_farm.pk)})
+
+    def test_processed_batch_includes_raw_material_origins(self):
+        self.assertEqual(
+            self.upstream_farms('PROC-1'),
+            {str(self.farm.pk), str(self.raw_farm.pk), str(self.other_farm.pk)}
+        )
+
+    def test_dropped_raw_material_is_unlinked(self):
+        self.butter.raw_materials = [str(self.shea.pk)]
+        self.assertEqual(lineage.reconcile_product_edges(self.butter), (0, 1))
+
+        self.assertEqual(self.upstream_farms('PROC-1'), {str(self.farm.pk), str(self.other_farm.pk)})
+        order_ancestors = lineage.group_node_ids(
+            lineage.upstream_of('order', ['order-1'], ('farm', 'product')), 'ancestor'
+        )
+        self.assertNotIn(str(self.raw_farm.pk), order_ancestors['farm'])
+        self.assertNotIn(str(self.cocoa.pk), order_ancestors['product'])
+        # Depths are shortest paths from the remaining edges
+        self.assertEqual(
+            lineage.LineageClosure.objects.get(
+                ancestor_type='farm', ancestor_id=str(self.other_farm.pk),
+                descendant_type='order', descendant_id='order-1'
+            ).depth,
+            5
+        )
+
+    def test_incremental_closure_matches_full_rebuild(self):
+        self.butter.raw_materials = [str(self.shea.pk)]
+        lineage.reconcile_product_edges(self.butter)
+        columns = ('ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id', 'depth')
+        incremental = set(lineage.LineageClosure.objects.values_list(*columns))
+        lineage.rebuild_closure()
+        self.assertEqual(incremental, set(lineage.LineageClosure.objects.values_list(*columns)))
+
+
+class RecallScopeTests(TraceabilityFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.buyer = User.objects.create_user('+233200000002', password='secret', roles=['BUYER'])
+        self.maize = self.make_product('Maize')
+        self.flour = self.make_product('Maize Flour', product_type='processed', raw_materials=[str(self.maize.pk)])
+        self.maize_trace = self.make_trace(self.maize, 'MZ-002')
+        self.flour_trace = self.make_trace(self.flour, 'FL-001')
+        for trace in (self.maize_trace, self.flour_trace):
+            lineage.add_edges(lineage.trace_edges(trace))
+        lineage.reconcile_product_edges(self.flour)
+
+        self.order = Order.objects.create(
+            buyer=self.buyer, seller=self.farmer, total_amount=Decimal('30.00'),
+            delivery_address='1 Market Road', delivery_city='Kumasi',
+            delivery_region='Ashanti', delivery_phone='+233200000002'
+        )
+        # Stamped from the product's current trace
+        self.recalled_item = self.order_item(self.maize)
+        self.older_item = self.order_item(self.maize, batch_number='MZ-001')
+        self.flour_item = self.order_item(self.flour)
+        self.unbatched_item = self.order_item(self.maize)
+        OrderItem.objects.filter(pk=self.unbatched_item.pk).update(batch_number='')
+
+        warehouse_type = WarehouseType.objects.create(name='Dry Storage', warehouse_type='dry_storage')
+        warehouse = Warehouse.objects.create(
+            code='WH-001', name='Kumasi Store', warehouse_type=warehouse_type, region='Ashanti',
+            city='Kumasi', address={}, capacity_cubic_meters=Decimal('1000.00')
+        )
+        zone = WarehouseZone.objects.create(
+            warehouse=warehouse, zone_code='A', name='Zone A', zone_type='dry_storage',
+            capacity_cubic_meters=Decimal('100.00')
+        )
+        # WarehouseInventory.save reads a quantity field the model does not declare
+        self.recalled_lot, self.older_lot = WarehouseInventory.objects.bulk_create([
+            WarehouseInventory(product=self.maize, warehouse=warehouse, zone=zone, batch_number=batch, qr_code=batch)
+            for batch in ('MZ-002', 'MZ-001')
+        ])
+        self.engine = RecallImpactEngine(batch_number='MZ-002')
+
+    def order_item(self, product, **kwargs):
+        return OrderItem.objects.create(
+            order=self.order, product=product, product_name=product.name,
+            quantity=1, unit_price=Decimal('10.00'), unit='kg', **kwargs
+        )
+
+    def test_sold_items_are_stamped_with_the_trace_batch(self):
+        self.assertEqual(self.recalled_item.batch_number, 'MZ-002')
+        self.assertEqual(self.older_item.batch_number, 'MZ-001')
+
+    def test_impact_is_scoped_to_the_batch(self):
+        self.assertEqual(set(self.engine.order_items()), {self.recalled_item, self.flour_item})
+        self.assertEqual(list(self.engine.inventory_lots()), [self.recalled_lot])
+        self.assertEqual(self.engine.derived_product_ids, [str(self.flour.pk)])
+
+        summary = self.engine.summary()
+        self.assertEqual(summary['order_items'], 2)
+        self.assertEqual(summary['unbatched_order_items'], 1)
+        self.assertEqual(summary['inventory_lots'], 1)
+
+    def test_notify_is_queued(self):
+        admin = User.objects.create_user('admin@agriconnect.test', password='secret', is_staff=True)
+        recall = ProductRecall.objects.create(batch_number='MZ-002', reason='Aflatoxin', initiated_by=admin)
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = f'/api/v1/traceability/recalls/{recall.pk}/notify/'
+
+        with mock.patch('traceability.views.notify_recall_buyers.delay') as delay:
+            response = client.post(url)
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once_with(recall.pk)
+        recall.refresh_from_db()
+        self.assertEqual(recall.status, 'notifying')
+
+        self.assertEqual(client.post(url).status_code, 409)
+
+    def notifying_recall(self, **fields):
+        return ProductRecall.objects.create(
+            batch_number='MZ-002', reason='Aflatoxin', status='notifying', notify_heartbeat_at=timezone.now(), **fields
+        )
+
+    def second_buyer(self):
+        buyer = User.objects.create_user('+233200000003', password='secret', roles=['BUYER'])
+        order = Order.objects.create(
+            buyer=buyer, seller=self.farmer, total_amount=Decimal('10.00'),
+            delivery_address='2 Market Road', delivery_city='Kumasi',
+            delivery_region='Ashanti', delivery_phone='+233200000003'
+        )
+        OrderItem.objects.create(
+            order=order, product=self.maize, product_name='Maize', quantity=1, unit_price=Decimal('10.00'), unit='kg'
+        )
+        return buyer
+
+    def fake_sms(self):
+        sms = mock.Mock()
+        sms.send_sms.side_effect = lambda phone, message: {'success': True, 'message_id': phone, 'response': {}}
+        patcher = mock.patch('communications.services.AVRSMSService', return_value=sms)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return sms
+
+    def test_task_notifies_every_buyer_once(self):
+        sms = self.fake_sms()
+        second = self.second_buyer()
+        recall = self.notifying_recall()
+
+        self.assertEqual(notify_recall_buyers.apply(args=[recall.pk]).get()['sent'], 2)
+        recall.refresh_from_db()
+        self.assertEqual((recall.status, recall.notifications_sent), ('notified', 2))
+        self.assertEqual(
+            sorted(call.args[0] for call in sms.send_sms.call_args_list),
+            [self.buyer.phone_number, second.phone_number]
+        )
+        # A redelivered task finds nothing to claim
+        self.assertIsNone(notify_recall_buyers.apply(args=[recall.pk]).get())
+
+    def test_retry_skips_buyers_already_sent_the_recall(self):
+        sms = self.fake_sms()
+        second = self.second_buyer()
+        recall = self.notifying_recall()
+        SMSMessage.objects.create(
+            recipient=self.buyer, recipient_phone=self.buyer.phone_number, message_type='product_recall',
+            content='recall', status='sent', campaign_id=recall.recall_id
+        )
+        SMSMessage.objects.create(
+            recipient=second, recipient_phone=second.phone_number, message_type='product_recall',
+            content='recall', status='failed', campaign_id=recall.recall_id
+        )
+
+        result = notify_affected_buyers(claim_notification(recall.pk))
+        self.assertEqual((result['sent'], result['finished']), (1, True))
+        sms.send_sms.assert_called_once()
+        self.assertEqual(sms.send_sms.call_args.args[0], second.phone_number)
+
+    def test_stale_run_is_reclaimed_and_fenced(self):
+        self.fake_sms()
+        recall = self.notifying_recall()
+        stale_run = claim_notification(recall.pk)
+        self.assertIsNone(claim_notification(recall.pk))
+        self.assertFalse(stalled_notifications().filter(pk=recall.pk).exists())
+
+        ProductRecall.objects.filter(pk=recall.pk).update(notify_heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(stalled_notifications().filter(pk=recall.pk).exists())
+        new_run = claim_notification(recall.pk)
+        self.assertNotEqual(new_run.notify_token, stale_run.notify_token)
+
+        # The superseded run neither counts its sends nor finishes the recall
+        result = notify_affected_buyers(stale_run)
+        self.assertFalse(result['finished'])
+        recall.refresh_from_db()
+        self.assertEqual((recall.status, recall.notifications_sent), ('notifying', 0))
+
+    def test_notify_is_released_when_the_queue_is_down(self):
+        admin = User.objects.create_user('admin@agriconnect.test', password='secret', is_staff=True)
+        recall = ProductRecall.objects.create(batch_number='MZ-002', reason='Aflatoxin', initiated_by=admin)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with mock.patch('traceability.views.notify_recall_buyers.delay', side_effect=ConnectionError):
+            response = client.post(f'/api/v1/traceability/recalls/{recall.pk}/notify/')
+        self.assertEqual(response.status_code, 503)
+        recall.refresh_from_db()
+        self.assertEqual(recall.status, 'open')
+
+
+class ChainAnchoringTests(TraceabilityFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        network = BlockchainNetwork.objects.create(name='Simulated', network_id=1337, rpc_url='sim://test')
+        self.contract = SmartContract.objects.create(
+            name='SupplyChain', contract_address='0x' + 'a' * 40, abi=[], network=network
+        )
+        trace = self.make_trace(self.make_product('Cassava'), 'CS-001')
+        self.events = [
+            SupplyChainEvent.objects.create(
+                product_trace=trace, event_type=event_type, actor=self.farmer, location='Ashanti',
+                timestamp=timezone.now(), description=event_type
+            )
+            for event_type in ('harvest', 'store', 'transport')
+        ]
+
+    def chain(self, **options):
+        return SimulatedChain(block_time=2.0, seed=7, clock=lambda: self.now, **options)
+
+    def poll(self, chain):
+        return poll_pending_transactions(self.contract.network, backend=chain, required_confirmations=2)
+
+    def test_blocks_are_mined_from_the_clock(self):
+        chain = self.chain()
+        tx_hash = chain.send_transaction('recordSupplyChainEvent', {}, '0x1', '0x2')
+        self.assertEqual(chain.get_receipt(tx_hash)['status'], 'pending')
+
+        self.now = 2.0
+        receipt = chain.get_receipt(tx_hash)
+        self.assertEqual((receipt['status'], receipt['block_number'], receipt['confirmations']), ('confirmed', 1, 1))
+        self.now = 10.0
+        self.assertEqual(chain.get_receipt(tx_hash)['confirmations'], 5)
+
+    def test_reorg_returns_transactions_to_the_mempool(self):
+        chain = self.chain(reorg_rate=1.0, max_reorg_depth=1)
+        tx_hash = chain.send_transaction('recordSupplyChainEvent', {}, '0x1', '0x2')
+        chain.mine()
+        first_block = chain.get_receipt(tx_hash)['block_hash']
+
+        # The next block orphans the head and includes the transaction again
+        chain.mine()
+        receipt = chain.get_receipt(tx_hash)
+        self.assertEqual(chain.reorg_count, 1)
+        self.assertEqual((receipt['status'], receipt['block_number']), ('confirmed', 1))
+        self.assertNotEqual(receipt['block_hash'], first_block)
+
+    def test_events_are_verified_after_the_required_confirmations(self):
+        chain = self.chain()
+        anchor_events(self.events, self.contract, '0x' + 'b' * 40, backend=chain)
+        self.assertEqual(
+            set(SupplyChainEvent.objects.values_list('blockchain_transaction__status', flat=True)), {'pending'}
+        )
+
+        self.assertEqual(self.poll(chain), {'polled': 3, 'updated': 0, 'confirmed': 0, 'failed': 0})
+        chain.mine()
+        self.assertEqual(self.poll(chain), {'polled': 3, 'updated': 3, 'confirmed': 0, 'failed': 0})
+        chain.mine()
+        self.assertEqual(self.poll(chain), {'polled': 3, 'updated': 3, 'confirmed': 3, 'failed': 0})
+        self.assertEqual(set(SupplyChainEvent.objects.values_list('status', flat=True)), {'verified'})
+
+    def test_failed_transactions_leave_events_unverified(self):
+        chain = self.chain(failure_rate=1.0)
+        anchor_events(self.events, self.contract, '0x' + 'b' * 40, backend=chain)
+        chain.mine()
+
+        self.assertEqual(self.poll(chain)['failed'], 3)
+        self.assertFalse(SupplyChainEvent.objects.filter(status='verified').exists())
@@ -20,6 +20,7 @@ router.register(r'certifications', views.FarmCertificationViewSet, basename='cer
 router.register(r'products', views.ProductTraceViewSet, basename='product-trace')
 router.register(r'events', views.SupplyChainEventViewSet, basename='event')
 router.register(r'scans', views.ConsumerScanViewSet, basename='scan')
+router.register(r'recalls', views.ProductRecallViewSet, basename='recall')
 router.register(r'dashboard', views.TraceabilityDashboardViewSet, basename='dashboard')
 
 @api_view(['GET'])
@@ -53,6 +54,7 @@ def traceability_root(request):
             "blockchain_networks": "/api/v1/traceability/networks/",
             "smart_contracts": "/api/v1/traceability/contracts/",
             "blockchain_transactions": "/api/v1/traceability/transactions/",
+            "recalls": "/api/v1/traceability/recalls/",
             "analytics_dashboard": "/api/v1/traceability/dashboard/"
         },
         "farm_operations": {
@@ -65,13 +67,15 @@ def traceability_root(request):
             "create_trace": "POST /products/",
             "generate_qr_code": "GET /products/{id}/qr_code/",
             "add_supply_chain_event": "POST /products/{id}/add_event/",
-            "consumer_view": "GET /products/{id}/consumer_view/"
+            "consumer_view": "GET /products/{id}/consumer_view/",
+            "batch_lineage": "GET /products/lineage/?batch_number=...&direction=upstream|downstream"
         },
         "blockchain_operations": {
             "record_on_blockchain": "POST /events/{id}/verify/",
             "verify_transaction": "POST /transactions/{id}/verify/",
             "deploy_contract": "POST /contracts/",
-            "network_status": "GET /dashboard/blockchain_status/"
+            "network_status": "GET /dashboard/blockchain_status/",
+            "scan_activity": "GET /dashboard/scan_activity/"
         },
         "consumer_features": {
             "scan_qr_code": "Consumer mobile app QR code scanning",
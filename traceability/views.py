@@ -6,27 +6,38 @@ REST API views for blockchain traceability system
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q, Avg, Sum
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.http import FileResponse, Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
 from datetime import datetime, timedelta
-import qrcode
-import base64
-import io
-import json
+import logging
 
 from .models import (
     BlockchainNetwork, SmartContract, BlockchainTransaction,
     Farm, FarmCertification, ProductTrace, SupplyChainEvent,
-    ConsumerScan
+    ConsumerScan, ConsumerScanRollup, ProductRecall
 )
 from .serializers import (
     BlockchainNetworkSerializer, SmartContractSerializer, BlockchainTransactionSerializer,
     FarmSerializer, FarmCertificationSerializer, ProductTraceSerializer,
-    SupplyChainEventSerializer, ConsumerScanSerializer, ConsumerTraceabilitySerializer,
+    SupplyChainEventSerializer, ConsumerScanSerializer,
     QRCodeDataSerializer, BlockchainVerificationSerializer, TraceabilityAnalyticsSerializer,
-    FarmRegistrationSerializer
+    FarmRegistrationSerializer, ProductRecallSerializer
 )
+from .qr_codes import (
+    QR_ASSET_FORMATS, build_qr_payload, serialize_qr_payload, ensure_qr_assets,
+    ensure_qr_assets_bulk, get_qr_config, qr_asset_path
+)
+from .scan_ingest import get_consumer_projection, record_consumer_scan
+from . import lineage
+from .recall import RecallImpactEngine
+from .tasks import notify_recall_buyers
+from .anchoring import ChainBackendUnavailable, apply_receipt, get_chain_backend
+
+logger = logging.getLogger(__name__)
 
 class ProductTraceViewSet(viewsets.ModelViewSet):
     """ViewSet for product traceability"""
@@ -42,66 +53,181 @@ class ProductTraceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
     def consumer_view(self, request, pk=None):
         """Consumer-facing traceability information"""
-        product_trace = self.get_object()
+        try:
+            trace_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        
+        projection = get_consumer_projection(trace_id)
+        if projection is None:
+            raise Http404
         
-        # Record the scan
-        ConsumerScan.objects.create(
-            product_trace=product_trace,
-            consumer_id=request.GET.get('consumer_id', ''),
+        # Record the scan; persisted in bulk by the scan buffer
+        record_consumer_scan(
+            trace_id,
+            consumer_id=request.GET.get('consumer_id', '')[:100],
             ip_address=self.get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', ''),
             device_type=self.get_device_type(request),
-            location=request.GET.get('location', '')
+            location=request.GET.get('location', '')[:300]
         )
         
-        # Update view count
-        product_trace.consumer_view_count += 1
-        product_trace.last_viewed_at = timezone.now()
-        product_trace.save()
-        
-        serializer = ConsumerTraceabilitySerializer(product_trace)
-        return Response(serializer.data)
+        return Response(projection)
 
     @action(detail=True, methods=['get'])
     def qr_code(self, request, pk=None):
         """Generate QR code for product"""
         product_trace = self.get_object()
         
-        # QR code data
-        qr_data = {
-            'product_id': product_trace.product.id,
-            'product_name': product_trace.product.name,
-            'batch_number': product_trace.batch_number,
-            'blockchain_id': product_trace.blockchain_id,
-            'farm_name': product_trace.farm.name,
-            'farmer_name': product_trace.farm.farmer.get_full_name(),
-            'harvest_date': product_trace.harvest_date.isoformat(),
-            'organic_certified': product_trace.farm.organic_certified,
-            'verification_url': f"{request.build_absolute_uri('/api/v1/traceability/products/')}{product_trace.id}/consumer_view/"
-        }
+        qr_data = build_qr_payload(product_trace, self._verification_base_url(request))
+        qr_text = serialize_qr_payload(qr_data)
+        content_hash = ensure_qr_assets(qr_text)
+        
+        # Only touch the row when the label content actually changed
+        if product_trace.qr_code_hash != content_hash:
+            product_trace.qr_code_data = qr_text
+            product_trace.qr_code_hash = content_hash
+            product_trace.save(update_fields=['qr_code_data', 'qr_code_hash'])
+        
+        return Response({
+            'qr_data': qr_data,
+            'qr_text': qr_text,
+            'qr_hash': content_hash,
+            'qr_image_url': self._qr_asset_url(request, product_trace, 'png'),
+            'qr_svg_url': self._qr_asset_url(request, product_trace, 'svg'),
+        })
+
+    @action(detail=True, methods=['get'], url_path=r'qr_code/(?P<asset_format>png|svg)')
+    def qr_code_asset(self, request, pk=None, asset_format='png'):
+        """Serve the stored QR label image with long-lived cache headers"""
+        product_trace = self.get_object()
+        content_hash = product_trace.qr_code_hash
+        if not content_hash:
+            content_hash = self._render_qr_assets(request, product_trace)
         
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(json.dumps(qr_data))
-        qr.make(fit=True)
+        etag = f'"{content_hash}"'
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            if not default_storage.exists(qr_asset_path(content_hash, asset_format)):
+                # Assets are content-addressed, so a lost file is simply rendered again
+                content_hash = self._render_qr_assets(request, product_trace)
+                etag = f'"{content_hash}"'
+            try:
+                asset = default_storage.open(qr_asset_path(content_hash, asset_format), 'rb')
+            except FileNotFoundError:
+                raise Http404
+            response = FileResponse(asset, content_type=QR_ASSET_FORMATS[asset_format])
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=get_qr_config()['CACHE_MAX_AGE'])
+        return response
+
+    @action(detail=False, methods=['post'])
+    def qr_batch(self, request):
+        """Generate QR labels for every trace in a batch"""
+        batch_number = request.data.get('batch_number')
+        if not batch_number:
+            return Response(
+                {'error': 'batch_number is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Create QR code image
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        qr_image_base64 = base64.b64encode(buffer.getvalue()).decode()
+        traces = list(
+            ProductTrace.objects.select_related('product', 'farm__farmer')
+            .filter(batch_number=batch_number, is_active=True)
+            .order_by('id')
+        )
+        if not traces:
+            return Response(
+                {'error': 'No active product traces found for this batch'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        # Update product trace with QR code data
-        product_trace.qr_code_data = json.dumps(qr_data)
-        product_trace.qr_code_image = qr_image_base64
-        product_trace.save()
+        base_url = self._verification_base_url(request)
+        qr_texts = [serialize_qr_payload(build_qr_payload(trace, base_url)) for trace in traces]
+        content_hashes = ensure_qr_assets_bulk(qr_texts)
+        
+        changed = []
+        for trace, qr_text, content_hash in zip(traces, qr_texts, content_hashes):
+            if trace.qr_code_hash != content_hash:
+                trace.qr_code_data = qr_text
+                trace.qr_code_hash = content_hash
+                changed.append(trace)
+        if changed:
+            ProductTrace.objects.bulk_update(changed, ['qr_code_data', 'qr_code_hash'], batch_size=500)
         
         return Response({
-            'qr_data': qr_data,
-            'qr_image': qr_image_base64,
-            'qr_text': json.dumps(qr_data)
+            'batch_number': batch_number,
+            'label_count': len(traces),
+            'labels': [{
+                'product_trace_id': trace.id,
+                'blockchain_id': trace.blockchain_id,
+                'qr_hash': trace.qr_code_hash,
+                'qr_image_url': self._qr_asset_url(request, trace, 'png'),
+                'qr_svg_url': self._qr_asset_url(request, trace, 'svg'),
+            } for trace in traces]
         })
 
+    @action(detail=False, methods=['get'])
+    def lineage(self, request):
+        """Upstream origins or downstream reach of a batch from the lineage closure"""
+        batch_number = request.GET.get('batch_number')
+        if not batch_number:
+            return Response(
+                {'error': 'batch_number is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        direction = request.GET.get('direction', 'upstream')
+        if direction == 'upstream':
+            nodes = lineage.group_node_ids(lineage.batch_upstream(batch_number), 'ancestor')
+            farms = Farm.objects.filter(pk__in=nodes.get('farm', [])).select_related('farmer')
+            events = SupplyChainEvent.objects.filter(
+                pk__in=nodes.get('event', [])
+            ).select_related('product_trace__product', 'actor')
+            return Response({
+                'batch_number': batch_number,
+                'direction': direction,
+                'farms': FarmSerializer(farms, many=True).data,
+                'events': SupplyChainEventSerializer(events, many=True).data,
+            })
+        
+        if direction == 'downstream':
+            nodes = lineage.group_node_ids(lineage.batch_downstream(batch_number), 'descendant')
+            return Response({
+                'batch_number': batch_number,
+                'direction': direction,
+                'products': nodes.get('product', []),
+                'order_items': nodes.get('order_item', []),
+                'orders': nodes.get('order', []),
+            })
+        
+        return Response(
+            {'error': "direction must be 'upstream' or 'downstream'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _verification_base_url(self, request):
+        return request.build_absolute_uri('/api/v1/traceability/products/')
+
+    def _render_qr_assets(self, request, product_trace):
+        """Render (if missing) the trace's current label and record its hash"""
+        qr_text = serialize_qr_payload(
+            build_qr_payload(product_trace, self._verification_base_url(request))
+        )
+        content_hash = ensure_qr_assets(qr_text)
+        if product_trace.qr_code_hash != content_hash:
+            product_trace.qr_code_data = qr_text
+            product_trace.qr_code_hash = content_hash
+            product_trace.save(update_fields=['qr_code_data', 'qr_code_hash'])
+        return content_hash
+
+    def _qr_asset_url(self, request, product_trace, asset_format):
+        return (
+            f"{self._verification_base_url(request)}{product_trace.id}/qr_code/{asset_format}/"
+            f"?v={product_trace.qr_code_hash[:12]}"
+        )
+
     def get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -152,11 +278,28 @@ class BlockchainTransactionViewSet(viewsets.ReadOnlyModelViewSet):
     def verify(self, request, pk=None):
         """Verify transaction status on blockchain"""
         transaction = self.get_object()
-        # TODO: Implement actual blockchain verification
+        try:
+            backend = get_chain_backend(transaction.contract.network)
+        except ChainBackendUnavailable as exc:
+            return Response({
+                'verified': False,
+                'transaction_hash': transaction.transaction_hash,
+                'status': transaction.status,
+                'confirmation_count': transaction.confirmation_count,
+                'error_message': str(exc)
+            })
+        
+        if apply_receipt(transaction, backend.get_receipt(transaction.transaction_hash)):
+            transaction.save(update_fields=[
+                'status', 'block_number', 'block_hash', 'gas_used',
+                'confirmation_count', 'confirmed_at'
+            ])
+        
         return Response({
-            'verified': True,
+            'verified': transaction.status == 'confirmed',
             'transaction_hash': transaction.transaction_hash,
             'status': transaction.status,
+            'block_number': transaction.block_number,
             'confirmation_count': transaction.confirmation_count
         })
 
@@ -246,6 +389,71 @@ class ConsumerScanViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['product_trace__product__name', 'consumer_id']
     ordering = ['-scanned_at']
 
+class ProductRecallViewSet(viewsets.ModelViewSet):
+    """ViewSet for batch recalls and their downstream impact (staff only)"""
+    queryset = ProductRecall.objects.select_related('product_trace', 'initiated_by').all()
+    serializer_class = ProductRecallSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['status', 'batch_number']
+    search_fields = ['batch_number', 'reason']
+    ordering = ['-created_at']
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def perform_create(self, serializer):
+        recall = serializer.save(initiated_by=self.request.user)
+        engine = RecallImpactEngine(batch_number=recall.batch_number, product_trace=recall.product_trace)
+        recall.impact_summary = engine.summary()
+        recall.save(update_fields=['impact_summary'])
+
+    @action(detail=True, methods=['get'])
+    def impact(self, request, pk=None):
+        """Stream the full impact set as NDJSON (default) or CSV (?output=csv)"""
+        recall = self.get_object()
+        engine = RecallImpactEngine(batch_number=recall.batch_number, product_trace=recall.product_trace)
+        
+        if request.GET.get('output') == 'csv':
+            response = StreamingHttpResponse(engine.stream_csv(), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="recall-{recall.batch_number}.csv"'
+        else:
+            response = StreamingHttpResponse(engine.stream_ndjson(), content_type='application/x-ndjson')
+        return response
+
+    @action(detail=True, methods=['post'])
+    def notify(self, request, pk=None):
+        """Queue SMS notification of every affected buyer"""
+        recall = self.get_object()
+        claimed = ProductRecall.objects.filter(pk=recall.pk).exclude(
+            status__in=('notifying', 'closed')
+        ).update(status='notifying', notify_token=None, notify_heartbeat_at=timezone.now())
+        if not claimed:
+            recall.refresh_from_db(fields=['status'])
+            return Response(
+                {'error': f'Recall is {recall.get_status_display().lower()}'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            notify_recall_buyers.delay(recall.pk)
+        except Exception as e:
+            ProductRecall.objects.filter(pk=recall.pk, status='notifying').update(status=recall.status)
+            logger.error(f"Could not queue recall {recall.recall_id} notifications: {str(e)}")
+            return Response(
+                {'error': 'Notification queue unavailable, try again shortly'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response(
+            {'recall_id': str(recall.recall_id), 'status': 'notifying'},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        recall = self.get_object()
+        recall.status = 'closed'
+        recall.closed_at = timezone.now()
+        recall.save(update_fields=['status', 'closed_at'])
+        return Response({'message': 'Recall closed'})
+
 class TraceabilityDashboardViewSet(viewsets.ViewSet):
     """Dashboard views for traceability analytics"""
     permission_classes = [permissions.AllowAny]  # Temporarily allow for testing
@@ -308,3 +516,60 @@ class TraceabilityDashboardViewSet(viewsets.ViewSet):
         
         serializer = TraceabilityAnalyticsSerializer(data)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def scan_activity(self, request):
+        """Consumer scan activity from hourly rollups"""
+        try:
+            hours = min(max(int(request.GET.get('hours', 24)), 1), 24 * 90)
+        except ValueError:
+            hours = 24
+        since = timezone.now() - timedelta(hours=hours)
+        rollups = ConsumerScanRollup.objects.filter(bucket_start__gte=since)
+        
+        product_trace = request.GET.get('product_trace')
+        if product_trace:
+            try:
+                product_trace = int(product_trace)
+            except ValueError:
+                return Response(
+                    {'error': 'product_trace must be an integer id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rollups = rollups.filter(product_trace_id=product_trace)
+        
+        hourly = rollups.values('bucket_start').annotate(
+            scans=Sum('scan_count')
+        ).order_by('bucket_start')
+        by_trace = rollups.values(
+            'product_trace_id', 'product_trace__product__name', 'product_trace__batch_number'
+        ).annotate(scans=Sum('scan_count')).order_by('-scans')[:20]
+        by_region = rollups.values('region').annotate(
+            scans=Sum('scan_count')
+        ).order_by('-scans')[:20]
+        by_device = rollups.values('device_type').annotate(
+            scans=Sum('scan_count')
+        ).order_by('-scans')
+        
+        return Response({
+            'window_hours': hours,
+            'total_scans': rollups.aggregate(total=Sum('scan_count'))['total'] or 0,
+            'hourly': [{
+                'hour': row['bucket_start'].isoformat(),
+                'scans': row['scans']
+            } for row in hourly],
+            'by_product': [{
+                'product_trace_id': row['product_trace_id'],
+                'product_name': row['product_trace__product__name'],
+                'batch_number': row['product_trace__batch_number'],
+                'scans': row['scans']
+            } for row in by_trace],
+            'by_region': [{
+                'region': row['region'] or 'unknown',
+                'scans': row['scans']
+            } for row in by_region],
+            'by_device': [{
+                'device_type': row['device_type'] or 'unknown',
+                'scans': row['scans']
+            } for row in by_device],
+        })